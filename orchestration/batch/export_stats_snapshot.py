@@ -0,0 +1,41 @@
+import sys
+import traceback
+from time import time
+
+from extract_stats.main import LEAGUE_CONFIG
+from prop_generation.snapshot import export_snapshot
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def main():
+    try:
+        start_time = time()
+
+        if len(sys.argv) < 3:
+            logger.error("Usage: python export_stats_snapshot.py <directory> <league> [<league> ...]")
+            sys.exit(1)
+
+        directory = sys.argv[1]
+        leagues = sys.argv[2:]
+        for league in leagues:
+            if league not in LEAGUE_CONFIG:
+                logger.error(f"Invalid league: {league}. Must be one of: {', '.join(LEAGUE_CONFIG.keys())}")
+                sys.exit(1)
+
+        for league in leagues:
+            logger.info(f"Exporting {league} stat snapshot")
+            export_snapshot(directory, league, LEAGUE_CONFIG[league]["sport"])
+
+        end_time = time()
+        logger.info(f"Stat snapshots exported in {end_time - start_time:.2f}s")
+
+    except Exception as e:
+        logger.error(f"Fatal error in export_stats_snapshot: {e}")
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import json
 import sys
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
@@ -6,6 +5,7 @@ from zoneinfo import ZoneInfo
 from utils import data_feeds_req, setup_logger
 from constants import LEAGUES
 from shared.game_processor import process_game
+from shared.feed_reader import iter_feed_games
 
 logger = setup_logger(__name__)
 
@@ -19,18 +19,16 @@ def main():
         ).strftime("%Y-%m-%d")
 
         for league in LEAGUES:
-            feed_req = data_feeds_req(f"/live/{yesterday_str}/{league}")
+            feed_req = data_feeds_req(f"/live/{yesterday_str}/{league}", stream=True)
             if feed_req.status_code == 304:
+                feed_req.close()
                 logger.info(f"Skipping {league}, no games yesterday")
                 continue
 
-            feed_data = feed_req.json()
-            games = feed_data["data"][league]
-
             league_player_stats_inserted = 0
             league_team_stats_inserted = 0
 
-            for game in games:
+            for game in iter_feed_games(feed_req, league):
                 if game["status"] != "completed":
                     logger.info(
                         f"Skipping game {game['game_ID']} - status: {game['status']}"
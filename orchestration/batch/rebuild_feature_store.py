@@ -0,0 +1,40 @@
+import sys
+import traceback
+from time import time
+
+from extract_stats.main import LEAGUE_CONFIG
+from prop_generation.feature_store import rebuild_feature_store
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def main():
+    try:
+        start_time = time()
+
+        if len(sys.argv) < 2:
+            logger.error("Usage: python rebuild_feature_store.py <league> [<league> ...]")
+            sys.exit(1)
+
+        for league in sys.argv[1:]:
+            if league not in LEAGUE_CONFIG:
+                logger.error(f"Invalid league: {league}. Must be one of: {', '.join(LEAGUE_CONFIG.keys())}")
+                sys.exit(1)
+
+        for league in sys.argv[1:]:
+            logger.info(f"Rebuilding feature windows for {league}")
+            teams_written, players_written = rebuild_feature_store(league, LEAGUE_CONFIG[league]["sport"])
+            logger.info(f"{teams_written} team and {players_written} player feature windows rebuilt for {league}")
+
+        end_time = time()
+        logger.info(f"Feature store rebuilt in {end_time - start_time:.2f}s")
+
+    except Exception as e:
+        logger.error(f"Fatal error in rebuild_feature_store: {e}")
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Summarizes exported trace spans (see tracing.py): end-to-end settlement lag
+per league, from a stat update reaching webhook_server to a match it settles
+resolving, and the queue wait and handling time of each hop.
+
+Usage: python settlement_lag_report.py <spans.jsonl> [<spans.jsonl> ...]
+"""
+
+import json
+import sys
+import traceback
+from collections import defaultdict
+
+import numpy as np
+
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def load_spans(paths: list[str]) -> list[dict]:
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def summarize(values: list[float]) -> str:
+    p50, p99 = np.percentile(values, [50, 99])
+    return f"{len(values):>8} {p50:>9.3f} {p99:>9.3f} {max(values):>9.3f}"
+
+
+def settlement_lags(spans: list[dict]) -> dict[str, list[float]]:
+    """Seconds from origin to match resolution per league; traces not started by a stat update are left out"""
+    lags = defaultdict(list)
+    for span in spans:
+        if span["kind"] == "mark" and span["name"] == "match_resolved" and span["league"]:
+            lags[span["league"]].append(span["at"] - span["origin_at"])
+    return lags
+
+
+def hop_timings(spans: list[dict]) -> dict[str, tuple[list[float], list[float]]]:
+    """Queue wait and handling seconds per channel"""
+    timings = defaultdict(lambda: ([], []))
+    for span in spans:
+        if span["kind"] == "handler":
+            waits, handling = timings[span["name"]]
+            waits.append(span["started_at"] - span["published_at"])
+            handling.append(span["ended_at"] - span["started_at"])
+    return timings
+
+
+def main():
+    try:
+        if len(sys.argv) < 2:
+            logger.error("Usage: python settlement_lag_report.py <spans.jsonl> [<spans.jsonl> ...]")
+            sys.exit(1)
+
+        spans = load_spans(sys.argv[1:])
+
+        header = f"{'count':>8} {'p50 (s)':>9} {'p99 (s)':>9} {'max (s)':>9}"
+        print(f"Settlement lag, stat update to match resolved\n{'league':<24}{header}")
+        for league, lags in sorted(settlement_lags(spans).items()):
+            print(f"{league:<24}{summarize(lags)}")
+
+        print(f"\nHops\n{'channel':<24}{'':<6}{header}")
+        for channel, (waits, handling) in sorted(hop_timings(spans).items()):
+            print(f"{channel:<24}{'queue':<6}{summarize(waits)}")
+            print(f"{'':<24}{'run':<6}{summarize(handling)}")
+
+    except Exception as e:
+        logger.error(f"Fatal error in settlement_lag_report: {e}")
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
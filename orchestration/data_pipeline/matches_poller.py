@@ -1,4 +1,5 @@
 from utils import setup_logger
+from metrics import start_metrics_server
 from redis_utils import create_async_redis_client, publish_message_async
 from db.connection import get_async_pool
 import asyncio
@@ -111,6 +112,7 @@ async def poll_matches():
 async def main():
     """Main function that starts the matches poller"""
     try:
+        start_metrics_server()
         await poll_matches()
     except KeyboardInterrupt:
         logger.warning("Shutting down matches_poller...")
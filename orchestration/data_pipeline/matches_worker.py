@@ -1,10 +1,25 @@
-from utils import setup_logger, async_server_req
+from utils import setup_logger
+from metrics import start_metrics_server
+from profiling import profiled, start_profiling_control
 from redis_utils import (
     create_async_redis_client,
     publish_message_async,
     listen_for_messages_async,
 )
-from db.connection import get_async_pool
+from db.connection import get_async_pool, pipeline
+from db.instrumentation import statement_budget
+from db.statements import (
+    AVAILABLE_PROPS_IN_LEAGUE,
+    LOCK_UNRESOLVED_MATCH,
+    MATCH_BY_ID,
+    MATCH_FOR_PARLAY,
+    MATCH_USER_PARLAYS,
+    MATCH_USERS,
+    PARLAY_EXISTS,
+    execute,
+)
+from db.outbox import OutboxNotification, enqueue_notifications
+from tracing import mark
 import asyncio
 from typing import TypedDict, Optional, List
 from datetime import datetime
@@ -70,6 +85,8 @@ def recalculate_points(current_points: List[float], winner: Optional[int]) -> Li
     return [round(r_prime_a), round(r_prime_b)]
 
 
+@profiled
+@statement_budget(30)
 async def handle_parlay_resolved(data):
     """Handles incoming parlay_resolved messages asynchronously"""
     start_time = time()
@@ -88,13 +105,7 @@ async def handle_parlay_resolved(data):
                     await cur.execute("BEGIN")
 
                     # Verify parlay exists
-                    parlay_check_query = """
-                        SELECT id
-                        FROM parlay
-                        WHERE id = %s
-                    """
-
-                    await cur.execute(parlay_check_query, (parlay_id,))
+                    await execute(cur, PARLAY_EXISTS, (parlay_id,))
                     parlay_res = await cur.fetchone()
 
                     if not parlay_res:
@@ -103,19 +114,7 @@ async def handle_parlay_resolved(data):
                         return
 
                     # Get match with all related data
-                    match_query = """
-                        SELECT DISTINCT
-                            m.id as match_id,
-                            m.type as match_type,
-                            m.league as match_league,
-                            m.resolved as match_resolved
-                        FROM parlay p
-                        JOIN match_user mu ON p.match_user_id = mu.id
-                        JOIN match m ON mu.match_id = m.id
-                        WHERE p.id = %s
-                    """
-
-                    await cur.execute(match_query, (parlay_id,))
+                    await execute(cur, MATCH_FOR_PARLAY, (parlay_id,))
                     match_res = await cur.fetchone()
 
                     if not match_res:
@@ -126,7 +125,7 @@ async def handle_parlay_resolved(data):
                     match_id = match_res[0]
 
                     # Acquire exclusive lock on match to prevent concurrent resolution
-                    await cur.execute("SELECT id FROM match WHERE id = %s AND resolved = false FOR UPDATE", (match_id,))
+                    await execute(cur, LOCK_UNRESOLVED_MATCH, (match_id,))
                     lock_result = await cur.fetchone()
                     if not lock_result:
                         logger.info(f"Match {match_id} is already resolved")
@@ -135,21 +134,7 @@ async def handle_parlay_resolved(data):
 
 
                     # Get all match users with parlays
-                    match_users_query = """
-                        SELECT
-                            mu.id as match_user_id,
-                            mu.user_id,
-                            mu.balance,
-                            mu.starting_balance,
-                            mu.points_snapshot,
-                            mu.points_delta,
-                            mu.status
-                        FROM match_user mu
-                        WHERE mu.match_id = %s
-                        ORDER BY mu.id
-                    """
-
-                    await cur.execute(match_users_query, (match_id,))
+                    await execute(cur, MATCH_USERS, (match_id,))
                     match_users_res = await cur.fetchall()
 
                     if len(match_users_res) != 2:
@@ -160,13 +145,7 @@ async def handle_parlay_resolved(data):
                     # Get parlays for each match user
                     match_users_data = []
                     for mu_row in match_users_res:
-                        parlays_query = """
-                            SELECT id, stake, resolved, payout
-                            FROM parlay
-                            WHERE match_user_id = %s
-                        """
-
-                        await cur.execute(parlays_query, (mu_row[0],))
+                        await execute(cur, MATCH_USER_PARLAYS, (mu_row[0],))
                         parlays_res = await cur.fetchall()
 
                         parlays = [
@@ -204,17 +183,8 @@ async def handle_parlay_resolved(data):
 
                     # Check if props are still available (simplified check)
                     # In production, you might want to implement the full getAvailablePropsForUser logic
-                    props_available_query = """
-                        SELECT COUNT(*) as available_count
-                        FROM prop p
-                        JOIN game g ON p.game_id = g.game_id
-                        WHERE g.league = %s
-                        AND p.status = 'not_resolved'
-                        AND g.start_time AT TIME ZONE 'UTC' > (NOW() AT TIME ZONE 'UTC')
-                    """
-
-                    await cur.execute(
-                        props_available_query, (match_res[2],)
+                    await execute(
+                        cur, AVAILABLE_PROPS_IN_LEAGUE, (match_res[2],)
                     )  # match_league
                     props_count_res = await cur.fetchone()
 
@@ -229,12 +199,17 @@ async def handle_parlay_resolved(data):
                         f"Match {match_id} resolution triggered by parlay {parlay_id}"
                     )
 
-                    # Resolve the match
-                    await _resolve_match(
-                        cur, match_id, match_res[1], match_users_data
-                    )
+                    # Resolve the match, pipelined so only the Elo point reads wait on the server
+                    async with pipeline(conn):
+                        await _resolve_match(
+                            cur, match_id, match_res[1], match_users_data
+                        )
+                        await enqueue_notifications(
+                            cur, _match_resolved_notifications(match_id, match_users_data)
+                        )
 
-                    await cur.execute("COMMIT")
+                        await cur.execute("COMMIT")
+                    mark("match_resolved", match_id=match_id)
 
                     # Publish Redis messages for cache invalidation
                     try:
@@ -254,9 +229,6 @@ async def handle_parlay_resolved(data):
                     logger.error(f"Full traceback: {traceback.format_exc()}")
                     raise e
 
-    except Exception as e:
-        logger.error(f"Error handling parlay resolved: {e}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
     finally:
         await redis_publisher.aclose()
 
@@ -376,18 +348,19 @@ async def _update_elo_points(
     if status1 == "disqualified" and status2 == "disqualified":
         return
 
-    # Get current user points atomically using SELECT FOR UPDATE
-    await cur.execute(
-        "SELECT id, points FROM public.user WHERE id = %s FOR UPDATE",
-        (match_user1["user_id"],)
-    )
-    user1_res = await cur.fetchone()
-
-    await cur.execute(
-        "SELECT id, points FROM public.user WHERE id = %s FOR UPDATE",
-        (match_user2["user_id"],)
-    )
-    user2_res = await cur.fetchone()
+    # Get current user points atomically using SELECT FOR UPDATE. Both reads are
+    # sent before either is fetched, on separate cursors so each keeps its result
+    async with cur.connection.cursor() as user2_cur:
+        await cur.execute(
+            "SELECT id, points FROM public.user WHERE id = %s FOR UPDATE",
+            (match_user1["user_id"],)
+        )
+        await user2_cur.execute(
+            "SELECT id, points FROM public.user WHERE id = %s FOR UPDATE",
+            (match_user2["user_id"],)
+        )
+        user1_res = await cur.fetchone()
+        user2_res = await user2_cur.fetchone()
 
     if not user1_res or not user2_res:
         return
@@ -427,26 +400,6 @@ async def _update_battle_pass_xp(
     """Update battle pass XP for a user"""
     now = datetime.now().isoformat()
 
-    # Get active battle passes for user
-    battle_pass_query = """
-        SELECT
-            ubp.battle_pass_id,
-            ubp.id as user_battle_pass_progress_id,
-            ubp.current_xp
-        FROM user_battle_pass_progress ubp
-        JOIN battle_pass bp ON ubp.battle_pass_id = bp.id
-        WHERE bp.is_active = true
-        AND bp.start_date <= %s
-        AND bp.end_date >= %s
-        AND ubp.user_id = %s
-    """
-
-    await cur.execute(battle_pass_query, (now, now, user_id))
-    battle_passes_res = await cur.fetchall()
-
-    if not battle_passes_res:
-        return  # No active battle passes
-
     # Calculate XP
     base_xp = 50
     parlay_bonus = parlay_count * 10
@@ -459,16 +412,32 @@ async def _update_battle_pass_xp(
     total_xp = int((base_xp + parlay_bonus + staking_bonus) * multiplier)
     xp_gained = max(25, total_xp)
 
-    # Update each active battle pass atomically
-    for bp_row in battle_passes_res:
-        progress_id = bp_row[1]
+    # Update each of the user's active battle passes atomically; one statement
+    # that needs no result, so it waits on nothing in a pipeline
+    await cur.execute(
+        """UPDATE user_battle_pass_progress ubp
+           SET current_xp = COALESCE(ubp.current_xp, 0) + %s
+           FROM battle_pass bp
+           WHERE ubp.battle_pass_id = bp.id
+           AND bp.is_active = true
+           AND bp.start_date <= %s
+           AND bp.end_date >= %s
+           AND ubp.user_id = %s""",
+        (xp_gained, now, now, user_id),
+    )
+
 
-        await cur.execute(
-            """UPDATE user_battle_pass_progress
-               SET current_xp = COALESCE(current_xp, 0) + %s
-               WHERE id = %s""",
-            (xp_gained, progress_id),
-        )
+def _match_resolved_notifications(match_id: int, match_users_data: List[dict]) -> List[OutboxNotification]:
+    """Push notifications telling both players their match ended"""
+    return [
+        {
+            "receiver_id": match_user["user_id"],
+            "title": "Match Ended",
+            "body": "Your match has ended. Check your results!",
+            "url": f"/match/{match_id}",
+        }
+        for match_user in match_users_data[:2]
+    ]
 
 
 async def _publish_match_resolved_messages(
@@ -478,7 +447,7 @@ async def _publish_match_resolved_messages(
     match_type: str,
     league: str,
 ):
-    """Publish cache invalidation via Redis and send push notifications via HTTP"""
+    """Publish cache invalidation via Redis"""
     user1_id = match_users_data[0]["user_id"]
     user2_id = match_users_data[1]["user_id"]
 
@@ -499,28 +468,13 @@ async def _publish_match_resolved_messages(
         ["battle-pass", BATTLE_PASS_ID, "progress", user2_id]
     ]
 
-    # Publish cache invalidation via Redis and send notification via HTTP in parallel
-    await asyncio.gather(
-        publish_message_async(
-            redis_publisher, "invalidate_queries", {"keys": invalidation_keys}
-        ),
-        async_server_req(
-            route="/push-notifications",
-            method="POST",
-            body={
-                "receiverIdsList": [user1_id, user2_id],
-                "pushNotification": {
-                    "title": "Match Ended",
-                    "body": "Your match has ended. Check your results!",
-                    "data": {
-                        "url": f"/match/{match_id}"
-                    }
-                },
-            },
-        )
+    await publish_message_async(
+        redis_publisher, "invalidate_queries", {"keys": invalidation_keys}
     )
 
 
+@profiled
+@statement_budget(30)
 async def handle_match_check(data):
     """Handles incoming match_check messages to resolve matches without parlay triggers"""
     start_time = time()
@@ -539,17 +493,7 @@ async def handle_match_check(data):
                     await cur.execute("BEGIN")
 
                     # Get match with all related data
-                    match_query = """
-                        SELECT
-                            m.id as match_id,
-                            m.type as match_type,
-                            m.league as match_league,
-                            m.resolved as match_resolved
-                        FROM match m
-                        WHERE m.id = %s
-                    """
-
-                    await cur.execute(match_query, (match_id,))
+                    await execute(cur, MATCH_BY_ID, (match_id,))
                     match_res = await cur.fetchone()
 
                     if not match_res:
@@ -558,7 +502,7 @@ async def handle_match_check(data):
                         return
 
                     # Acquire exclusive lock on match to prevent concurrent resolution
-                    await cur.execute("SELECT id FROM match WHERE id = %s AND resolved = false FOR UPDATE", (match_id,))
+                    await execute(cur, LOCK_UNRESOLVED_MATCH, (match_id,))
                     lock_result = await cur.fetchone()
                     if not lock_result:
                         logger.info(f"Match {match_id} is already resolved")
@@ -567,21 +511,7 @@ async def handle_match_check(data):
 
 
                     # Get all match users with parlays
-                    match_users_query = """
-                        SELECT
-                            mu.id as match_user_id,
-                            mu.user_id,
-                            mu.balance,
-                            mu.starting_balance,
-                            mu.points_snapshot,
-                            mu.points_delta,
-                            mu.status
-                        FROM match_user mu
-                        WHERE mu.match_id = %s
-                        ORDER BY mu.id
-                    """
-
-                    await cur.execute(match_users_query, (match_id,))
+                    await execute(cur, MATCH_USERS, (match_id,))
                     match_users_res = await cur.fetchall()
 
                     if len(match_users_res) != 2:
@@ -592,13 +522,7 @@ async def handle_match_check(data):
                     # Get parlays for each match user
                     match_users_data = []
                     for mu_row in match_users_res:
-                        parlays_query = """
-                            SELECT id, stake, resolved, payout
-                            FROM parlay
-                            WHERE match_user_id = %s
-                        """
-
-                        await cur.execute(parlays_query, (mu_row[0],))
+                        await execute(cur, MATCH_USER_PARLAYS, (mu_row[0],))
                         parlays_res = await cur.fetchall()
 
                         parlays = [
@@ -639,17 +563,8 @@ async def handle_match_check(data):
                         return
 
                     # Check if props are still available
-                    props_available_query = """
-                        SELECT COUNT(*) as available_count
-                        FROM prop p
-                        JOIN game g ON p.game_id = g.game_id
-                        WHERE g.league = %s
-                        AND p.status = 'not_resolved'
-                        AND g.start_time AT TIME ZONE 'UTC' > (NOW() AT TIME ZONE 'UTC')
-                    """
-
-                    await cur.execute(
-                        props_available_query, (match_res[2],)
+                    await execute(
+                        cur, AVAILABLE_PROPS_IN_LEAGUE, (match_res[2],)
                     )  # match_league
                     props_count_res = await cur.fetchone()
 
@@ -662,12 +577,17 @@ async def handle_match_check(data):
 
                     logger.info(f"Match {match_id} resolution triggered by match_check")
 
-                    # Resolve the match
-                    await _resolve_match(
-                        cur, match_id, match_res[1], match_users_data
-                    )
+                    # Resolve the match, pipelined so only the Elo point reads wait on the server
+                    async with pipeline(conn):
+                        await _resolve_match(
+                            cur, match_id, match_res[1], match_users_data
+                        )
+                        await enqueue_notifications(
+                            cur, _match_resolved_notifications(match_id, match_users_data)
+                        )
 
-                    await cur.execute("COMMIT")
+                        await cur.execute("COMMIT")
+                    mark("match_resolved", match_id=match_id)
 
                     # Publish Redis messages for cache invalidation
                     await _publish_match_resolved_messages(
@@ -683,9 +603,6 @@ async def handle_match_check(data):
                     logger.error(f"Database transaction failed: {e}")
                     raise e
 
-    except Exception as e:
-        logger.error(f"Error handling match check: {e}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
     finally:
         await redis_publisher.aclose()
 
@@ -695,22 +612,6 @@ async def handle_match_check(data):
     )
 
 
-async def handle_parlay_resolved_safe(data):
-    """Safe wrapper for handle_parlay_resolved that prevents listener crashes"""
-    try:
-        await handle_parlay_resolved(data)
-    except Exception as e:
-        logger.error(f"Error handling parlay_resolved message: {e}", exc_info=True)
-        logger.error(f"Full traceback: {traceback.format_exc()}")
-
-async def handle_match_check_safe(data):
-    """Safe wrapper for handle_match_check that prevents listener crashes"""
-    try:
-        await handle_match_check(data)
-    except Exception as e:
-        logger.error(f"Error handling match_check message: {e}", exc_info=True)
-        logger.error(f"Full traceback: {traceback.format_exc()}")
-
 async def listen_for_parlay_resolved():
     """Function that listens for a parlay_resolved message on redis"""
     while True:
@@ -719,7 +620,7 @@ async def listen_for_parlay_resolved():
             redis_subscriber = await create_async_redis_client()
             logger.info("Listening for parlay_resolved messages...")
             await listen_for_messages_async(
-                redis_subscriber, "parlay_resolved", handle_parlay_resolved_safe
+                redis_subscriber, "parlay_resolved", handle_parlay_resolved
             )
         except Exception as e:
             logger.error(f"Error in parlay_resolved listener, restarting: {e}")
@@ -738,7 +639,7 @@ async def listen_for_match_check():
             redis_subscriber = await create_async_redis_client()
             logger.info("Listening for match_check messages...")
             await listen_for_messages_async(
-                redis_subscriber, "match_check", handle_match_check_safe
+                redis_subscriber, "match_check", handle_match_check
             )
         except Exception as e:
             logger.error(f"Error in match_check listener, restarting: {e}")
@@ -752,6 +653,8 @@ async def listen_for_match_check():
 async def main():
     """Main function that listens for both parlay_resolved and match_check messages."""
     try:
+        start_metrics_server()
+        start_profiling_control()
         # Run both listeners concurrently
         await asyncio.gather(listen_for_parlay_resolved(), listen_for_match_check())
     except KeyboardInterrupt:
@@ -0,0 +1,191 @@
+"""
+Sends the push notifications settlement workers leave in the outbox.
+
+Each pass leases a batch of due notifications in a short transaction, merges
+them, sends them concurrently under a rate limit with no transaction open, and
+records the outcome in a second short transaction. Each receiver gets one push
+per batch: a single notification as it is, several merged into a summary that
+links to the most recent one. Receivers of identical pushes share a request.
+A failed request is retried with
+exponential backoff until it has been attempted MAX_ATTEMPTS times, after which
+its notifications are logged as dead letters and purged with the sent ones.
+Several dispatchers can run at once; leased rows are skipped.
+"""
+
+import asyncio
+import traceback
+from time import time
+
+from psycopg.rows import dict_row
+
+from db.connection import get_async_pool
+from db.outbox import (
+    PendingNotification,
+    claim_notifications,
+    delete_finished_notifications,
+    mark_notifications_failed,
+    mark_notifications_sent,
+)
+from metrics import start_metrics_server
+from utils import AsyncRateLimiter, async_server_req, setup_logger
+
+logger = setup_logger(__name__)
+
+BATCH_SIZE = 500
+POLL_SECONDS = 1
+MAX_CONCURRENT_REQUESTS = 10
+REQUESTS_PER_SECOND = 20
+MAX_ATTEMPTS = 8
+# Leased rows go back to other dispatchers after this long; sends still running
+# SEND_DEADLINE_SECONDS into a batch are abandoned as failures well before then
+LEASE_SECONDS = 300
+SEND_DEADLINE_SECONDS = 240
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 600
+RETENTION_DAYS = 7
+CLEANUP_INTERVAL_SECONDS = 3600
+
+
+def summarize_notifications(rows: list[PendingNotification]) -> tuple[str, str, str | None]:
+    """(title, body, url) of the one push standing for a receiver's notifications, oldest first"""
+    titles = list(dict.fromkeys(row["title"] for row in rows))
+    bodies = list(dict.fromkeys(row["body"] for row in rows))
+    title = titles[0] if len(titles) == 1 else f"{len(rows)} new notifications"
+    body = bodies[0] if len(bodies) == 1 else "\n".join(bodies)
+    if len(bodies) == 1 and len(rows) > 1:
+        body = f"{body} ({len(rows)} updates)"
+    return title, body, rows[-1]["url"]
+
+
+def merge_notifications(rows: list[PendingNotification]) -> list[tuple[dict, list[str], list[int]]]:
+    """Collapse a batch into requests, one push per receiver.
+
+    Returns:
+        (push notification, receiver ids, outbox ids covered) per request
+    """
+    by_receiver: dict[str, list[PendingNotification]] = {}
+    for row in rows:
+        by_receiver.setdefault(row["receiver_id"], []).append(row)
+
+    requests: dict[tuple, tuple[dict, list[str], list[int]]] = {}
+    for receiver_id, receiver_rows in by_receiver.items():
+        payload_key = summarize_notifications(receiver_rows)
+        if payload_key not in requests:
+            title, body, url = payload_key
+            requests[payload_key] = ({"title": title, "body": body, "data": {"url": url}}, [], [])
+        requests[payload_key][1].append(receiver_id)
+        requests[payload_key][2].extend(row["id"] for row in receiver_rows)
+    return list(requests.values())
+
+
+async def dispatch_batch(rate_limiter: AsyncRateLimiter) -> int:
+    """Send one batch of due notifications.
+
+    Returns:
+        Number of outbox rows handled
+    """
+    pool = await get_async_pool()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def send(push_notification: dict, receiver_ids: list[str]) -> None:
+        async with semaphore:
+            await rate_limiter.wait()
+            await async_server_req(
+                route="/push-notifications",
+                method="POST",
+                body={"receiverIdsList": receiver_ids, "pushNotification": push_notification},
+            )
+
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            rows = await claim_notifications(cur, BATCH_SIZE, MAX_ATTEMPTS, LEASE_SECONDS)
+    if not rows:
+        return 0
+
+    # Send with no transaction or connection held; the lease keeps the rows ours
+    start = time()
+    requests = merge_notifications(rows)
+    tasks = [
+        asyncio.create_task(send(push_notification, receiver_ids))
+        for push_notification, receiver_ids, _ in requests
+    ]
+    _, pending = await asyncio.wait(tasks, timeout=SEND_DEADLINE_SECONDS)
+    for task in pending:
+        task.cancel()
+
+    sent_ids = []
+    failures = []
+    for (_, receiver_ids, ids), task in zip(requests, tasks):
+        if task in pending:
+            failures.append((ids, f"Not sent within {SEND_DEADLINE_SECONDS}s"))
+        elif task.exception() is not None:
+            logger.warning(f"Push notification to {len(receiver_ids)} receivers failed: {task.exception()}")
+            failures.append((ids, str(task.exception())))
+        else:
+            sent_ids.extend(ids)
+
+    dead_letter_ids = []
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            for ids, error in failures:
+                dead_letter_ids.extend(
+                    await mark_notifications_failed(
+                        cur, ids, error, BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS, MAX_ATTEMPTS
+                    )
+                )
+            await mark_notifications_sent(cur, sent_ids)
+
+    if dead_letter_ids:
+        logger.error(
+            f"Dead letters: giving up on {len(dead_letter_ids)} notifications after "
+            f"{MAX_ATTEMPTS} attempts, ids {sorted(dead_letter_ids)}"
+        )
+
+    elapsed = time() - start
+    logger.info(
+        f"Dispatched {len(sent_ids)}/{len(rows)} notifications in {len(requests)} requests "
+        f"in {elapsed:.2f}s ({len(rows) / elapsed if elapsed > 0 else 0:.0f} notifications/s)"
+    )
+    return len(rows)
+
+
+async def cleanup_finished() -> None:
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            deleted = await delete_finished_notifications(cur, RETENTION_DAYS, MAX_ATTEMPTS)
+    if deleted:
+        logger.info(f"Deleted {deleted} sent or dead-letter notifications over {RETENTION_DAYS} days old")
+
+
+async def main():
+    """Drain the outbox until stopped"""
+    rate_limiter = AsyncRateLimiter(REQUESTS_PER_SECOND)
+    last_cleanup = 0.0
+    start_metrics_server()
+    logger.info("Notification dispatcher started")
+
+    try:
+        while True:
+            try:
+                if time() - last_cleanup >= CLEANUP_INTERVAL_SECONDS:
+                    await cleanup_finished()
+                    last_cleanup = time()
+
+                handled = await dispatch_batch(rate_limiter)
+                if handled < BATCH_SIZE:
+                    await asyncio.sleep(POLL_SECONDS)
+            except Exception as e:
+                logger.error(f"Error dispatching notifications: {e}")
+                logger.error(f"Full traceback: {traceback.format_exc()}")
+                await asyncio.sleep(5)
+    except KeyboardInterrupt:
+        logger.warning("Shutting down notification_dispatcher...")
+    finally:
+        from db.connection import close_async_pool
+
+        await close_async_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
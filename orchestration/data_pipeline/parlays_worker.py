@@ -1,4 +1,6 @@
-from utils import setup_logger, async_server_req
+from utils import setup_logger
+from metrics import start_metrics_server
+from profiling import profiled, start_profiling_control
 import asyncio
 from typing import TypedDict, Optional, Dict, List
 from redis_utils import (
@@ -6,10 +8,24 @@ from redis_utils import (
     listen_for_messages_async,
     publish_message_async,
 )
-from db.connection import get_async_pool
+from db.connection import get_async_pool, pipeline
+from db.instrumentation import statement_budget
+from db.statements import (
+    CREDIT_DYNASTY_LEAGUE_USER,
+    CREDIT_MATCH_USER,
+    LOCK_PARLAY,
+    PARLAY_FOR_PICK,
+    PARLAY_PICKS,
+    PICK_EXISTS,
+    RESOLVE_PARLAY,
+    execute,
+)
+from db.outbox import OutboxNotification, enqueue_notifications
 from time import time
 
 logger = setup_logger(__name__)
+# One line per balance update; rate limited for busy settlement windows
+balance_logger = setup_logger(f"{__name__}.balances", max_per_second=5)
 
 
 class PickResult(TypedDict):
@@ -82,6 +98,8 @@ def get_flex_multiplier(pick_count: int, hit_count: int) -> float:
     return flex_payouts.get(key, 0.0)
 
 
+@profiled
+@statement_budget(12)
 async def handle_pick_resolved(data):
     """Handles incoming pick_resolved messages asynchronously"""
     start_time = time()
@@ -100,13 +118,7 @@ async def handle_pick_resolved(data):
                     await cur.execute("BEGIN")
 
                     # Verify pick exists
-                    pick_check_query = """
-                        SELECT id
-                        FROM pick
-                        WHERE id = %s
-                    """
-
-                    await cur.execute(pick_check_query, (pick_id,))
+                    await execute(cur, PICK_EXISTS, (pick_id,))
                     pick_res = await cur.fetchone()
 
                     if not pick_res:
@@ -115,28 +127,7 @@ async def handle_pick_resolved(data):
                         return
 
                     # Get parlay with all picks and user information
-                    parlay_query = """
-                        SELECT
-                            p.id as parlay_id,
-                            p.stake,
-                            p.type,
-                            p.resolved,
-                            p.match_user_id,
-                            p.dynasty_league_user_id,
-                            mu.balance as match_user_balance,
-                            mu.match_id,
-                            mu.user_id as match_user_user_id,
-                            dlu.balance as dynasty_league_user_balance,
-                            dlu.dynasty_league_id,
-                            dlu.user_id as dynasty_league_user_user_id
-                        FROM pick pk
-                        JOIN parlay p ON pk.parlay_id = p.id
-                        LEFT JOIN match_user mu ON p.match_user_id = mu.id
-                        LEFT JOIN dynasty_league_user dlu ON p.dynasty_league_user_id = dlu.id
-                        WHERE pk.id = %s
-                    """
-
-                    await cur.execute(parlay_query, (pick_id,))
+                    await execute(cur, PARLAY_FOR_PICK, (pick_id,))
                     parlay_res = await cur.fetchone()
 
                     if not parlay_res:
@@ -145,14 +136,7 @@ async def handle_pick_resolved(data):
                         return
 
                     # Lock the parlay row to prevent concurrent processing
-                    lock_parlay_query = """
-                        SELECT id, resolved
-                        FROM parlay
-                        WHERE id = %s
-                        FOR UPDATE
-                    """
-
-                    await cur.execute(lock_parlay_query, (parlay_res[0],))
+                    await execute(cur, LOCK_PARLAY, (parlay_res[0],))
                     locked_parlay = await cur.fetchone()
 
                     # Check if parlay is already resolved after acquiring lock
@@ -161,13 +145,7 @@ async def handle_pick_resolved(data):
                         return
 
                     # Get all picks for this parlay
-                    picks_query = """
-                        SELECT id, status
-                        FROM pick
-                        WHERE parlay_id = %s
-                    """
-
-                    await cur.execute(picks_query, (parlay_res[0],))
+                    await execute(cur, PARLAY_PICKS, (parlay_res[0],))
                     picks_res = await cur.fetchall()
 
                     # Check if any picks are still not resolved
@@ -208,70 +186,53 @@ async def handle_pick_resolved(data):
                         f"Parlay {parlay_res[0]} resolution triggered by pick {pick_id}, payout: {payout}"
                     )
 
-                    # Update parlay as resolved (safe due to FOR UPDATE lock)
-                    update_parlay_query = """
-                        UPDATE parlay
-                        SET payout = %s, resolved = true
-                        WHERE id = %s
-                    """
-
-                    await cur.execute(update_parlay_query, (payout, parlay_res[0]))
-
-                    # Update user balance
+                    # Settle in one round trip: resolve the parlay, credit the balance,
+                    # notify and commit. The balance update gets its own cursor so its
+                    # rowcount is still there once the pipeline has run
                     user_context = None
-                    if parlay_res[4]:  # match_user_id
-                        # Update match user balance atomically
-                        update_balance_query = """
-                            UPDATE match_user
-                            SET balance = balance + %s
-                            WHERE id = %s
-                        """
+                    async with conn.cursor() as balance_cur:
+                        async with pipeline(conn):
+                            # Update parlay as resolved (safe due to FOR UPDATE lock)
+                            await execute(cur, RESOLVE_PARLAY, (payout, parlay_res[0]))
+
+                            # Update user balance atomically
+                            if parlay_res[4]:  # match_user_id
+                                await execute(balance_cur, CREDIT_MATCH_USER, (payout, parlay_res[4]))
+                                user_context = {
+                                    "type": "match",
+                                    "match_id": parlay_res[7],  # match_id
+                                    "user_id": parlay_res[8],  # match_user_user_id
+                                }
+
+                            elif parlay_res[5]:  # dynasty_league_user_id
+                                await execute(balance_cur, CREDIT_DYNASTY_LEAGUE_USER, (payout, parlay_res[5]))
+                                user_context = {
+                                    "type": "dynasty_league",
+                                    "dynasty_league_id": parlay_res[10],  # dynasty_league_id
+                                    "user_id": parlay_res[11],  # dynasty_league_user_user_id
+                                }
+
+                            # Notify in the same transaction; the dispatcher sends it after commit
+                            if user_context:
+                                await enqueue_notifications(
+                                    cur, [_parlay_resolved_notification(parlay_res[0], user_context)]
+                                )
 
-                        await cur.execute(update_balance_query, (payout, parlay_res[4]))
-
-                        # Check if the update affected any rows
-                        if cur.rowcount == 0:
-                            logger.error(
-                                f"No match_user found with id {parlay_res[4]} - balance not updated"
-                            )
-                        else:
-                            logger.info(
-                                f"Updated balance for match_user {parlay_res[4]} by {payout} (affected {cur.rowcount} rows)"
-                            )
-
-                        user_context = {
-                            "type": "match",
-                            "match_id": parlay_res[7],  # match_id
-                            "user_id": parlay_res[8],  # match_user_user_id
-                        }
-
-                    elif parlay_res[5]:  # dynasty_league_user_id
-                        # Update dynasty league user balance atomically
-                        update_balance_query = """
-                            UPDATE dynasty_league_user
-                            SET balance = balance + %s
-                            WHERE id = %s
-                        """
-
-                        await cur.execute(update_balance_query, (payout, parlay_res[5]))
+                            await cur.execute("COMMIT")
 
                         # Check if the update affected any rows
-                        if cur.rowcount == 0:
-                            logger.error(
-                                f"No dynasty_league_user found with id {parlay_res[5]} - balance not updated"
-                            )
-                        else:
-                            logger.info(
-                                f"Updated balance for dynasty_league_user {parlay_res[5]} by {payout} (affected {cur.rowcount} rows)"
-                            )
-
-                        user_context = {
-                            "type": "dynasty_league",
-                            "dynasty_league_id": parlay_res[10],  # dynasty_league_id
-                            "user_id": parlay_res[11],  # dynasty_league_user_user_id
-                        }
-
-                    await cur.execute("COMMIT")
+                        if user_context:
+                            balance_table = "match_user" if parlay_res[4] else "dynasty_league_user"
+                            balance_id = parlay_res[4] or parlay_res[5]
+                            if balance_cur.rowcount == 0:
+                                logger.error(
+                                    f"No {balance_table} found with id {balance_id} - balance not updated"
+                                )
+                            else:
+                                balance_logger.info(
+                                    "Updated balance for %s %s by %s (affected %s rows)",
+                                    balance_table, balance_id, payout, balance_cur.rowcount,
+                                )
 
                     # Publish Redis messages for cache invalidation and real-time updates
                     if user_context:
@@ -287,8 +248,6 @@ async def handle_pick_resolved(data):
                     logger.error(f"Database transaction failed: {e}")
                     raise e
 
-    except Exception as e:
-        logger.error(f"Error handling pick resolved: {e}")
     finally:
         await redis_publisher.aclose()
 
@@ -298,12 +257,28 @@ async def handle_pick_resolved(data):
     )
 
 
+def _parlay_resolved_notification(parlay_id: int, user_context: dict) -> OutboxNotification:
+    """Push notification telling the parlay's owner it was resolved"""
+    if user_context["type"] == "match":
+        body = "Your match parlay has been resolved!"
+        url = f"/match/{user_context['match_id']}?openSubRoute=parlays&subRouteId={parlay_id}"
+    else:
+        body = "Your dynasty league parlay has been resolved!"
+        url = f"/dynastyLeague/{user_context['dynasty_league_id']}?openSubRoute=parlays&subRouteId={parlay_id}"
+
+    return {
+        "receiver_id": user_context["user_id"],
+        "title": "Parlay Resolved",
+        "body": body,
+        "url": url,
+    }
+
+
 async def _publish_parlay_resolved_messages(
     redis_publisher, parlay_id: int, user_context: dict
 ):
-    """Publish cache invalidation via Redis and send push notifications via HTTP"""
+    """Publish cache invalidation and parlay_resolved via Redis"""
     redis_tasks = []
-    notification_task = None
 
     if user_context["type"] == "match":
         # Invalidate cache queries
@@ -321,22 +296,6 @@ async def _publish_parlay_resolved_messages(
             )
         )
 
-        # Send push notification via HTTP
-        notification_task = async_server_req(
-            route="/push-notifications",
-            method="POST",
-            body={
-                "receiverIdsList": [user_context["user_id"]],
-                "pushNotification": {
-                    "title": "Parlay Resolved",
-                    "body": "Your match parlay has been resolved!",
-                    "data": {
-                        "url": f"/match/{user_context['match_id']}?openSubRoute=parlays&subRouteId={parlay_id}"
-                    },
-                },
-            },
-        )
-
     elif user_context["type"] == "dynasty_league":
         # Invalidate cache queries
         invalidation_keys = [
@@ -357,41 +316,12 @@ async def _publish_parlay_resolved_messages(
             )
         )
 
-        # Send push notification via HTTP
-        notification_task = async_server_req(
-            route="/push-notifications",
-            method="POST",
-            body={
-                "receiverIdsList": [user_context["user_id"]],
-                "pushNotification": {
-                    "title": "Parlay Resolved",
-                    "body": "Your dynasty league parlay has been resolved!",
-                    "data": {
-                        "url": f"/dynastyLeague/{user_context['dynasty_league_id']}?openSubRoute=parlays&subRouteId={parlay_id}"
-                    }
-                },
-            },
-        )
-
     # Publish parlay_resolved message for match resolution (applies to both match and dynasty league)
     redis_tasks.append(
         publish_message_async(redis_publisher, "parlay_resolved", {"id": parlay_id})
     )
 
-    # Execute Redis tasks and HTTP notification in parallel
-    tasks = redis_tasks
-    if notification_task:
-        tasks.append(notification_task)
-
-    await asyncio.gather(*tasks)
-
-
-async def handle_pick_resolved_safe(data):
-    """Safe wrapper for handle_pick_resolved that prevents listener crashes"""
-    try:
-        await handle_pick_resolved(data)
-    except Exception as e:
-        logger.error(f"Error handling pick_resolved message: {e}", exc_info=True)
+    await asyncio.gather(*redis_tasks)
 
 
 async def listen_for_pick_resolved():
@@ -402,7 +332,7 @@ async def listen_for_pick_resolved():
             redis_subscriber = await create_async_redis_client()
             logger.info("Listening for pick_resolved messages...")
             await listen_for_messages_async(
-                redis_subscriber, "pick_resolved", handle_pick_resolved_safe
+                redis_subscriber, "pick_resolved", handle_pick_resolved
             )
         except Exception as e:
             logger.error(f"Error in listener, restarting: {e}")
@@ -415,6 +345,8 @@ async def listen_for_pick_resolved():
 async def main():
     """Main function that listens for pick_resolved messages."""
     try:
+        start_metrics_server()
+        start_profiling_control()
         await listen_for_pick_resolved()
     except KeyboardInterrupt:
         logger.warning("Shutting down parlays_worker...")
@@ -1,4 +1,6 @@
 from utils import setup_logger
+from metrics import start_metrics_server
+from profiling import profiled, start_profiling_control
 from redis_utils import (
     listen_for_messages_async,
     create_async_redis_client,
@@ -6,11 +8,23 @@ from redis_utils import (
 )
 import asyncio
 from db.connection import get_async_pool
+from db.instrumentation import statement_budget
+from db.statements import (
+    PICKS_DID_NOT_PLAY,
+    PICKS_FOR_PROP,
+    PICKS_OVER_HIT,
+    PICKS_TIE,
+    PICKS_UNDER_HIT,
+    PROP_BY_ID,
+    execute,
+)
 from time import time
 
 logger = setup_logger(__name__)
 
 
+@profiled
+@statement_budget(10)
 async def handle_prop_updated(data):
     """Handle incoming prop_updated messages asynchronously"""
     start_time = time()
@@ -30,13 +44,7 @@ async def handle_prop_updated(data):
                 try:
                     await cur.execute("BEGIN")
 
-                    select_query = """
-                        SELECT id, current_value, line, status
-                        FROM prop
-                        WHERE id = %s
-                    """
-
-                    await cur.execute(select_query, (prop_id,))
+                    await execute(cur, PROP_BY_ID, (prop_id,))
                     prop_query_res = await cur.fetchone()
 
                     if not prop_query_res:
@@ -52,13 +60,7 @@ async def handle_prop_updated(data):
                     }
 
                     if updated_prop["status"] == "did_not_play":
-                        update_stmt = """
-                            UPDATE pick SET status = 'did_not_play'::pick_status
-                            WHERE prop_id = %s
-                            RETURNING id, parlay_id
-                        """
-
-                        await cur.execute(update_stmt, (updated_prop["id"],))
+                        await execute(cur, PICKS_DID_NOT_PLAY, (updated_prop["id"],))
                         dnp_res_list = await cur.fetchall()
 
                         for res in dnp_res_list:
@@ -68,19 +70,7 @@ async def handle_prop_updated(data):
 
                     elif updated_prop["status"] == "resolved":
                         if updated_prop["current_value"] > updated_prop["line"]:
-                            batch_update_stmt = """
-                                WITH updates AS (
-                                    UPDATE pick SET status = CASE
-                                        WHEN choice = 'over' THEN 'hit'::pick_status
-                                        WHEN choice = 'under' THEN 'missed'::pick_status
-                                    END
-                                    WHERE prop_id = %s AND choice IN ('over', 'under')
-                                    RETURNING id, parlay_id
-                                )
-                                SELECT id, parlay_id FROM updates
-                            """
-
-                            await cur.execute(batch_update_stmt, (updated_prop["id"],))
+                            await execute(cur, PICKS_OVER_HIT, (updated_prop["id"],))
                             batch_res_list = await cur.fetchall()
 
                             for res in batch_res_list:
@@ -89,13 +79,7 @@ async def handle_prop_updated(data):
                                 )
 
                         elif updated_prop["current_value"] == updated_prop["line"]:
-                            ties_update_stmt = """
-                                UPDATE pick SET status = 'tie'::pick_status
-                                WHERE prop_id = %s
-                                RETURNING id, parlay_id
-                            """
-
-                            await cur.execute(ties_update_stmt, (updated_prop["id"],))
+                            await execute(cur, PICKS_TIE, (updated_prop["id"],))
                             ties_res_list = await cur.fetchall()
 
                             for ties_res in ties_res_list:
@@ -103,19 +87,7 @@ async def handle_prop_updated(data):
                                     {"id": ties_res[0], "parlay_id": ties_res[1]}
                                 )
                         else:
-                            batch_update_stmt = """
-                                WITH updates AS (
-                                    UPDATE pick SET status = CASE
-                                        WHEN choice = 'over' THEN 'missed'::pick_status
-                                        WHEN choice = 'under' THEN 'hit'::pick_status
-                                    END
-                                    WHERE prop_id = %s AND choice IN ('over', 'under')
-                                    RETURNING id, parlay_id
-                                )
-                                SELECT id, parlay_id FROM updates
-                            """
-
-                            await cur.execute(batch_update_stmt, (updated_prop["id"],))
+                            await execute(cur, PICKS_UNDER_HIT, (updated_prop["id"],))
                             batch_res_list = await cur.fetchall()
 
                             for res in batch_res_list:
@@ -124,13 +96,7 @@ async def handle_prop_updated(data):
                                 )
 
                     else:
-                        related_picks_query = """
-                            SELECT id, parlay_id
-                            FROM pick
-                            WHERE prop_id = %s
-                        """
-
-                        await cur.execute(related_picks_query, (updated_prop["id"],))
+                        await execute(cur, PICKS_FOR_PROP, (updated_prop["id"],))
                         related_picks_res_list = await cur.fetchall()
 
                         for related_picks_res in related_picks_res_list:
@@ -166,8 +132,6 @@ async def handle_prop_updated(data):
                 )
             await asyncio.gather(*publish_tasks)
 
-    except Exception as e:
-        logger.error(f"Error handling prop update: {e}")
     finally:
         await redis_publisher.aclose()
 
@@ -178,14 +142,6 @@ async def handle_prop_updated(data):
         )
 
 
-async def handle_prop_updated_safe(data):
-    """Safe wrapper for handle_prop_updated that prevents listener crashes"""
-    try:
-        await handle_prop_updated(data)
-    except Exception as e:
-        logger.error(f"Error handling prop_updated message: {e}", exc_info=True)
-
-
 async def listen_for_prop_updated():
     """Function that listens for a prop updated message on the redis server"""
     while True:
@@ -194,7 +150,7 @@ async def listen_for_prop_updated():
             redis_subscriber = await create_async_redis_client()
             logger.info("Listening for prop updated messages...")
             await listen_for_messages_async(
-                redis_subscriber, "prop_updated", handle_prop_updated_safe
+                redis_subscriber, "prop_updated", handle_prop_updated
             )
         except Exception as e:
             logger.error(f"Error in listener, restarting: {e}")
@@ -207,6 +163,8 @@ async def listen_for_prop_updated():
 async def main():
     """Main function that listens for prop updated messages."""
     try:
+        start_metrics_server()
+        start_profiling_control()
         await listen_for_prop_updated()
     except KeyboardInterrupt:
         logger.warning("Shutting down picks_worker...")
@@ -3,14 +3,24 @@ import aiohttp
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from db.connection import get_async_pool
+from db.instrumentation import statement_budget
+from db.statements import (
+    OPEN_PROPS_FOR_GAME,
+    PROPS_FOR_GAME_STATS,
+    UPDATE_PROP_VALUE,
+    execute,
+)
 from typing import TypedDict
-from extract_stats.main import extract_player_stats
+from extract_stats.executor import ExtractionStage
+from shared.feed_reader import iter_feed_games_async
 from redis_utils import (
     create_async_redis_client,
     listen_for_messages_async,
     publish_message_async,
 )
-from utils import getenv_required, setup_logger
+from utils import getenv_required, setup_logger, monitor_event_loop_lag
+from metrics import stage, start_metrics_server
+from profiling import profiled, start_profiling_control
 from prop_generation.configs.football import (
     get_football_stats_list,
 )
@@ -35,7 +45,15 @@ LEAGUE_VALID_STATS = {
     "NCAABB": VALID_BASKETBALL_STATS,
 }
 
+# No total deadline: the body is consumed while games are being settled
+FEED_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+MAX_CONCURRENT_GAMES = 8
+
 logger = setup_logger(__name__)
+# One line per did-not-play prop; rate limited as a completed slate marks many at once
+prop_logger = setup_logger(f"{__name__}.props", max_per_second=5)
+
+extraction_stage = ExtractionStage()
 
 
 class StatEntry(TypedDict):
@@ -52,22 +70,22 @@ async def process_single_game(game, league):
     game_id = game["game_ID"]
     game_status = game["status"]
 
-    # Extract stats for this game
-    player_stats_list, _ = extract_player_stats(game, league)
-    stats_list: list[StatEntry] = []
-
-    for player_stats in player_stats_list:
-        player_id = player_stats["player_id"]
-        for stat_name, stat_value in player_stats.items():
-            if stat_name in LEAGUE_VALID_STATS[league]:
-                stats_list.append({
-                    "player_id": player_id,
-                    "stat_name": stat_name,
-                    "current_value": stat_value,
-                    "league": league,
-                    "game_id": game_id,
-                    "status": game_status,
-                })
+    # Extract stats for this game off the event loop
+    with stage("extraction").time():
+        stat_tuples = await extraction_stage.extract(
+            game, league, LEAGUE_VALID_STATS[league]
+        )
+    stats_list: list[StatEntry] = [
+        {
+            "player_id": player_id,
+            "stat_name": stat_name,
+            "current_value": stat_value,
+            "league": league,
+            "game_id": game_id,
+            "status": game_status,
+        }
+        for player_id, stat_name, stat_value in stat_tuples
+    ]
 
     if not stats_list:
         return []
@@ -84,25 +102,14 @@ async def process_single_game(game, league):
                     await cur.execute("BEGIN")
 
                     try:
-                        # Get existing props for this game
-                        select_conditions = []
-                        select_params = []
-                        for stat_entry in stats_list:
-                            select_conditions.append("(player_id = %s AND stat_name = %s AND league = %s AND game_id = %s)")
-                            select_params.extend([
-                                stat_entry["player_id"],
-                                stat_entry["stat_name"],
-                                stat_entry["league"],
-                                stat_entry["game_id"]
-                            ])
-
-                        select_query = f"""
-                            SELECT id, line, status, player_id, stat_name, league, game_id
-                            FROM prop
-                            WHERE {' OR '.join(select_conditions)}
-                        """
-
-                        await cur.execute(select_query, select_params)
+                        # Get existing props for this game; the stats arrive as arrays so the
+                        # statement text is the same for every game and can stay prepared
+                        await execute(cur, PROPS_FOR_GAME_STATS, (
+                            game_id,
+                            league,
+                            [stat_entry["player_id"] for stat_entry in stats_list],
+                            [stat_entry["stat_name"] for stat_entry in stats_list],
+                        ))
                         existing_props = await cur.fetchall()
 
                         # Create lookup for existing props
@@ -132,12 +139,7 @@ async def process_single_game(game, league):
 
                         # Handle DNP for completed games
                         if game_status in ["completed", "final"]:
-                            dnp_select_query = """
-                                SELECT id, player_id, game_id
-                                FROM prop
-                                WHERE game_id = %s AND (status = 'not_resolved' OR status = 'did_not_play')
-                            """
-                            await cur.execute(dnp_select_query, (game_id,))
+                            await execute(cur, OPEN_PROPS_FOR_GAME, (game_id,))
                             all_game_props = await cur.fetchall()
 
                             for prop in all_game_props:
@@ -147,19 +149,15 @@ async def process_single_game(game, league):
                                 # If player has no stats for this game, mark as did_not_play
                                 if player_game_key not in players_with_stats:
                                     update_data.append((0.0, "did_not_play", prop_id))
-                                    logger.info(f"Marking prop {prop_id} as did_not_play for player {player_id} in game {game_id}")
+                                    prop_logger.info(
+                                        "Marking prop %s as did_not_play for player %s in game %s",
+                                        prop_id, player_id, game_id,
+                                    )
 
                         # Execute updates
                         if update_data:
-                            update_query = """
-                                UPDATE prop
-                                SET current_value = %s, status = %s
-                                WHERE id = %s
-                                RETURNING id
-                            """
-
                             for update_params in update_data:
-                                await cur.execute(update_query, update_params)
+                                await execute(cur, UPDATE_PROP_VALUE, update_params)
                                 result = await cur.fetchone()
                                 if result:
                                     props_updated.append(result)
@@ -185,6 +183,8 @@ async def process_single_game(game, league):
     return props_updated
 
 
+@profiled
+@statement_budget()
 async def handle_stats_updated(data):
     """Handle incoming stats_updated messages asynchronously"""
     start_time = time()
@@ -202,10 +202,18 @@ async def handle_stats_updated(data):
 
     dates_to_check = [yesterday.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")]
 
-    all_games = []
+    # Stream each date's feed and settle games as they are parsed, so early
+    # games are processed before the rest of the payload has downloaded.
+    # Each game runs as its own task so extraction overlaps feed and DB I/O.
+    game_semaphore = asyncio.Semaphore(MAX_CONCURRENT_GAMES)
+
+    async def process_game_bounded(game):
+        async with game_semaphore:
+            return await process_single_game(game, league)
 
-    # Fetch all dates concurrently
-    async def fetch_games_for_date(session, date_str):
+    async def process_games_for_date(session, date_str):
+        props_updated = []
+        game_tasks = []
         try:
             logger.info(f"Checking games /live/{date_str}/{league}")
 
@@ -214,53 +222,54 @@ async def handle_stats_updated(data):
 
             url = f"{DATA_FEEDS_BASE_URL}/live/{date_str}/{league}?RSC_token={DATA_FEEDS_API_TOKEN}"
 
-            async with session.get(url, timeout=30) as response:
-                response.raise_for_status()
-                feed_data = await response.json()
-                games = feed_data["data"][league]
-                logger.info(f"{len(games)} {league} games found for {date_str}")
-                return games
+            with stage("feed_fetch").time():
+                async with session.get(url, timeout=FEED_TIMEOUT) as response:
+                    response.raise_for_status()
+                    if response.status == 304:
+                        logger.info(f"No {league} games found for {date_str}")
+                        return props_updated
+
+                    async for game in iter_feed_games_async(response, league):
+                        game_tasks.append(
+                            asyncio.create_task(
+                                process_game_bounded(game)
+                            )
+                        )
+
+            logger.info(f"{len(game_tasks)} {league} games found for {date_str}")
         except Exception as e:
-            logger.warning(f"Failed to fetch games for {date_str}: {e}")
-            return []
+            logger.warning(f"Failed to process games for {date_str} after {len(game_tasks)} games: {e}")
 
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_games_for_date(session, date_str) for date_str in dates_to_check]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        for games in results:
-            if isinstance(games, list):
-                all_games.extend(games)
-
-    logger.info(f"Total {len(all_games)} {league} games found across dates")
+        for game_props_updated in await asyncio.gather(*game_tasks, return_exceptions=True):
+            if isinstance(game_props_updated, list):
+                props_updated.extend(game_props_updated)
+            else:
+                logger.error(f"Error processing game for {date_str}: {game_props_updated}")
+        return props_updated
 
-    # Process each game individually in separate transactions
     all_props_updated = []
-    for game in all_games:
-        props_updated = await process_single_game(game, league)
-        all_props_updated.extend(props_updated)
-
-    # Publish all Redis messages in parallel
-    if all_props_updated:
-        publish_tasks = [
-            publish_message_async(redis_publisher, "prop_updated", {"id": prop[0]})
-            for prop in all_props_updated
-        ]
-        await asyncio.gather(*publish_tasks)
-
-    await redis_publisher.aclose()
+    try:
+        async with aiohttp.ClientSession() as session:
+            tasks = [process_games_for_date(session, date_str) for date_str in dates_to_check]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for props_updated in results:
+                if isinstance(props_updated, list):
+                    all_props_updated.extend(props_updated)
+
+        # Publish all Redis messages in parallel
+        if all_props_updated:
+            publish_tasks = [
+                publish_message_async(redis_publisher, "prop_updated", {"id": prop[0]})
+                for prop in all_props_updated
+            ]
+            await asyncio.gather(*publish_tasks)
+    finally:
+        await redis_publisher.aclose()
 
     end_time = time()
     logger.info(f"Updated {len(all_props_updated)} props. Completed in {end_time - start_time:.2f}s")
 
 
-async def handle_stats_updated_safe(data):
-    """Safe wrapper for handle_stats_updated that prevents listener crashes"""
-    try:
-        await handle_stats_updated(data)
-    except Exception as e:
-        logger.error(f"Error handling stats_updated message: {e}", exc_info=True)
-
-
 async def listen_for_stats_updated(provided_league: str):
     """Function that listens for stats updated messages on the redis server"""
     while True:
@@ -269,7 +278,7 @@ async def listen_for_stats_updated(provided_league: str):
             redis_subscriber = await create_async_redis_client()
             logger.info(f"Listening for stats updated {provided_league} messages...")
             await listen_for_messages_async(
-                redis_subscriber, f"stats_updated_{provided_league}", handle_stats_updated_safe
+                redis_subscriber, f"stats_updated_{provided_league}", handle_stats_updated
             )
         except Exception as e:
             logger.error(f"Error in listener, restarting: {e}")
@@ -282,20 +291,27 @@ async def listen_for_stats_updated(provided_league: str):
 async def main():
     """Main function that listens for stats updated messages."""
     try:
+        start_metrics_server()
+        start_profiling_control()
         if len(sys.argv) < 2:
             logger.error("You need to provide a league command line arg")
             sys.exit(1)
 
         provided_league = sys.argv[1]   
     
-        await listen_for_stats_updated(provided_league)
+        await asyncio.gather(
+            listen_for_stats_updated(provided_league),
+            monitor_event_loop_lag(logger),
+        )
     except KeyboardInterrupt:
         logger.warning("Shutting down props_worker...")
+        extraction_stage.shutdown()
         # Ensure pool cleanup on shutdown
         from db.connection import close_async_pool
         await close_async_pool()
     except Exception as e:
         logger.error(f"Error in main: {e}")
+        extraction_stage.shutdown()
         # Ensure pool cleanup on error
         from db.connection import close_async_pool
         await close_async_pool()
@@ -1,7 +1,10 @@
 from contextlib import asynccontextmanager
 
-from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from metrics import HANDLER_SECONDS
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from redis_utils import create_async_redis_client, publish_message_async
+from tracing import start_trace
 from utils import getenv_required, setup_logger
 
 logger = setup_logger(__name__)
@@ -60,8 +63,16 @@ async def handle_webhook(
     if league_id not in ["MLB", "NBA", "NFL", "NCAAFB", "NCAABB"]:
         raise HTTPException(status_code=400, detail="Invalid league_id")
 
-    # Use async Redis client
-    redis_client = await get_redis_client()
-    await publish_message_async(redis_client, f"stats_updated_{league_id}", {"league": league_id})
+    # The trace of every settlement this update causes starts here
+    with HANDLER_SECONDS.labels(handler="stats_webhook").time(), start_trace(league_id):
+        # Use async Redis client
+        redis_client = await get_redis_client()
+        await publish_message_async(redis_client, f"stats_updated_{league_id}", {"league": league_id})
 
     return {"success": True}
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics of this server"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,89 @@
+"""
+Progress checkpoints of broadcast notifications, so a failed broadcast can
+resume after the last user it reached instead of starting over.
+"""
+
+from typing import Optional, TypedDict
+
+import psycopg
+from psycopg import AsyncCursor
+
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class BroadcastCheckpoint(TypedDict):
+    broadcast_id: str
+    last_user_id: Optional[str]
+    recipients: int
+    completed: bool
+
+
+async def get_broadcast_checkpoint(cur: AsyncCursor, broadcast_id: str) -> Optional[BroadcastCheckpoint]:
+    """
+    Get the saved progress of a broadcast.
+
+    Args:
+        cur: Cursor with a dict row factory
+        broadcast_id: Broadcast to look up
+
+    Returns:
+        The checkpoint, or None if the broadcast never started
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    try:
+        await cur.execute(
+            """
+            SELECT broadcast_id, last_user_id, recipients, completed_at IS NOT NULL AS completed
+            FROM broadcast_checkpoint
+            WHERE broadcast_id = %s
+            """,
+            (broadcast_id,),
+        )
+        return await cur.fetchone()
+    except psycopg.Error as e:
+        logger.error(f"Database error retrieving broadcast checkpoint: {e}")
+        raise
+
+
+async def save_broadcast_checkpoint(
+    cur: AsyncCursor, broadcast_id: str, last_user_id: Optional[str], recipients: int, completed: bool = False
+) -> None:
+    """
+    Save how far a broadcast got.
+
+    Args:
+        cur: Cursor to write with
+        broadcast_id: Broadcast being sent
+        last_user_id: Every user up to and including this id has been sent to
+        recipients: Users sent to so far
+        completed: Whether the broadcast reached every user
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    try:
+        await cur.execute(
+            """
+            INSERT INTO broadcast_checkpoint (broadcast_id, last_user_id, recipients, completed_at, updated_at)
+            VALUES (%(broadcast_id)s, %(last_user_id)s, %(recipients)s, CASE WHEN %(completed)s THEN NOW() END, NOW())
+            ON CONFLICT (broadcast_id)
+            DO UPDATE SET
+                last_user_id = EXCLUDED.last_user_id,
+                recipients = EXCLUDED.recipients,
+                completed_at = EXCLUDED.completed_at,
+                updated_at = EXCLUDED.updated_at
+            """,
+            {
+                "broadcast_id": broadcast_id,
+                "last_user_id": last_user_id,
+                "recipients": recipients,
+                "completed": completed,
+            },
+        )
+    except psycopg.Error as e:
+        logger.error(f"Database error saving broadcast checkpoint: {e}")
+        raise
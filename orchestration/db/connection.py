@@ -1,11 +1,82 @@
+from psycopg import AsyncConnection, Pipeline
 from psycopg_pool import ConnectionPool, AsyncConnectionPool
+from contextlib import asynccontextmanager, contextmanager
+from db.instrumentation import InstrumentedAsyncCursor, InstrumentedCursor
+from db.statements import PREPARED_STATEMENTS
+from metrics import POOL_WAIT_SECONDS, stage
 from utils import getenv_required, setup_logger
+from time import perf_counter
 import threading
 import atexit
 import asyncio
+import os
 
 logger = setup_logger(__name__)
 
+PIPELINE = os.getenv("DB_PIPELINE", "on").lower() != "off" and Pipeline.is_supported()
+
+
+class InstrumentedConnectionPool(ConnectionPool):
+    """Connection pool recording how long callers wait for a connection and hold it"""
+
+    @contextmanager
+    def connection(self, timeout=None):
+        start = perf_counter()
+        acquired = None
+        try:
+            with super().connection(timeout) as conn:
+                acquired = perf_counter()
+                POOL_WAIT_SECONDS.labels(pool="sync").observe(acquired - start)
+                yield conn
+        finally:
+            # Measured after the pool commits, so the commit counts towards the transaction
+            if acquired is not None:
+                stage("db_transaction").observe(perf_counter() - acquired)
+
+
+class InstrumentedAsyncConnectionPool(AsyncConnectionPool):
+    """Async connection pool recording how long callers wait for a connection and hold it"""
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        start = perf_counter()
+        acquired = None
+        try:
+            async with super().connection(timeout) as conn:
+                acquired = perf_counter()
+                POOL_WAIT_SECONDS.labels(pool="async").observe(acquired - start)
+                yield conn
+        finally:
+            if acquired is not None:
+                stage("db_transaction").observe(perf_counter() - acquired)
+
+
+def _connection_kwargs(cursor_factory) -> dict:
+    """Arguments for each pooled connection; without prepared statements psycopg must not prepare on its own either"""
+    kwargs = {"cursor_factory": cursor_factory}
+    if not PREPARED_STATEMENTS:
+        kwargs["prepare_threshold"] = None
+    return kwargs
+
+
+@asynccontextmanager
+async def pipeline(conn: AsyncConnection):
+    """Run the statements of the block in libpq pipeline mode.
+
+    execute() only queues a statement; queued statements are sent together when
+    a result is fetched and when the block exits, which also raises the first
+    error among them. Fetching a result is therefore the only wait on the
+    server, rowcount is only valid after the block, and the statement timings
+    recorded by the cursor cover queueing alone. With DB_PIPELINE=off, or a
+    libpq without pipeline support, the block runs statement by statement.
+    """
+    if not PIPELINE:
+        yield
+        return
+    async with conn.pipeline():
+        yield
+
+
 _pool = None
 _pool_lock = threading.Lock()
 
@@ -20,12 +91,13 @@ def get_pool():
         with _pool_lock:
             if _pool is None:
                 database_url = getenv_required("DATABASE_URL")
-                _pool = ConnectionPool(
+                _pool = InstrumentedConnectionPool(
                     database_url,
                     min_size=1,
                     max_size=int(getenv_required("POOL_MAX_SIZE")),
                     timeout=30.0,
                     max_idle=300.0,
+                    kwargs=_connection_kwargs(InstrumentedCursor),
                     open=False,
                 )
                 _pool.open()
@@ -62,7 +134,7 @@ async def get_async_pool():
             if _async_pool is None:
                 try:
                     database_url = getenv_required("DATABASE_URL")
-                    _async_pool = AsyncConnectionPool(
+                    _async_pool = InstrumentedAsyncConnectionPool(
                         database_url,
                         min_size=2,
                         max_size=int(getenv_required("POOL_MAX_SIZE")),
@@ -70,6 +142,7 @@ async def get_async_pool():
                         max_idle=300.0,  # Match sync pool settings
                         max_lifetime=1800.0,  # 30 minutes - prevent stale connections
                         reconnect_timeout=2.0,  # Fast reconnection
+                        kwargs=_connection_kwargs(InstrumentedAsyncCursor),
                         open=False,
                     )
                     await _async_pool.open()
@@ -0,0 +1,206 @@
+import psycopg
+from datetime import datetime
+from psycopg.rows import dict_row
+from typing import Optional, TypedDict, cast
+from utils import setup_logger
+from .connection import get_connection_context
+
+logger = setup_logger(__name__)
+
+
+class PlayerFeatureWindow(TypedDict):
+    player_id: int
+    league: str
+    team_id: int
+    game_ids: list[str]
+    player_fields: list[str]
+    team_fields: list[str]
+    player_values: list[float]
+    team_values: list[float]
+    opponent_values: list[float]
+    head_start_time: Optional[datetime]  # start of game_ids[0]
+
+
+class TeamFeatureWindow(TypedDict):
+    team_id: int
+    league: str
+    game_ids: list[str]
+    fields: list[str]
+    stat_values: list[float]
+    head_start_time: Optional[datetime]  # start of game_ids[0]
+
+
+def get_player_feature_windows(league: str, player_ids: list[int]) -> dict[int, PlayerFeatureWindow]:
+    """
+    Get the stored feature windows for a set of players.
+
+    Args:
+        league: League of the players
+        player_ids: Players to look up
+
+    Returns:
+        Windows keyed by player_id; players without one are left out
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    if not player_ids:
+        return {}
+
+    try:
+        with get_connection_context() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    """
+                    SELECT player_id, league, team_id, game_ids, player_fields, team_fields,
+                        player_values, team_values, opponent_values, head_start_time
+                    FROM player_feature_window
+                    WHERE league = %s AND player_id = ANY(%s)
+                    """,
+                    (league, player_ids),
+                )
+                return {
+                    row["player_id"]: cast(PlayerFeatureWindow, row)
+                    for row in cur.fetchall()
+                }
+
+    except psycopg.Error as e:
+        logger.error(f"Database error retrieving player feature windows: {e}")
+        raise
+
+
+def get_team_feature_windows(league: str, team_ids: list[int]) -> dict[int, TeamFeatureWindow]:
+    """
+    Get the stored feature windows for a set of teams.
+
+    Args:
+        league: League of the teams
+        team_ids: Teams to look up
+
+    Returns:
+        Windows keyed by team_id; teams without one are left out
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    if not team_ids:
+        return {}
+
+    try:
+        with get_connection_context() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    """
+                    SELECT team_id, league, game_ids, fields, stat_values, head_start_time
+                    FROM team_feature_window
+                    WHERE league = %s AND team_id = ANY(%s)
+                    """,
+                    (league, team_ids),
+                )
+                return {
+                    row["team_id"]: cast(TeamFeatureWindow, row)
+                    for row in cur.fetchall()
+                }
+
+    except psycopg.Error as e:
+        logger.error(f"Database error retrieving team feature windows: {e}")
+        raise
+
+
+def upsert_player_feature_windows(windows: list[PlayerFeatureWindow]) -> int:
+    """
+    Insert or replace player feature windows.
+
+    Args:
+        windows: Windows keyed by (player_id, league)
+
+    Returns:
+        Number of windows written
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    if not windows:
+        return 0
+
+    try:
+        with get_connection_context() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    """
+                    INSERT INTO player_feature_window (
+                        player_id, league, team_id, game_ids, player_fields, team_fields,
+                        player_values, team_values, opponent_values, head_start_time, updated_at
+                    )
+                    VALUES (
+                        %(player_id)s, %(league)s, %(team_id)s, %(game_ids)s, %(player_fields)s,
+                        %(team_fields)s, %(player_values)s, %(team_values)s, %(opponent_values)s,
+                        %(head_start_time)s, NOW()
+                    )
+                    ON CONFLICT (player_id, league)
+                    DO UPDATE SET
+                        team_id = EXCLUDED.team_id,
+                        game_ids = EXCLUDED.game_ids,
+                        player_fields = EXCLUDED.player_fields,
+                        team_fields = EXCLUDED.team_fields,
+                        player_values = EXCLUDED.player_values,
+                        team_values = EXCLUDED.team_values,
+                        opponent_values = EXCLUDED.opponent_values,
+                        head_start_time = EXCLUDED.head_start_time,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    windows,
+                )
+
+        logger.info(f"Successfully upserted {len(windows)} player feature window(s)")
+        return len(windows)
+
+    except psycopg.Error as e:
+        logger.error(f"Database error upserting player feature windows: {e}")
+        raise
+
+
+def upsert_team_feature_windows(windows: list[TeamFeatureWindow]) -> int:
+    """
+    Insert or replace team feature windows.
+
+    Args:
+        windows: Windows keyed by (team_id, league)
+
+    Returns:
+        Number of windows written
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    if not windows:
+        return 0
+
+    try:
+        with get_connection_context() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    """
+                    INSERT INTO team_feature_window (
+                        team_id, league, game_ids, fields, stat_values, head_start_time, updated_at
+                    )
+                    VALUES (
+                        %(team_id)s, %(league)s, %(game_ids)s, %(fields)s, %(stat_values)s, %(head_start_time)s, NOW()
+                    )
+                    ON CONFLICT (team_id, league)
+                    DO UPDATE SET
+                        game_ids = EXCLUDED.game_ids,
+                        fields = EXCLUDED.fields,
+                        stat_values = EXCLUDED.stat_values,
+                        head_start_time = EXCLUDED.head_start_time,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    windows,
+                )
+
+        logger.info(f"Successfully upserted {len(windows)} team feature window(s)")
+        return len(windows)
+
+    except psycopg.Error as e:
+        logger.error(f"Database error upserting team feature windows: {e}")
+        raise
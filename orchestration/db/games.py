@@ -1,4 +1,5 @@
 import psycopg
+from datetime import datetime
 from typing import TypedDict
 from utils import setup_logger
 from .connection import get_connection_context
@@ -58,4 +59,39 @@ def insert_game(game_data: Game):
         raise
     except Exception as e:
         logger.error(f"Unexpected error inserting game: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+def get_game_start_times(league: str, game_ids: list[str]) -> dict[str, datetime]:
+    """
+    Get the start times of a set of games.
+
+    Args:
+        league: League of the games
+        game_ids: Games to look up
+
+    Returns:
+        Start times keyed by game_id; games without one are left out
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    if not game_ids:
+        return {}
+
+    try:
+        with get_connection_context() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT game_id, start_time
+                    FROM game
+                    WHERE league = %s AND game_id = ANY(%s) AND start_time IS NOT NULL
+                    """,
+                    (league, game_ids),
+                )
+                return dict(cur.fetchall())
+
+    except psycopg.Error as e:
+        logger.error(f"Database error retrieving game start times: {e}")
+        raise
@@ -0,0 +1,182 @@
+"""
+Statement timing and counting for pooled connections.
+
+Both pools hand out connections whose cursors time every statement, labelled
+with its name in db/statements.py or "other". A statement slower than
+DB_SLOW_STATEMENT_MS is logged by that name, or otherwise with its normalized
+SQL (literals and parameters replaced by ?, repeated IN lists and OR groups
+collapsed). Statements are also counted against the innermost unit of work
+in progress, opened with unit_of_work or the statement_budget decorator. A
+unit that runs more statements than its budget logs the statements it ran
+most often, which is where an N+1 pattern shows up; with
+DB_STATEMENT_BUDGET_STRICT=1, as in tests, it raises StatementBudgetExceeded
+instead.
+"""
+
+import functools
+import inspect
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Optional
+
+import psycopg
+from psycopg import sql
+
+from db.statements import registered_name
+from metrics import STATEMENT_SECONDS, STATEMENTS_PER_UNIT
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+SLOW_STATEMENT_SECONDS = float(os.getenv("DB_SLOW_STATEMENT_MS", "500")) / 1000
+STRICT_BUDGETS = os.getenv("DB_STATEMENT_BUDGET_STRICT") == "1"
+
+
+class StatementBudgetExceeded(Exception):
+    pass
+
+
+class UnitOfWork:
+    def __init__(self, name: str, max_statements: Optional[int], parent: Optional["UnitOfWork"]):
+        self.name = name
+        self.max_statements = max_statements
+        self.parent = parent
+        self.statements = 0
+        self.seconds = 0.0
+        self.queries: Counter = Counter()
+
+
+_current_unit: ContextVar[Optional[UnitOfWork]] = ContextVar("unit_of_work", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"%\(\w+\)s|%s")
+_WHITESPACE = re.compile(r"\s+")
+_VALUE_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_REPEATED_GROUP = re.compile(r"(\([^()]*\))(?:\s+(OR|AND)\s+\1)+")
+
+
+def normalize_sql(query: str) -> str:
+    """Reduce a statement to its shape, so repeats of it compare equal"""
+    query = _STRING_LITERAL.sub("?", query)
+    query = _PARAMETER.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _WHITESPACE.sub(" ", query).strip()
+    query = _VALUE_LIST.sub("?, ...", query)
+    return _REPEATED_GROUP.sub(r"\1 \2 ...", query)
+
+
+def _query_text(cursor, query) -> str:
+    if isinstance(query, sql.Composable):
+        return query.as_string(cursor)
+    if isinstance(query, bytes):
+        return query.decode(errors="replace")
+    return query
+
+
+def _record_statement(cursor, query, seconds: float) -> None:
+    name = registered_name(query)
+    STATEMENT_SECONDS.labels(statement=name or "other").observe(seconds)
+    current = _current_unit.get()
+    slow = seconds >= SLOW_STATEMENT_SECONDS
+    if current is None and not slow:
+        return
+
+    normalized = name or normalize_sql(_query_text(cursor, query))
+    unit = current
+    while unit is not None:
+        unit.statements += 1
+        unit.seconds += seconds
+        unit.queries[normalized] += 1
+        unit = unit.parent
+
+    if slow:
+        where = f" in {current.name}" if current is not None else ""
+        logger.warning(f"Slow statement ({seconds * 1000:.0f}ms{where}): {normalized[:1000]}")
+
+
+class InstrumentedCursor(psycopg.Cursor):
+    def execute(self, query, params=None, *, prepare=None, binary=None):
+        start = perf_counter()
+        try:
+            return super().execute(query, params, prepare=prepare, binary=binary)
+        finally:
+            _record_statement(self, query, perf_counter() - start)
+
+    def executemany(self, query, params_seq, *, returning=False):
+        start = perf_counter()
+        try:
+            return super().executemany(query, params_seq, returning=returning)
+        finally:
+            _record_statement(self, query, perf_counter() - start)
+
+
+class InstrumentedAsyncCursor(psycopg.AsyncCursor):
+    async def execute(self, query, params=None, *, prepare=None, binary=None):
+        start = perf_counter()
+        try:
+            return await super().execute(query, params, prepare=prepare, binary=binary)
+        finally:
+            _record_statement(self, query, perf_counter() - start)
+
+    async def executemany(self, query, params_seq, *, returning=False):
+        start = perf_counter()
+        try:
+            return await super().executemany(query, params_seq, returning=returning)
+        finally:
+            _record_statement(self, query, perf_counter() - start)
+
+
+@contextmanager
+def unit_of_work(name: str, max_statements: Optional[int] = None, strict: Optional[bool] = None):
+    """Count the statements run inside the block, also towards any enclosing unit.
+
+    Args:
+        name: Unit name for logs and the statements-per-unit metric
+        max_statements: Statement budget (optional)
+        strict: Raise instead of logging when over budget (defaults to DB_STATEMENT_BUDGET_STRICT)
+
+    Raises:
+        StatementBudgetExceeded: If strict and the block ran more than max_statements statements
+    """
+    unit = UnitOfWork(name, max_statements, _current_unit.get())
+    token = _current_unit.set(unit)
+    try:
+        yield unit
+    finally:
+        _current_unit.reset(token)
+        STATEMENTS_PER_UNIT.labels(unit=name).observe(unit.statements)
+
+    if max_statements is not None and unit.statements > max_statements:
+        most_run = "; ".join(f"{count}x {query[:200]}" for query, count in unit.queries.most_common(3))
+        message = f"{name} ran {unit.statements} statements, over its budget of {max_statements}. Most run: {most_run}"
+        if STRICT_BUDGETS if strict is None else strict:
+            raise StatementBudgetExceeded(message)
+        logger.warning(message)
+
+
+def statement_budget(max_statements: Optional[int] = None):
+    """Run each call of the decorated function, sync or async, as a unit of work"""
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with unit_of_work(fn.__name__, max_statements):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with unit_of_work(fn.__name__, max_statements):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,119 @@
+import psycopg
+from psycopg.rows import dict_row
+from typing import Any, TypedDict, cast
+from utils import setup_logger
+from .connection import get_connection_context
+
+logger = setup_logger(__name__)
+
+
+class ModelState(TypedDict):
+    player_id: int
+    league: str
+    stat_name: str
+    feature_names: list[str]
+    information: list[float]
+    moments: list[float]
+    coefficients: list[float]
+    feature_means: list[float]
+    mean_weight: float
+    target_sum_squares: float
+    games: int
+    last_game_id: str | None
+
+
+def get_model_states(
+    league: str, player_ids: list[int], stat_names: list[str]
+) -> dict[tuple[int, str], ModelState]:
+    """
+    Get the online model states for a set of players and stats.
+
+    Args:
+        league: League of the players
+        player_ids: Players to look up
+        stat_names: Stats to look up
+
+    Returns:
+        States keyed by (player_id, stat_name); missing states are left out
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    if not player_ids or not stat_names:
+        return {}
+
+    try:
+        with get_connection_context() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    """
+                    SELECT player_id, league, stat_name, feature_names, information, moments,
+                        coefficients, feature_means, mean_weight, target_sum_squares, games, last_game_id
+                    FROM prop_model_state
+                    WHERE league = %s AND player_id = ANY(%s) AND stat_name = ANY(%s)
+                    """,
+                    (league, player_ids, stat_names),
+                )
+                return {
+                    (row["player_id"], row["stat_name"]): cast(ModelState, row)
+                    for row in cur.fetchall()
+                }
+
+    except psycopg.Error as e:
+        logger.error(f"Database error retrieving model states: {e}")
+        raise
+
+
+def upsert_model_states(states: list[dict[str, Any]]) -> int:
+    """
+    Insert or replace online model states.
+
+    Args:
+        states: ModelState dicts, keyed by (player_id, league, stat_name)
+
+    Returns:
+        Number of states written
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    if not states:
+        return 0
+
+    try:
+        with get_connection_context() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    """
+                    INSERT INTO prop_model_state (
+                        player_id, league, stat_name, feature_names, information, moments,
+                        coefficients, feature_means, mean_weight, target_sum_squares, games,
+                        last_game_id, updated_at
+                    )
+                    VALUES (
+                        %(player_id)s, %(league)s, %(stat_name)s, %(feature_names)s, %(information)s,
+                        %(moments)s, %(coefficients)s, %(feature_means)s, %(mean_weight)s,
+                        %(target_sum_squares)s, %(games)s, %(last_game_id)s, NOW()
+                    )
+                    ON CONFLICT (player_id, league, stat_name)
+                    DO UPDATE SET
+                        feature_names = EXCLUDED.feature_names,
+                        information = EXCLUDED.information,
+                        moments = EXCLUDED.moments,
+                        coefficients = EXCLUDED.coefficients,
+                        feature_means = EXCLUDED.feature_means,
+                        mean_weight = EXCLUDED.mean_weight,
+                        target_sum_squares = EXCLUDED.target_sum_squares,
+                        games = EXCLUDED.games,
+                        last_game_id = EXCLUDED.last_game_id,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    states,
+                )
+
+        logger.info(f"Successfully upserted {len(states)} model state(s)")
+        return len(states)
+
+    except psycopg.Error as e:
+        logger.error(f"Database error upserting model states: {e}")
+        raise
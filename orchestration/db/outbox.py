@@ -0,0 +1,196 @@
+"""
+Push notification outbox.
+
+Settlement workers add notifications with the cursor of their settlement
+transaction, so a notification is stored exactly when the settlement it
+announces commits and never waits on the notification API.
+data_pipeline.notification_dispatcher drains the outbox.
+"""
+
+from typing import Optional, TypedDict
+
+import psycopg
+from psycopg import AsyncCursor
+
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class OutboxNotification(TypedDict):
+    receiver_id: str
+    title: str
+    body: str
+    url: Optional[str]
+
+
+class PendingNotification(OutboxNotification):
+    id: int
+    attempts: int
+
+
+async def enqueue_notifications(cur: AsyncCursor, notifications: list[OutboxNotification]) -> None:
+    """
+    Add notifications to the outbox within the caller's transaction.
+
+    Args:
+        cur: Cursor of the open transaction
+        notifications: One notification per receiver
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    notifications = [notification for notification in notifications if notification["receiver_id"]]
+    if not notifications:
+        return
+    try:
+        await cur.executemany(
+            """
+            INSERT INTO notification_outbox (receiver_id, title, body, url)
+            VALUES (%(receiver_id)s, %(title)s, %(body)s, %(url)s)
+            """,
+            notifications,
+        )
+    except psycopg.Error as e:
+        logger.error(f"Database error enqueueing notifications: {e}")
+        raise
+
+
+async def claim_notifications(
+    cur: AsyncCursor, limit: int, max_attempts: int, lease_seconds: float
+) -> list[PendingNotification]:
+    """
+    Lease the oldest notifications due for sending. A claim counts as an
+    attempt and pushes the next one back by lease_seconds, so other
+    dispatchers leave the rows alone once the caller commits, and a
+    dispatcher that dies mid-send only delays them. Rows another dispatcher
+    is claiming at the same moment are skipped.
+
+    Args:
+        cur: Cursor of a short transaction the caller commits before sending, with a dict row factory
+        limit: Maximum notifications to claim
+        max_attempts: Notifications attempted this many times are left alone
+        lease_seconds: How long the claimed notifications stay with the caller
+
+    Returns:
+        The claimed notifications, oldest first, with attempts including this one
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    try:
+        await cur.execute(
+            """
+            WITH due AS (
+                SELECT id
+                FROM notification_outbox
+                WHERE sent_at IS NULL
+                AND attempts < %s
+                AND next_attempt_at <= NOW()
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE notification_outbox o
+            SET attempts = o.attempts + 1,
+                next_attempt_at = NOW() + make_interval(secs => %s)
+            FROM due
+            WHERE o.id = due.id
+            RETURNING o.id, o.receiver_id, o.title, o.body, o.url, o.attempts
+            """,
+            (max_attempts, limit, lease_seconds),
+        )
+        return sorted(await cur.fetchall(), key=lambda row: row["id"])
+    except psycopg.Error as e:
+        logger.error(f"Database error claiming notifications: {e}")
+        raise
+
+
+async def mark_notifications_sent(cur: AsyncCursor, ids: list[int]) -> None:
+    """
+    Mark notifications as sent.
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    if not ids:
+        return
+    try:
+        await cur.execute(
+            "UPDATE notification_outbox SET sent_at = NOW() WHERE id = ANY(%s)",
+            (ids,),
+        )
+    except psycopg.Error as e:
+        logger.error(f"Database error marking notifications sent: {e}")
+        raise
+
+
+async def mark_notifications_failed(
+    cur: AsyncCursor,
+    ids: list[int],
+    error: str,
+    backoff_base_seconds: float,
+    backoff_max_seconds: float,
+    max_attempts: int,
+) -> list[int]:
+    """
+    Record a failed attempt, counted when the notifications were claimed, and
+    schedule the next one with exponential backoff.
+
+    Args:
+        cur: Cursor of the open transaction, with a dict row factory
+        ids: Notifications whose send failed
+        error: Error to record
+        backoff_base_seconds: Delay after the first failure, doubled with each further one
+        backoff_max_seconds: Longest delay between attempts
+        max_attempts: Attempts after which a notification is given up on
+
+    Returns:
+        Ids of the notifications that have now used up their attempts
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    if not ids:
+        return []
+    try:
+        await cur.execute(
+            """
+            UPDATE notification_outbox
+            SET last_error = %s,
+                next_attempt_at = NOW() + make_interval(secs => LEAST(%s * POWER(2, attempts - 1), %s))
+            WHERE id = ANY(%s)
+            RETURNING id, attempts
+            """,
+            (error, backoff_base_seconds, backoff_max_seconds, ids),
+        )
+        return [row["id"] for row in await cur.fetchall() if row["attempts"] >= max_attempts]
+    except psycopg.Error as e:
+        logger.error(f"Database error marking notifications failed: {e}")
+        raise
+
+
+async def delete_finished_notifications(cur: AsyncCursor, retention_days: int, max_attempts: int) -> int:
+    """
+    Delete notifications sent more than retention_days ago, and dead letters
+    (notifications that used up their attempts) created that long ago.
+
+    Returns:
+        Number of notifications deleted
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    try:
+        await cur.execute(
+            """
+            DELETE FROM notification_outbox
+            WHERE sent_at < NOW() - make_interval(days => %s)
+            OR (sent_at IS NULL AND attempts >= %s AND created_at < NOW() - make_interval(days => %s))
+            """,
+            (retention_days, max_attempts, retention_days),
+        )
+        return cur.rowcount
+    except psycopg.Error as e:
+        logger.error(f"Database error deleting finished notifications: {e}")
+        raise
@@ -1,7 +1,8 @@
 import psycopg
-from typing import TypedDict, Literal
+from typing import TypedDict, Literal, Optional
 from utils import setup_logger
 from .connection import get_connection_context
+from .games import Game
 
 logger = setup_logger(__name__)
 
@@ -14,15 +15,32 @@ class Prop(TypedDict):
     game_id: str
     choices: list[str]
 
-def insert_prop(prop_data: Prop) -> str:
+class PropRetirement(TypedDict):
+    league: str
+    game_id: str
+    player_id: int
+    keep_stat_names: list[str]
+
+class FingerprintKey(TypedDict):
+    league: str
+    game_id: str
+    player_id: int
+
+class InputFingerprint(FingerprintKey):
+    team_id: int
+    fingerprint: str
+
+def get_input_fingerprints(league: str, game_id: str, team_ids: Optional[list[int]] = None) -> dict[int, str]:
     """
-    Insert a single prop into the database.
+    Get the input fingerprints stored by the last prop generation run for a game.
 
     Args:
-        prop_data: Prop dict with required fields
+        league: League of the game
+        game_id: Game to look up
+        team_ids: Only players recorded for these teams (defaults to both teams)
 
     Returns:
-        The inserted prop ID
+        Fingerprints keyed by player_id
 
     Raises:
         psycopg.Error: If database operation fails
@@ -30,35 +48,133 @@ def insert_prop(prop_data: Prop) -> str:
     try:
         with get_connection_context() as conn:
             with conn.cursor() as cur:
-                # Let database use default value for current_value
-                insert_query = """
-                    INSERT INTO prop (line, stat_name, stat_display_name, player_id, league, game_id, choices)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                """
-                params = (
-                    prop_data['line'],
-                    prop_data['stat_name'],
-                    prop_data['stat_display_name'],
-                    prop_data['player_id'],
-                    prop_data['league'],
-                    prop_data['game_id'],
-                    prop_data['choices'],
+                cur.execute(
+                    """
+                    SELECT player_id, fingerprint
+                    FROM prop_input_fingerprint
+                    WHERE league = %s AND game_id = %s
+                        AND (%s::integer[] IS NULL OR team_id = ANY(%s::integer[]))
+                    """,
+                    (league, game_id, team_ids, team_ids),
                 )
+                return {player_id: fingerprint for player_id, fingerprint in cur.fetchall()}
+
+    except psycopg.Error as e:
+        logger.error(f"Database error retrieving input fingerprints: {e}")
+        raise
+
+
+def upsert_slate(
+    games: list[Game],
+    props: list[Prop],
+    retirements: list[PropRetirement] | None = None,
+    fingerprints: list[InputFingerprint] | None = None,
+    dropped_fingerprints: list[FingerprintKey] | None = None,
+) -> tuple[int, int, int]:
+    """
+    Upsert a league's games and the props generated for them in one transaction.
+
+    Props are keyed by (league, game_id, player_id, stat_name), so rerunning
+    generation for a date doesn't duplicate them. A rerun refreshes the line
+    of props nobody has picked yet; props with picks keep the line they were
+    picked at.
+
+    Args:
+        games: Games the props belong to
+        props: Generated props
+        retirements: Players whose other props for a game are retired, with the
+            stats they keep; unresolved props without picks are deleted
+        fingerprints: Input fingerprints of the players that were generated
+        dropped_fingerprints: Keys of the fingerprints to remove
+
+    Returns:
+        (games written, props written, props retired)
+
+    Raises:
+        psycopg.Error: If database operation fails
+    """
+    retirements = retirements or []
+    fingerprints = fingerprints or []
+    dropped_fingerprints = dropped_fingerprints or []
+    if not (games or props or retirements or fingerprints or dropped_fingerprints):
+        return 0, 0, 0
+
+    try:
+        with get_connection_context() as conn:
+            # One transaction: the pool commits when the context exits
+            with conn.cursor() as cur:
+                if games:
+                    cur.executemany(
+                        """
+                        INSERT INTO game (game_id, start_time, home_team_id, away_team_id, league)
+                        VALUES (%(game_id)s, %(start_time)s, %(home_team_id)s, %(away_team_id)s, %(league)s)
+                        ON CONFLICT (game_id, league)
+                        DO UPDATE SET game_id = EXCLUDED.game_id
+                        """,
+                        games,
+                    )
+                games_written = cur.rowcount if games else 0
+
+                if props:
+                    cur.executemany(
+                        """
+                        INSERT INTO prop (line, stat_name, stat_display_name, player_id, league, game_id, choices)
+                        VALUES (
+                            %(line)s, %(stat_name)s, %(stat_display_name)s, %(player_id)s,
+                            %(league)s, %(game_id)s, %(choices)s
+                        )
+                        ON CONFLICT (league, game_id, player_id, stat_name)
+                        DO UPDATE SET
+                            line = EXCLUDED.line,
+                            stat_display_name = EXCLUDED.stat_display_name,
+                            choices = EXCLUDED.choices
+                        WHERE prop.status = 'not_resolved'
+                            AND NOT EXISTS (SELECT 1 FROM pick WHERE pick.prop_id = prop.id)
+                        """,
+                        props,
+                    )
+                props_written = cur.rowcount if props else 0
+
+                if retirements:
+                    cur.executemany(
+                        """
+                        DELETE FROM prop
+                        WHERE league = %(league)s
+                            AND game_id = %(game_id)s
+                            AND player_id = %(player_id)s
+                            AND stat_name <> ALL(%(keep_stat_names)s)
+                            AND status = 'not_resolved'
+                            AND NOT EXISTS (SELECT 1 FROM pick WHERE pick.prop_id = prop.id)
+                        """,
+                        retirements,
+                    )
+                props_retired = cur.rowcount if retirements else 0
 
-                cur.execute(insert_query, params)
+                if fingerprints:
+                    cur.executemany(
+                        """
+                        INSERT INTO prop_input_fingerprint (league, game_id, player_id, team_id, fingerprint, updated_at)
+                        VALUES (%(league)s, %(game_id)s, %(player_id)s, %(team_id)s, %(fingerprint)s, NOW())
+                        ON CONFLICT (league, game_id, player_id)
+                        DO UPDATE SET
+                            team_id = EXCLUDED.team_id,
+                            fingerprint = EXCLUDED.fingerprint,
+                            updated_at = EXCLUDED.updated_at
+                        """,
+                        fingerprints,
+                    )
 
-                result = cur.fetchone()
-                if not result:
-                    raise psycopg.Error("Failed to insert prop - no ID returned")
+                if dropped_fingerprints:
+                    cur.executemany(
+                        """
+                        DELETE FROM prop_input_fingerprint
+                        WHERE league = %(league)s AND game_id = %(game_id)s AND player_id = %(player_id)s
+                        """,
+                        dropped_fingerprints,
+                    )
 
-                prop_id = result[0]
-                logger.info(f"Successfully inserted prop: {prop_id}")
-                return str(prop_id)
+        return games_written, props_written, props_retired
 
     except psycopg.Error as e:
-        logger.error(f"Database error inserting prop: {e}")
+        logger.error(f"Database error upserting slate: {e}")
         raise
-    except Exception as e:
-        logger.error(f"Unexpected error inserting prop: {e}")
-        raise
\ No newline at end of file
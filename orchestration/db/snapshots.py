@@ -0,0 +1,97 @@
+import psycopg
+from psycopg import sql
+from psycopg.rows import dict_row
+from typing import Any
+from utils import setup_logger
+from .connection import get_connection_context
+
+logger = setup_logger(__name__)
+
+# Stat tables per sport, the only identifiers interpolated into the queries below
+STAT_TABLES = {
+    "basketball": ("basketball_player_stats", "basketball_team_stats"),
+    "football": ("football_player_stats", "football_team_stats"),
+    "baseball": ("baseball_player_stats", "baseball_team_stats"),
+}
+
+
+def get_player_stat_history(sport: str, league: str) -> list[dict[str, Any]]:
+    """
+    Get every active player stat row of a league, as the prop services read them.
+
+    Args:
+        sport: basketball, football or baseball
+        league: League to export
+
+    Returns:
+        Rows ordered by player_id, then most recent game first, each with the
+        opponent_team_id of its game
+
+    Raises:
+        ValueError: If the sport is unknown
+        psycopg.Error: If database operation fails
+    """
+    if sport not in STAT_TABLES:
+        raise ValueError(f"Invalid sport parameter: {sport}")
+
+    query = sql.SQL(
+        """
+        SELECT ps.*,
+            CASE WHEN g.home_team_id = ps.team_id THEN g.away_team_id ELSE g.home_team_id END
+                AS opponent_team_id
+        FROM {player_stats} ps
+        INNER JOIN game g ON ps.game_id = g.game_id AND ps.league = g.league
+        WHERE ps.league = %(league)s
+            AND ps.status = 'ACT'
+        ORDER BY ps.player_id, g.start_time DESC
+        """
+    ).format(player_stats=sql.Identifier(STAT_TABLES[sport][0]))
+
+    try:
+        with get_connection_context() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(query, {"league": league})
+                return cur.fetchall()
+
+    except psycopg.Error as e:
+        logger.error(f"Database error retrieving {league} player stat history: {e}")
+        raise
+
+
+def get_team_stat_history(sport: str, league: str) -> list[dict[str, Any]]:
+    """
+    Get every team stat row of a league.
+
+    Args:
+        sport: basketball, football or baseball
+        league: League to export
+
+    Returns:
+        Rows ordered by team_id, then most recent game first
+
+    Raises:
+        ValueError: If the sport is unknown
+        psycopg.Error: If database operation fails
+    """
+    if sport not in STAT_TABLES:
+        raise ValueError(f"Invalid sport parameter: {sport}")
+
+    query = sql.SQL(
+        """
+        SELECT ts.*
+        FROM {team_stats} ts
+        INNER JOIN game g ON ts.game_id = g.game_id AND ts.league = g.league
+        WHERE ts.league = %(league)s
+        ORDER BY ts.team_id, g.start_time DESC
+        """
+    ).format(team_stats=sql.Identifier(STAT_TABLES[sport][1]))
+
+    try:
+        with get_connection_context() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(query, {"league": league})
+                return cur.fetchall()
+
+    except psycopg.Error as e:
+        logger.error(f"Database error retrieving {league} team stat history: {e}")
+        raise
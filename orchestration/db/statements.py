@@ -0,0 +1,331 @@
+"""
+Registry of the queries the pipeline workers run on every message.
+
+Each query is declared once here and run with execute(), which asks psycopg to
+prepare it on the connection the first time it runs there: later runs on that
+pooled connection skip parsing and planning and send only the parameters.
+psycopg names the prepared statements itself, so the registry name is what
+identifies a statement in the statement timing metric and in the statement
+budget and slow statement logs (see db/instrumentation.py).
+
+Behind a pooler that cannot carry prepared statements across transactions
+(PgBouncer in transaction mode before 1.21, or with max_prepared_statements
+unset), set DB_PREPARED_STATEMENTS=off. Registry statements then run
+unprepared, and the pools stop psycopg from preparing other statements
+automatically.
+"""
+
+import os
+import textwrap
+from typing import NamedTuple, Optional
+
+from psycopg import AsyncCursor
+
+PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "on").lower() != "off"
+
+
+class Statement(NamedTuple):
+    name: str
+    sql: str
+
+
+_registry: dict[str, Statement] = {}
+_names_by_sql: dict[str, str] = {}
+
+
+def statement(name: str, sql: str) -> Statement:
+    """Declare a statement"""
+    if name in _registry:
+        raise ValueError(f"Statement {name} is already registered")
+    registered = Statement(name, textwrap.dedent(sql).strip())
+    _registry[name] = registered
+    _names_by_sql[registered.sql] = name
+    return registered
+
+
+def registered_statements() -> list[Statement]:
+    return list(_registry.values())
+
+
+def registered_name(query) -> Optional[str]:
+    """Name of the registered statement with this SQL, if there is one"""
+    return _names_by_sql.get(query) if isinstance(query, str) else None
+
+
+async def execute(
+    cur: AsyncCursor, registered: Statement, params: Optional[tuple] = None, prepare: Optional[bool] = None
+) -> AsyncCursor:
+    """Run a registered statement, prepared unless DB_PREPARED_STATEMENTS=off.
+
+    Args:
+        cur: Cursor to run it on
+        registered: The statement
+        params: Query parameters (optional)
+        prepare: Override the DB_PREPARED_STATEMENTS setting (optional)
+    """
+    return await cur.execute(
+        registered.sql, params, prepare=PREPARED_STATEMENTS if prepare is None else prepare
+    )
+
+
+# props_worker
+
+PROPS_FOR_GAME_STATS = statement(
+    "props_for_game_stats",
+    """
+    SELECT id, line, status, player_id, stat_name, league, game_id
+    FROM prop
+    WHERE game_id = %s AND league = %s
+    AND (player_id, stat_name) IN (SELECT * FROM unnest(%s::integer[], %s::text[]))
+    """,
+)
+
+OPEN_PROPS_FOR_GAME = statement(
+    "open_props_for_game",
+    """
+    SELECT id, player_id, game_id
+    FROM prop
+    WHERE game_id = %s AND (status = 'not_resolved' OR status = 'did_not_play')
+    """,
+)
+
+UPDATE_PROP_VALUE = statement(
+    "update_prop_value",
+    """
+    UPDATE prop
+    SET current_value = %s, status = %s
+    WHERE id = %s
+    RETURNING id
+    """,
+)
+
+# picks_worker
+
+PROP_BY_ID = statement(
+    "prop_by_id",
+    """
+    SELECT id, current_value, line, status
+    FROM prop
+    WHERE id = %s
+    """,
+)
+
+PICKS_DID_NOT_PLAY = statement(
+    "picks_did_not_play",
+    """
+    UPDATE pick SET status = 'did_not_play'::pick_status
+    WHERE prop_id = %s
+    RETURNING id, parlay_id
+    """,
+)
+
+PICKS_OVER_HIT = statement(
+    "picks_over_hit",
+    """
+    WITH updates AS (
+        UPDATE pick SET status = CASE
+            WHEN choice = 'over' THEN 'hit'::pick_status
+            WHEN choice = 'under' THEN 'missed'::pick_status
+        END
+        WHERE prop_id = %s AND choice IN ('over', 'under')
+        RETURNING id, parlay_id
+    )
+    SELECT id, parlay_id FROM updates
+    """,
+)
+
+PICKS_TIE = statement(
+    "picks_tie",
+    """
+    UPDATE pick SET status = 'tie'::pick_status
+    WHERE prop_id = %s
+    RETURNING id, parlay_id
+    """,
+)
+
+PICKS_UNDER_HIT = statement(
+    "picks_under_hit",
+    """
+    WITH updates AS (
+        UPDATE pick SET status = CASE
+            WHEN choice = 'over' THEN 'missed'::pick_status
+            WHEN choice = 'under' THEN 'hit'::pick_status
+        END
+        WHERE prop_id = %s AND choice IN ('over', 'under')
+        RETURNING id, parlay_id
+    )
+    SELECT id, parlay_id FROM updates
+    """,
+)
+
+PICKS_FOR_PROP = statement(
+    "picks_for_prop",
+    """
+    SELECT id, parlay_id
+    FROM pick
+    WHERE prop_id = %s
+    """,
+)
+
+# parlays_worker
+
+PICK_EXISTS = statement(
+    "pick_exists",
+    """
+    SELECT id
+    FROM pick
+    WHERE id = %s
+    """,
+)
+
+PARLAY_FOR_PICK = statement(
+    "parlay_for_pick",
+    """
+    SELECT
+        p.id as parlay_id,
+        p.stake,
+        p.type,
+        p.resolved,
+        p.match_user_id,
+        p.dynasty_league_user_id,
+        mu.balance as match_user_balance,
+        mu.match_id,
+        mu.user_id as match_user_user_id,
+        dlu.balance as dynasty_league_user_balance,
+        dlu.dynasty_league_id,
+        dlu.user_id as dynasty_league_user_user_id
+    FROM pick pk
+    JOIN parlay p ON pk.parlay_id = p.id
+    LEFT JOIN match_user mu ON p.match_user_id = mu.id
+    LEFT JOIN dynasty_league_user dlu ON p.dynasty_league_user_id = dlu.id
+    WHERE pk.id = %s
+    """,
+)
+
+LOCK_PARLAY = statement(
+    "lock_parlay",
+    """
+    SELECT id, resolved
+    FROM parlay
+    WHERE id = %s
+    FOR UPDATE
+    """,
+)
+
+PARLAY_PICKS = statement(
+    "parlay_picks",
+    """
+    SELECT id, status
+    FROM pick
+    WHERE parlay_id = %s
+    """,
+)
+
+RESOLVE_PARLAY = statement(
+    "resolve_parlay",
+    """
+    UPDATE parlay
+    SET payout = %s, resolved = true
+    WHERE id = %s
+    """,
+)
+
+CREDIT_MATCH_USER = statement(
+    "credit_match_user",
+    """
+    UPDATE match_user
+    SET balance = balance + %s
+    WHERE id = %s
+    """,
+)
+
+CREDIT_DYNASTY_LEAGUE_USER = statement(
+    "credit_dynasty_league_user",
+    """
+    UPDATE dynasty_league_user
+    SET balance = balance + %s
+    WHERE id = %s
+    """,
+)
+
+# matches_worker
+
+PARLAY_EXISTS = statement(
+    "parlay_exists",
+    """
+    SELECT id
+    FROM parlay
+    WHERE id = %s
+    """,
+)
+
+MATCH_FOR_PARLAY = statement(
+    "match_for_parlay",
+    """
+    SELECT DISTINCT
+        m.id as match_id,
+        m.type as match_type,
+        m.league as match_league,
+        m.resolved as match_resolved
+    FROM parlay p
+    JOIN match_user mu ON p.match_user_id = mu.id
+    JOIN match m ON mu.match_id = m.id
+    WHERE p.id = %s
+    """,
+)
+
+MATCH_BY_ID = statement(
+    "match_by_id",
+    """
+    SELECT
+        m.id as match_id,
+        m.type as match_type,
+        m.league as match_league,
+        m.resolved as match_resolved
+    FROM match m
+    WHERE m.id = %s
+    """,
+)
+
+LOCK_UNRESOLVED_MATCH = statement(
+    "lock_unresolved_match",
+    "SELECT id FROM match WHERE id = %s AND resolved = false FOR UPDATE",
+)
+
+MATCH_USERS = statement(
+    "match_users",
+    """
+    SELECT
+        mu.id as match_user_id,
+        mu.user_id,
+        mu.balance,
+        mu.starting_balance,
+        mu.points_snapshot,
+        mu.points_delta,
+        mu.status
+    FROM match_user mu
+    WHERE mu.match_id = %s
+    ORDER BY mu.id
+    """,
+)
+
+MATCH_USER_PARLAYS = statement(
+    "match_user_parlays",
+    """
+    SELECT id, stake, resolved, payout
+    FROM parlay
+    WHERE match_user_id = %s
+    """,
+)
+
+AVAILABLE_PROPS_IN_LEAGUE = statement(
+    "available_props_in_league",
+    """
+    SELECT COUNT(*) as available_count
+    FROM prop p
+    JOIN game g ON p.game_id = g.game_id
+    WHERE g.league = %s
+    AND p.status = 'not_resolved'
+    AND g.start_time AT TIME ZONE 'UTC' > (NOW() AT TIME ZONE 'UTC')
+    """,
+)
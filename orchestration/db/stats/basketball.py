@@ -1,4 +1,4 @@
-from typing import TypedDict, List, Optional, Union, cast, Literal
+from typing import TypedDict, Dict, List, Optional, Union, cast, Literal
 from psycopg.rows import dict_row
 from psycopg import sql
 import logging
@@ -253,6 +253,59 @@ def get_basketball_player_stats(player_id: int, league: str, limit: int) -> List
         logger.error(f"Error retrieving basketball player stats: {e}")
         raise
 
+def get_basketball_recent_player_averages(player_ids: List[int], league: str, limit: int, fields: List[str]) -> Dict[int, Dict[str, float]]:
+    """Average of each field over the last `limit` active games of every player, in one query
+
+    Gives the same means the services took of get_basketball_player_stats rows, for
+    a whole roster at once. Players without games are left out.
+    """
+    if league not in ["NBA", "NCAABB"]:
+        raise ValueError("Invalid league parameter")
+
+    if limit <= 0:
+        raise ValueError("Invalid limit parameter")
+
+    if not player_ids or not fields:
+        return {}
+
+    try:
+        with get_connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                query = sql.SQL("""
+                    SELECT recent.player_id, {averages}
+                    FROM (
+                        SELECT bps.*,
+                            ROW_NUMBER() OVER (PARTITION BY bps.player_id ORDER BY g.start_time DESC) AS recent_rank
+                        FROM basketball_player_stats bps
+                        INNER JOIN game g ON bps.game_id = g.game_id AND bps.league = g.league
+                        WHERE bps.player_id = ANY(%(player_ids)s)
+                            AND bps.league = %(league)s
+                            AND bps.status = 'ACT'
+                    ) recent
+                    WHERE recent.recent_rank <= %(limit)s
+                    GROUP BY recent.player_id
+                """).format(
+                    averages=sql.SQL(", ").join(
+                        sql.SQL("AVG(recent.{field})::float8 AS {field}").format(field=sql.Identifier(field))
+                        for field in fields
+                    )
+                )
+
+                cur.execute(query, {
+                    'player_ids': player_ids,
+                    'league': league,
+                    'limit': limit
+                })
+
+                return {
+                    row["player_id"]: {field: row[field] for field in fields}
+                    for row in cur.fetchall()
+                }
+
+    except Exception as e:
+        logger.error(f"Error retrieving basketball recent player averages: {e}")
+        raise
+
 def get_basketball_team_stats(team_id: int, league: str, limit: int) -> List[BasketballTeamStats]:
     """Get basketball team stats for a specific team"""
     if league not in ["NBA", "NCAABB"]:
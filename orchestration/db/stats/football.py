@@ -1,5 +1,5 @@
 import logging
-from typing import List, Literal, Optional, TypedDict, Union, cast
+from typing import Dict, List, Literal, Optional, TypedDict, Union, cast
 
 from db.connection import get_connection
 from psycopg import sql
@@ -340,6 +340,60 @@ def get_football_player_stats(
         raise
 
 
+def get_football_recent_player_averages(
+    player_ids: List[int], league: str, limit: int, fields: List[str]
+) -> Dict[int, Dict[str, float]]:
+    """Average of each field over the last `limit` active games of every player, in one query
+
+    Gives the same means the services took of get_football_player_stats rows, for
+    a whole roster at once. Players without games are left out.
+    """
+    if league not in ["NFL", "NCAAFB"]:
+        raise ValueError("Invalid league parameter")
+
+    if limit <= 0:
+        raise ValueError("Invalid limit parameter")
+
+    if not player_ids or not fields:
+        return {}
+
+    try:
+        with get_connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                query = sql.SQL("""
+                    SELECT recent.player_id, {averages}
+                    FROM (
+                        SELECT fps.*,
+                            ROW_NUMBER() OVER (PARTITION BY fps.player_id ORDER BY g.start_time DESC) AS recent_rank
+                        FROM football_player_stats fps
+                        INNER JOIN game g ON fps.game_id = g.game_id
+                        WHERE fps.player_id = ANY(%(player_ids)s)
+                            AND fps.league = %(league)s
+                            AND fps.status = 'ACT'
+                    ) recent
+                    WHERE recent.recent_rank <= %(limit)s
+                    GROUP BY recent.player_id
+                """).format(
+                    averages=sql.SQL(", ").join(
+                        sql.SQL("AVG(recent.{field})::float8 AS {field}").format(field=sql.Identifier(field))
+                        for field in fields
+                    )
+                )
+
+                cur.execute(
+                    query, {"player_ids": player_ids, "league": league, "limit": limit}
+                )
+
+                return {
+                    row["player_id"]: {field: row[field] for field in fields}
+                    for row in cur.fetchall()
+                }
+
+    except Exception as e:
+        logger.error(f"Error retrieving football recent player averages: {e}")
+        raise
+
+
 def get_football_team_stats(
     team_id: int, league: str, limit: int
 ) -> List[FootballTeamStats]:
@@ -5,59 +5,154 @@ Baseball statistics extraction and extended calculations.
 from db.stats.baseball import BaseballPlayerStats, BaseballTeamStats
 
 
-def calculate_baseball_batting_extended_stats(player_stats):
-    """Calculate extended baseball batting statistics."""
+def _batting_avg(player_stats):
+    return player_stats["hits"] / player_stats["at_bats"] if player_stats["at_bats"] > 0 else 0
 
-    # Batting Average
-    batting_avg = player_stats["hits"] / player_stats["at_bats"] if player_stats["at_bats"] > 0 else 0
 
-    # On-Base Percentage
+def _obp(player_stats):
     plate_appearances = player_stats["at_bats"] + player_stats["walks"] + player_stats["hit_by_pitch"]
-    obp = (player_stats["hits"] + player_stats["walks"] + player_stats["hit_by_pitch"]) / plate_appearances if plate_appearances > 0 else 0
+    return (player_stats["hits"] + player_stats["walks"] + player_stats["hit_by_pitch"]) / plate_appearances if plate_appearances > 0 else 0
 
-    # Slugging Percentage
+
+def _slugging_pct(player_stats):
     total_bases = (player_stats["singles"] +
                    2 * player_stats["doubles"] +
                    3 * player_stats["triples"] +
                    4 * player_stats["home_runs"])
-    slugging_pct = total_bases / player_stats["at_bats"] if player_stats["at_bats"] > 0 else 0
+    return total_bases / player_stats["at_bats"] if player_stats["at_bats"] > 0 else 0
 
-    # OPS (On-base Plus Slugging)
-    ops = obp + slugging_pct
 
+def _per_inning(player_stats, numerator):
+    return numerator / player_stats["innings_pitched"] if player_stats["innings_pitched"] > 0 else 0
+
+
+# Extended batting stats in output order
+BASEBALL_BATTING_EXTENDED_STATS = {
+    "batting_avg": lambda p: round(_batting_avg(p), 4),
+    # On-Base Percentage
+    "obp": lambda p: round(_obp(p), 4),
+    # Slugging Percentage
+    "slugging_pct": lambda p: round(_slugging_pct(p), 4),
+    # OPS (On-base Plus Slugging)
+    "ops": lambda p: round(_obp(p) + _slugging_pct(p), 4),
     # Combination Stats
-    hits_runs_rbis = player_stats["hits"] + player_stats["runs"] + player_stats["rbis"]
+    "hits_runs_rbis": lambda p: p["hits"] + p["runs"] + p["rbis"],
+}
 
-    return {
-        "batting_avg": round(batting_avg, 4),
-        "obp": round(obp, 4),
-        "slugging_pct": round(slugging_pct, 4),
-        "ops": round(ops, 4),
-        "hits_runs_rbis": hits_runs_rbis,
-    }
+# Extended pitching stats in output order
+BASEBALL_PITCHING_EXTENDED_STATS = {
+    # ERA (Earned Run Average)
+    "era": lambda p: round(_per_inning(p, p["earned_runs"] * 9), 2),
+    # WHIP (Walks + Hits per Inning Pitched)
+    "whip": lambda p: round(_per_inning(p, p["hits_allowed"] + p["pitching_walks"]), 2),
+    # K/9 (Strikeouts per 9 innings)
+    "k_per_nine": lambda p: round(_per_inning(p, p["pitching_strikeouts"] * 9), 2),
+    # Strike Percentage
+    "strike_pct": lambda p: round(p["strikes"] / p["pitches_thrown"] if p["pitches_thrown"] > 0 else 0, 4),
+}
 
+# Fields each extended batting and pitching stat is computed from
+BASEBALL_PLAYER_STAT_DEPENDENCIES = {
+    "batting_avg": {"hits", "at_bats"},
+    "obp": {"hits", "at_bats", "walks", "hit_by_pitch"},
+    "slugging_pct": {"singles", "doubles", "triples", "home_runs", "at_bats"},
+    "ops": {"obp", "slugging_pct"},
+    "hits_runs_rbis": {"hits", "runs", "rbis"},
+    "era": {"earned_runs", "innings_pitched"},
+    "whip": {"hits_allowed", "pitching_walks", "innings_pitched"},
+    "k_per_nine": {"pitching_strikeouts", "innings_pitched"},
+    "strike_pct": {"strikes", "pitches_thrown"},
+}
 
-def calculate_baseball_pitching_extended_stats(player_stats):
-    """Calculate extended baseball pitching statistics."""
+# Batting box score fields: stat name -> (feed key, default)
+BASEBALL_BATTING_FIELDS = {
+    "errors": ("E", 0),
+    "hits": ("H", 0),
+    "runs": ("R", 0),
+    "singles": ("1B", 0),
+    "doubles": ("2B", 0),
+    "triples": ("3B", 0),
+    "at_bats": ("AB", 0),
+    "walks": ("BB", 0),
+    "caught_stealing": ("CS", 0),
+    "home_runs": ("HR", 0),
+    "putouts": ("PO", 0),
+    "stolen_bases": ("SB", 0),
+    "strikeouts": ("SO", 0),
+    "hit_by_pitch": ("HBP", 0),
+    "intentional_walks": ("IBB", 0),
+    "rbis": ("RBI", 0),
+    "outs": ("Outs", 0),
+    "status": ("status", "INACT"),
+}
 
-    # ERA (Earned Run Average)
-    era = (player_stats["earned_runs"] * 9) / player_stats["innings_pitched"] if player_stats["innings_pitched"] > 0 else 0
+# Pitching box score fields: stat name -> (feed key, default)
+BASEBALL_PITCHING_FIELDS = {
+    "hits_allowed": ("H", 0),
+    "pitching_strikeouts": ("K", 0),
+    "losses": ("L", 0),
+    "runs_allowed": ("R", 0),
+    "saves": ("S", 0),
+    "wins": ("W", 0),
+    "singles_allowed": ("1B", 0),
+    "doubles_allowed": ("2B", 0),
+    "triples_allowed": ("3B", 0),
+    "pitching_walks": ("BB", 0),
+    "balks": ("BK", 0),
+    "blown_saves": ("BS", 0),
+    "pitching_caught_stealing": ("CS", 0),
+    "earned_runs": ("ER", 0),
+    "home_runs_allowed": ("HR", 0),
+    "innings_pitched": ("IP", 0),
+    "pitching_putouts": ("PO", 0),
+    "stolen_bases_allowed": ("SB", 0),
+    "wild_pitches": ("WP", 0),
+    "pitching_hit_by_pitch": ("HBP", 0),
+    "holds": ("HLD", 0),
+    "pitching_intentional_walks": ("IBB", 0),
+    "pitches_thrown": ("pitches", 0),
+    "strikes": ("strikes", 0),
+    "status": ("status", "INACT"),
+}
 
-    # WHIP (Walks + Hits per Inning Pitched)
-    whip = (player_stats["hits_allowed"] + player_stats["pitching_walks"]) / player_stats["innings_pitched"] if player_stats["innings_pitched"] > 0 else 0
 
-    # K/9 (Strikeouts per 9 innings)
-    k_per_nine = (player_stats["pitching_strikeouts"] * 9) / player_stats["innings_pitched"] if player_stats["innings_pitched"] > 0 else 0
+def calculate_baseball_batting_extended_stats(player_stats, fields=None):
+    """Calculate extended baseball batting statistics.
+
+    Args:
+        fields: Resolved set of fields to compute, or None for every extended stat
+    """
+    return {
+        stat_name: calculator(player_stats)
+        for stat_name, calculator in BASEBALL_BATTING_EXTENDED_STATS.items()
+        if fields is None or stat_name in fields
+    }
 
-    # Strike Percentage
-    strike_pct = player_stats["strikes"] / player_stats["pitches_thrown"] if player_stats["pitches_thrown"] > 0 else 0
 
+def calculate_baseball_pitching_extended_stats(player_stats, fields=None):
+    """Calculate extended baseball pitching statistics.
+
+    Args:
+        fields: Resolved set of fields to compute, or None for every extended stat
+    """
     return {
-        "era": round(era, 2),
-        "whip": round(whip, 2),
-        "k_per_nine": round(k_per_nine, 2),
-        "strike_pct": round(strike_pct, 4),
+        stat_name: calculator(player_stats)
+        for stat_name, calculator in BASEBALL_PITCHING_EXTENDED_STATS.items()
+        if fields is None or stat_name in fields
+    }
+
+
+def _extract_box_score_fields(game, team_id, player_id, player_stats, league, box_score_fields, fields):
+    base_stats = {
+        "game_id": game["game_ID"],
+        "player_id": int(player_id),
+        "team_id": int(team_id),
+        "league": league,
     }
+    for field, (feed_key, default) in box_score_fields.items():
+        if fields is None or field in fields or field == "status":
+            base_stats[field] = player_stats.get(feed_key, default)
+    return base_stats
 
 
 def calculate_baseball_team_extended_stats(game, team, team_stats):
@@ -168,77 +263,38 @@ def extract_baseball_team_stats(game, team, league="MLB"):
 
 
 def extract_baseball_batting_stats(
-    game, team_id, player_id, player_stats, league="MLB"
+    game, team_id, player_id, player_stats, league="MLB", fields=None
 ):
-    """Extract baseball batting stats from game data."""
-    base_stats = {
-        "game_id": game["game_ID"],
-        "player_id": int(player_id),
-        "team_id": int(team_id),
-        "league": league,
-        "errors": player_stats.get("E", 0),
-        "hits": player_stats.get("H", 0),
-        "runs": player_stats.get("R", 0),
-        "singles": player_stats.get("1B", 0),
-        "doubles": player_stats.get("2B", 0),
-        "triples": player_stats.get("3B", 0),
-        "at_bats": player_stats.get("AB", 0),
-        "walks": player_stats.get("BB", 0),
-        "caught_stealing": player_stats.get("CS", 0),
-        "home_runs": player_stats.get("HR", 0),
-        "putouts": player_stats.get("PO", 0),
-        "stolen_bases": player_stats.get("SB", 0),
-        "strikeouts": player_stats.get("SO", 0),
-        "hit_by_pitch": player_stats.get("HBP", 0),
-        "intentional_walks": player_stats.get("IBB", 0),
-        "rbis": player_stats.get("RBI", 0),
-        "outs": player_stats.get("Outs", 0),
-        "status": player_stats.get("status", "INACT"),
-    }
+    """Extract baseball batting stats from game data.
+
+    Args:
+        fields: Resolved set of fields to extract (see resolve_stat_dependencies),
+            or None for the full stat line
+    """
+    base_stats = _extract_box_score_fields(
+        game, team_id, player_id, player_stats, league, BASEBALL_BATTING_FIELDS, fields
+    )
     
     # Calculate extended batting stats
-    extended_stats = calculate_baseball_batting_extended_stats(base_stats)
+    extended_stats = calculate_baseball_batting_extended_stats(base_stats, fields)
     
     return {**base_stats, **extended_stats}
 
 
 def extract_baseball_pitching_stats(
-    game, team_id, player_id, player_stats, league="MLB"
+    game, team_id, player_id, player_stats, league="MLB", fields=None
 ):
-    """Extract baseball pitching stats from game data."""
-    base_stats = {
-        "game_id": game["game_ID"],
-        "player_id": int(player_id),
-        "team_id": int(team_id),
-        "league": league,
-        "hits_allowed": player_stats.get("H", 0),
-        "pitching_strikeouts": player_stats.get("K", 0),
-        "losses": player_stats.get("L", 0),
-        "runs_allowed": player_stats.get("R", 0),
-        "saves": player_stats.get("S", 0),
-        "wins": player_stats.get("W", 0),
-        "singles_allowed": player_stats.get("1B", 0),
-        "doubles_allowed": player_stats.get("2B", 0),
-        "triples_allowed": player_stats.get("3B", 0),
-        "pitching_walks": player_stats.get("BB", 0),
-        "balks": player_stats.get("BK", 0),
-        "blown_saves": player_stats.get("BS", 0),
-        "pitching_caught_stealing": player_stats.get("CS", 0),
-        "earned_runs": player_stats.get("ER", 0),
-        "home_runs_allowed": player_stats.get("HR", 0),
-        "innings_pitched": player_stats.get("IP", 0),
-        "pitching_putouts": player_stats.get("PO", 0),
-        "stolen_bases_allowed": player_stats.get("SB", 0),
-        "wild_pitches": player_stats.get("WP", 0),
-        "pitching_hit_by_pitch": player_stats.get("HBP", 0),
-        "holds": player_stats.get("HLD", 0),
-        "pitching_intentional_walks": player_stats.get("IBB", 0),
-        "pitches_thrown": player_stats.get("pitches", 0),
-        "strikes": player_stats.get("strikes", 0),
-        "status": player_stats.get("status", "INACT"),
-    }
+    """Extract baseball pitching stats from game data.
+
+    Args:
+        fields: Resolved set of fields to extract (see resolve_stat_dependencies),
+            or None for the full stat line
+    """
+    base_stats = _extract_box_score_fields(
+        game, team_id, player_id, player_stats, league, BASEBALL_PITCHING_FIELDS, fields
+    )
     
     # Calculate extended pitching stats
-    extended_stats = calculate_baseball_pitching_extended_stats(base_stats)
+    extended_stats = calculate_baseball_pitching_extended_stats(base_stats, fields)
     
-    return {**base_stats, **extended_stats}
\ No newline at end of file
+    return {**base_stats, **extended_stats}
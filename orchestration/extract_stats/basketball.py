@@ -4,72 +4,140 @@ Basketball statistics extraction and extended calculations.
 
 from time_utils import convert_minutes_to_decimal
 from db.stats.basketball import BasketballPlayerStats, BasketballTeamStats
+from extract_stats.selection import TEAM_CONTEXT
 
 
-def calculate_basketball_player_extended_stats(player_stats, team_stats, opp_team_stats, all_team_players_minutes=240):
-    """Calculate extended basketball player statistics."""
-
-    # True Shooting Percentage
+def _true_shooting_pct(player_stats, team_stats, opp_team_stats, all_team_players_minutes):
     ts_denominator = 2 * (player_stats["field_goals_attempted"] + 0.44 * player_stats.get("free_throws_attempted", 0))
     true_shooting_pct = player_stats["points"] / ts_denominator if ts_denominator > 0 else 0
+    return round(true_shooting_pct, 4)
+
 
-    # Usage Rate
+def _usage_rate(player_stats, team_stats, opp_team_stats, all_team_players_minutes):
     team_fga_fta_to = team_stats.get("field_goals_attempted", 0) + 0.44 * team_stats.get("free_throws_attempted", 0) + team_stats.get("turnovers", 0)
     player_fga_fta_to = player_stats["field_goals_attempted"] + 0.44 * player_stats.get("free_throws_attempted", 0) + player_stats["turnovers"]
 
     usage_rate = 0
     if player_stats["minutes"] > 0 and team_fga_fta_to > 0:
         usage_rate = 100 * ((player_fga_fta_to * (all_team_players_minutes / 5)) / (player_stats["minutes"] * team_fga_fta_to))
+    return round(usage_rate, 2)
 
-    # Rebound Percentage
+
+def _rebounds_pct(player_stats, team_stats, opp_team_stats, all_team_players_minutes):
     total_rebounds = team_stats.get("total_rebounds", 0) + opp_team_stats.get("total_rebounds", 0)
     rebounds_pct = 0
     if player_stats["minutes"] > 0 and total_rebounds > 0:
         rebounds_pct = 100 * (player_stats["rebounds"] * (all_team_players_minutes / 5)) / (player_stats["minutes"] * total_rebounds)
+    return round(rebounds_pct, 2)
+
 
-    # Assist Percentage
+def _assists_pct(player_stats, team_stats, opp_team_stats, all_team_players_minutes):
     team_field_goals = team_stats.get("field_goals_made", 0) - player_stats["field_goals_made"]
     assists_pct = 0
     if player_stats["minutes"] > 0 and team_field_goals > 0:
         assists_pct = 100 * player_stats["assists"] / ((player_stats["minutes"] / (all_team_players_minutes / 5)) * team_field_goals)
+    return round(assists_pct, 2)
 
-    # Block Percentage
+
+def _blocks_pct(player_stats, team_stats, opp_team_stats, all_team_players_minutes):
     opp_two_point_attempts = opp_team_stats.get("field_goals_attempted", 0) - opp_team_stats.get("three_points_attempted", 0)
     blocks_pct = 0
     if player_stats["minutes"] > 0 and opp_two_point_attempts > 0:
         blocks_pct = 100 * (player_stats["blocks"] * (all_team_players_minutes / 5)) / (player_stats["minutes"] * opp_two_point_attempts)
+    return round(blocks_pct, 2)
+
 
-    # Steal Percentage (estimate opponent possessions)
+def _steals_pct(player_stats, team_stats, opp_team_stats, all_team_players_minutes):
+    # Estimate opponent possessions
     opp_possessions = opp_team_stats.get("field_goals_attempted", 0) - opp_team_stats.get("offensive_rebounds", 0) + opp_team_stats.get("turnovers", 0) + 0.44 * opp_team_stats.get("free_throws_attempted", 0)
     steals_pct = 0
     if player_stats["minutes"] > 0 and opp_possessions > 0:
         steals_pct = 100 * (player_stats["steals"] * (all_team_players_minutes / 5)) / (player_stats["minutes"] * opp_possessions)
+    return round(steals_pct, 2)
 
-    # Three Point Percentage
-    three_pct = player_stats["three_points_made"] / player_stats.get("three_points_attempted", 0) if player_stats.get("three_points_attempted", 0) > 0 else 0
 
-    # Free Throw Percentage
-    free_throw_pct = player_stats["free_throws_made"] / player_stats.get("free_throws_attempted", 0) if player_stats.get("free_throws_attempted", 0) > 0 else 0
+def _three_pct(player_stats, team_stats, opp_team_stats, all_team_players_minutes):
+    three_pct = player_stats["three_points_made"] / player_stats.get("three_points_attempted", 0) if player_stats.get("three_points_attempted", 0) > 0 else 0
+    return round(three_pct, 4)
 
-    # Combination Stats
-    points_rebounds_assists = player_stats["points"] + player_stats["rebounds"] + player_stats["assists"]
-    points_rebounds = player_stats["points"] + player_stats["rebounds"]
-    points_assists = player_stats["points"] + player_stats["assists"]
-    rebounds_assists = player_stats["rebounds"] + player_stats["assists"]
 
+def _free_throw_pct(player_stats, team_stats, opp_team_stats, all_team_players_minutes):
+    free_throw_pct = player_stats["free_throws_made"] / player_stats.get("free_throws_attempted", 0) if player_stats.get("free_throws_attempted", 0) > 0 else 0
+    return round(free_throw_pct, 4)
+
+
+# Extended player stats in output order
+BASKETBALL_PLAYER_EXTENDED_STATS = {
+    "true_shooting_pct": _true_shooting_pct,
+    "usage_rate": _usage_rate,
+    "rebounds_pct": _rebounds_pct,
+    "assists_pct": _assists_pct,
+    "blocks_pct": _blocks_pct,
+    "steals_pct": _steals_pct,
+    "three_pct": _three_pct,
+    "free_throw_pct": _free_throw_pct,
+    "points_rebounds_assists": lambda p, *_: p["points"] + p["rebounds"] + p["assists"],
+    "points_rebounds": lambda p, *_: p["points"] + p["rebounds"],
+    "points_assists": lambda p, *_: p["points"] + p["assists"],
+    "rebounds_assists": lambda p, *_: p["rebounds"] + p["assists"],
+}
+
+# Fields each extended player stat is computed from
+BASKETBALL_PLAYER_STAT_DEPENDENCIES = {
+    "true_shooting_pct": {"points", "field_goals_attempted", "free_throws_attempted"},
+    "usage_rate": {"field_goals_attempted", "free_throws_attempted", "turnovers", "minutes", TEAM_CONTEXT},
+    "rebounds_pct": {"rebounds", "minutes", TEAM_CONTEXT},
+    "assists_pct": {"assists", "field_goals_made", "minutes", TEAM_CONTEXT},
+    "blocks_pct": {"blocks", "minutes", TEAM_CONTEXT},
+    "steals_pct": {"steals", "minutes", TEAM_CONTEXT},
+    "three_pct": {"three_points_made", "three_points_attempted"},
+    "free_throw_pct": {"free_throws_made", "free_throws_attempted"},
+    "points_rebounds_assists": {"points", "rebounds", "assists"},
+    "points_rebounds": {"points", "rebounds"},
+    "points_assists": {"points", "assists"},
+    "rebounds_assists": {"rebounds", "assists"},
+}
+
+# Player box score fields: stat name -> (feed key, default)
+BASKETBALL_PLAYER_FIELDS = {
+    "fouls": ("fouls", 0),
+    "blocks": ("blocks", 0),
+    "points": ("points", 0),
+    "steals": ("steals", 0),
+    "assists": ("assists", 0),
+    "minutes": ("minutes", "0:00"),
+    "turnovers": ("turnovers", 0),
+    "rebounds": ("total_rebounds", 0),
+    "two_points_made": ("two_points_made", 0),
+    "field_goals_made": ("field_goals_made", 0),
+    "free_throws_made": ("free_throws_made", 0),
+    "three_points_made": ("three_points_made", 0),
+    "defensive_rebounds": ("defensive_rebounds", 0),
+    "offensive_rebounds": ("offensive_rebounds", 0),
+    "two_point_percentage": ("two_point_percentage", 0),
+    "two_points_attempted": ("two_points_attempted", 0),
+    "field_goals_attempted": ("field_goals_attempted", 0),
+    "free_throws_attempted": ("free_throws_attempted", 0),
+    "three_points_attempted": ("three_points_attempted", 0),
+    "status": ("status", "INACT"),
+}
+
+BASKETBALL_PLAYER_FIELD_CONVERTERS = {
+    "minutes": convert_minutes_to_decimal,
+    "field_goals_attempted": lambda value: value or 0,
+}
+
+
+def calculate_basketball_player_extended_stats(player_stats, team_stats, opp_team_stats, all_team_players_minutes=240, fields=None):
+    """Calculate extended basketball player statistics.
+
+    Args:
+        fields: Resolved set of fields to compute, or None for every extended stat
+    """
     return {
-        "true_shooting_pct": round(true_shooting_pct, 4),
-        "usage_rate": round(usage_rate, 2),
-        "rebounds_pct": round(rebounds_pct, 2),
-        "assists_pct": round(assists_pct, 2),
-        "blocks_pct": round(blocks_pct, 2),
-        "steals_pct": round(steals_pct, 2),
-        "three_pct": round(three_pct, 4),
-        "free_throw_pct": round(free_throw_pct, 4),
-        "points_rebounds_assists": points_rebounds_assists,
-        "points_rebounds": points_rebounds,
-        "points_assists": points_assists,
-        "rebounds_assists": rebounds_assists,
+        stat_name: calculator(player_stats, team_stats, opp_team_stats, all_team_players_minutes)
+        for stat_name, calculator in BASKETBALL_PLAYER_EXTENDED_STATS.items()
+        if fields is None or stat_name in fields
     }
 
 
@@ -159,54 +227,47 @@ def extract_basketball_team_stats(game, team, league):
     return {**base_stats, **extended_stats}
 
 
-def extract_basketball_player_stats(game, team_id, player_id, player_stats, league):
-    """Extract basketball player stats from game data."""
-
-    # Determine which team this player is on
-    team_key = None
-    if str(team_id) == str(game["full_box"]["home_team"]["team_id"]):
-        team_key = "home_team"
-    elif str(team_id) == str(game["full_box"]["away_team"]["team_id"]):
-        team_key = "away_team"
-
-    # Get team and opponent stats for extended calculations
-    if team_key:
-        team_stats = game["full_box"][team_key]["team_stats"]
-        opp_team_key = "away_team" if team_key == "home_team" else "home_team"
-        opp_team_stats = game["full_box"][opp_team_key]["team_stats"]
-    else:
-        # Fallback if team matching fails
-        team_stats = game["full_box"]["home_team"]["team_stats"]
-        opp_team_stats = game["full_box"]["away_team"]["team_stats"]
+def extract_basketball_player_stats(game, team_id, player_id, player_stats, league, fields=None):
+    """Extract basketball player stats from game data.
+
+    Args:
+        fields: Resolved set of fields to extract (see resolve_stat_dependencies),
+            or None for the full stat line
+    """
+
+    # Team context is only looked up when a requested stat reads it
+    team_stats = opp_team_stats = None
+    if fields is None or TEAM_CONTEXT in fields:
+        # Determine which team this player is on
+        team_key = None
+        if str(team_id) == str(game["full_box"]["home_team"]["team_id"]):
+            team_key = "home_team"
+        elif str(team_id) == str(game["full_box"]["away_team"]["team_id"]):
+            team_key = "away_team"
+
+        # Get team and opponent stats for extended calculations
+        if team_key:
+            team_stats = game["full_box"][team_key]["team_stats"]
+            opp_team_key = "away_team" if team_key == "home_team" else "home_team"
+            opp_team_stats = game["full_box"][opp_team_key]["team_stats"]
+        else:
+            # Fallback if team matching fails
+            team_stats = game["full_box"]["home_team"]["team_stats"]
+            opp_team_stats = game["full_box"]["away_team"]["team_stats"]
 
     base_stats = {
         "game_id": game["game_ID"],
         "player_id": int(player_id),
         "team_id": int(team_id),
         "league": league,
-        "fouls": player_stats.get("fouls", 0),
-        "blocks": player_stats.get("blocks", 0),
-        "points": player_stats.get("points", 0),
-        "steals": player_stats.get("steals", 0),
-        "assists": player_stats.get("assists", 0),
-        "minutes": convert_minutes_to_decimal(player_stats.get("minutes", "0:00")),
-        "turnovers": player_stats.get("turnovers", 0),
-        "rebounds": player_stats.get("total_rebounds", 0),
-        "two_points_made": player_stats.get("two_points_made", 0),
-        "field_goals_made": player_stats.get("field_goals_made", 0),
-        "free_throws_made": player_stats.get("free_throws_made", 0),
-        "three_points_made": player_stats.get("three_points_made", 0),
-        "defensive_rebounds": player_stats.get("defensive_rebounds", 0),
-        "offensive_rebounds": player_stats.get("offensive_rebounds", 0),
-        "two_point_percentage": player_stats.get("two_point_percentage", 0),
-        "two_points_attempted": player_stats.get("two_points_attempted", 0),
-        "field_goals_attempted": player_stats.get("field_goals_attempted", 0) or 0,
-        "free_throws_attempted": player_stats.get("free_throws_attempted", 0),
-        "three_points_attempted": player_stats.get("three_points_attempted", 0),
-        "status": player_stats.get("status", "INACT"),
     }
+    for field, (feed_key, default) in BASKETBALL_PLAYER_FIELDS.items():
+        if fields is None or field in fields or field == "status":
+            value = player_stats.get(feed_key, default)
+            converter = BASKETBALL_PLAYER_FIELD_CONVERTERS.get(field)
+            base_stats[field] = converter(value) if converter else value
 
     # Calculate extended stats
-    extended_stats = calculate_basketball_player_extended_stats(base_stats, team_stats, opp_team_stats)
+    extended_stats = calculate_basketball_player_extended_stats(base_stats, team_stats, opp_team_stats, fields=fields)
 
-    return {**base_stats, **extended_stats}
\ No newline at end of file
+    return {**base_stats, **extended_stats}
@@ -0,0 +1,99 @@
+"""
+Executor-backed stat extraction for asyncio callers.
+
+Extraction is pure CPU work, so running it directly on the event loop stalls
+every pub/sub listener and DB call in the same process. A thread pool does not
+help, as extraction holds the GIL and still competes with the loop thread, so
+every game goes to a process pool and only the compact per-game inputs and
+outputs cross the executor boundary.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from extract_stats.main import extract_player_stats
+
+EXTRACTION_MAX_WORKERS = int(
+    os.getenv("EXTRACTION_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+
+# Only these parts of a feed game are read by the extractors
+TEAM_BOX_KEYS = ("team_id", "score", "team_stats")
+
+StatTuple = tuple[int, str, float]
+
+
+def compact_game(game: dict) -> dict:
+    """Strip a feed game down to the fields extraction needs before pickling it"""
+    compact = {
+        "game_ID": game["game_ID"],
+        "full_box": {
+            team: {
+                key: game["full_box"][team][key]
+                for key in TEAM_BOX_KEYS
+                if key in game["full_box"][team]
+            }
+            for team in ["home_team", "away_team"]
+        },
+    }
+    if "player_box" in game:
+        compact["player_box"] = game["player_box"]
+    return compact
+
+
+def extract_stat_tuples(
+    game: dict, league: str, stat_names: Iterable[str]
+) -> list[StatTuple]:
+    """Extract player stats and keep only (player_id, stat_name, value) for the given stats.
+
+    Module-level so it can be pickled into a process pool.
+    """
+    stat_names = set(stat_names)
+    player_stats_list, _ = extract_player_stats(game, league, stats=stat_names)
+
+    return [
+        (player_stats["player_id"], stat_name, stat_value)
+        for player_stats in player_stats_list
+        for stat_name, stat_value in player_stats.items()
+        if stat_name in stat_names
+    ]
+
+
+class ExtractionStage:
+    """Runs stat extraction off the event loop in a process pool"""
+
+    def __init__(self, max_workers: int = EXTRACTION_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """Get the process pool, creating it lazily and reusing it across ticks"""
+        if self._process_pool is None:
+            # spawn instead of fork: the parent holds event loop, DB pool and Redis threads
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._process_pool
+
+    async def extract(
+        self, game: dict, league: str, stat_names: Iterable[str]
+    ) -> list[StatTuple]:
+        """Extract (player_id, stat_name, value) tuples for one game without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.get_executor(),
+            extract_stat_tuples,
+            compact_game(game),
+            league,
+            tuple(stat_names),
+        )
+
+    def shutdown(self):
+        """Shut down the pool if it was started"""
+        if self._process_pool:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
@@ -3,76 +3,86 @@ Football statistics extraction and extended calculations.
 """
 
 
-def calculate_football_player_extended_stats(player_stats):
-    """Calculate extended football player statistics."""
-
-    # Passing efficiency stats
-    completion_pct = (
-        player_stats["completions"] / player_stats["passing_attempts"]
-        if player_stats["passing_attempts"] > 0
-        else 0
-    )
-    yards_per_attempt = (
-        player_stats["passing_yards"] / player_stats["passing_attempts"]
-        if player_stats["passing_attempts"] > 0
-        else 0
-    )
-    yards_per_completion = (
-        player_stats["passing_yards"] / player_stats["completions"]
-        if player_stats["completions"] > 0
-        else 0
+def _ratio(player_stats, numerator, denominator, zero_value):
+    return (
+        player_stats[numerator] / player_stats[denominator]
+        if player_stats[denominator] > 0
+        else zero_value
     )
 
-    # Rushing efficiency
-    yards_per_carry = (
-        player_stats["rushing_yards"] / player_stats["rushing_attempts"]
-        if player_stats["rushing_attempts"] > 0
-        else 0
-    )
 
+# Extended player stats in output order
+FOOTBALL_PLAYER_EXTENDED_STATS = {
+    # Passing efficiency stats
+    "completion_pct": lambda p: round(_ratio(p, "completions", "passing_attempts", 0), 4),
+    "yards_per_attempt": lambda p: round(_ratio(p, "passing_yards", "passing_attempts", 0), 2),
+    "yards_per_completion": lambda p: round(_ratio(p, "passing_yards", "completions", 0), 2),
+    # Rushing efficiency
+    "yards_per_carry": lambda p: round(_ratio(p, "rushing_yards", "rushing_attempts", 0), 2),
     # Receiving efficiency
-    yards_per_reception = (
-        player_stats["receiving_yards"] / player_stats["receptions"]
-        if player_stats["receptions"] > 0
-        else 0.0
-    )
-
+    "yards_per_reception": lambda p: round(_ratio(p, "receiving_yards", "receptions", 0.0), 2),
     # Field goal percentage
-    field_goal_pct = (
-        player_stats["field_goals_made"] / player_stats["field_goals_attempted"]
-        if player_stats["field_goals_attempted"] > 0
-        else 0.0
-    )
-    extra_point_pct = (
-        player_stats["extra_points_made"] / player_stats["extra_points_attempted"]
-        if player_stats["extra_points_attempted"] > 0
-        else 0.0
-    )
-
+    "field_goal_pct": lambda p: round(_ratio(p, "field_goals_made", "field_goals_attempted", 0.0), 4),
+    "extra_point_pct": lambda p: round(_ratio(p, "extra_points_made", "extra_points_attempted", 0.0), 4),
     # Combination stats
-    receiving_rushing_touchdowns = (
-        player_stats["receiving_touchdowns"] + player_stats["rushing_touchdowns"]
-    )
-    passing_rushing_touchdowns = (
-        player_stats["passing_touchdowns"] + player_stats["rushing_touchdowns"]
-    )
-    total_yards = float(
-        player_stats["passing_yards"]
-        + player_stats["rushing_yards"]
-        + player_stats["receiving_yards"]
-    )
-
+    "receiving_rushing_touchdowns": lambda p: p["receiving_touchdowns"] + p["rushing_touchdowns"],
+    "passing_rushing_touchdowns": lambda p: p["passing_touchdowns"] + p["rushing_touchdowns"],
+    "total_yards": lambda p: round(
+        float(p["passing_yards"] + p["rushing_yards"] + p["receiving_yards"]), 2
+    ),
+}
+
+# Fields each extended player stat is computed from
+FOOTBALL_PLAYER_STAT_DEPENDENCIES = {
+    "completion_pct": {"completions", "passing_attempts"},
+    "yards_per_attempt": {"passing_yards", "passing_attempts"},
+    "yards_per_completion": {"passing_yards", "completions"},
+    "yards_per_carry": {"rushing_yards", "rushing_attempts"},
+    "yards_per_reception": {"receiving_yards", "receptions"},
+    "field_goal_pct": {"field_goals_made", "field_goals_attempted"},
+    "extra_point_pct": {"extra_points_made", "extra_points_attempted"},
+    "receiving_rushing_touchdowns": {"receiving_touchdowns", "rushing_touchdowns"},
+    "passing_rushing_touchdowns": {"passing_touchdowns", "rushing_touchdowns"},
+    "total_yards": {"passing_yards", "rushing_yards", "receiving_yards"},
+}
+
+# Player box score fields: stat name -> default (feed keys match stat names)
+FOOTBALL_PLAYER_FIELDS = {
+    "completions": 0,
+    "fumbles_lost": 0,
+    "rushing_long": 0.0,
+    "passer_rating": 0.0,
+    "passing_yards": 0.0,
+    "rushing_yards": 0.0,
+    "passing_attempts": 0,
+    "rushing_attempts": 0,
+    "fumble_recoveries": 0,
+    "passing_touchdowns": 0,
+    "rushing_touchdowns": 0,
+    "passing_interceptions": 0,
+    "receiving_long": 0.0,
+    "receiving_yards": 0,
+    "receiving_touchdowns": 0,
+    "receptions": 0,
+    "field_goals_attempted": 0,
+    "field_goals_made": 0,
+    "field_goals_long": 0.0,
+    "extra_points_attempted": 0,
+    "extra_points_made": 0,
+    "status": "INACT",
+}
+
+
+def calculate_football_player_extended_stats(player_stats, fields=None):
+    """Calculate extended football player statistics.
+
+    Args:
+        fields: Resolved set of fields to compute, or None for every extended stat
+    """
     return {
-        "completion_pct": round(completion_pct, 4),
-        "yards_per_attempt": round(yards_per_attempt, 2),
-        "yards_per_completion": round(yards_per_completion, 2),
-        "yards_per_carry": round(yards_per_carry, 2),
-        "yards_per_reception": round(yards_per_reception, 2),
-        "field_goal_pct": round(field_goal_pct, 4),
-        "extra_point_pct": round(extra_point_pct, 4),
-        "receiving_rushing_touchdowns": receiving_rushing_touchdowns,
-        "passing_rushing_touchdowns": passing_rushing_touchdowns,
-        "total_yards": round(total_yards, 2),
+        stat_name: calculator(player_stats)
+        for stat_name, calculator in FOOTBALL_PLAYER_EXTENDED_STATS.items()
+        if fields is None or stat_name in fields
     }
 
 
@@ -192,38 +202,24 @@ def extract_football_team_stats(game, team, league):
     return {**base_stats, **extended_stats}
 
 
-def extract_football_player_stats(game, team_id, player_id, player_stats, league):
-    """Extract football player stats from game data."""
+def extract_football_player_stats(game, team_id, player_id, player_stats, league, fields=None):
+    """Extract football player stats from game data.
+
+    Args:
+        fields: Resolved set of fields to extract (see resolve_stat_dependencies),
+            or None for the full stat line
+    """
     base_stats = {
         "game_id": game["game_ID"],
         "player_id": int(player_id),
         "league": league,
         "team_id": int(team_id),
-        "completions": player_stats.get("completions", 0),
-        "fumbles_lost": player_stats.get("fumbles_lost", 0),
-        "rushing_long": player_stats.get("rushing_long", 0.0),
-        "passer_rating": player_stats.get("passer_rating", 0.0),
-        "passing_yards": player_stats.get("passing_yards", 0.0),
-        "rushing_yards": player_stats.get("rushing_yards", 0.0),
-        "passing_attempts": player_stats.get("passing_attempts", 0),
-        "rushing_attempts": player_stats.get("rushing_attempts", 0),
-        "fumble_recoveries": player_stats.get("fumble_recoveries", 0),
-        "passing_touchdowns": player_stats.get("passing_touchdowns", 0),
-        "rushing_touchdowns": player_stats.get("rushing_touchdowns", 0),
-        "passing_interceptions": player_stats.get("passing_interceptions", 0),
-        "receiving_long": player_stats.get("receiving_long", 0.0),
-        "receiving_yards": player_stats.get("receiving_yards", 0),
-        "receiving_touchdowns": player_stats.get("receiving_touchdowns", 0),
-        "receptions": player_stats.get("receptions", 0),
-        "field_goals_attempted": player_stats.get("field_goals_attempted", 0),
-        "field_goals_made": player_stats.get("field_goals_made", 0),
-        "field_goals_long": player_stats.get("field_goals_long", 0.0),
-        "extra_points_attempted": player_stats.get("extra_points_attempted", 0),
-        "extra_points_made": player_stats.get("extra_points_made", 0),
-        "status": player_stats.get("status", "INACT"),
     }
+    for field, default in FOOTBALL_PLAYER_FIELDS.items():
+        if fields is None or field in fields or field == "status":
+            base_stats[field] = player_stats.get(field, default)
 
     # Calculate extended stats
-    extended_stats = calculate_football_player_extended_stats(base_stats)
+    extended_stats = calculate_football_player_extended_stats(base_stats, fields)
 
     return {**base_stats, **extended_stats}
@@ -5,9 +5,10 @@ This module provides the primary functions that other modules should use for
 extracting stats from game data.
 """
 
-from extract_stats.basketball import extract_basketball_team_stats, extract_basketball_player_stats
-from extract_stats.baseball import extract_baseball_team_stats, extract_baseball_batting_stats, extract_baseball_pitching_stats
-from extract_stats.football import extract_football_team_stats, extract_football_player_stats
+from extract_stats.basketball import extract_basketball_team_stats, extract_basketball_player_stats, BASKETBALL_PLAYER_STAT_DEPENDENCIES
+from extract_stats.baseball import extract_baseball_team_stats, extract_baseball_batting_stats, extract_baseball_pitching_stats, BASEBALL_PLAYER_STAT_DEPENDENCIES
+from extract_stats.football import extract_football_team_stats, extract_football_player_stats, FOOTBALL_PLAYER_STAT_DEPENDENCIES
+from extract_stats.selection import resolve_stat_dependencies
 
 
 # Configuration mapping leagues to their respective extractors
@@ -15,6 +16,7 @@ LEAGUE_CONFIG = {
     "MLB": {
         "sport": "baseball",
         "team_extractor": extract_baseball_team_stats,
+        "stat_dependencies": BASEBALL_PLAYER_STAT_DEPENDENCIES,
         "player_extractors": {
             "batting": extract_baseball_batting_stats,
             "pitching": extract_baseball_pitching_stats,
@@ -23,6 +25,7 @@ LEAGUE_CONFIG = {
     "NBA": {
         "sport": "basketball",
         "team_extractor": extract_basketball_team_stats,
+        "stat_dependencies": BASKETBALL_PLAYER_STAT_DEPENDENCIES,
         "player_extractors": {
             "default": extract_basketball_player_stats,
         },
@@ -30,6 +33,7 @@ LEAGUE_CONFIG = {
     "NCAABB": {
         "sport": "basketball",
         "team_extractor": extract_basketball_team_stats,
+        "stat_dependencies": BASKETBALL_PLAYER_STAT_DEPENDENCIES,
         "player_extractors": {
             "default": extract_basketball_player_stats,
         },
@@ -37,6 +41,7 @@ LEAGUE_CONFIG = {
     "NFL": {
         "sport": "football",
         "team_extractor": extract_football_team_stats,
+        "stat_dependencies": FOOTBALL_PLAYER_STAT_DEPENDENCIES,
         "player_extractors": {
             "default": extract_football_player_stats,
         },
@@ -44,6 +49,7 @@ LEAGUE_CONFIG = {
     "NCAAFB": {
         "sport": "football",
         "team_extractor": extract_football_team_stats,
+        "stat_dependencies": FOOTBALL_PLAYER_STAT_DEPENDENCIES,
         "player_extractors": {
             "default": extract_football_player_stats,
         },
@@ -51,18 +57,21 @@ LEAGUE_CONFIG = {
 }
 
 
-def extract_player_stats(game, league):
+def extract_player_stats(game, league, stats=None):
     """
     Extract player stats for the given league.
     
     Args:
         game: Game data dictionary from API
         league: League identifier (MLB, NBA, NCAABB, NFL, NCAAFB)
+        stats: Optional stat names to extract. Only these stats and the fields
+            they are computed from are filled in; None extracts everything.
         
     Returns:
         tuple: (player_stats_list, total_player_count)
     """
     config = LEAGUE_CONFIG[league]
+    fields = resolve_stat_dependencies(stats, config["stat_dependencies"])
     player_stats_list = []
     total_player_stats = 0
 
@@ -85,6 +94,7 @@ def extract_player_stats(game, league):
                                 player_id,
                                 player_stats,
                                 league,
+                                fields,
                             )
                         )
 
@@ -103,6 +113,7 @@ def extract_player_stats(game, league):
                                 player_id,
                                 player_stats,
                                 league,
+                                fields,
                             )
                         )
     else:
@@ -117,7 +128,7 @@ def extract_player_stats(game, league):
                     total_player_stats += 1
                     player_stats_list.append(
                         config["player_extractors"]["default"](
-                            game, game["full_box"][team]["team_id"], player_id, player_stats, league
+                            game, game["full_box"][team]["team_id"], player_id, player_stats, league, fields
                         )
                     )
 
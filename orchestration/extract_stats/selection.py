@@ -0,0 +1,39 @@
+"""
+Dependency resolution for selective stat extraction.
+
+Each sport declares which fields every extended stat is computed from, so a
+caller that only needs a handful of stats (e.g. prop settlement) can extract
+exactly those stats and what they depend on instead of the full box score.
+"""
+
+from typing import Collection, Mapping, Optional
+
+# Pseudo-field for stats that read the team/opponent box score
+TEAM_CONTEXT = "team_context"
+
+
+def resolve_stat_dependencies(
+    stats: Optional[Collection[str]], dependencies: Mapping[str, Collection[str]]
+) -> Optional[set[str]]:
+    """Expand requested stats into every field needed to compute them.
+
+    Args:
+        stats: Requested stat names, or None for full extraction
+        dependencies: Sport dependency map of stat name -> fields it reads
+
+    Returns:
+        Requested stats plus their transitive dependencies, or None if stats is None
+    """
+    if stats is None:
+        return None
+
+    resolved: set[str] = set()
+    pending = list(stats)
+    while pending:
+        field = pending.pop()
+        if field in resolved:
+            continue
+        resolved.add(field)
+        pending.extend(dependencies.get(field, ()))
+
+    return resolved
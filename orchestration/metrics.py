@@ -0,0 +1,88 @@
+"""
+Prometheus metrics shared by the workers and the webhook server.
+
+Metrics live in the default registry of the process that records them. The
+webhook server serves them on /metrics; workers call start_metrics_server to
+serve them on METRICS_PORT. Recording a sample is a lock and a few additions,
+cheap enough to leave on everywhere.
+"""
+
+import os
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Default buckets stop at 10s; feed downloads and large slates run longer
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HANDLER_SECONDS = Histogram(
+    "handler_duration_seconds",
+    "Time to handle one message, by the channel it arrived on",
+    ["handler"],
+    buckets=LATENCY_BUCKETS,
+)
+HANDLER_FAILURES = Counter(
+    "handler_failures_total",
+    "Messages whose handler raised",
+    ["handler"],
+)
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds",
+    "Time spent in one stage of handling: feed_fetch, extraction, db_transaction or publish",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time waiting for a connection from the pool",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+STATEMENT_SECONDS = Histogram(
+    "db_statement_duration_seconds",
+    "Time of one statement on a pooled connection, by registered statement name (other for the rest)",
+    ["statement"],
+    buckets=LATENCY_BUCKETS,
+)
+STATEMENTS_PER_UNIT = Histogram(
+    "db_statements_per_unit",
+    "Statements run by one unit of work, such as a handler call",
+    ["unit"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000),
+)
+SERVER_REQUEST_SECONDS = Histogram(
+    "server_request_duration_seconds",
+    "Time of requests to the server API, such as push notifications",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+SERVER_REQUEST_FAILURES = Counter(
+    "server_request_failures_total",
+    "Requests to the server API that raised or returned an error status",
+    ["route"],
+)
+PUBSUB_IN_FLIGHT = Gauge(
+    "pubsub_in_flight_messages",
+    "Messages received on a channel whose handler has not finished",
+    ["channel"],
+)
+PUBSUB_RECEIVED = Counter(
+    "pubsub_messages_received_total",
+    "Messages received on a channel",
+    ["channel"],
+)
+
+
+def stage(name: str):
+    """Histogram of one handling stage; use as `with stage("feed_fetch").time():`"""
+    return STAGE_SECONDS.labels(stage=name)
+
+
+def start_metrics_server() -> None:
+    """Serve this process's metrics on METRICS_PORT, if it is set.
+
+    The server runs on a daemon thread, so it never competes with the event
+    loop and stops with the process.
+    """
+    port = os.getenv("METRICS_PORT")
+    if port:
+        start_http_server(int(port))
@@ -0,0 +1,151 @@
+"""
+Chunked delivery of a push notification to every user.
+
+User ids are streamed in id order through a server-side cursor and sent in
+fixed-size chunks, several requests at a time, so memory stays flat however
+many users there are. After each chunk the broadcast checkpoints the last user
+id below which every chunk has gone out. A broadcast that fails stops, and
+running it again with the same broadcast id resumes from the checkpoint; at
+most the chunks that were in flight past the checkpoint are sent twice. Running
+a completed broadcast id again sends it again from the start.
+"""
+
+import asyncio
+from typing import Optional
+
+from psycopg.rows import dict_row
+
+from db.broadcasts import get_broadcast_checkpoint, save_broadcast_checkpoint
+from db.connection import get_async_pool
+from utils import async_server_req, setup_logger
+
+logger = setup_logger(__name__)
+
+CHUNK_SIZE = 500
+MAX_IN_FLIGHT = 4
+CHUNK_ATTEMPTS = 3
+
+
+async def _save_checkpoint(broadcast_id: str, last_user_id: Optional[str], recipients: int, completed: bool = False):
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await save_broadcast_checkpoint(cur, broadcast_id, last_user_id, recipients, completed)
+
+
+async def _send_chunk(push_notification: dict, user_ids: list[str]) -> None:
+    for attempt in range(1, CHUNK_ATTEMPTS + 1):
+        try:
+            await async_server_req(
+                route="/push-notifications",
+                method="POST",
+                body={"receiverIdsList": user_ids, "pushNotification": push_notification},
+            )
+            return
+        except Exception as e:
+            if attempt == CHUNK_ATTEMPTS:
+                raise
+            logger.warning(f"Broadcast chunk failed (attempt {attempt}/{CHUNK_ATTEMPTS}): {e}")
+            await asyncio.sleep(2**attempt)
+
+
+async def broadcast(
+    broadcast_id: str,
+    title: str,
+    body: str,
+    url: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_in_flight: int = MAX_IN_FLIGHT,
+) -> int:
+    """Send a push notification to every user, resuming an unfinished broadcast of the same id.
+
+    Args:
+        broadcast_id: Identifies the broadcast for checkpointing
+        title: Notification title
+        body: Notification body
+        url: Link opened from the notification (optional)
+        chunk_size: Users per request
+        max_in_flight: Requests sent at once
+
+    Returns:
+        Number of users the broadcast has reached, including earlier attempts
+
+    Raises:
+        Exception: The first chunk failure, once the checkpoint is saved
+    """
+    pool = await get_async_pool()
+    push_notification = {"title": title, "body": body, "data": {"url": url}}
+
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            checkpoint = await get_broadcast_checkpoint(cur, broadcast_id)
+
+    if checkpoint is None or checkpoint["completed"]:
+        after_user_id, recipients = None, 0
+        await _save_checkpoint(broadcast_id, None, 0)
+    else:
+        after_user_id, recipients = checkpoint["last_user_id"], checkpoint["recipients"]
+        logger.info(f"Resuming broadcast {broadcast_id} after {recipients} users")
+
+    in_flight = asyncio.Semaphore(max_in_flight)
+    checkpoint_lock = asyncio.Lock()
+    # Chunks sent but not yet covered by the checkpoint: index -> (last user id, size)
+    finished: dict[int, tuple[str, int]] = {}
+    next_index = 0
+    last_user_id = after_user_id
+    failure: Optional[Exception] = None
+    tasks = set()
+
+    async def send(index: int, user_ids: list[str]) -> None:
+        nonlocal next_index, last_user_id, recipients, failure
+        try:
+            await _send_chunk(push_notification, user_ids)
+        except Exception as e:
+            failure = failure or e
+            return
+        finally:
+            in_flight.release()
+
+        async with checkpoint_lock:
+            finished[index] = (user_ids[-1], len(user_ids))
+            if index != next_index:
+                return
+            while next_index in finished:
+                last_user_id, size = finished.pop(next_index)
+                recipients += size
+                next_index += 1
+            await _save_checkpoint(broadcast_id, last_user_id, recipients)
+
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor(name="broadcast_users") as cur:
+                await cur.execute(
+                    """
+                    SELECT id
+                    FROM public.user
+                    WHERE %(after)s::text IS NULL OR id > %(after)s::text
+                    ORDER BY id
+                    """,
+                    {"after": after_user_id},
+                )
+
+                index = 0
+                while failure is None:
+                    rows = await cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    await in_flight.acquire()
+                    task = asyncio.create_task(send(index, [row[0] for row in rows]))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    index += 1
+
+    await asyncio.gather(*tasks)
+
+    if failure is not None:
+        logger.error(f"Broadcast {broadcast_id} stopped after {recipients} users: {failure}")
+        raise failure
+
+    await _save_checkpoint(broadcast_id, last_user_id, recipients, completed=True)
+    logger.info(f"Broadcast {broadcast_id} reached {recipients} users")
+    return recipients
@@ -1,56 +1,30 @@
-from utils import setup_logger, async_server_req
-from db.connection import get_async_pool, close_async_pool
+from utils import setup_logger
+from db.connection import close_async_pool
+from notification_services.broadcast import broadcast
 import asyncio
+import hashlib
+import json
 
 logger = setup_logger(__name__)
 
 
+def broadcast_id_for(title: str, body: str, url: str | None) -> str:
+    """Same message, same broadcast: rerunning a failed send resumes it"""
+    digest = hashlib.sha256(json.dumps([title, body, url]).encode()).hexdigest()[:16]
+    return f"broadcast:{digest}"
+
+
 async def send_broadcast_notification(title: str, body: str, url: str | None = None):
     """Send a broadcast notification to all users"""
     logger.info(f"Preparing to send broadcast notification: {title}")
 
-    pool = await get_async_pool()
-
     try:
-        async with pool.connection() as conn:
-            async with conn.cursor() as cur:
-                # Get all users
-                users_query = """
-                    SELECT DISTINCT id
-                    FROM public.user
-                """
-
-                await cur.execute(users_query)
-                users_res = await cur.fetchall()
-
-                user_ids = [row[0] for row in users_res]
-
-                # Ensure no duplicates in the list
-                user_ids = list(set(user_ids))
-
-                if len(user_ids) == 0:
-                    logger.info("No users found to notify")
-                    return
-
-                logger.info(f"Sending notification to {len(user_ids)} unique user(s)")
-
-                # Send notification to all users via HTTP
-                await async_server_req(
-                    route="/push-notifications",
-                    method="POST",
-                    body={
-                        "receiverIdsList": user_ids,
-                        "pushNotification": {
-                            "title": title,
-                            "body": body,
-                            "data": {
-                                "url": url
-                            }
-                        },
-                    },
-                )
-
-                logger.info(f"Successfully sent notification to {len(user_ids)} recipients")
+        recipients = await broadcast(broadcast_id_for(title, body, url), title, body, url)
+        if recipients == 0:
+            logger.info("No users found to notify")
+            return
+
+        logger.info(f"Successfully sent notification to {recipients} recipients")
 
     except Exception as e:
         logger.error(f"Error sending broadcast notification: {e}")
@@ -1,6 +1,9 @@
-from utils import setup_logger, async_server_req
+from utils import setup_logger
 from db.connection import get_async_pool, close_async_pool
+from notification_services.broadcast import broadcast
 import asyncio
+from datetime import datetime
+from zoneinfo import ZoneInfo
 from time import time
 import traceback
 
@@ -48,45 +51,15 @@ async def check_and_notify_available_props():
 
                 body = f"Start a {leagues_text} match right now!"
 
-                # Get all users
-                users_query = """
-                    SELECT DISTINCT id
-                    FROM public.user
-                """
-
-                await cur.execute(users_query)
-                users_res = await cur.fetchall()
-
-                user_ids = [row[0] for row in users_res]
+        # One broadcast per day, so a failed run resumes where it stopped
+        today_str = datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d")
+        recipients = await broadcast(f"daily_props:{today_str}", "Start a Match!", body)
 
-                # Ensure no duplicates in the list
-                user_ids = list(set(user_ids))
-
-                if len(user_ids) == 0:
-                    logger.info("No users found to notify")
-                    return
+        if recipients == 0:
+            logger.info("No users found to notify")
+            return
 
-                logger.info(f"Sending notification to {len(user_ids)} unique user(s)")
-                logger.debug(f"User IDs: {user_ids}")
-
-                # Send notification to all users via HTTP
-                logger.info("Sending push notification via HTTP...")
-                await async_server_req(
-                    route="/push-notifications",
-                    method="POST",
-                    body={
-                        "receiverIdsList": user_ids,
-                        "pushNotification": {
-                            "title": "Start a Match!",
-                            "body": body,
-                            "data": {
-                                "url": None
-                            }
-                        },
-                    },
-                )
-
-                logger.info(f"Successfully sent notification to {len(user_ids)} recipients")
+        logger.info(f"Successfully sent notification to {recipients} recipients")
 
     except Exception as e:
         logger.error(f"Error checking available props: {e}")
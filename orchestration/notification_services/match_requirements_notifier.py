@@ -1,4 +1,4 @@
-from utils import setup_logger, async_server_req
+from utils import AsyncRateLimiter, setup_logger, async_server_req
 from db.connection import get_async_pool
 import asyncio
 from typing import List, Dict
@@ -10,6 +10,86 @@ logger = setup_logger(__name__)
 MIN_PARLAYS_REQUIRED = 2
 MIN_PCT_TOTAL_STAKED = 0.5
 
+# Push notification requests in flight at once, and started per second
+MAX_CONCURRENT_NOTIFICATIONS = 10
+NOTIFICATIONS_PER_SECOND = 20
+
+# Unresolved match users short of the stake or parlay requirements, with their totals.
+# double precision ROUND rounds half to even, like Python's round.
+REQUIREMENTS_QUERY = """
+    SELECT
+        mu.id AS match_user_id,
+        mu.user_id,
+        mu.match_id,
+        ROUND(mu.starting_balance * %(min_pct_total_staked)s) AS min_required,
+        COALESCE(SUM(p.stake), 0) AS total_staked,
+        COUNT(p.id) AS parlay_count
+    FROM match_user mu
+    JOIN match m ON mu.match_id = m.id
+    LEFT JOIN parlay p ON p.match_user_id = mu.id
+    WHERE mu.status = 'not_resolved'
+    AND m.resolved = false
+    GROUP BY mu.id
+    HAVING COALESCE(SUM(p.stake), 0) < ROUND(mu.starting_balance * %(min_pct_total_staked)s)
+    OR COUNT(p.id) < %(min_parlays_required)s
+"""
+
+
+def group_notifications(candidates: List[tuple]) -> Dict[tuple, List[int]]:
+    """Receivers keyed by (match_id, amount_needed), so identical notifications go out as one request"""
+    groups: Dict[tuple, List[int]] = {}
+    for _, user_id, match_id, min_required, total_staked, parlay_count in candidates:
+        amount_needed = max(0, float(min_required) - float(total_staked))
+        groups.setdefault((match_id, int(amount_needed)), []).append(user_id)
+        logger.info(
+            f"Notifying user {user_id} for match {match_id} "
+            f"(needs ${amount_needed:.2f} more, {MIN_PARLAYS_REQUIRED - parlay_count} more parlays)"
+        )
+    return groups
+
+
+async def send_notifications(groups: Dict[tuple, List[int]]) -> int:
+    """Send the grouped notifications concurrently under the rate limit.
+
+    Returns:
+        Number of users notified
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_NOTIFICATIONS)
+    rate_limiter = AsyncRateLimiter(NOTIFICATIONS_PER_SECOND)
+
+    async def send(match_id: int, amount_needed: int, user_ids: List[int]) -> int:
+        async with semaphore:
+            await rate_limiter.wait()
+            await async_server_req(
+                route="/push-notifications",
+                method="POST",
+                body={
+                    "receiverIdsList": user_ids,
+                    "pushNotification": {
+                        "title": "You could get disqualified!",
+                        "body": f"You need to stake ${amount_needed} more! Create another parlay right now!",
+                        "data": {
+                            "url": f"/match/{match_id}"
+                        }
+                    },
+                },
+            )
+            return len(user_ids)
+
+    results = await asyncio.gather(
+        *[send(match_id, amount_needed, user_ids) for (match_id, amount_needed), user_ids in groups.items()],
+        return_exceptions=True,
+    )
+
+    notified = 0
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Error sending requirements notification: {result}")
+        else:
+            notified += result
+    return notified
+
+
 async def check_and_notify_requirements():
     """Check all unresolved match users and notify if they haven't met requirements"""
     start_time = time()
@@ -22,84 +102,28 @@ async def check_and_notify_requirements():
     try:
         async with pool.connection() as conn:
             async with conn.cursor() as cur:
-                # Get all unresolved match users with their match info
-                query = """
-                    SELECT
-                        mu.id as match_user_id,
-                        mu.user_id,
-                        mu.starting_balance,
-                        mu.match_id,
-                        m.id as match_id,
-                        m.resolved as match_resolved
-                    FROM match_user mu
-                    JOIN match m ON mu.match_id = m.id
-                    WHERE mu.status = 'not_resolved'
-                    AND m.resolved = false
-                """
-
-                await cur.execute(query)
-                match_users = await cur.fetchall()
-
-                logger.info(f"Found {len(match_users)} unresolved match users")
-
-                for mu_row in match_users:
-                    match_user_id = mu_row[0]
-                    user_id = mu_row[1]
-                    starting_balance = float(mu_row[2])
-                    match_id = mu_row[4]
-
-                    # Get parlays for this match user
-                    parlays_query = """
-                        SELECT id, stake, resolved
-                        FROM parlay
-                        WHERE match_user_id = %s
-                    """
-
-                    await cur.execute(parlays_query, (match_user_id,))
-                    parlays_res = await cur.fetchall()
-
-                    parlays = [
-                        {
-                            "id": p[0],
-                            "stake": float(p[1]),
-                            "resolved": p[2]
-                        }
-                        for p in parlays_res
-                    ]
-
-                    # Calculate requirements
-                    total_staked = sum(p["stake"] for p in parlays)
-                    min_required = round(starting_balance * MIN_PCT_TOTAL_STAKED)
-                    parlay_count = len(parlays)
-
-                    # Check if requirements are not met
-                    needs_more_stake = total_staked < min_required
-                    needs_more_parlays = parlay_count < MIN_PARLAYS_REQUIRED
-
-                    if needs_more_stake or needs_more_parlays:
-                        amount_needed = max(0, min_required - total_staked)
-
-                        # Send notification via HTTP
-                        await async_server_req(
-                            route="/push-notifications",
-                            method="POST",
-                            body={
-                                "receiverIdsList": [user_id],
-                                "pushNotification": {
-                                    "title": "You could get disqualified!",
-                                    "body": f"You need to stake ${int(amount_needed)} more! Create another parlay right now!",
-                                    "data": {
-                                        "url": f"/match/{match_id}"
-                                    }
-                                },
-                            },
-                        )
-
-                        notifications_sent += 1
-                        logger.info(
-                            f"Sent notification to user {user_id} for match {match_id} "
-                            f"(needs ${amount_needed:.2f} more, {MIN_PARLAYS_REQUIRED - parlay_count} more parlays)"
-                        )
+                await cur.execute(
+                    REQUIREMENTS_QUERY,
+                    {
+                        "min_pct_total_staked": MIN_PCT_TOTAL_STAKED,
+                        "min_parlays_required": MIN_PARLAYS_REQUIRED,
+                    },
+                )
+                candidates = await cur.fetchall()
+
+        query_seconds = time() - start_time
+        logger.info(
+            f"Found {len(candidates)} match users short of requirements in {query_seconds:.2f}s "
+            f"({len(candidates) / query_seconds if query_seconds > 0 else 0:.0f} candidates/s)"
+        )
+
+        send_start = time()
+        notifications_sent = await send_notifications(group_notifications(candidates))
+        send_seconds = time() - send_start
+        logger.info(
+            f"Sent {notifications_sent} notifications in {send_seconds:.2f}s "
+            f"({notifications_sent / send_seconds if send_seconds > 0 else 0:.1f} notifications/s)"
+        )
 
     except Exception as e:
         logger.error(f"Error checking match requirements: {e}")
@@ -0,0 +1,238 @@
+"""
+Sampled, opt-in profiling of hot paths.
+
+Functions decorated with @profiled are profiled on PROFILE_PERCENT percent of
+their calls. A sampled call registers its thread with a sampling profiler,
+which reads the thread's stack every PROFILE_INTERVAL_MS milliseconds until the
+call returns, then writes the stacks to PROFILE_DIR in folded format (one
+`outer;inner;leaf count` line per stack), ready for flamegraph.pl or
+speedscope. A sampled async call registers its task instead: while the task is
+running its stack is read from the loop thread, and while it is suspended from
+its chain of awaiting coroutines, ending in a `<suspended>` frame. Other tasks
+on the loop stay out of its profile, including tasks it starts itself, which
+show up as the await on them.
+
+The percentage starts from the PROFILE_PERCENT env var and can be changed
+without a restart by a message on the profiling_control channel, e.g.
+
+    PUBLISH profiling_control '{"percent": 5, "functions": ["handle_stats_updated"]}'
+
+where functions optionally limits profiling to those function names. Processes
+pick up control messages once start_profiling_control has been called.
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import queue
+import random
+import sys
+import threading
+from collections import Counter
+from time import sleep, time
+from typing import Optional
+
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+CONTROL_CHANNEL = "profiling_control"
+
+_percent = float(os.getenv("PROFILE_PERCENT", "0"))
+_functions: Optional[set[str]] = None
+
+
+def set_profiling(percent: float, functions: Optional[list[str]] = None) -> None:
+    """Profile percent% of calls, of the named functions only if given"""
+    global _percent, _functions
+    _percent = max(0.0, min(100.0, float(percent)))
+    _functions = set(functions) if functions else None
+    logger.info(f"Profiling {_percent}% of calls to {', '.join(sorted(_functions)) if _functions else 'all functions'}")
+
+
+def _should_profile(function_name: str) -> bool:
+    if _percent <= 0:
+        return False
+    if _functions is not None and function_name not in _functions:
+        return False
+    return random.random() * 100 < _percent
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _thread_stack(frame) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _task_stack(task: asyncio.Task, thread_frame) -> list[str]:
+    """The task's stack, outermost first, read from its thread while it runs and from its coroutines otherwise"""
+    coro_frame = getattr(task.get_coro(), "cr_frame", None)
+    if coro_frame is None:
+        return []
+
+    stack = []
+    frame = thread_frame
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        if frame is coro_frame:
+            stack.reverse()
+            return stack
+        frame = frame.f_back
+
+    # Suspended: follow what each coroutine awaits down to the one parked on a future
+    stack = []
+    awaitable = task.get_coro()
+    while (frame := getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)) is not None:
+        stack.append(_frame_name(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    if stack:
+        stack.append("<suspended>")
+    return stack
+
+
+class _Session:
+    def __init__(self, name: str, thread_id: int, task: Optional[asyncio.Task] = None):
+        self.name = name
+        self.thread_id = thread_id
+        self.task = task
+        self.stacks: Counter = Counter()
+
+
+class _Sampler:
+    """One daemon thread sampling the stacks of every thread or task with a sampled call in progress"""
+
+    def __init__(self):
+        self._sessions: set[_Session] = set()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._finished: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name="profiler", daemon=True).start()
+
+    def start(self, name: str, task: Optional[asyncio.Task] = None) -> _Session:
+        session = _Session(name, threading.get_ident(), task)
+        with self._lock:
+            self._sessions.add(session)
+            self._active.set()
+        return session
+
+    def stop(self, session: _Session) -> None:
+        with self._lock:
+            self._sessions.discard(session)
+            if not self._sessions:
+                self._active.clear()
+        self._finished.put(session)
+
+    def _run(self) -> None:
+        interval = PROFILE_INTERVAL_MS / 1000
+        while True:
+            self._write_finished()
+            if not self._active.wait(timeout=1):
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                sessions = list(self._sessions)
+            for session in sessions:
+                frame = frames.get(session.thread_id)
+                stack = _thread_stack(frame) if session.task is None else _task_stack(session.task, frame)
+                if stack:
+                    session.stacks[";".join(stack)] += 1
+            sleep(interval)
+
+    def _write_finished(self) -> None:
+        while not self._finished.empty():
+            session = self._finished.get()
+            if not session.stacks:
+                continue
+            try:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                path = os.path.join(PROFILE_DIR, f"{session.name}-{os.getpid()}-{int(time() * 1000)}.folded")
+                with open(path, "w", encoding="utf-8") as f:
+                    for stack, count in session.stacks.items():
+                        f.write(f"{stack} {count}\n")
+            except OSError as e:
+                logger.error(f"Error writing profile of {session.name}: {e}")
+
+
+_sampler: Optional[_Sampler] = None
+_sampler_lock = threading.Lock()
+
+
+def _get_sampler() -> _Sampler:
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = _Sampler()
+    return _sampler
+
+
+def profiled(fn):
+    """Profile a sampled share of calls to fn, sync or async"""
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            if not _should_profile(fn.__name__):
+                return await fn(*args, **kwargs)
+            sampler = _get_sampler()
+            session = sampler.start(name, asyncio.current_task())
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                sampler.stop(session)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _should_profile(fn.__name__):
+            return fn(*args, **kwargs)
+        sampler = _get_sampler()
+        session = sampler.start(name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            sampler.stop(session)
+
+    return wrapper
+
+
+def _apply_control_message(data: dict) -> None:
+    if not isinstance(data, dict) or "percent" not in data:
+        logger.error(f"Profiling control message without percent: {data}")
+        return
+    set_profiling(data["percent"], data.get("functions"))
+
+
+def _listen_for_control() -> None:
+    from redis_utils import create_redis_client, listen_for_messages
+
+    while True:
+        client = None
+        try:
+            client = create_redis_client()
+            listen_for_messages(client, CONTROL_CHANNEL, _apply_control_message)
+        except Exception as e:
+            logger.error(f"Error in profiling control listener, restarting: {e}")
+            sleep(5)
+        finally:
+            if client:
+                client.close()
+
+
+def start_profiling_control() -> None:
+    """Follow profiling_control messages from a daemon thread, in sync and async processes alike"""
+    threading.Thread(target=_listen_for_control, name="profiling-control", daemon=True).start()
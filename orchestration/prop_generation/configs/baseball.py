@@ -7,7 +7,8 @@ def walks_config() -> PropConfig:
     return PropConfig(...)
 """
 
-from prop_generation.generator.base import (
+from prop_generation.generator.catalog import (
+    BATCHED_NEWTON_SOLVER,
     DataScope,
     FeatureDefinition,
     ModelType,
@@ -60,7 +61,7 @@ def home_runs_config() -> PropConfig:
             FeatureDefinition("opp_pitching_walks", "pitching_walks", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -80,7 +81,7 @@ def doubles_config() -> PropConfig:
             FeatureDefinition("opp_pitching_walks", "pitching_walks", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -99,7 +100,7 @@ def hits_config() -> PropConfig:
             FeatureDefinition("opp_pitching_walks", "pitching_walks", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -119,7 +120,7 @@ def triples_config() -> PropConfig:
             FeatureDefinition("opp_pitching_walks", "pitching_walks", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -140,7 +141,7 @@ def rbis_config() -> PropConfig:
             FeatureDefinition("opp_runs_allowed", "runs_allowed", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -159,7 +160,7 @@ def strikeouts_config() -> PropConfig:
             FeatureDefinition("opp_hits_allowed", "hits_allowed", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -178,7 +179,7 @@ def pitching_strikeouts_config() -> PropConfig:
             FeatureDefinition("opp_slugging_pct", "slugging_pct", DataScope.OPPONENT)
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -201,7 +202,7 @@ def pitches_thrown_config() -> PropConfig:
             FeatureDefinition("opp_slugging_pct", "slugging_pct", DataScope.OPPONENT)
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -223,7 +224,7 @@ def earned_runs_config() -> PropConfig:
             FeatureDefinition("opp_slugging_pct", "slugging_pct", DataScope.OPPONENT)
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -242,7 +243,7 @@ def hits_allowed_config() -> PropConfig:
             FeatureDefinition("opp_strikeouts", "strikeouts", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -259,7 +260,7 @@ def pitching_walks_config() -> PropConfig:
             FeatureDefinition("opp_obp", "on_base_percentage", DataScope.OPPONENT)
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -281,7 +282,7 @@ def runs_config() -> PropConfig:
             FeatureDefinition("opp_runs_allowed", "runs_allowed", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -302,7 +303,7 @@ def hits_runs_rbis_config() -> PropConfig:
             FeatureDefinition("opp_runs_allowed", "runs_allowed", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -323,7 +324,7 @@ def stolen_bases_config() -> PropConfig:
             FeatureDefinition("opp_earned_runs", "earned_runs", DataScope.OPPONENT),
         ],
         model_type=ModelType.POISSON,
-        model_params={"alpha": 1},
+        model_params={"alpha": 1, "solver": BATCHED_NEWTON_SOLVER},
     )
 
 
@@ -7,7 +7,7 @@ def fgm_config() -> PropConfig:
     return PropConfig(...)
 """
 
-from prop_generation.generator.base import (
+from prop_generation.generator.catalog import (
     DataScope,
     FeatureDefinition,
     ModelType,
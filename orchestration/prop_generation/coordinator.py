@@ -0,0 +1,76 @@
+"""
+Distributed prop generation coordinator.
+
+Fetches the day's schedule of every league and enqueues one work unit per team
+of each game as a new run on the Redis work queue, for prop_generation.worker
+processes to generate. Refuses to start while the current run is unsettled.
+
+Usage: python -m prop_generation.coordinator [date] [--delta]
+  date: Slate date as YYYY-MM-DD (defaults to today in New York)
+  --delta: Workers skip players whose inputs are unchanged since the last run
+"""
+
+import sys
+import traceback
+from datetime import datetime
+from time import time
+from zoneinfo import ZoneInfo
+
+from extract_stats.main import LEAGUE_CONFIG
+from prop_generation.delta import parse_service_args
+from prop_generation.work_queue import PropWorkQueue, WorkUnit, make_unit
+from redis_utils import create_redis_client
+from utils import data_feeds_req, setup_logger
+
+logger = setup_logger(__name__)
+
+
+def slate_units(today_str: str, delta_mode: bool) -> list[WorkUnit]:
+    """Work units for every team of every game scheduled on the date"""
+    units = []
+    for league, config in LEAGUE_CONFIG.items():
+        today_schedule_req = data_feeds_req(f"/schedule/{today_str}/{league}")
+        if today_schedule_req.status_code == 304:
+            logger.info(f"No {league} games today, skipping")
+            continue
+
+        games_list = today_schedule_req.json()["data"][league]
+        for game in games_list:
+            for team_id in [game["home_team_ID"], game["away_team_ID"]]:
+                units.append(make_unit(config["sport"], league, today_str, delta_mode, game, team_id))
+        logger.info(f"{len(games_list)} {league} games to generate")
+    return units
+
+
+def main():
+    try:
+        date_arg, delta_mode = parse_service_args(sys.argv)
+        today_str = (
+            date_arg
+            if date_arg
+            else datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d")
+        )
+
+        client = create_redis_client()
+        current = PropWorkQueue.current(client)
+        if current is not None and not current.settled():
+            logger.error(f"Run {current.run_id} is still in progress: {current.progress()}")
+            sys.exit(1)
+
+        units = slate_units(today_str, delta_mode)
+        if not units:
+            logger.info("No games today, nothing to enqueue")
+            return
+
+        run_id = f"{today_str}-{int(time())}"
+        queue = PropWorkQueue.create(client, run_id, units)
+        queue.make_current()
+        logger.info(f"Enqueued {len(units)} work units as run {run_id}")
+    except Exception as e:
+        logger.error(f"There was an error enqueueing prop generation: {e}")
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Incremental (delta) prop generation.
+
+Every player whose props are generated for a game gets a fingerprint of the
+inputs that decide them: their roster entry, the stats they are eligible for,
+the averages behind that, their stat window and the upcoming opponent's
+window. Fingerprints are stored with the props.
+
+With --delta, a service skips players whose fingerprint is unchanged since the
+last run for the game, so it can be rerun as injury reports and depth charts
+move without refitting every model. Players that changed are regenerated and
+their props for stats they no longer get are retired; players that dropped
+off the roster or out of eligibility have all their props for the game
+retired. Retiring deletes props that are unresolved and unpicked; picked
+props are left for settlement.
+"""
+
+import hashlib
+import json
+from typing import Any
+
+from db.feature_store import TeamFeatureWindow
+from db.props import get_input_fingerprints
+from db.players import Player
+from prop_generation.feature_store import SPORT_FEATURE_STORES, team_window_current
+from prop_generation.snapshot import StatsSnapshot
+from prop_generation.writer import PropWriter
+
+DELTA_FLAG = "--delta"
+
+
+def parse_service_args(argv: list[str]) -> tuple[str | None, bool]:
+    """(date argument, delta mode) from a prop service's command line"""
+    positional = [arg for arg in argv[1:] if not arg.startswith("--")]
+    return (positional[0] if positional else None), DELTA_FLAG in argv[1:]
+
+
+def input_fingerprint(*parts: Any) -> str:
+    """Stable digest of a player's generation inputs"""
+    encoded = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def team_window_key(
+    sport: str,
+    league: str,
+    team_id: int,
+    team_windows: dict[int, TeamFeatureWindow],
+    snapshot: StatsSnapshot | None,
+) -> list[str]:
+    """Game ids of a team's recent-games window, from wherever the service reads it"""
+    sample_size = SPORT_FEATURE_STORES[sport]["sample_size"]
+    if snapshot is not None:
+        return [row["game_id"] for row in snapshot.team_stats(team_id, sample_size)]
+
+    window = team_windows.get(team_id)
+    if team_window_current(sport, window):
+        return list(window["game_ids"])
+
+    team_rows = SPORT_FEATURE_STORES[sport]["team_stats"](team_id=team_id, league=league, limit=sample_size)
+    return [row["game_id"] for row in team_rows]
+
+
+class GameDelta:
+    """Which players of one game to regenerate, and the props to retire afterwards"""
+
+    def __init__(self, league: str, game_id: str, delta_mode: bool, team_ids: list[int] | None = None):
+        self.league = league
+        self.game_id = game_id
+        self.delta_mode = delta_mode
+        # A run over some of the game's teams only retires players recorded for those teams
+        self.stored = get_input_fingerprints(league, game_id, team_ids)
+        self.fingerprints: dict[int, str] = {}
+        self.team_ids: dict[int, int] = {}
+        self.regenerated: set[int] = set()
+        self.generated_stats: dict[int, list[str]] = {}
+        self.skipped = 0
+
+    def unchanged(self, player: Player, *inputs: Any) -> bool:
+        """Record a player's inputs; True when delta mode can skip them"""
+        player_id = player["player_id"]
+        fingerprint = input_fingerprint(
+            self.game_id, player["team_id"], player["status"], player["position"], *inputs
+        )
+        self.fingerprints[player_id] = fingerprint
+        self.team_ids[player_id] = player["team_id"]
+
+        if self.delta_mode and self.stored.get(player_id) == fingerprint:
+            self.skipped += 1
+            return True
+
+        self.regenerated.add(player_id)
+        return False
+
+    def record_prop(self, player_id: int, stat_name: str) -> None:
+        self.generated_stats.setdefault(player_id, []).append(stat_name)
+
+    def finish(self, writer: PropWriter) -> None:
+        """Queue fingerprints and retirements for the game on the league's writer"""
+        for player_id in self.regenerated:
+            writer.add_fingerprint(
+                self.game_id, player_id, self.team_ids[player_id], self.fingerprints[player_id]
+            )
+            writer.retire(self.game_id, player_id, self.generated_stats.get(player_id, []))
+
+        # Off the roster or no longer eligible for anything
+        for player_id in self.stored.keys() - self.fingerprints.keys():
+            writer.retire(self.game_id, player_id, [])
+            writer.drop_fingerprint(self.game_id, player_id)
+
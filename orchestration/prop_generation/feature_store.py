@@ -0,0 +1,421 @@
+"""
+Materialized rolling feature windows for prop generation.
+
+The prop services used to read a player's last SAMPLE_SIZE stat rows, the
+matching team and opponent rows, and the upcoming opponent's recent rows for
+every player every day. Those windows are now kept in two tables updated as
+games are ingested:
+
+- player_feature_window: per player, the fields the league's configs read from
+  their last SAMPLE_SIZE games, with their team's and opponent's rows for the
+  same games, as flattened (games x fields) arrays, most recent game first
+- team_feature_window: per team, the same for its own last SAMPLE_SIZE team
+  rows, which is the opponent profile when a team is the upcoming opponent
+
+The decay-weighted means are taken from these windows when a line is
+generated, so lines match the query path exactly. Missing values are stored
+as NaN and come back as None.
+
+Each window also keeps the start time of its most recent game. An ingested
+game newer than that is prepended; an older one, as when seed/process_games.py
+backfills a past date range, means the window is reseeded from the stat
+tables, so it still holds the latest games in order.
+
+rebuild_feature_store backfills every window of a league from the stat tables.
+"""
+
+import math
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+from db.feature_store import (
+    PlayerFeatureWindow,
+    TeamFeatureWindow,
+    get_player_feature_windows,
+    get_team_feature_windows,
+    upsert_player_feature_windows,
+    upsert_team_feature_windows,
+)
+from db.games import get_game_start_times
+from db.players import get_players_by_league
+from db.stats.baseball import (
+    get_baseball_opponent_stats_for_player,
+    get_baseball_player_stats,
+    get_baseball_team_stats,
+    get_baseball_team_stats_for_player,
+)
+from db.stats.basketball import (
+    get_basketball_opponent_stats_for_player,
+    get_basketball_player_stats,
+    get_basketball_team_stats,
+    get_basketball_team_stats_for_player,
+)
+from db.stats.football import (
+    get_football_opponent_stats_for_player,
+    get_football_player_stats,
+    get_football_team_stats,
+    get_football_team_stats_for_player,
+)
+from db.teams import get_teams_by_league
+from prop_generation.configs.baseball import SAMPLE_SIZE as BASEBALL_SAMPLE_SIZE
+from prop_generation.configs.baseball import get_baseball_prop_configs
+from prop_generation.configs.basketball import SAMPLE_SIZE as BASKETBALL_SAMPLE_SIZE
+from prop_generation.configs.basketball import get_basketball_prop_configs
+from prop_generation.configs.football import SAMPLE_SIZE as FOOTBALL_SAMPLE_SIZE
+from prop_generation.configs.football import get_football_prop_configs
+from prop_generation.generator.catalog import DataScope
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Per sport: configs, window length, player fields read outside the configs
+# (eligibility checks) and the stat queries used to seed windows
+SPORT_FEATURE_STORES = {
+    "basketball": {
+        "get_configs": get_basketball_prop_configs,
+        "sample_size": BASKETBALL_SAMPLE_SIZE,
+        "extra_player_fields": ["minutes"],
+        "player_stats": get_basketball_player_stats,
+        "team_stats_for_player": get_basketball_team_stats_for_player,
+        "opponent_stats_for_player": get_basketball_opponent_stats_for_player,
+        "team_stats": get_basketball_team_stats,
+    },
+    "football": {
+        "get_configs": get_football_prop_configs,
+        "sample_size": FOOTBALL_SAMPLE_SIZE,
+        "extra_player_fields": [],
+        "player_stats": get_football_player_stats,
+        "team_stats_for_player": get_football_team_stats_for_player,
+        "opponent_stats_for_player": get_football_opponent_stats_for_player,
+        "team_stats": get_football_team_stats,
+    },
+    "baseball": {
+        "get_configs": get_baseball_prop_configs,
+        "sample_size": BASEBALL_SAMPLE_SIZE,
+        "extra_player_fields": ["at_bats", "stolen_bases"],
+        "player_stats": get_baseball_player_stats,
+        "team_stats_for_player": get_baseball_team_stats_for_player,
+        "opponent_stats_for_player": get_baseball_opponent_stats_for_player,
+        "team_stats": get_baseball_team_stats,
+    },
+}
+
+# Windows written per upsert during a rebuild
+REBUILD_CHUNK_SIZE = 500
+
+
+@lru_cache(maxsize=None)
+def window_fields(sport: str) -> tuple[list[str], list[str]]:
+    """(player fields, team fields) a sport's windows keep, in a stable order"""
+    store = SPORT_FEATURE_STORES[sport]
+    player_fields = set(store["extra_player_fields"])
+    team_fields = set()
+    for config in store["get_configs"]().values():
+        player_fields.add(config.stat_name)
+        for feature in config.features:
+            if feature.scope == DataScope.PLAYER:
+                player_fields.add(feature.field)
+            else:
+                team_fields.add(feature.field)
+    return sorted(player_fields), sorted(team_fields)
+
+
+def _row_values(row: Any, fields: list[str]) -> list[float]:
+    values = []
+    for field in fields:
+        value = row.get(field)
+        values.append(math.nan if value is None else float(value))
+    return values
+
+
+def _window_rows(
+    game_ids: list[str], fields: list[str], values: list[float], **identity: Any
+) -> list[dict[str, Any]]:
+    """Rebuild stat rows from a flattened window"""
+    matrix = np.array(values, dtype=np.float64).reshape(len(game_ids), len(fields)).tolist()
+    rows = []
+    for game_id, row_values in zip(game_ids, matrix):
+        row = {"game_id": game_id, **identity}
+        for field, value in zip(fields, row_values):
+            row[field] = None if math.isnan(value) else value
+        rows.append(row)
+    return rows
+
+
+def build_player_window(
+    sport: str,
+    league: str,
+    player_rows: list[Any],
+    team_rows: list[Any],
+    opponent_rows: list[Any],
+) -> PlayerFeatureWindow | None:
+    """Window from a player's stat rows (most recent first), keeping games with both team rows"""
+    if not player_rows:
+        return None
+
+    player_fields, team_fields = window_fields(sport)
+    team_by_game = {row["game_id"]: row for row in team_rows}
+    opponent_by_game = {row["game_id"]: row for row in opponent_rows}
+
+    window: PlayerFeatureWindow = {
+        "player_id": player_rows[0]["player_id"],
+        "league": league,
+        "team_id": player_rows[0]["team_id"],
+        "game_ids": [],
+        "player_fields": player_fields,
+        "team_fields": team_fields,
+        "player_values": [],
+        "team_values": [],
+        "opponent_values": [],
+        "head_start_time": None,
+    }
+    for player_row in player_rows[: SPORT_FEATURE_STORES[sport]["sample_size"]]:
+        game_id = player_row["game_id"]
+        if game_id not in team_by_game or game_id not in opponent_by_game:
+            continue
+        window["game_ids"].append(game_id)
+        window["player_values"].extend(_row_values(player_row, player_fields))
+        window["team_values"].extend(_row_values(team_by_game[game_id], team_fields))
+        window["opponent_values"].extend(_row_values(opponent_by_game[game_id], team_fields))
+    return window
+
+
+def build_team_window(sport: str, league: str, team_id: int, team_rows: list[Any]) -> TeamFeatureWindow:
+    """Window from a team's own stat rows, most recent first"""
+    _, team_fields = window_fields(sport)
+    team_rows = team_rows[: SPORT_FEATURE_STORES[sport]["sample_size"]]
+    return {
+        "team_id": team_id,
+        "league": league,
+        "game_ids": [row["game_id"] for row in team_rows],
+        "fields": team_fields,
+        "stat_values": [value for row in team_rows for value in _row_values(row, team_fields)],
+        "head_start_time": None,
+    }
+
+
+def player_window_current(sport: str, window: PlayerFeatureWindow | None) -> bool:
+    """Whether a stored window has the fields the sport's configs read now and a known most recent game"""
+    player_fields, team_fields = window_fields(sport)
+    return (
+        window is not None
+        and window["head_start_time"] is not None
+        and list(window["player_fields"]) == player_fields
+        and list(window["team_fields"]) == team_fields
+    )
+
+
+def team_window_current(sport: str, window: TeamFeatureWindow | None) -> bool:
+    return (
+        window is not None
+        and window["head_start_time"] is not None
+        and list(window["fields"]) == window_fields(sport)[1]
+    )
+
+
+def _is_newer(window: PlayerFeatureWindow | TeamFeatureWindow, start_time: datetime | None) -> bool:
+    return start_time is not None and window["head_start_time"] is not None and start_time > window["head_start_time"]
+
+
+def prepend_player_game(
+    sport: str,
+    window: PlayerFeatureWindow,
+    start_time: datetime | None,
+    player_row: Any,
+    team_row: Any,
+    opponent_row: Any,
+) -> bool:
+    """Add a game to the front of a player window; False unless it started after the window's most recent game"""
+    if not _is_newer(window, start_time):
+        return False
+
+    sample_size = SPORT_FEATURE_STORES[sport]["sample_size"]
+    player_width = len(window["player_fields"])
+    team_width = len(window["team_fields"])
+
+    window["team_id"] = player_row["team_id"]
+    window["game_ids"] = [player_row["game_id"], *window["game_ids"]][:sample_size]
+    window["player_values"] = (
+        _row_values(player_row, window["player_fields"]) + list(window["player_values"])
+    )[: sample_size * player_width]
+    window["team_values"] = (
+        _row_values(team_row, window["team_fields"]) + list(window["team_values"])
+    )[: sample_size * team_width]
+    window["opponent_values"] = (
+        _row_values(opponent_row, window["team_fields"]) + list(window["opponent_values"])
+    )[: sample_size * team_width]
+    window["head_start_time"] = start_time
+    return True
+
+
+def prepend_team_game(sport: str, window: TeamFeatureWindow, start_time: datetime | None, team_row: Any) -> bool:
+    """Add a game to the front of a team window; False unless it started after the window's most recent game"""
+    if not _is_newer(window, start_time):
+        return False
+
+    sample_size = SPORT_FEATURE_STORES[sport]["sample_size"]
+    window["game_ids"] = [team_row["game_id"], *window["game_ids"]][:sample_size]
+    window["stat_values"] = (
+        _row_values(team_row, window["fields"]) + list(window["stat_values"])
+    )[: sample_size * len(window["fields"])]
+    window["head_start_time"] = start_time
+    return True
+
+
+def window_stats_lists(
+    sport: str,
+    player_window: PlayerFeatureWindow | None,
+    opponent_window: TeamFeatureWindow | None,
+) -> tuple[list[dict], list[dict], list[dict], list[dict]] | None:
+    """The four stat lists a prop service builds GameStats from, read from the windows.
+
+    Returns None when either window is missing or out of date, in which case
+    the service falls back to querying the stat tables.
+    """
+    if not player_window_current(sport, player_window) or not team_window_current(sport, opponent_window):
+        return None
+
+    identity = {"player_id": player_window["player_id"], "league": player_window["league"]}
+    return (
+        _window_rows(
+            player_window["game_ids"],
+            player_window["player_fields"],
+            player_window["player_values"],
+            team_id=player_window["team_id"],
+            **identity,
+        ),
+        _window_rows(player_window["game_ids"], player_window["team_fields"], player_window["team_values"]),
+        _window_rows(player_window["game_ids"], player_window["team_fields"], player_window["opponent_values"]),
+        _window_rows(
+            opponent_window["game_ids"],
+            opponent_window["fields"],
+            opponent_window["stat_values"],
+            team_id=opponent_window["team_id"],
+        ),
+    )
+
+
+def seed_player_window(sport: str, league: str, player_id: int) -> PlayerFeatureWindow | None:
+    """Build a player's window from the stat tables"""
+    store = SPORT_FEATURE_STORES[sport]
+    limit = store["sample_size"]
+    player_rows = store["player_stats"](player_id=player_id, league=league, limit=limit)
+    if not player_rows:
+        return None
+    return build_player_window(
+        sport,
+        league,
+        player_rows,
+        store["team_stats_for_player"](player_id=player_id, league=league, limit=limit),
+        store["opponent_stats_for_player"](player_id=player_id, league=league, limit=limit),
+    )
+
+
+def seed_team_window(sport: str, league: str, team_id: int) -> TeamFeatureWindow:
+    """Build a team's window from the stat tables"""
+    store = SPORT_FEATURE_STORES[sport]
+    team_rows = store["team_stats"](team_id=team_id, league=league, limit=store["sample_size"])
+    return build_team_window(sport, league, team_id, team_rows)
+
+
+def set_head_start_times(league: str, windows: list[PlayerFeatureWindow] | list[TeamFeatureWindow]) -> None:
+    """Set the start time of each seeded window's most recent game from the game table"""
+    start_times = get_game_start_times(league, list({window["game_ids"][0] for window in windows if window["game_ids"]}))
+    for window in windows:
+        window["head_start_time"] = start_times.get(window["game_ids"][0]) if window["game_ids"] else None
+
+
+def update_feature_store(league: str, sport: str, team_stats_list: list[Any], player_stats_list: list[Any]) -> int:
+    """Add an ingested game to the windows of its teams and active players.
+
+    Windows that don't exist yet, were built for other fields, or whose most
+    recent game started after this one (a backfill) are seeded from the stat
+    tables, which already hold this game.
+
+    Returns:
+        Number of windows written
+    """
+    team_rows = {team_stats["team_id"]: team_stats for team_stats in team_stats_list}
+    if len(team_rows) != 2:
+        return 0
+
+    game_id = team_stats_list[0]["game_id"]
+    start_time = get_game_start_times(league, [game_id]).get(game_id)
+
+    stored_team_windows = get_team_feature_windows(league, list(team_rows))
+    team_windows = []
+    seeded_team_windows = []
+    for team_id, team_row in team_rows.items():
+        window = stored_team_windows.get(team_id)
+        if team_window_current(sport, window):
+            if game_id in window["game_ids"]:
+                continue
+            if prepend_team_game(sport, window, start_time, team_row):
+                team_windows.append(window)
+                continue
+        seeded_team_windows.append(seed_team_window(sport, league, team_id))
+    set_head_start_times(league, seeded_team_windows)
+
+    # Same rows the prop services read
+    active_rows = [
+        player_stats for player_stats in player_stats_list
+        if player_stats.get("status") == "ACT" and player_stats["team_id"] in team_rows
+    ]
+    stored_player_windows = get_player_feature_windows(
+        league, list({player_stats["player_id"] for player_stats in active_rows})
+    )
+    player_windows = []
+    seeded_player_windows = []
+    for player_stats in active_rows:
+        window = stored_player_windows.get(player_stats["player_id"])
+        if player_window_current(sport, window):
+            if game_id in window["game_ids"]:
+                continue
+            opponent_row = next(row for team_id, row in team_rows.items() if team_id != player_stats["team_id"])
+            if prepend_player_game(
+                sport, window, start_time, player_stats, team_rows[player_stats["team_id"]], opponent_row
+            ):
+                player_windows.append(window)
+                continue
+
+        window = seed_player_window(sport, league, player_stats["player_id"])
+        if window is not None:
+            seeded_player_windows.append(window)
+    set_head_start_times(league, seeded_player_windows)
+
+    return upsert_team_feature_windows(team_windows + seeded_team_windows) + upsert_player_feature_windows(
+        player_windows + seeded_player_windows
+    )
+
+
+def rebuild_feature_store(league: str, sport: str) -> tuple[int, int]:
+    """Rebuild every team and player window of a league from the stat tables.
+
+    Returns:
+        (team windows written, player windows written)
+    """
+    team_windows = [
+        seed_team_window(sport, league, team["team_id"]) for team in get_teams_by_league(league)
+    ]
+    set_head_start_times(league, team_windows)
+    teams_written = upsert_team_feature_windows(team_windows)
+    logger.info(f"Rebuilt {teams_written} {league} team feature windows")
+
+    players = get_players_by_league(league)
+    players_written = 0
+    pending: list[PlayerFeatureWindow] = []
+    for index, player in enumerate(players):
+        window = seed_player_window(sport, league, player["player_id"])
+        if window is not None:
+            pending.append(window)
+
+        if len(pending) >= REBUILD_CHUNK_SIZE or index == len(players) - 1:
+            set_head_start_times(league, pending)
+            players_written += upsert_player_feature_windows(pending)
+            pending = []
+            logger.info(f"Rebuilt {players_written} {league} player feature windows ({index + 1}/{len(players)} players)")
+
+    return teams_written, players_written
@@ -1,54 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import Any, Generic, TypeVar
-from enum import Enum
-import pandas as pd
-from sklearn.pipeline import Pipeline
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
 
-PlayerStatsType = TypeVar("PlayerStatsType")
-TeamStatsType = TypeVar("TeamStatsType")
-
-
-class DataScope(Enum):
-    """Defines the scope of where a feature comes from"""
-    PLAYER = "player"
-    TEAM = "team"
-    OPPONENT = "opponent"
-
-
-class ModelType(Enum):
-    """Available model types for prop generation"""
-
-    RIDGE = "ridge"
-    POISSON = "poisson"
-
-
-class FeatureDefinition:
-    """Defines how to extract and calculate a feature"""
-
-    def __init__(
-        self, name: str, field: str, scope: DataScope
-    ):
-        self.name = name
-        self.field = field
-        self.scope = scope
+# Re-exported: config declarations live in the catalog so they load without the ML stack
+from prop_generation.generator.catalog import (
+    DataScope,
+    FeatureDefinition,
+    ModelType,
+    PropConfig,
+)
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.pipeline import Pipeline
 
-class PropConfig:
-    """Configuration for generating a specific prop"""
-
-    def __init__(
-        self,
-        stat_name: str,
-        features: list[FeatureDefinition],
-        model_type: ModelType,
-        display_name: str,
-        model_params: dict[str, Any] | None = None,
-    ):
-        self.stat_name = stat_name
-        self.features = features
-        self.model_type = model_type
-        self.model_params = model_params or {}
-        self.display_name = display_name
+PlayerStatsType = TypeVar("PlayerStatsType")
+TeamStatsType = TypeVar("TeamStatsType")
 
 
 class GameStats(Generic[PlayerStatsType, TeamStatsType]):
@@ -60,6 +26,7 @@ class GameStats(Generic[PlayerStatsType, TeamStatsType]):
         team_stats_list: list[TeamStatsType],
         prev_opponents_stats_list: list[TeamStatsType],
         curr_opponent_stats_list: list[TeamStatsType],
+        model_states: dict[str, Any] | None = None,
     ):
         min_length = min(
             len(player_stats_list),
@@ -71,6 +38,8 @@ class GameStats(Generic[PlayerStatsType, TeamStatsType]):
         self.team_stats_list = team_stats_list[:min_length]
         self.prev_opponents_stats_list = prev_opponents_stats_list[:min_length]
         self.curr_opponent_stats_list = curr_opponent_stats_list
+        # Stored online model states (prop_model_state rows) for the player, by stat name
+        self.model_states = model_states or {}
 
 
 class PropGenerator(ABC, Generic[PlayerStatsType, TeamStatsType]):
@@ -86,14 +55,14 @@ class PropGenerator(ABC, Generic[PlayerStatsType, TeamStatsType]):
     @abstractmethod
     def create_model(
         self, model_type: ModelType, params: dict[str, Any]
-    ) -> Pipeline:
+    ) -> "Pipeline":
         """Create a sklearn model based on the configuration"""
         pass
 
     @abstractmethod
     def extract_features(
         self, config: PropConfig, game_data: GameStats[PlayerStatsType, TeamStatsType]
-    ) -> pd.DataFrame:
+    ) -> "pd.DataFrame":
         """Extract features for model training"""
         pass
 
@@ -102,7 +71,7 @@ class PropGenerator(ABC, Generic[PlayerStatsType, TeamStatsType]):
         self,
         config: PropConfig,
         game_data: GameStats[PlayerStatsType, TeamStatsType],
-        training_data: pd.DataFrame,
-    ) -> pd.DataFrame:
+        training_data: "pd.DataFrame",
+    ) -> "pd.DataFrame":
         """Extract features for the next game prediction"""
         pass
\ No newline at end of file
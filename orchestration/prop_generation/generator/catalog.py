@@ -0,0 +1,61 @@
+"""
+Stat catalog: the declarations prop configs are written in.
+
+Configs and the registry only need these plain classes, so importing them (for
+example to get a league's stat names in a settlement worker) does not load
+pandas or scikit-learn. The ML stack is imported by the generator at
+generation time.
+"""
+
+from enum import Enum
+from typing import Any
+
+
+class DataScope(Enum):
+    """Defines the scope of where a feature comes from"""
+    PLAYER = "player"
+    TEAM = "team"
+    OPPONENT = "opponent"
+
+
+class ModelType(Enum):
+    """Available model types for prop generation"""
+
+    RIDGE = "ridge"
+    POISSON = "poisson"
+
+
+# model_params["solver"] value that fits POISSON configs with the batched Newton solver
+BATCHED_NEWTON_SOLVER = "batched_newton"
+
+# model_params["solver"] value that serves RIDGE configs from online per-player states
+ONLINE_RLS_SOLVER = "online_rls"
+
+
+class FeatureDefinition:
+    """Defines how to extract and calculate a feature"""
+
+    def __init__(
+        self, name: str, field: str, scope: DataScope
+    ):
+        self.name = name
+        self.field = field
+        self.scope = scope
+
+
+class PropConfig:
+    """Configuration for generating a specific prop"""
+
+    def __init__(
+        self,
+        stat_name: str,
+        features: list[FeatureDefinition],
+        model_type: ModelType,
+        display_name: str,
+        model_params: dict[str, Any] | None = None,
+    ):
+        self.stat_name = stat_name
+        self.features = features
+        self.model_type = model_type
+        self.model_params = model_params or {}
+        self.display_name = display_name
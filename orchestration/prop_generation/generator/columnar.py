@@ -0,0 +1,124 @@
+"""
+Columnar game data for prop generation.
+
+ColumnarGameStats converts the stat rows returned by the DB queries into one
+contiguous float64 array per field when it is built. Feature extraction then
+selects and stacks columns instead of looping over row dicts for every feature
+of every config, and the model is fitted on a plain matrix rather than a
+DataFrame.
+"""
+
+from typing import Any, TypeVar
+
+import numpy as np
+
+from prop_generation.generator.base import GameStats
+from prop_generation.generator.catalog import DataScope, FeatureDefinition
+
+PlayerStatsType = TypeVar("PlayerStatsType")
+TeamStatsType = TypeVar("TeamStatsType")
+
+
+def _feature_value(row: Any, field: str) -> float:
+    """Per-row conversion used by FeatureExtractor.extract_feature_value"""
+    try:
+        value = row[field]
+        return float(value) if value is not None else 0.0
+    except AttributeError:
+        return 0.0
+
+
+def build_feature_columns(rows: list[Any]) -> dict[str, np.ndarray]:
+    """Convert stat rows to one float64 array per numeric field, with None as 0.0.
+
+    Fields that can't be converted (names, statuses, dates) are left out.
+    """
+    if not rows:
+        return {}
+
+    columns = {}
+    for field in rows[0].keys():
+        try:
+            columns[field] = np.array(
+                [0.0 if row[field] is None else row[field] for row in rows],
+                dtype=np.float64,
+            )
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # Left to the row-by-row fallback, which raises the same errors as the list path
+            continue
+    return columns
+
+
+class ColumnarGameStats(GameStats[PlayerStatsType, TeamStatsType]):
+    """GameStats backed by contiguous NumPy columns, one per field.
+
+    Drop-in for GameStats wherever it is passed to BasePropGenerator. The row
+    lists are kept as well, so code that reads them keeps working.
+    """
+
+    def __init__(
+        self,
+        player_stats_list: list[PlayerStatsType],
+        team_stats_list: list[TeamStatsType],
+        prev_opponents_stats_list: list[TeamStatsType],
+        curr_opponent_stats_list: list[TeamStatsType],
+        model_states: dict[str, Any] | None = None,
+    ):
+        super().__init__(
+            player_stats_list,
+            team_stats_list,
+            prev_opponents_stats_list,
+            curr_opponent_stats_list,
+            model_states,
+        )
+        self._rows_by_scope = {
+            DataScope.PLAYER: self.player_stats_list,
+            DataScope.TEAM: self.team_stats_list,
+            DataScope.OPPONENT: self.prev_opponents_stats_list,
+        }
+        self._columns_by_scope = {
+            scope: build_feature_columns(rows)
+            for scope, rows in self._rows_by_scope.items()
+        }
+        self._curr_opponent_columns: dict[str, np.ndarray] = {}
+        self._target_columns: dict[str, np.ndarray] = {}
+
+    def feature_column(self, definition: FeatureDefinition) -> np.ndarray:
+        """Training values for one feature, as FeatureExtractor.extract_feature_value would give them"""
+        rows = self._rows_by_scope.get(definition.scope)
+        if rows is None:
+            raise ValueError(f"Unknown scope: {definition.scope}")
+
+        column = self._columns_by_scope[definition.scope].get(definition.field)
+        if column is None:
+            # Missing or non-numeric field: convert row by row like the list path
+            column = np.array(
+                [_feature_value(row, definition.field) for row in rows], dtype=np.float64
+            )
+        return column
+
+    def feature_matrix(self, definitions: list[FeatureDefinition]) -> np.ndarray:
+        """Stack feature columns into an (n_games, n_features) training matrix"""
+        if not definitions:
+            return np.empty((len(self.player_stats_list), 0))
+        return np.column_stack([self.feature_column(definition) for definition in definitions])
+
+    def target_column(self, stat_name: str) -> np.ndarray:
+        """Raw values of the stat being predicted, from the player's rows"""
+        column = self._target_columns.get(stat_name)
+        if column is None:
+            column = np.array(
+                [game[stat_name] for game in self.player_stats_list], dtype=np.float64
+            )
+            self._target_columns[stat_name] = column
+        return column
+
+    def curr_opponent_column(self, field: str) -> np.ndarray:
+        """Raw values of a field from the upcoming opponent's recent games"""
+        column = self._curr_opponent_columns.get(field)
+        if column is None:
+            column = np.array(
+                [game[field] for game in self.curr_opponent_stats_list], dtype=np.float64
+            )
+            self._curr_opponent_columns[field] = column
+        return column
@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 from typing import Generic, TypeVar, Protocol, Any
 from prop_generation.generator.base import DataScope, FeatureDefinition, GameStats
+from prop_generation.generator.columnar import ColumnarGameStats
+from prop_generation.generator.weighting import weighted_column_means, weighted_mean
 
 
 class StatsDict(Protocol):
@@ -29,20 +32,7 @@ def calculate_weighted_arithmetic_mean(values: list[float], decay_factor: float
     Returns:
         Weighted average with exponential decay applied
     """
-    if not values:
-        return 0.0
-
-    n = len(values)
-    if n == 1:
-        return values[0]
-
-    # Exponential weights: decay^(n-1), decay^(n-2), ..., decay^1, decay^0
-    # Most recent game (index n-1) gets weight 1.0 (decay^0 = 1)
-    weights = [decay_factor ** (n - i - 1) for i in range(n)]
-    weighted_sum = sum(v * w for v, w in zip(values, weights))
-    total_weight = sum(weights)
-
-    return weighted_sum / total_weight if total_weight > 0 else 0.0
+    return weighted_mean(values, decay_factor)
 
 
 class FeatureExtractor(Generic[PlayerStatsType, TeamStatsType]):
@@ -117,10 +107,64 @@ class FeatureExtractor(Generic[PlayerStatsType, TeamStatsType]):
     ) -> pd.DataFrame:
         """Build feature DataFrame for prediction"""
 
+        # Weighted means of every training column in one product
+        training_names = [
+            definition.name
+            for definition in feature_definitions
+            if definition.scope != DataScope.OPPONENT and definition.name in training_data.columns
+        ]
+        means = {}
+        if training_names:
+            training_matrix = training_data[training_names].to_numpy(dtype=np.float64)
+            means.update(zip(training_names, weighted_column_means(training_matrix)))
+
+        opponent_definitions = [
+            definition for definition in feature_definitions if definition.scope == DataScope.OPPONENT
+        ]
+        if opponent_definitions:
+            opponent_matrix = np.array(
+                [
+                    [game[definition.field] for definition in opponent_definitions]
+                    for game in game_data.curr_opponent_stats_list
+                ],
+                dtype=np.float64,
+            ).reshape(len(game_data.curr_opponent_stats_list), len(opponent_definitions))
+            means.update(
+                zip([definition.name for definition in opponent_definitions], weighted_column_means(opponent_matrix))
+            )
+
         data = {}
         for definition in feature_definitions:
-            data[definition.name] = self.extract_prediction_feature_value(
-                definition, game_data, training_data
-            )
+            if definition.name in means:
+                data[definition.name] = means[definition.name]
+            else:
+                data[definition.name] = self.extract_prediction_feature_value(
+                    definition, game_data, training_data
+                )
 
         return pd.DataFrame([data])
+
+    def build_prediction_vector(
+        self,
+        feature_definitions: list[FeatureDefinition],
+        game_data: ColumnarGameStats[PlayerStatsType, TeamStatsType],
+        training_matrix: np.ndarray,
+    ) -> np.ndarray:
+        """Build the (1, n_features) prediction row for columnar game data"""
+
+        # Training column means for every feature, then opponent features are
+        # replaced with the upcoming opponent's means
+        values = weighted_column_means(training_matrix)
+
+        opponent_indexes = [
+            index
+            for index, definition in enumerate(feature_definitions)
+            if definition.scope == DataScope.OPPONENT
+        ]
+        if opponent_indexes:
+            opponent_matrix = np.column_stack(
+                [game_data.curr_opponent_column(feature_definitions[index].field) for index in opponent_indexes]
+            )
+            values[opponent_indexes] = weighted_column_means(opponent_matrix)
+
+        return values.reshape(1, -1)
@@ -7,12 +7,26 @@ from sklearn.pipeline import Pipeline, make_pipeline
 from sklearn.preprocessing import StandardScaler
 
 from prop_generation.generator.base import (
+    DataScope,
     GameStats,
     ModelType,
     PropConfig,
     PropGenerator,
 )
+from prop_generation.generator.columnar import ColumnarGameStats
 from prop_generation.generator.features import FeatureExtractor
+from prop_generation.generator.online import (
+    MIN_ONLINE_GAMES,
+    OnlineRidgeState,
+    build_online_state,
+    is_online_config,
+    row_value,
+)
+from prop_generation.generator.poisson import (
+    BATCHED_NEWTON_SOLVER,
+    BatchedPoissonRegressor,
+)
+from prop_generation.generator.weighting import weighted_mean
 import random
 
 
@@ -43,16 +57,34 @@ class BasePropGenerator(PropGenerator[PlayerStatsType, TeamStatsType]):
 
     def __init__(self):
         self.feature_extractor = FeatureExtractor[PlayerStatsType, TeamStatsType]()
+        # Online model states rebuilt during generation, for the service to save
+        self.pending_model_states: list[dict[str, Any]] = []
 
     def generate_prop(
         self, config: PropConfig, game_data: GameStats[PlayerStatsType, TeamStatsType]
     ) -> float:
         """Generate a prop line using ML model"""
 
-        feature_df = self.extract_features(config, game_data)
+        if is_online_config(config) and game_data.player_stats_list:
+            state = self.get_online_state(config, game_data)
+            # Too few games for the state to be trusted: fit on the window instead
+            if state.games >= MIN_ONLINE_GAMES:
+                return self.generate_prop_from_state(config, state, game_data)
+
+        if isinstance(game_data, ColumnarGameStats):
+            x_values = game_data.feature_matrix(config.features)
+            y_values = game_data.target_column(config.stat_name)
+            prediction_features = self.feature_extractor.build_prediction_vector(
+                config.features, game_data, x_values
+            )
+        else:
+            feature_df = self.extract_features(config, game_data)
 
-        x_values = feature_df[[f.name for f in config.features]]
-        y_values = feature_df[config.stat_name]
+            x_values = feature_df[[f.name for f in config.features]]
+            y_values = feature_df[config.stat_name]
+            prediction_features = self.extract_prediction_features(
+                config, game_data, feature_df
+            )
 
         model = self.create_model(config.model_type, config.model_params)
 
@@ -60,15 +92,127 @@ class BasePropGenerator(PropGenerator[PlayerStatsType, TeamStatsType]):
             warnings.filterwarnings("ignore", category=RuntimeWarning, module="sklearn")
             model.fit(x_values, y_values)
 
-        prediction_features = self.extract_prediction_features(
-            config, game_data, feature_df
-        )
-
         with warnings.catch_warnings():
             warnings.filterwarnings("ignore", category=RuntimeWarning, module="sklearn")
             predicted_value = float(model.predict(prediction_features)[0])
 
-        sd = float(np.std(y_values, ddof=1))
+        return self.finalize_prop(predicted_value, float(np.std(y_values, ddof=1)))
+
+    def generate_prop_from_state(
+        self,
+        config: PropConfig,
+        state: OnlineRidgeState,
+        game_data: GameStats[PlayerStatsType, TeamStatsType],
+    ) -> float:
+        """Generate a prop line from an online model state, without fitting"""
+
+        return self.finalize_prop(
+            self.predict_from_state(config, state, game_data), state.target_sd()
+        )
+
+    def predict_from_state(
+        self,
+        config: PropConfig,
+        state: OnlineRidgeState,
+        game_data: GameStats[PlayerStatsType, TeamStatsType],
+    ) -> float:
+        """Predicted stat value for the next game from an online model state"""
+
+        prediction_features = state.feature_means.copy()
+        for index, feature in enumerate(config.features):
+            if feature.scope == DataScope.OPPONENT:
+                prediction_features[index] = weighted_mean(
+                    [row_value(game, feature.field) for game in game_data.curr_opponent_stats_list]
+                )
+
+        return state.predict(prediction_features)
+
+    def get_online_state(
+        self, config: PropConfig, game_data: GameStats[PlayerStatsType, TeamStatsType]
+    ) -> OnlineRidgeState:
+        """The player's stored state, or one rebuilt from game_data if it is missing or stale"""
+
+        latest_game = game_data.player_stats_list[0]
+        stored = game_data.model_states.get(config.stat_name)
+        if stored is not None:
+            state = OnlineRidgeState.from_row(stored)
+            if state.matches(config) and state.last_game_id == latest_game["game_id"]:
+                return state
+
+        state = build_online_state(
+            config,
+            game_data.player_stats_list,
+            game_data.team_stats_list,
+            game_data.prev_opponents_stats_list,
+        )
+        self.pending_model_states.append(
+            {
+                **state.to_row(),
+                "player_id": latest_game["player_id"],
+                "league": latest_game["league"],
+                "stat_name": config.stat_name,
+            }
+        )
+        return state
+
+    def take_pending_model_states(self) -> list[dict[str, Any]]:
+        """Return and clear the states rebuilt since the last call"""
+
+        pending_model_states = self.pending_model_states
+        self.pending_model_states = []
+        return pending_model_states
+
+    def generate_props(
+        self,
+        config: PropConfig,
+        games_data: list[GameStats[PlayerStatsType, TeamStatsType]],
+    ) -> list[float]:
+        """Generate one prop line per player for the same stat.
+
+        Configs using the batched Poisson solver fit every player with the same
+        sample size in one batch. Anything else is generated player by player.
+        """
+
+        if not self.uses_batched_solver(config) or not all(
+            isinstance(game_data, ColumnarGameStats) for game_data in games_data
+        ):
+            return [self.generate_prop(config, game_data) for game_data in games_data]
+
+        groups: dict[int, list[int]] = {}
+        for index, game_data in enumerate(games_data):
+            groups.setdefault(len(game_data.player_stats_list), []).append(index)
+
+        prop_lines = [0.0] * len(games_data)
+        for indexes in groups.values():
+            x_stack = []
+            y_stack = []
+            prediction_stack = []
+            for index in indexes:
+                game_data = games_data[index]
+                x_values = game_data.feature_matrix(config.features)
+                x_stack.append(x_values)
+                y_stack.append(game_data.target_column(config.stat_name))
+                prediction_stack.append(
+                    self.feature_extractor.build_prediction_vector(
+                        config.features, game_data, x_values
+                    )
+                )
+
+            model = self.create_model(config.model_type, config.model_params)
+            with np.errstate(all="ignore"):
+                model.fit(np.stack(x_stack), np.stack(y_stack))
+                predicted_values = model.predict(np.stack(prediction_stack))[:, 0]
+
+            for index, y_values, predicted_value in zip(indexes, y_stack, predicted_values):
+                prop_lines[index] = self.finalize_prop(
+                    float(predicted_value), float(np.std(y_values, ddof=1))
+                )
+
+        return prop_lines
+
+    def finalize_prop(self, predicted_value: float, sd: float) -> float:
+        """Bias the prediction above the mean by a share of the stat's SD and round it to a prop line"""
+
         final_prop = predicted_value + random.uniform(MIN_BIAS, MAX_BIAS) * sd
 
         if np.isnan(final_prop) or np.isinf(final_prop):
@@ -76,12 +220,24 @@ class BasePropGenerator(PropGenerator[PlayerStatsType, TeamStatsType]):
 
         return round_prop(final_prop)
 
-    def create_model(self, model_type: ModelType, params: dict[str, Any]) -> Pipeline:
-        """Create sklearn model pipeline"""
+    def uses_batched_solver(self, config: PropConfig) -> bool:
+        """Whether the config asks for the batched Poisson solver"""
+
+        return (
+            config.model_type == ModelType.POISSON
+            and config.model_params.get("solver") == BATCHED_NEWTON_SOLVER
+        )
+
+    def create_model(
+        self, model_type: ModelType, params: dict[str, Any]
+    ) -> Pipeline | BatchedPoissonRegressor:
+        """Create sklearn model pipeline, or the batched Poisson model if requested"""
 
         if model_type == ModelType.RIDGE:
             estimator = Ridge(alpha=params.get("alpha", 1))
         elif model_type == ModelType.POISSON:
+            if params.get("solver") == BATCHED_NEWTON_SOLVER:
+                return BatchedPoissonRegressor(alpha=params.get("alpha", 1))
             estimator = PoissonRegressor(alpha=params.get("alpha", 1))
         else:
             raise ValueError(f"Unknown model type: {model_type}")
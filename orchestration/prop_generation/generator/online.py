@@ -0,0 +1,238 @@
+"""
+Online ridge regression for prop lines.
+
+Instead of refitting Ridge on a window that moved by one game, each
+(player, stat) keeps an OnlineRidgeState that folds in every new game as it is
+ingested. The state is recursive least squares in information form: the
+exponentially forgotten sums
+
+    A = sum(forgetting^age * z z^T),   b = sum(forgetting^age * z y),   z = [x, 1]
+
+from which the ridge solution is refreshed after every game. Keeping A rather
+than its inverse lets the penalty stay constant instead of decaying with the
+forgetting factor, and applies it on the standardized scale like the
+StandardScaler + Ridge pipeline (the feature variances are read off A). The
+intercept is unpenalized.
+
+Generating a line is then a dot product with the stored coefficients. The
+prediction features are the decay-weighted means of recent games, as in
+FeatureExtractor, kept as a running mean.
+"""
+
+from typing import Any
+
+import numpy as np
+
+from prop_generation.generator.catalog import (
+    ONLINE_RLS_SOLVER,
+    DataScope,
+    FeatureDefinition,
+    ModelType,
+    PropConfig,
+)
+from prop_generation.generator.weighting import DEFAULT_DECAY_FACTOR
+
+# Roughly a 33 game memory, close to the sample sizes of the batch fits
+DEFAULT_FORGETTING_FACTOR = 0.97
+
+# Games a state needs before it is used instead of a batch fit
+MIN_ONLINE_GAMES = 5
+
+
+def is_online_config(config: PropConfig) -> bool:
+    """Whether the config asks to be served from online states"""
+    return (
+        config.model_type == ModelType.RIDGE
+        and config.model_params.get("solver") == ONLINE_RLS_SOLVER
+    )
+
+
+def row_value(row: Any, field: str) -> float:
+    """A stat row value as a float, with missing values as 0.0 like FeatureExtractor"""
+    try:
+        value = row[field]
+    except (KeyError, AttributeError):
+        return 0.0
+    return float(value) if value is not None else 0.0
+
+
+def game_feature_vector(
+    features: list[FeatureDefinition], player_row: Any, team_row: Any, opponent_row: Any
+) -> np.ndarray:
+    """Training features of one game, from the player's, their team's and the opponent's rows"""
+    rows = {
+        DataScope.PLAYER: player_row,
+        DataScope.TEAM: team_row,
+        DataScope.OPPONENT: opponent_row,
+    }
+    return np.array(
+        [row_value(rows[feature.scope], feature.field) for feature in features],
+        dtype=np.float64,
+    )
+
+
+class OnlineRidgeState:
+    """Recursive ridge regression state for one (player, stat)"""
+
+    def __init__(
+        self,
+        feature_names: list[str],
+        information: np.ndarray,
+        moments: np.ndarray,
+        coefficients: np.ndarray,
+        feature_means: np.ndarray,
+        mean_weight: float,
+        target_sum_squares: float,
+        games: int,
+        last_game_id: str | None = None,
+    ):
+        self.feature_names = feature_names
+        self.information = information
+        self.moments = moments
+        self.coefficients = coefficients
+        self.feature_means = feature_means
+        self.mean_weight = mean_weight
+        self.target_sum_squares = target_sum_squares
+        self.games = games
+        self.last_game_id = last_game_id
+
+    @classmethod
+    def empty(cls, feature_names: list[str]) -> "OnlineRidgeState":
+        size = len(feature_names) + 1
+        return cls(
+            feature_names=list(feature_names),
+            information=np.zeros((size, size)),
+            moments=np.zeros(size),
+            coefficients=np.zeros(size),
+            feature_means=np.zeros(size - 1),
+            mean_weight=0.0,
+            target_sum_squares=0.0,
+            games=0,
+        )
+
+    def matches(self, config: PropConfig) -> bool:
+        """Whether the state was built for the config's current feature list"""
+        return self.feature_names == [feature.name for feature in config.features]
+
+    def update(
+        self,
+        x: np.ndarray,
+        y: float,
+        alpha: float = 1.0,
+        forgetting: float = DEFAULT_FORGETTING_FACTOR,
+        decay_factor: float = DEFAULT_DECAY_FACTOR,
+        game_id: str | None = None,
+    ) -> None:
+        """Fold in one game and refresh the coefficients"""
+        z = np.append(x, 1.0)
+        self.information = forgetting * self.information + np.outer(z, z)
+        self.moments = forgetting * self.moments + z * y
+        self.target_sum_squares = forgetting * self.target_sum_squares + y * y
+
+        self.mean_weight = decay_factor * self.mean_weight + 1.0
+        self.feature_means = self.feature_means + (x - self.feature_means) / self.mean_weight
+
+        self.games += 1
+        self.last_game_id = game_id
+        self.coefficients = self.solve(alpha)
+
+    def solve(self, alpha: float) -> np.ndarray:
+        """Ridge coefficients (intercept last) for the current sums"""
+        total_weight = self.information[-1, -1]
+        means = self.information[:-1, -1] / total_weight
+        variances = np.diagonal(self.information)[:-1] / total_weight - means**2
+
+        # Penalize on the standardized scale; constant features keep a scale of 1
+        scales = np.where(variances > 1e-12, variances, 1.0)
+        penalty = np.append(alpha * scales, 0.0)
+
+        system = self.information + np.diag(penalty)
+        try:
+            return np.linalg.solve(system, self.moments)
+        except np.linalg.LinAlgError:
+            return np.linalg.lstsq(system, self.moments, rcond=None)[0]
+
+    def predict(self, x: np.ndarray) -> float:
+        return float(np.dot(self.coefficients[:-1], x) + self.coefficients[-1])
+
+    def target_sd(self) -> float:
+        """Forgetting-weighted standard deviation of the target, NaN before two games"""
+        total_weight = self.information[-1, -1]
+        if self.games < 2 or total_weight <= 1.0:
+            return float("nan")
+        target_sum = self.moments[-1]
+        variance = (self.target_sum_squares - target_sum * target_sum / total_weight) / (total_weight - 1.0)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def to_row(self) -> dict[str, Any]:
+        """Column values for the prop_model_state table"""
+        return {
+            "feature_names": self.feature_names,
+            "information": self.information.ravel().tolist(),
+            "moments": self.moments.tolist(),
+            "coefficients": self.coefficients.tolist(),
+            "feature_means": self.feature_means.tolist(),
+            "mean_weight": self.mean_weight,
+            "target_sum_squares": self.target_sum_squares,
+            "games": self.games,
+            "last_game_id": self.last_game_id,
+        }
+
+    @classmethod
+    def from_row(cls, row: dict[str, Any]) -> "OnlineRidgeState":
+        size = len(row["feature_names"]) + 1
+        return cls(
+            feature_names=list(row["feature_names"]),
+            information=np.array(row["information"], dtype=np.float64).reshape(size, size),
+            moments=np.array(row["moments"], dtype=np.float64),
+            coefficients=np.array(row["coefficients"], dtype=np.float64),
+            feature_means=np.array(row["feature_means"], dtype=np.float64),
+            mean_weight=float(row["mean_weight"]),
+            target_sum_squares=float(row["target_sum_squares"]),
+            games=int(row["games"]),
+            last_game_id=row["last_game_id"],
+        )
+
+
+def online_params(config: PropConfig) -> tuple[float, float]:
+    """(alpha, forgetting) for an online config"""
+    return (
+        config.model_params.get("alpha", 1),
+        config.model_params.get("forgetting", DEFAULT_FORGETTING_FACTOR),
+    )
+
+
+def fold_game(
+    state: OnlineRidgeState,
+    config: PropConfig,
+    player_row: Any,
+    team_row: Any,
+    opponent_row: Any,
+) -> None:
+    """Update a state with one game of the player's stats"""
+    alpha, forgetting = online_params(config)
+    state.update(
+        game_feature_vector(config.features, player_row, team_row, opponent_row),
+        row_value(player_row, config.stat_name),
+        alpha=alpha,
+        forgetting=forgetting,
+        game_id=player_row["game_id"],
+    )
+
+
+def build_online_state(
+    config: PropConfig,
+    player_stats_list: list[Any],
+    team_stats_list: list[Any],
+    prev_opponents_stats_list: list[Any],
+) -> OnlineRidgeState:
+    """Replay a player's recent games into a fresh state.
+
+    The stat lists are the ones the prop services fetch: most recent game
+    first, aligned game by game.
+    """
+    state = OnlineRidgeState.empty([feature.name for feature in config.features])
+    games = list(zip(player_stats_list, team_stats_list, prev_opponents_stats_list))
+    for player_row, team_row, opponent_row in reversed(games):
+        fold_game(state, config, player_row, team_row, opponent_row)
+    return state
@@ -0,0 +1,66 @@
+"""
+Exponential-decay weighted aggregation.
+
+Weight vectors depend only on the sample length and the decay factor, so they
+are built once per (n, decay) and cached. Means of whole feature matrices, or
+of a stack of players sharing the same sample length, are a single
+matrix-vector product against the cached weights.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_DECAY_FACTOR = 0.825
+
+
+@lru_cache(maxsize=256)
+def get_normalized_decay_weights(n: int, decay_factor: float = DEFAULT_DECAY_FACTOR) -> np.ndarray:
+    """Exponential weights for n values, oldest first, normalized to sum to 1.
+
+    The most recent value (index n-1) has raw weight decay^0 = 1. The returned
+    array is read-only since it is shared between callers.
+    """
+    weights = np.array([decay_factor ** (n - i - 1) for i in range(n)], dtype=np.float64)
+    total_weight = weights.sum()
+    if total_weight > 0:
+        weights = weights / total_weight
+    weights.setflags(write=False)
+    return weights
+
+
+def weighted_mean(values, decay_factor: float = DEFAULT_DECAY_FACTOR) -> float:
+    """Weighted mean of one series, index 0 = oldest, index -1 = most recent"""
+    n = len(values)
+    if n == 0:
+        return 0.0
+    if n == 1:
+        return values[0]
+    return float(np.dot(get_normalized_decay_weights(n, decay_factor), np.asarray(values, dtype=np.float64)))
+
+
+def weighted_column_means(matrix: np.ndarray, decay_factor: float = DEFAULT_DECAY_FACTOR) -> np.ndarray:
+    """Weighted mean of every column of an (n_games, n_features) matrix"""
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(matrix.shape[1:], dtype=np.float64)
+    if n == 1:
+        return np.array(matrix[0], dtype=np.float64)
+    return get_normalized_decay_weights(n, decay_factor) @ matrix
+
+
+def weighted_means_batch(stack: np.ndarray, decay_factor: float = DEFAULT_DECAY_FACTOR) -> np.ndarray:
+    """Weighted column means for many players at once.
+
+    Args:
+        stack: (n_players, n_games, n_features) array, every player with the same n_games
+
+    Returns:
+        (n_players, n_features) array of weighted means
+    """
+    n = stack.shape[1]
+    if n == 0:
+        return np.zeros((stack.shape[0], stack.shape[2]), dtype=np.float64)
+    if n == 1:
+        return np.array(stack[:, 0, :], dtype=np.float64)
+    return np.einsum("g,pgf->pf", get_normalized_decay_weights(n, decay_factor), stack)
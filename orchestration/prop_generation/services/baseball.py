@@ -2,10 +2,14 @@ import sys
 import traceback
 from datetime import datetime
 from time import time
+from typing import TypedDict
 from zoneinfo import ZoneInfo
-from db.games import insert_game, Game
-from db.props import insert_prop, Prop
+from db.games import Game
+from db.instrumentation import statement_budget
+from db.props import Prop
 from db.players import get_active_players_for_team, Player
+from db.model_states import get_model_states, upsert_model_states
+from db.feature_store import get_player_feature_windows, get_team_feature_windows
 from db.stats.baseball import (
     BaseballPlayerStats,
     BaseballTeamStats,
@@ -15,9 +19,9 @@ from db.stats.baseball import (
     get_baseball_team_stats_for_player,
     get_baseball_opponent_stats_for_player,
     get_baseball_league_averages,
+    get_baseball_recent_player_averages,
 )
 
-import numpy
 from prop_generation.configs.baseball import (
     BATTING_STATS,
     PITCHING_STATS,
@@ -27,11 +31,288 @@ from prop_generation.configs.baseball import (
     get_baseball_prop_configs,
     get_baseball_stats_list,
 )
-from prop_generation.generator.base import GameStats
+from prop_generation.delta import GameDelta, parse_service_args, team_window_key
+from prop_generation.feature_store import window_stats_lists
+from prop_generation.generator.columnar import ColumnarGameStats
 from prop_generation.generator.main import BasePropGenerator
+from prop_generation.generator.online import is_online_config
+from prop_generation.snapshot import StatsSnapshot, open_snapshot
+from prop_generation.writer import PropWriter
+from profiling import profiled
 from utils import data_feeds_req, setup_logger
 
 logger = setup_logger(__name__)
+# One line per generated prop; sampled so logging stays off the generation path
+prop_logger = setup_logger(f"{__name__}.props", sample_rate=0.01, max_per_second=5)
+
+
+class LeagueContext(TypedDict):
+    league: str
+    stats_list: list[str]
+    configs: dict
+    online_stats: list[str]
+    league_avg_at_bats: float
+    league_avg_stolen_bases: float
+    snapshot: StatsSnapshot | None
+
+
+def prepare_league(league: str) -> LeagueContext:
+    """League-wide inputs shared by every game of the slate"""
+    stats_list = get_baseball_stats_list()
+    configs = get_baseball_prop_configs()
+
+    logger.info(f"Fetching {league} league average at bats")
+    league_avg_at_bats_data: LeagueAverages = get_baseball_league_averages(
+        league, "at_bats"
+    )
+
+    logger.info(f"Fetching {league} league average stolen bases")
+    league_avg_stolen_bases_data: LeagueAverages = get_baseball_league_averages(
+        league, "stolen_bases"
+    )
+
+    return {
+        "league": league,
+        "stats_list": stats_list,
+        "configs": configs,
+        "online_stats": [stat for stat, config in configs.items() if is_online_config(config)],
+        "league_avg_at_bats": league_avg_at_bats_data["average"],
+        "league_avg_stolen_bases": league_avg_stolen_bases_data["average"],
+        "snapshot": open_snapshot(league),
+    }
+
+
+@profiled
+@statement_budget()
+def generate_game_props(
+    context: LeagueContext,
+    game: dict,
+    writer: PropWriter,
+    delta_mode: bool = False,
+    team_ids: list[int] | None = None,
+) -> tuple[int, int]:
+    """Generate a game's props onto the writer.
+
+    Args:
+        context: The league's prepared inputs
+        game: Game from the schedule feed
+        writer: Writer the game and its props are added to
+        delta_mode: Skip players whose inputs are unchanged since the last run
+        team_ids: Only generate for these teams of the game (defaults to both)
+
+    Returns:
+        Props generated and players skipped as unchanged
+    """
+    stats_list = context["stats_list"]
+    configs = context["configs"]
+    snapshot = context["snapshot"]
+    props_generated = 0
+
+    game_team_ids: list[int] = [game["home_team_ID"], game["away_team_ID"]]
+    starting_pitcher_ids = [
+        game["home_pitcher"]["player_id"],
+        game["away_pitcher"]["player_id"],
+    ]
+
+    game_data: Game = {
+        "game_id": game["game_ID"],
+        "start_time": game["game_time"],
+        "home_team_id": game_team_ids[0],
+        "away_team_id": game_team_ids[1],
+        "league": "MLB",
+    }
+
+    writer.add_game(game_data)
+    game_delta = GameDelta("MLB", game["game_ID"], delta_mode, team_ids)
+
+    # Players with their game data and eligible stats, for the game's teams
+    candidates: list[tuple[Player, ColumnarGameStats, list[str]]] = []
+
+    team_windows = get_team_feature_windows("MLB", game_team_ids) if snapshot is None else {}
+
+    for index, team_id in enumerate(game_team_ids):
+        if team_ids is not None and team_id not in team_ids:
+            continue
+
+        curr_opponent_id = game_team_ids[1] if index == 0 else game_team_ids[0]
+        opponent_window_key = team_window_key(
+            "baseball", "MLB", curr_opponent_id, team_windows, snapshot
+        )
+        team_active_players_data: list[Player] = get_active_players_for_team(
+            "MLB", team_id
+        )
+        team_player_ids = [team_player["player_id"] for team_player in team_active_players_data]
+
+        # Eligibility from one aggregate over the roster; only eligible players are fetched
+        recent_averages = (
+            get_baseball_recent_player_averages(
+                team_player_ids, "MLB", SAMPLE_SIZE, ["at_bats", "stolen_bases"]
+            )
+            if snapshot is None
+            else snapshot.recent_averages(team_player_ids, SAMPLE_SIZE, ["at_bats", "stolen_bases"])
+        )
+
+        eligible_players = []
+        for player in team_active_players_data:
+            player_averages = recent_averages.get(player["player_id"])
+            if player_averages is None:
+                continue
+
+            eligible_stats = []
+            for stat in stats_list:
+                if stat in PITCHING_STATS:
+                    if player["player_id"] in starting_pitcher_ids:
+                        eligible_stats.append(stat)
+                elif stat == "stolen_bases":
+                    if (
+                        player_averages["stolen_bases"]
+                        >= context["league_avg_stolen_bases"]
+                        * ELIGIBILITY_THRESHOLDS["stolen_bases"]
+                        and player["position"] != "P"
+                    ):
+                        eligible_stats.append(stat)
+                elif stat in BATTING_STATS:
+                    if (
+                        player_averages["at_bats"]
+                        >= context["league_avg_at_bats"]
+                        * ELIGIBILITY_THRESHOLDS["at_bats"]
+                        and player["position"] != "P"
+                    ):
+                        eligible_stats.append(stat)
+
+            if not eligible_stats:
+                prop_logger.info("No eligible stats, skipping player %s", player["name"])
+                continue
+
+            eligible_players.append((player, eligible_stats))
+
+        eligible_player_ids = [player["player_id"] for player, _ in eligible_players]
+        model_states = get_model_states("MLB", eligible_player_ids, context["online_stats"])
+        player_windows = (
+            get_player_feature_windows("MLB", eligible_player_ids) if snapshot is None else {}
+        )
+
+        for player, eligible_stats in eligible_players:
+            if game_delta.unchanged(
+                player,
+                eligible_stats,
+                recent_averages[player["player_id"]],
+                player_windows.get(player["player_id"], {}).get("game_ids"),
+                opponent_window_key,
+            ):
+                continue
+
+            if snapshot is not None:
+                stored_stats_lists = snapshot.stats_lists(
+                    player["player_id"], curr_opponent_id, SAMPLE_SIZE
+                )
+            else:
+                stored_stats_lists = window_stats_lists(
+                    "baseball",
+                    player_windows.get(player["player_id"]),
+                    team_windows.get(curr_opponent_id),
+                )
+            if stored_stats_lists is not None:
+                (
+                    player_stats_list,
+                    team_stats_list,
+                    prev_opponent_stats_list,
+                    curr_opponents_stats_list,
+                ) = stored_stats_lists
+            else:
+                player_stats_list: list[BaseballPlayerStats] = (
+                    get_baseball_player_stats(
+                        league="MLB",
+                        player_id=player["player_id"],
+                        limit=SAMPLE_SIZE,
+                    )
+                )
+
+            if not player_stats_list:
+                continue
+
+            if stored_stats_lists is None:
+                team_stats_list: list[BaseballTeamStats] = (
+                    get_baseball_team_stats_for_player(
+                        league="MLB",
+                        player_id=player["player_id"],
+                        limit=SAMPLE_SIZE,
+                    )
+                )
+                prev_opponent_stats_list: list[BaseballTeamStats] = (
+                    get_baseball_opponent_stats_for_player(
+                        league="MLB",
+                        player_id=player["player_id"],
+                        limit=SAMPLE_SIZE,
+                    )
+                )
+                curr_opponents_stats_list: list[BaseballTeamStats] = (
+                    get_baseball_team_stats(
+                        league="MLB",
+                        team_id=curr_opponent_id,
+                        limit=SAMPLE_SIZE,
+                    )
+                )
+
+            games_stats_data = ColumnarGameStats(
+                player_stats_list=player_stats_list,
+                team_stats_list=team_stats_list,
+                prev_opponents_stats_list=prev_opponent_stats_list,
+                curr_opponent_stats_list=curr_opponents_stats_list,
+                model_states={
+                    stat: state
+                    for (player_id, stat), state in model_states.items()
+                    if player_id == player["player_id"]
+                },
+            )
+
+            candidates.append((player, games_stats_data, eligible_stats))
+
+    # One stat at a time across the players, so batched models fit together
+    generator = BasePropGenerator()
+
+    for stat in stats_list:
+        stat_candidates = [
+            (player, games_stats_data)
+            for player, games_stats_data, eligible_stats in candidates
+            if stat in eligible_stats
+        ]
+        if not stat_candidates:
+            continue
+
+        config = configs[stat]
+        prop_lines = generator.generate_props(
+            config, [games_stats_data for _, games_stats_data in stat_candidates]
+        )
+
+        for (player, _), prop_line in zip(stat_candidates, prop_lines):
+            if prop_line > 0:
+                prop_data: Prop = {
+                    "line": prop_line,
+                    "stat_name": config.stat_name,
+                    "stat_display_name": config.display_name,
+                    "player_id": player["player_id"],
+                    "league": "MLB",
+                    "game_id": game["game_ID"],
+                    "choices": (
+                        ["over", "under"]
+                        if prop_line > MIN_LINE_FOR_UNDER
+                        else ["over"]
+                    ),
+                }
+
+                writer.add_prop(prop_data)
+                game_delta.record_prop(player["player_id"], config.stat_name)
+
+                props_generated += 1
+                prop_logger.info(
+                    "Generated prop for %s - %s: %s", player["name"], config.display_name, prop_line
+                )
+
+    upsert_model_states(generator.take_pending_model_states())
+
+    game_delta.finish(writer)
+    return props_generated, game_delta.skipped
 
 
 def main() -> None:
@@ -39,10 +320,12 @@ def main() -> None:
     try:
         start = time()
         total_props_generated = 0
+        players_skipped = 0
 
+        date_arg, delta_mode = parse_service_args(sys.argv)
         today_str = (
-            sys.argv[1]
-            if len(sys.argv) > 1
+            date_arg
+            if date_arg
             else datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d")
         )
         today_schedule_req = data_feeds_req(f"/schedule/{today_str}/MLB")
@@ -53,143 +336,18 @@ def main() -> None:
         games_today = today_schedule_req.json()
         games_list = games_today["data"]["MLB"]
 
-        stats_list = get_baseball_stats_list()
-        configs = get_baseball_prop_configs()
-
-        logger.info("Fetching MLB league average at bats")
-        league_avg_at_bats_data: LeagueAverages = get_baseball_league_averages(
-            "MLB", "at_bats"
-        )
-
-        logger.info("Fetching MLB league average stolen bases")
-        league_avg_stolen_bases_data: LeagueAverages = get_baseball_league_averages(
-            "MLB", "stolen_bases"
-        )
+        context = prepare_league("MLB")
+        writer = PropWriter("MLB")
 
         for i, game in enumerate(games_list):
             logger.info(f"Processing MLB game {game['game_ID']} ({i + 1}/{len(game)})")
-            team_ids: list[int] = [game["home_team_ID"], game["away_team_ID"]]
-            starting_pitcher_ids = [
-                game["home_pitcher"]["player_id"],
-                game["away_pitcher"]["player_id"],
-            ]
-
-            game_data: Game = {
-                "game_id": game["game_ID"],
-                "start_time": game["game_time"],
-                "home_team_id": team_ids[0],
-                "away_team_id": team_ids[1],
-                "league": "MLB",
-            }
-
-            insert_game(game_data)
-
-            for index, team_id in enumerate(team_ids):
-                team_active_players_data: list[Player] = get_active_players_for_team(
-                    "MLB", team_id
-                )
-
-                for player in team_active_players_data:
-                    eligible_stats = []
-                    player_stats_list: list[BaseballPlayerStats] = (
-                        get_baseball_player_stats(
-                            league="MLB",
-                            player_id=player["player_id"],
-                            limit=SAMPLE_SIZE,
-                        )
-                    )
-
-                    if not player_stats_list:
-                        continue
-
-                    avg_at_bats = numpy.mean(
-                        [game_stats["at_bats"] for game_stats in player_stats_list]
-                    )
-                    avg_stolen_bases = numpy.mean(
-                        [game_stats["stolen_bases"] for game_stats in player_stats_list]
-                    )
-
-                    for stat in stats_list:
-                        if stat in PITCHING_STATS:
-                            if player["player_id"] in starting_pitcher_ids:
-                                eligible_stats.append(stat)
-                        elif stat == "stolen_bases":
-                            if (
-                                avg_stolen_bases
-                                >= league_avg_stolen_bases_data["average"]
-                                * ELIGIBILITY_THRESHOLDS["stolen_bases"]
-                                and player["position"] != "P"
-                            ):
-                                eligible_stats.append(stat)
-                        elif stat in BATTING_STATS:
-                            if (
-                                avg_at_bats
-                                >= league_avg_at_bats_data["average"]
-                                * ELIGIBILITY_THRESHOLDS["at_bats"]
-                                and player["position"] != "P"
-                            ):
-                                eligible_stats.append(stat)
-
-                    if not eligible_stats:
-                        logger.info(f"No eligible stats skipping player")
-                        continue
-
-                    team_stats_list: list[BaseballTeamStats] = (
-                        get_baseball_team_stats_for_player(
-                            league="MLB",
-                            player_id=player["player_id"],
-                            limit=SAMPLE_SIZE,
-                        )
-                    )
-                    prev_opponent_stats_list: list[BaseballTeamStats] = (
-                        get_baseball_opponent_stats_for_player(
-                            league="MLB",
-                            player_id=player["player_id"],
-                            limit=SAMPLE_SIZE,
-                        )
-                    )
-                    curr_opponents_stats_list: list[BaseballTeamStats] = (
-                        get_baseball_team_stats(
-                            league="MLB",
-                            team_id=team_ids[1] if index == 0 else team_ids[0],
-                            limit=SAMPLE_SIZE,
-                        )
-                    )
-
-                    games_stats_data = GameStats(
-                        player_stats_list=player_stats_list,
-                        team_stats_list=team_stats_list,
-                        prev_opponents_stats_list=prev_opponent_stats_list,
-                        curr_opponent_stats_list=curr_opponents_stats_list,
-                    )
+            props_generated, game_players_skipped = generate_game_props(context, game, writer, delta_mode)
+            total_props_generated += props_generated
+            players_skipped += game_players_skipped
 
-                    generator = BasePropGenerator()
-
-                    for stat in eligible_stats:
-                        config = configs[stat]
-                        prop_line = generator.generate_prop(config, games_stats_data)
-
-                        if prop_line > 0:
-                            prop_data: Prop = {
-                                "line": prop_line,
-                                "stat_name": config.stat_name,
-                                "stat_display_name": config.display_name,
-                                "player_id": player["player_id"],
-                                "league": "MLB",
-                                "game_id": game["game_ID"],
-                                "choices": (
-                                    ["over", "under"]
-                                    if prop_line > MIN_LINE_FOR_UNDER
-                                    else ["over"]
-                                ),
-                            }
-
-                            insert_prop(prop_data)
-
-                            total_props_generated += 1
-                            logger.info(
-                                f"Generated prop for {player['name']} - {config.display_name}: {prop_line}"
-                            )
+        writer.flush()
+        if delta_mode:
+            logger.info(f"{players_skipped} MLB players skipped as unchanged")
 
         end = time()
         logger.info(
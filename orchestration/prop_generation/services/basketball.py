@@ -2,10 +2,14 @@ import sys
 import traceback
 from datetime import datetime
 from time import time
+from typing import TypedDict
 from zoneinfo import ZoneInfo
-from db.games import insert_game, Game
-from db.props import insert_prop, Prop
+from db.games import Game
+from db.instrumentation import statement_budget
+from db.props import Prop
 from db.players import get_active_players_for_team, Player
+from db.model_states import get_model_states, upsert_model_states
+from db.feature_store import get_player_feature_windows, get_team_feature_windows
 from db.stats.basketball import (
     BasketballPlayerStats,
     BasketballTeamStats,
@@ -15,9 +19,9 @@ from db.stats.basketball import (
     get_basketball_team_stats_for_player,
     get_basketball_opponent_stats_for_player,
     get_basketball_league_averages,
+    get_basketball_recent_player_averages,
 )
 
-import numpy
 from prop_generation.configs.basketball import (
     ELIGIBILITY_THRESHOLDS,
     SAMPLE_SIZE,
@@ -25,11 +29,19 @@ from prop_generation.configs.basketball import (
     get_basketball_prop_configs,
     get_basketball_stats_list,
 )
-from prop_generation.generator.base import GameStats
+from prop_generation.delta import GameDelta, parse_service_args, team_window_key
+from prop_generation.feature_store import window_stats_lists
+from prop_generation.generator.columnar import ColumnarGameStats
 from prop_generation.generator.main import BasePropGenerator
+from prop_generation.generator.online import is_online_config
+from prop_generation.snapshot import StatsSnapshot, open_snapshot
+from prop_generation.writer import PropWriter
+from profiling import profiled
 from utils import data_feeds_req, setup_logger
 
 logger = setup_logger(__name__)
+# One line per generated prop; sampled so logging stays off the generation path
+prop_logger = setup_logger(f"{__name__}.props", sample_rate=0.01, max_per_second=5)
 
 
 def is_stat_eligible_for_player(
@@ -60,176 +72,294 @@ def get_position_umbrella(position: str):
         return "C"
 
 
+class LeagueContext(TypedDict):
+    league: str
+    stats_list: list[str]
+    configs: dict
+    online_stats: list[str]
+    eligibility_fields: list[str]
+    leagues_averages: dict[str, dict[str, float]]
+    league_avg_minutes: float
+    snapshot: StatsSnapshot | None
+
+
+def prepare_league(league: str) -> LeagueContext:
+    """League-wide inputs shared by every game of the league's slate"""
+    stats_list = get_basketball_stats_list()
+    configs = get_basketball_prop_configs()
+
+    leagues_averages = {}
+    for stat in stats_list:
+        config = configs[stat]
+        leagues_averages[stat] = {}
+        for position in ["G", "F", "C"]:
+            logger.info(f"Fetching league average {stat} for {position}")
+            league_position_avg: LeagueAverages = (
+                get_basketball_league_averages(
+                    league=league, stat=config.stat_name, position=position
+                )
+            )
+            leagues_averages[stat][position] = league_position_avg["average"]
+
+    league_avg_minutes_data: LeagueAverages = get_basketball_league_averages(
+        league=league, stat="minutes"
+    )
+
+    return {
+        "league": league,
+        "stats_list": stats_list,
+        "configs": configs,
+        "online_stats": [stat for stat, config in configs.items() if is_online_config(config)],
+        "eligibility_fields": ["minutes", *sorted({configs[stat].stat_name for stat in stats_list})],
+        "leagues_averages": leagues_averages,
+        "league_avg_minutes": league_avg_minutes_data["average"],
+        "snapshot": open_snapshot(league),
+    }
+
+
+@profiled
+@statement_budget()
+def generate_game_props(
+    context: LeagueContext,
+    game: dict,
+    writer: PropWriter,
+    delta_mode: bool = False,
+    team_ids: list[int] | None = None,
+) -> tuple[int, int]:
+    """Generate a game's props onto the writer.
+
+    Args:
+        context: The league's prepared inputs
+        game: Game from the schedule feed
+        writer: Writer the game and its props are added to
+        delta_mode: Skip players whose inputs are unchanged since the last run
+        team_ids: Only generate for these teams of the game (defaults to both)
+
+    Returns:
+        Props generated and players skipped as unchanged
+    """
+    league = context["league"]
+    stats_list = context["stats_list"]
+    configs = context["configs"]
+    leagues_averages = context["leagues_averages"]
+    snapshot = context["snapshot"]
+    props_generated = 0
+
+    game_team_ids: list[int] = [game["home_team_ID"], game["away_team_ID"]]
+
+    game_data: Game = {
+        "game_id": game["game_ID"],
+        "start_time": game["game_time"],
+        "home_team_id": game_team_ids[0],
+        "away_team_id": game_team_ids[1],
+        "league": league,
+    }
+    writer.add_game(game_data)
+    game_delta = GameDelta(league, game["game_ID"], delta_mode, team_ids)
+
+    team_windows = get_team_feature_windows(league, game_team_ids) if snapshot is None else {}
+
+    for index, team_id in enumerate(game_team_ids):
+        if team_ids is not None and team_id not in team_ids:
+            continue
+
+        curr_opponent_id = game_team_ids[1] if index == 0 else game_team_ids[0]
+        opponent_window_key = team_window_key(
+            "basketball", league, curr_opponent_id, team_windows, snapshot
+        )
+        team_active_players_data: list[Player] = (
+            get_active_players_for_team(league, team_id)
+        )
+        team_player_ids = [team_player["player_id"] for team_player in team_active_players_data]
+
+        # Eligibility from one aggregate over the roster; only eligible players are fetched
+        recent_averages = (
+            get_basketball_recent_player_averages(
+                team_player_ids, league, SAMPLE_SIZE, context["eligibility_fields"]
+            )
+            if snapshot is None
+            else snapshot.recent_averages(team_player_ids, SAMPLE_SIZE, context["eligibility_fields"])
+        )
+
+        eligible_players = []
+        for player in team_active_players_data:
+            player_averages = recent_averages.get(player["player_id"])
+            if player_averages is None:
+                continue
+
+            position_umbrella = get_position_umbrella(player["position"])
+            eligible_stats = [
+                stat
+                for stat in stats_list
+                if is_stat_eligible_for_player(
+                    stat,
+                    player_averages[configs[stat].stat_name],
+                    leagues_averages[stat][position_umbrella],
+                    player_averages["minutes"],
+                    context["league_avg_minutes"],
+                )
+            ]
+
+            if not eligible_stats:
+                logger.warning(f"No eligible stats for {player['name']}")
+                continue
+
+            eligible_players.append((player, eligible_stats))
+
+        eligible_player_ids = [player["player_id"] for player, _ in eligible_players]
+        model_states = get_model_states(league, eligible_player_ids, context["online_stats"])
+        player_windows = (
+            get_player_feature_windows(league, eligible_player_ids) if snapshot is None else {}
+        )
+
+        for player, eligible_stats in eligible_players:
+            if game_delta.unchanged(
+                player,
+                eligible_stats,
+                recent_averages[player["player_id"]],
+                player_windows.get(player["player_id"], {}).get("game_ids"),
+                opponent_window_key,
+            ):
+                continue
+
+            if snapshot is not None:
+                stored_stats_lists = snapshot.stats_lists(
+                    player["player_id"], curr_opponent_id, SAMPLE_SIZE
+                )
+            else:
+                stored_stats_lists = window_stats_lists(
+                    "basketball",
+                    player_windows.get(player["player_id"]),
+                    team_windows.get(curr_opponent_id),
+                )
+            if stored_stats_lists is not None:
+                (
+                    player_stats_list,
+                    team_stats_list,
+                    prev_opponent_stats_list,
+                    curr_opponents_stats_list,
+                ) = stored_stats_lists
+            else:
+                player_stats_list: list[BasketballPlayerStats] = (
+                    get_basketball_player_stats(
+                        league=league,
+                        player_id=player["player_id"],
+                        limit=SAMPLE_SIZE,
+                    )
+                )
+
+            if not player_stats_list:
+                continue
+
+            if stored_stats_lists is None:
+                team_stats_list: list[BasketballTeamStats] = (
+                    get_basketball_team_stats_for_player(
+                        league=league,
+                        player_id=player["player_id"],
+                        limit=SAMPLE_SIZE,
+                    )
+                )
+                prev_opponent_stats_list: list[BasketballTeamStats] = (
+                    get_basketball_opponent_stats_for_player(
+                        league=league,
+                        player_id=player["player_id"],
+                        limit=SAMPLE_SIZE,
+                    )
+                )
+                curr_opponents_stats_list: list[BasketballTeamStats] = (
+                    get_basketball_team_stats(
+                        league=league,
+                        team_id=curr_opponent_id,
+                        limit=SAMPLE_SIZE,
+                    )
+                )
+
+            games_stats_data = ColumnarGameStats(
+                player_stats_list=player_stats_list,
+                team_stats_list=team_stats_list,
+                prev_opponents_stats_list=prev_opponent_stats_list,
+                curr_opponent_stats_list=curr_opponents_stats_list,
+                model_states={
+                    stat: state
+                    for (player_id, stat), state in model_states.items()
+                    if player_id == player["player_id"]
+                },
+            )
+
+            generator = BasePropGenerator()
+
+            for stat in eligible_stats:
+                config = configs[stat]
+                prop_line = generator.generate_prop(
+                    config, games_stats_data
+                )
+
+                if prop_line > 0:
+                    prop_data: Prop = {
+                        "line": prop_line,
+                        "stat_name": config.stat_name,
+                        "stat_display_name": config.display_name,
+                        "player_id": player["player_id"],
+                        "league": league,
+                        "game_id": game["game_ID"],
+                        "choices": (
+                            ["over", "under"]
+                            if prop_line > MIN_LINE_FOR_UNDER
+                            else ["over"]
+                        ),
+                    }
+
+                    writer.add_prop(prop_data)
+                    game_delta.record_prop(player["player_id"], config.stat_name)
+
+                    props_generated += 1
+                    prop_logger.info(
+                        "Generated prop for %s - %s: %s", player["name"], config.display_name, prop_line
+                    )
+
+            upsert_model_states(generator.take_pending_model_states())
+
+    game_delta.finish(writer)
+    return props_generated, game_delta.skipped
+
+
 def main():
     try:
         start = time()
         total_props_generated = 0
 
+        date_arg, delta_mode = parse_service_args(sys.argv)
         today_str = (
-            sys.argv[1]
-            if len(sys.argv) > 1
+            date_arg
+            if date_arg
             else datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d")
         )
 
-        stats_list = get_basketball_stats_list()
-        configs = get_basketball_prop_configs()
-
         for league in ["NCAABB", "NBA"]:
             today_schedule_req = data_feeds_req(f"/schedule/{today_str}/{league}")
             if today_schedule_req.status_code == 304:
                 logger.info(f"No {league} games today, skipping")
                 continue
 
-            leagues_averages = {}
-            for stat in stats_list:
-                config = configs[stat]
-                leagues_averages[stat] = {}
-                for position in ["G", "F", "C"]:
-                    logger.info(f"Fetching league average {stat} for {position}")
-                    league_position_avg: LeagueAverages = (
-                        get_basketball_league_averages(
-                            league=league, stat=config.stat_name, position=position
-                        )
-                    )
-                    leagues_averages[stat][position] = league_position_avg["average"]
-
+            context = prepare_league(league)
             league_props_generated = 0
-
-            league_avg_minutes_data: LeagueAverages = get_basketball_league_averages(
-                league=league, stat="minutes"
-            )
+            league_players_skipped = 0
+            writer = PropWriter(league)
 
             games_today = today_schedule_req.json()
             games_list = games_today["data"][league]
+
             for i, game in enumerate(games_list):
                 logger.info(f"Processing game {game['game_ID']} ({i + 1}/{len(game)})")
-                team_ids: list[int] = [game["home_team_ID"], game["away_team_ID"]]
-
-                game_data: Game = {
-                    "game_id": game["game_ID"],
-                    "start_time": game["game_time"],
-                    "home_team_id": team_ids[0],
-                    "away_team_id": team_ids[1],
-                    "league": league,
-                }
-                insert_game(game_data)
-
-                for index, team_id in enumerate(team_ids):
-                    team_active_players_data: list[Player] = (
-                        get_active_players_for_team(league, team_id)
-                    )
-
-                    for player in team_active_players_data:
-                        eligible_stats = []
-                        position_umbrella = get_position_umbrella(player["position"])
-
-                        player_stats_list: list[BasketballPlayerStats] = (
-                            get_basketball_player_stats(
-                                league=league,
-                                player_id=player["player_id"],
-                                limit=SAMPLE_SIZE,
-                            )
-                        )
-
-                        if not player_stats_list:
-                            continue
-
-                        avg_minutes = float(
-                            numpy.mean(
-                                [
-                                    game_stats["minutes"]
-                                    for game_stats in player_stats_list
-                                ]
-                            )
-                        )
-
-                        for stat in stats_list:
-                            stat_config = configs[stat]
-                            league_stat_avg = leagues_averages[stat][position_umbrella]
-
-                            player_stat_avg = float(
-                                numpy.mean(
-                                    [
-                                        game_stats[stat_config.stat_name]
-                                        for game_stats in player_stats_list
-                                    ]
-                                )
-                            )
-
-                            if is_stat_eligible_for_player(
-                                stat,
-                                player_stat_avg,
-                                league_stat_avg,
-                                avg_minutes,
-                                league_avg_minutes_data["average"],
-                            ):
-                                eligible_stats.append(stat)
-
-                        if not eligible_stats:
-                            logger.warning(f"No eligible stats for {player['name']}")
-                            continue
-
-                        team_stats_list: list[BasketballTeamStats] = (
-                            get_basketball_team_stats_for_player(
-                                league=league,
-                                player_id=player["player_id"],
-                                limit=SAMPLE_SIZE,
-                            )
-                        )
-                        prev_opponent_stats_list: list[BasketballTeamStats] = (
-                            get_basketball_opponent_stats_for_player(
-                                league=league,
-                                player_id=player["player_id"],
-                                limit=SAMPLE_SIZE,
-                            )
-                        )
-                        curr_opponents_stats_list: list[BasketballTeamStats] = (
-                            get_basketball_team_stats(
-                                league=league,
-                                team_id=team_ids[1] if index == 0 else team_ids[0],
-                                limit=SAMPLE_SIZE,
-                            )
-                        )
-
-                        games_stats_data = GameStats(
-                            player_stats_list=player_stats_list,
-                            team_stats_list=team_stats_list,
-                            prev_opponents_stats_list=prev_opponent_stats_list,
-                            curr_opponent_stats_list=curr_opponents_stats_list,
-                        )
-
-                        generator = BasePropGenerator()
-
-                        for stat in eligible_stats:
-                            config = configs[stat]
-                            prop_line = generator.generate_prop(
-                                config, games_stats_data
-                            )
-
-                            if prop_line > 0:
-                                prop_data: Prop = {
-                                    "line": prop_line,
-                                    "stat_name": config.stat_name,
-                                    "stat_display_name": config.display_name,
-                                    "player_id": player["player_id"],
-                                    "league": league,
-                                    "game_id": game["game_ID"],
-                                    "choices": (
-                                        ["over", "under"]
-                                        if prop_line > MIN_LINE_FOR_UNDER
-                                        else ["over"]
-                                    ),
-                                }
-
-                                insert_prop(prop_data)
-
-                                league_props_generated += 1
-                                total_props_generated += 1
-                                logger.info(
-                                    f"Generated prop for {player['name']} - {config.display_name}: {prop_line}"
-                                )
+                props_generated, players_skipped = generate_game_props(context, game, writer, delta_mode)
+                league_props_generated += props_generated
+                league_players_skipped += players_skipped
 
+            writer.flush()
+            total_props_generated += league_props_generated
             logger.info(f"{league_props_generated} props generated for {league}")
+            if delta_mode:
+                logger.info(f"{league_players_skipped} {league} players skipped as unchanged")
 
         end = time()
         logger.info(
@@ -0,0 +1,272 @@
+"""
+On-disk stat snapshots for prop generation.
+
+export_snapshot writes a league's player and team stat histories to a
+directory of .npy files, one per column, which StatsSnapshot opens memory
+mapped. The reader answers the same four questions the prop services ask the
+stat tables (a player's recent games, their team's and opponent's rows for
+those games, and a team's recent games) by slicing the mapped columns, so
+generation can run from a snapshot without touching the stat tables or
+loading whole histories into memory.
+
+Layout of <directory>/<league>/:
+
+- manifest.json: league, sport, export time, row counts and column names
+- players/*.npy: active player rows sorted by player_id, most recent game
+  first, with team_row / opponent_row pointing at the matching team rows
+  (-1 when the team row is missing)
+- teams/*.npy: team rows sorted by team_id, most recent game first
+- players/ids.npy, players/offsets.npy (and the same for teams): each id's
+  rows are offsets[i]:offsets[i + 1]
+
+Numeric fields are float64 with NaN for missing values, which come back as None.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+
+from db.snapshots import get_player_stat_history, get_team_stat_history
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Directory the prop services read stat histories from instead of the database
+STATS_SNAPSHOT_DIR = os.getenv("STATS_SNAPSHOT_DIR")
+
+SNAPSHOT_VERSION = 1
+
+# Columns kept with their own dtype rather than as float64 stats
+ID_COLUMNS = {"player_id": np.int64, "team_id": np.int64, "opponent_team_id": np.int64}
+TEXT_COLUMNS = ["game_id"]
+
+
+def _numeric_fields(rows: list[dict[str, Any]]) -> list[str]:
+    """Fields whose values are all numbers or None"""
+    if not rows:
+        return []
+    fields = []
+    for field in rows[0]:
+        if field in ID_COLUMNS or field in TEXT_COLUMNS:
+            continue
+        if all(
+            row[field] is None or (isinstance(row[field], (int, float, Decimal)) and not isinstance(row[field], bool))
+            for row in rows
+        ):
+            fields.append(field)
+    return fields
+
+
+def _index(ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Distinct ids of a sorted id column and the offsets of their rows"""
+    if len(ids) == 0:
+        return np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    starts = np.flatnonzero(np.diff(ids)) + 1
+    offsets = np.concatenate([[0], starts, [len(ids)]]).astype(np.int64)
+    return ids[offsets[:-1]], offsets
+
+
+def _write_table(directory: str, rows: list[dict[str, Any]], id_field: str, extra: dict[str, np.ndarray]) -> list[str]:
+    os.makedirs(directory)
+    fields = _numeric_fields(rows)
+
+    columns: dict[str, np.ndarray] = dict(extra)
+    for field, dtype in ID_COLUMNS.items():
+        if rows and field in rows[0]:
+            columns[field] = np.array([row[field] for row in rows], dtype=dtype)
+    for field in TEXT_COLUMNS:
+        columns[field] = np.array([str(row[field]) for row in rows], dtype=np.str_)
+    for field in fields:
+        columns[field] = np.array(
+            [np.nan if row[field] is None else float(row[field]) for row in rows], dtype=np.float64
+        )
+
+    ids = columns.get(id_field, np.empty(0, dtype=np.int64))
+    columns["ids"], columns["offsets"] = _index(ids)
+
+    for name, column in columns.items():
+        np.save(os.path.join(directory, f"{name}.npy"), column, allow_pickle=False)
+    return fields
+
+
+def write_snapshot(
+    directory: str,
+    league: str,
+    sport: str,
+    player_rows: list[dict[str, Any]],
+    team_rows: list[dict[str, Any]],
+) -> str:
+    """Write stat rows as a snapshot, replacing any previous one of the league.
+
+    Args:
+        directory: Snapshot root
+        league: League of the rows
+        sport: Sport of the league
+        player_rows: Active player rows ordered by player_id, most recent game first,
+            with an opponent_team_id
+        team_rows: Team rows ordered by team_id, most recent game first
+
+    Returns:
+        Path of the league's snapshot
+    """
+    league_dir = os.path.join(directory, league)
+    staging_dir = f"{league_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    team_row_index = {(row["game_id"], row["team_id"]): index for index, row in enumerate(team_rows)}
+    pointers = {
+        "team_row": np.array(
+            [team_row_index.get((row["game_id"], row["team_id"]), -1) for row in player_rows], dtype=np.int64
+        ),
+        "opponent_row": np.array(
+            [team_row_index.get((row["game_id"], row["opponent_team_id"]), -1) for row in player_rows],
+            dtype=np.int64,
+        ),
+    }
+
+    os.makedirs(staging_dir)
+    player_fields = _write_table(os.path.join(staging_dir, "players"), player_rows, "player_id", pointers)
+    team_fields = _write_table(os.path.join(staging_dir, "teams"), team_rows, "team_id", {})
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "league": league,
+        "sport": sport,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "player_rows": len(player_rows),
+        "team_rows": len(team_rows),
+        "player_fields": player_fields,
+        "team_fields": team_fields,
+    }
+    with open(os.path.join(staging_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the finished snapshot in so readers never see a partial one
+    previous_dir = f"{league_dir}.old-{os.getpid()}"
+    if os.path.exists(league_dir):
+        os.rename(league_dir, previous_dir)
+    os.rename(staging_dir, league_dir)
+    shutil.rmtree(previous_dir, ignore_errors=True)
+
+    return league_dir
+
+
+def export_snapshot(directory: str, league: str, sport: str) -> str:
+    """Export a league's stat histories from the database to a snapshot"""
+    player_rows = get_player_stat_history(sport, league)
+    team_rows = get_team_stat_history(sport, league)
+    league_dir = write_snapshot(directory, league, sport, player_rows, team_rows)
+    logger.info(f"Exported {len(player_rows)} player and {len(team_rows)} team {league} stat rows to {league_dir}")
+    return league_dir
+
+
+class _SnapshotTable:
+    """Memory-mapped columns of one table with its id index"""
+
+    def __init__(self, directory: str, fields: list[str]):
+        self.fields = fields
+        self.columns = {
+            file_name[:-4]: np.load(os.path.join(directory, file_name), mmap_mode="r")
+            for file_name in os.listdir(directory)
+            if file_name.endswith(".npy")
+        }
+        self.ids = self.columns.pop("ids")
+        self.offsets = self.columns.pop("offsets")
+
+    def row_range(self, row_id: int) -> tuple[int, int]:
+        """Row span of an id, empty when the id has no rows"""
+        position = int(np.searchsorted(self.ids, row_id))
+        if position == len(self.ids) or self.ids[position] != row_id:
+            return 0, 0
+        return int(self.offsets[position]), int(self.offsets[position + 1])
+
+    def rows(self, indices: np.ndarray, league: str) -> list[dict[str, Any]]:
+        """Stat rows for the given row numbers, shaped like the query results"""
+        if len(indices) == 0:
+            return []
+        rows = [{"league": league} for _ in range(len(indices))]
+        for field in [*ID_COLUMNS, *TEXT_COLUMNS]:
+            if field in self.columns:
+                for row, value in zip(rows, self.columns[field][indices].tolist()):
+                    row[field] = value
+        for field in self.fields:
+            for row, value in zip(rows, self.columns[field][indices].tolist()):
+                row[field] = None if value != value else value
+        return rows
+
+
+class StatsSnapshot:
+    """Read-only view of a league's snapshot, answering the prop services' stat queries"""
+
+    def __init__(self, directory: str, league: str):
+        league_dir = os.path.join(directory, league)
+        with open(os.path.join(league_dir, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.manifest['version']} in {league_dir}")
+
+        self.league = league
+        self.players = _SnapshotTable(os.path.join(league_dir, "players"), self.manifest["player_fields"])
+        self.teams = _SnapshotTable(os.path.join(league_dir, "teams"), self.manifest["team_fields"])
+
+    def _player_rows(self, player_id: int, limit: int) -> np.ndarray:
+        start, end = self.players.row_range(player_id)
+        return np.arange(start, min(end, start + limit))
+
+    def player_stats(self, player_id: int, limit: int) -> list[dict[str, Any]]:
+        """A player's most recent active games"""
+        return self.players.rows(self._player_rows(player_id, limit), self.league)
+
+    def _team_rows_for_player(self, player_id: int, limit: int, pointer: str) -> list[dict[str, Any]]:
+        team_rows = np.asarray(self.players.columns[pointer][self._player_rows(player_id, limit)])
+        return self.teams.rows(team_rows[team_rows >= 0], self.league)
+
+    def team_stats_for_player(self, player_id: int, limit: int) -> list[dict[str, Any]]:
+        """The player's team's rows for their most recent games"""
+        return self._team_rows_for_player(player_id, limit, "team_row")
+
+    def opponent_stats_for_player(self, player_id: int, limit: int) -> list[dict[str, Any]]:
+        """The opponent's rows for the player's most recent games"""
+        return self._team_rows_for_player(player_id, limit, "opponent_row")
+
+    def team_stats(self, team_id: int, limit: int) -> list[dict[str, Any]]:
+        """A team's most recent games"""
+        start, end = self.teams.row_range(team_id)
+        return self.teams.rows(np.arange(start, min(end, start + limit)), self.league)
+
+    def recent_averages(self, player_ids: list[int], limit: int, fields: list[str]) -> dict[int, dict[str, float]]:
+        """Means of player fields over each player's last `limit` games, like get_*_recent_player_averages"""
+        averages = {}
+        for player_id in player_ids:
+            rows = self._player_rows(player_id, limit)
+            if len(rows) == 0:
+                continue
+            averages[player_id] = {
+                field: float(np.nanmean(self.players.columns[field][rows])) for field in fields
+            }
+        return averages
+
+    def stats_lists(
+        self, player_id: int, curr_opponent_id: int, limit: int
+    ) -> tuple[list[dict], list[dict], list[dict], list[dict]]:
+        """The four stat lists a prop service builds GameStats from"""
+        return (
+            self.player_stats(player_id, limit),
+            self.team_stats_for_player(player_id, limit),
+            self.opponent_stats_for_player(player_id, limit),
+            self.team_stats(curr_opponent_id, limit),
+        )
+
+
+def open_snapshot(league: str) -> StatsSnapshot | None:
+    """The league's snapshot when STATS_SNAPSHOT_DIR is set, otherwise None"""
+    if not STATS_SNAPSHOT_DIR:
+        return None
+    snapshot = StatsSnapshot(STATS_SNAPSHOT_DIR, league)
+    logger.info(f"Reading {league} stats from the snapshot exported at {snapshot.manifest['exported_at']}")
+    return snapshot
@@ -0,0 +1,257 @@
+"""
+Redis work queue for distributed prop generation.
+
+The coordinator splits a slate into one work unit per team of each game and
+enqueues them as a run. Workers claim units with a lease, extend the lease with
+heartbeats while they generate, and complete or fail them. A unit whose lease
+runs out (its worker died or stalled) goes back on the queue at the next claim,
+and a failed unit is retried, until it has been claimed MAX_ATTEMPTS times;
+after that it is marked failed. Claim, heartbeat, complete and fail are Lua
+scripts, so each step is atomic across workers and lease expiry is judged by
+the Redis clock rather than the workers'.
+
+Once every unit of a run is done or failed, exactly one claim, complete or fail
+call reports the run as finished, which is the worker's cue to send the daily
+props notification.
+
+Keys of a run, under prop_generation:<run_id>:
+
+- units: hash of unit id -> unit JSON
+- pending: list of unit ids waiting to be claimed
+- leases: sorted set of claimed unit ids scored by lease expiry
+- owners: hash of claimed unit id -> worker id
+- attempts: hash of unit id -> claims so far
+- done, failed: sets of finished unit ids
+- total: number of units in the run
+- finished: set once, when the run completes
+- expires_at: unix time the run's keys expire at
+
+Keys that do not exist yet when the run is created, or that are emptied and
+written again, get their expiry from the script that writes them.
+
+prop_generation:current_run holds the run id workers pull from.
+"""
+
+import json
+import time
+from typing import Optional, TypedDict
+
+import redis
+
+KEY_PREFIX = "prop_generation"
+CURRENT_RUN_KEY = f"{KEY_PREFIX}:current_run"
+RUN_KEYS = ["units", "pending", "leases", "owners", "attempts", "done", "failed", "total", "finished", "expires_at"]
+
+MAX_ATTEMPTS = 3
+# Runs are cleared out of Redis a day after they start
+RUN_TTL_SECONDS = 24 * 60 * 60
+
+# Shared by the scripts below; KEYS are RUN_KEYS in order
+_LUA_HELPERS = """
+local units, pending, leases, owners, attempts, done, failed, total, finished, expires_at = unpack(KEYS)
+
+local function now()
+    local time = redis.call('TIME')
+    return tonumber(time[1]) + tonumber(time[2]) / 1000000
+end
+
+local function run_finished()
+    local settled = redis.call('SCARD', done) + redis.call('SCARD', failed)
+    if settled >= tonumber(redis.call('GET', total) or '0') and redis.call('SET', finished, '1', 'NX') then
+        return 1
+    end
+    return 0
+end
+
+-- EXPIRE skips missing keys, so keys created after the run started get the run's expiry here
+local function expire_run()
+    local at = redis.call('GET', expires_at)
+    if at then
+        for _, key in ipairs(KEYS) do
+            redis.call('EXPIREAT', key, at)
+        end
+    end
+end
+"""
+
+# ARGV: worker id, lease seconds, max attempts
+_CLAIM = _LUA_HELPERS + """
+for _, unit_id in ipairs(redis.call('ZRANGEBYSCORE', leases, '-inf', now())) do
+    redis.call('ZREM', leases, unit_id)
+    redis.call('HDEL', owners, unit_id)
+    if tonumber(redis.call('HGET', attempts, unit_id) or '0') >= tonumber(ARGV[3]) then
+        redis.call('SADD', failed, unit_id)
+    else
+        redis.call('RPUSH', pending, unit_id)
+    end
+end
+
+local is_finished = run_finished()
+local unit_id = redis.call('LPOP', pending)
+if not unit_id then
+    expire_run()
+    return {'', '', 0, is_finished}
+end
+
+redis.call('ZADD', leases, now() + tonumber(ARGV[2]), unit_id)
+redis.call('HSET', owners, unit_id, ARGV[1])
+local attempt = redis.call('HINCRBY', attempts, unit_id, 1)
+expire_run()
+return {unit_id, redis.call('HGET', units, unit_id), attempt, is_finished}
+"""
+
+# ARGV: unit id, worker id, lease seconds
+_HEARTBEAT = _LUA_HELPERS + """
+if redis.call('HGET', owners, ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZADD', leases, 'XX', now() + tonumber(ARGV[3]), ARGV[1])
+expire_run()
+return 1
+"""
+
+# ARGV: unit id
+_COMPLETE = _LUA_HELPERS + """
+redis.call('ZREM', leases, ARGV[1])
+redis.call('HDEL', owners, ARGV[1])
+redis.call('LREM', pending, 0, ARGV[1])
+redis.call('SREM', failed, ARGV[1])
+redis.call('SADD', done, ARGV[1])
+local is_finished = run_finished()
+expire_run()
+return is_finished
+"""
+
+# ARGV: unit id, worker id, max attempts
+_FAIL = _LUA_HELPERS + """
+if redis.call('HGET', owners, ARGV[1]) == ARGV[2] and redis.call('SISMEMBER', done, ARGV[1]) == 0 then
+    redis.call('ZREM', leases, ARGV[1])
+    redis.call('HDEL', owners, ARGV[1])
+    if tonumber(redis.call('HGET', attempts, ARGV[1]) or '0') >= tonumber(ARGV[3]) then
+        redis.call('SADD', failed, ARGV[1])
+    else
+        redis.call('RPUSH', pending, ARGV[1])
+    end
+end
+local is_finished = run_finished()
+expire_run()
+return is_finished
+"""
+
+
+class WorkUnit(TypedDict):
+    """One team of one game to generate props for"""
+    unit_id: str
+    sport: str
+    league: str
+    date: str
+    delta_mode: bool
+    game: dict
+    team_id: int
+
+
+def make_unit(sport: str, league: str, date: str, delta_mode: bool, game: dict, team_id: int) -> WorkUnit:
+    return {
+        "unit_id": f"{league}:{game['game_ID']}:{team_id}",
+        "sport": sport,
+        "league": league,
+        "date": date,
+        "delta_mode": delta_mode,
+        "game": game,
+        "team_id": team_id,
+    }
+
+
+class PropWorkQueue:
+    """The work units of one generation run"""
+
+    def __init__(self, client: redis.Redis, run_id: str):
+        self.client = client
+        self.run_id = run_id
+        self.keys = [f"{KEY_PREFIX}:{run_id}:{name}" for name in RUN_KEYS]
+        self._claim = client.register_script(_CLAIM)
+        self._heartbeat = client.register_script(_HEARTBEAT)
+        self._complete = client.register_script(_COMPLETE)
+        self._fail = client.register_script(_FAIL)
+
+    def _key(self, name: str) -> str:
+        return self.keys[RUN_KEYS.index(name)]
+
+    @classmethod
+    def create(cls, client: redis.Redis, run_id: str, units: list[WorkUnit]) -> "PropWorkQueue":
+        """Enqueue a new run's units"""
+        queue = cls(client, run_id)
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(*queue.keys)
+        if units:
+            pipe.hset(queue._key("units"), mapping={unit["unit_id"]: json.dumps(unit) for unit in units})
+            pipe.rpush(queue._key("pending"), *[unit["unit_id"] for unit in units])
+        pipe.set(queue._key("total"), len(units))
+        expires_at = int(time.time()) + RUN_TTL_SECONDS
+        pipe.set(queue._key("expires_at"), expires_at)
+        for key in queue.keys:
+            pipe.expireat(key, expires_at)
+        pipe.execute()
+        return queue
+
+    @classmethod
+    def current(cls, client: redis.Redis) -> Optional["PropWorkQueue"]:
+        """The run workers should pull from, if any"""
+        run_id = client.get(CURRENT_RUN_KEY)
+        if run_id is None:
+            return None
+        return cls(client, run_id.decode() if isinstance(run_id, bytes) else run_id)
+
+    def make_current(self) -> None:
+        self.client.set(CURRENT_RUN_KEY, self.run_id, ex=RUN_TTL_SECONDS)
+
+    def claim(self, worker_id: str, lease_seconds: float) -> tuple[Optional[WorkUnit], int, bool]:
+        """Lease the next pending unit, first requeueing units whose leases ran out.
+
+        Args:
+            worker_id: Identifies the claiming worker
+            lease_seconds: How long the unit is held without a heartbeat
+
+        Returns:
+            The claimed unit (None when nothing is pending), which claim of the
+            unit this is, and whether this call finished the run
+        """
+        unit_id, unit_json, attempt, finished = self._claim(
+            keys=self.keys, args=[worker_id, lease_seconds, MAX_ATTEMPTS]
+        )
+        unit = json.loads(unit_json) if unit_id else None
+        return unit, int(attempt), bool(finished)
+
+    def heartbeat(self, unit_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False when the worker no longer holds it"""
+        return bool(self._heartbeat(keys=self.keys, args=[unit_id, worker_id, lease_seconds]))
+
+    def complete(self, unit_id: str) -> bool:
+        """Mark a unit done; True when this finished the run"""
+        return bool(self._complete(keys=self.keys, args=[unit_id]))
+
+    def fail(self, unit_id: str, worker_id: str) -> bool:
+        """Release a unit for retry, or mark it failed once out of attempts; True when this finished the run"""
+        return bool(self._fail(keys=self.keys, args=[unit_id, worker_id, MAX_ATTEMPTS]))
+
+    def progress(self) -> dict[str, int]:
+        """Unit counts of the run"""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self._key("total"))
+        pipe.llen(self._key("pending"))
+        pipe.zcard(self._key("leases"))
+        pipe.scard(self._key("done"))
+        pipe.scard(self._key("failed"))
+        total, pending, leased, done, failed = pipe.execute()
+        return {
+            "total": int(total or 0),
+            "pending": pending,
+            "leased": leased,
+            "done": done,
+            "failed": failed,
+        }
+
+    def settled(self) -> bool:
+        """Whether every unit of the run is done or failed"""
+        progress = self.progress()
+        return progress["done"] + progress["failed"] >= progress["total"]
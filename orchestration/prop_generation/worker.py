@@ -0,0 +1,151 @@
+"""
+Distributed prop generation worker.
+
+Pulls work units of the current run from the Redis work queue (see
+prop_generation.work_queue), generates each unit's props with the sport's
+service and writes them before completing the unit. Any number of workers can
+run, on one machine or many. The worker whose call finishes a run sends the
+daily props notification.
+
+Usage: python -m prop_generation.worker [--drain]
+  --drain: Exit once the current run is settled instead of waiting for the next one
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import traceback
+from time import sleep, time
+
+from metrics import HANDLER_FAILURES, HANDLER_SECONDS, start_metrics_server
+from notification_services.daily_props_notifier import main as notify_available_props
+from profiling import start_profiling_control
+from prop_generation.services import baseball, basketball, football
+from prop_generation.work_queue import PropWorkQueue, WorkUnit
+from prop_generation.writer import PropWriter
+from redis_utils import create_redis_client
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+LEASE_SECONDS = int(os.getenv("PROP_WORKER_LEASE_SECONDS", "120"))
+HEARTBEAT_SECONDS = LEASE_SECONDS / 4
+POLL_SECONDS = 5
+
+SPORT_SERVICES = {
+    "basketball": basketball,
+    "football": football,
+    "baseball": baseball,
+}
+
+
+def keep_lease(queue: PropWorkQueue, unit_id: str, worker_id: str, stop: threading.Event) -> None:
+    """Heartbeat a unit's lease until stopped"""
+    while not stop.wait(HEARTBEAT_SECONDS):
+        if not queue.heartbeat(unit_id, worker_id, LEASE_SECONDS):
+            logger.warning(f"Lost the lease on {unit_id}, it may be generated again")
+            return
+
+
+def process_unit(unit: WorkUnit, contexts: dict) -> int:
+    """Generate and write one unit's props.
+
+    Args:
+        unit: The claimed work unit
+        contexts: League contexts prepared by this worker for the run, reused across units
+
+    Returns:
+        Number of props generated
+    """
+    service = SPORT_SERVICES[unit["sport"]]
+    if unit["league"] not in contexts:
+        contexts[unit["league"]] = service.prepare_league(unit["league"])
+
+    writer = PropWriter(unit["league"])
+    props_generated, players_skipped = service.generate_game_props(
+        contexts[unit["league"]], unit["game"], writer, unit["delta_mode"], [unit["team_id"]]
+    )
+    writer.flush()
+
+    if unit["delta_mode"]:
+        logger.info(f"{players_skipped} players skipped as unchanged for {unit['unit_id']}")
+    return props_generated
+
+
+def run_unit(queue: PropWorkQueue, unit: WorkUnit, attempt: int, worker_id: str, contexts: dict) -> bool:
+    """Process a claimed unit under a heartbeat and settle it; True when this finished the run"""
+    logger.info(f"Processing {unit['unit_id']} (attempt {attempt})")
+    start = time()
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=keep_lease, args=(queue, unit["unit_id"], worker_id, stop), daemon=True)
+    heartbeat.start()
+    try:
+        with HANDLER_SECONDS.labels(handler="prop_unit").time():
+            props_generated = process_unit(unit, contexts)
+    except Exception as e:
+        HANDLER_FAILURES.labels(handler="prop_unit").inc()
+        logger.error(f"Error processing {unit['unit_id']}: {e}")
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        return queue.fail(unit["unit_id"], worker_id)
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    logger.info(f"{props_generated} props generated for {unit['unit_id']} in {time() - start:.2f}s")
+    return queue.complete(unit["unit_id"])
+
+
+def finish_run(queue: PropWorkQueue) -> None:
+    progress = queue.progress()
+    logger.info(f"Run {queue.run_id} finished: {progress['done']} units done, {progress['failed']} failed")
+    asyncio.run(notify_available_props())
+
+
+def main():
+    try:
+        drain = "--drain" in sys.argv[1:]
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        client = create_redis_client()
+        contexts = {}
+        run_id = None
+
+        start_metrics_server()
+        start_profiling_control()
+        logger.info(f"Prop worker {worker_id} started")
+        while True:
+            queue = PropWorkQueue.current(client)
+            if queue is None:
+                if drain:
+                    break
+                sleep(POLL_SECONDS)
+                continue
+
+            # League contexts hold one run's averages and snapshots
+            if queue.run_id != run_id:
+                contexts = {}
+                run_id = queue.run_id
+
+            unit, attempt, run_finished = queue.claim(worker_id, LEASE_SECONDS)
+            if unit is not None:
+                run_finished = run_unit(queue, unit, attempt, worker_id, contexts) or run_finished
+
+            if run_finished:
+                finish_run(queue)
+
+            if unit is None:
+                if drain and queue.settled():
+                    break
+                sleep(POLL_SECONDS)
+
+        logger.info(f"Prop worker {worker_id} exiting")
+    except Exception as e:
+        logger.error(f"Fatal error in prop worker: {e}")
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
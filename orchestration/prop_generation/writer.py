@@ -0,0 +1,84 @@
+"""
+Buffered writes of generated props.
+
+The prop services used to insert each game and each prop as it was produced,
+one pool checkout and round trip per row. PropWriter collects a league's games
+and props while they are generated and writes them with upsert_slate in one
+transaction when the league is done, along with the props retired and the
+input fingerprints recorded by delta generation.
+"""
+
+from time import perf_counter
+
+from db.games import Game
+from db.props import FingerprintKey, InputFingerprint, Prop, PropRetirement, upsert_slate
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PropWriter:
+    """Buffers one league's games and props until flush"""
+
+    def __init__(self, league: str):
+        self.league = league
+        self.games: list[Game] = []
+        self.props: list[Prop] = []
+        self.retirements: list[PropRetirement] = []
+        self.fingerprints: list[InputFingerprint] = []
+        self.dropped_fingerprints: list[FingerprintKey] = []
+
+    def add_game(self, game: Game) -> None:
+        self.games.append(game)
+
+    def add_prop(self, prop: Prop) -> None:
+        self.props.append(prop)
+
+    def retire(self, game_id: str, player_id: int, keep_stat_names: list[str]) -> None:
+        """Retire a player's props for a game other than keep_stat_names"""
+        self.retirements.append({
+            "league": self.league,
+            "game_id": game_id,
+            "player_id": player_id,
+            "keep_stat_names": keep_stat_names,
+        })
+
+    def add_fingerprint(self, game_id: str, player_id: int, team_id: int, fingerprint: str) -> None:
+        self.fingerprints.append({
+            "league": self.league,
+            "game_id": game_id,
+            "player_id": player_id,
+            "team_id": team_id,
+            "fingerprint": fingerprint,
+        })
+
+    def drop_fingerprint(self, game_id: str, player_id: int) -> None:
+        self.dropped_fingerprints.append({
+            "league": self.league,
+            "game_id": game_id,
+            "player_id": player_id,
+        })
+
+    def flush(self) -> int:
+        """Write the buffered games and props and clear the buffers.
+
+        Returns:
+            Number of props written
+        """
+        buffers = [self.games, self.props, self.retirements, self.fingerprints, self.dropped_fingerprints]
+        if not any(buffers):
+            return 0
+
+        start = perf_counter()
+        games_written, props_written, props_retired = upsert_slate(*buffers)
+        elapsed = perf_counter() - start
+
+        rows = sum(len(buffer) for buffer in buffers)
+        logger.info(
+            f"Wrote {games_written} games and {props_written}/{len(self.props)} props and retired "
+            f"{props_retired} props for {self.league} in {elapsed:.2f}s "
+            f"({rows / elapsed if elapsed > 0 else 0:.0f} rows/s)"
+        )
+        for buffer in buffers:
+            buffer.clear()
+        return props_written
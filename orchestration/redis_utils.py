@@ -1,8 +1,11 @@
 import json
 import asyncio
+import traceback
 
 import redis
 import redis.asyncio as redis_async
+from metrics import HANDLER_FAILURES, HANDLER_SECONDS, PUBSUB_IN_FLIGHT, PUBSUB_RECEIVED, stage
+from tracing import handling, inject
 from utils import getenv_required, setup_logger
 
 REDIS_HOST = getenv_required("REDIS_HOST")
@@ -35,7 +38,8 @@ def publish_message(redis_client: redis.Redis, channel: str, message_data: dict)
         channel: The channel to publish the message
         message_data: The actual message data being passed
     """
-    redis_client.publish(channel, json.dumps(message_data))
+    with stage("publish").time():
+        redis_client.publish(channel, json.dumps(message_data))
 
 
 def listen_for_messages(redis_client: redis.Redis, channel: str, callback):
@@ -58,14 +62,15 @@ def listen_for_messages(redis_client: redis.Redis, channel: str, callback):
 
 
 async def publish_message_async(redis_client: redis_async.Redis, channel: str, message_data: dict):
-    """Publishes a message to Redis asynchronously.
+    """Publishes a message to Redis asynchronously, carrying the current trace.
 
     Args:
         redis_client: Async Redis client
         channel: The channel to publish the message
         message_data: The actual message data being passed
     """
-    await redis_client.publish(channel, json.dumps(message_data))
+    with stage("publish").time():
+        await redis_client.publish(channel, json.dumps(inject(channel, message_data)))
 
 
 async def listen_for_messages_async(redis_client: redis_async.Redis, channel: str, callback):
@@ -79,6 +84,24 @@ async def listen_for_messages_async(redis_client: redis_async.Redis, channel: st
     pubsub = redis_client.pubsub()
     await pubsub.subscribe(channel)
 
+    in_flight = PUBSUB_IN_FLIGHT.labels(channel=channel)
+    received = PUBSUB_RECEIVED.labels(channel=channel)
+    handler_seconds = HANDLER_SECONDS.labels(handler=channel)
+    handler_failures = HANDLER_FAILURES.labels(handler=channel)
+
+    async def handle(data):
+        in_flight.inc()
+        try:
+            with handler_seconds.time(), handling(channel, data):
+                await callback(data)
+        except Exception as e:
+            # The single place handler errors are caught: counted, marked on the span, logged
+            handler_failures.inc()
+            logger.error(f"Error handling {channel} message: {e}")
+            logger.error(f"Full traceback: {traceback.format_exc()}")
+        finally:
+            in_flight.dec()
+
     # Task monitoring counters
     active_tasks = 0
     total_messages = 0
@@ -98,8 +121,9 @@ async def listen_for_messages_async(redis_client: redis_async.Redis, channel: st
                 data = json.loads(message["data"]) if isinstance(message["data"], str) else message["data"]
 
                 # Create task with monitoring
-                task = asyncio.create_task(callback(data))
+                task = asyncio.create_task(handle(data))
                 task.add_done_callback(task_done_callback)
+                received.inc()
 
                 active_tasks += 1
                 total_messages += 1
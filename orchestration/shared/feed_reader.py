@@ -0,0 +1,52 @@
+"""
+Streaming readers for the data feeds /live endpoints.
+
+Games are parsed incrementally from the response body and yielded one at a
+time, so a large slate is never held in memory as a single parsed document and
+early games can be processed while the rest of the payload is still downloading.
+"""
+
+from typing import AsyncIterator, Iterator
+
+import ijson
+
+
+def get_feed_games_prefix(league: str) -> str:
+    """Returns the ijson prefix of the games array in a /live feed document"""
+    return f"data.{league}.item"
+
+
+def iter_feed_games(response, league: str) -> Iterator[dict]:
+    """Yield games one at a time from a streamed /live feed response.
+
+    Args:
+        response: requests Response opened with stream=True
+        league: League identifier (MLB, NBA, NCAABB, NFL, NCAAFB)
+
+    Yields:
+        Game data dictionaries, in feed order
+    """
+    try:
+        # Let urllib3 undo any gzip/deflate encoding before the parser sees the bytes
+        response.raw.decode_content = True
+        yield from ijson.items(
+            response.raw, get_feed_games_prefix(league), use_float=True
+        )
+    finally:
+        response.close()
+
+
+async def iter_feed_games_async(response, league: str) -> AsyncIterator[dict]:
+    """Yield games one at a time from an aiohttp /live feed response.
+
+    Args:
+        response: aiohttp ClientResponse whose body has not been read yet
+        league: League identifier (MLB, NBA, NCAABB, NFL, NCAAFB)
+
+    Yields:
+        Game data dictionaries, in feed order
+    """
+    async for game in ijson.items(
+        response.content, get_feed_games_prefix(league), use_float=True
+    ):
+        yield game
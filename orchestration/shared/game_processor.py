@@ -5,6 +5,12 @@ from db.games import insert_game, Game
 from db.stats.baseball import insert_baseball_team_stats, insert_baseball_player_stats
 from db.stats.football import insert_football_team_stats, insert_football_player_stats
 from db.stats.basketball import insert_basketball_team_stats, insert_basketball_player_stats
+from db.model_states import get_model_states, upsert_model_states
+from prop_generation.configs.baseball import get_baseball_prop_configs
+from prop_generation.configs.basketball import get_basketball_prop_configs
+from prop_generation.configs.football import get_football_prop_configs
+from prop_generation.feature_store import update_feature_store
+from prop_generation.generator.online import OnlineRidgeState, fold_game, is_online_config
 
 logger = setup_logger(__name__)
 
@@ -24,6 +30,64 @@ SPORT_DB_FUNCTIONS = {
     },
 }
 
+# Prop configs per sport, for updating online model states
+SPORT_PROP_CONFIGS = {
+    "baseball": get_baseball_prop_configs,
+    "football": get_football_prop_configs,
+    "basketball": get_basketball_prop_configs,
+}
+
+
+def update_online_model_states(league, sport, team_stats_list, player_stats_list):
+    """Fold a game's stats into the stored online model states of its players.
+
+    Players without a stored state are left alone; the prop services build one
+    from their history the first time a line is generated.
+    """
+    configs = [config for config in SPORT_PROP_CONFIGS[sport]().values() if is_online_config(config)]
+    if not configs:
+        return 0
+
+    team_rows = {team_stats["team_id"]: team_stats for team_stats in team_stats_list}
+    # Same rows the prop services train on
+    active_rows = [
+        player_stats for player_stats in player_stats_list
+        if player_stats.get("status") == "ACT" and player_stats["team_id"] in team_rows
+    ]
+    if len(team_rows) != 2 or not active_rows:
+        return 0
+
+    stored_states = get_model_states(
+        league,
+        list({player_stats["player_id"] for player_stats in active_rows}),
+        [config.stat_name for config in configs],
+    )
+
+    updated_states = []
+    for player_stats in active_rows:
+        team_row = team_rows[player_stats["team_id"]]
+        opponent_row = next(row for team_id, row in team_rows.items() if team_id != player_stats["team_id"])
+
+        for config in configs:
+            stored = stored_states.get((player_stats["player_id"], config.stat_name))
+            if stored is None:
+                continue
+
+            state = OnlineRidgeState.from_row(stored)
+            if not state.matches(config) or state.last_game_id == player_stats["game_id"]:
+                continue
+
+            fold_game(state, config, player_stats, team_row, opponent_row)
+            updated_states.append({
+                **state.to_row(),
+                "player_id": player_stats["player_id"],
+                "league": league,
+                "stat_name": config.stat_name,
+            })
+
+    return upsert_model_states(updated_states)
+
+
 def process_game(game, league):
     """Process a single game for the given league."""
 
@@ -76,6 +140,22 @@ def process_game(game, league):
             logger.error(f"Error inserting player stats for game {game['game_ID']}: {e}")
             raise
 
+    # Keep online prop models current; a failure here must not fail the game
+    try:
+        model_states_updated = update_online_model_states(league, sport, team_stats_list, player_stats_list)
+        if model_states_updated:
+            logger.info(f"Updated {model_states_updated} online model states")
+    except Exception as e:
+        logger.error(f"Error updating online model states for game {game['game_ID']}: {e}")
+
+    # Same for the materialized feature windows; the services fall back to the stat tables
+    try:
+        feature_windows_updated = update_feature_store(league, sport, team_stats_list, player_stats_list)
+        if feature_windows_updated:
+            logger.info(f"Updated {feature_windows_updated} feature windows")
+    except Exception as e:
+        logger.error(f"Error updating feature windows for game {game['game_ID']}: {e}")
+
     logger.info(
         f"Successfully processed game {game['game_ID']}: {team_stats_inserted} team stats, {player_stats_inserted}/{total_player_stats} player stats"
     )
@@ -0,0 +1,120 @@
+"""
+Benchmark the batched Poisson solver on a synthetic MLB slate.
+
+Builds a slate of games with nine batters a side plus both starting pitchers,
+then generates every Poisson prop the way the MLB service does: once with
+scikit-learn's PoissonRegressor fitted player by player, and once with
+BasePropGenerator.generate_props fitting each stat's players in one batch.
+The random bias is seeded identically for both so the lines can be compared.
+
+Usage: python benchmark_batched_poisson.py [games] [seed]
+  games: Games on the slate (defaults to 15)
+  seed: Random seed (defaults to 0)
+"""
+
+import random
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from prop_generation.configs.baseball import (
+    BATTING_STATS,
+    PITCHING_STATS,
+    SAMPLE_SIZE,
+    get_baseball_prop_configs,
+)
+from prop_generation.generator.base import DataScope, ModelType, PropConfig
+from prop_generation.generator.columnar import ColumnarGameStats
+from prop_generation.generator.main import BasePropGenerator
+
+BATTERS_PER_TEAM = 9
+
+
+def sklearn_config(config: PropConfig) -> PropConfig:
+    """The same config without the batched solver"""
+    return PropConfig(
+        stat_name=config.stat_name,
+        features=config.features,
+        model_type=config.model_type,
+        display_name=config.display_name,
+        model_params={key: value for key, value in config.model_params.items() if key != "solver"},
+    )
+
+
+def random_rows(rng: np.random.Generator, fields, rates, count):
+    return [
+        {"game_id": f"g{i}", **{field: float(rng.poisson(rates[field])) for field in fields}}
+        for i in range(count)
+    ]
+
+
+def random_player(rng: np.random.Generator, player_fields, team_fields):
+    player_rates = {field: rng.uniform(0.1, 6.0) for field in player_fields}
+    team_rates = {field: rng.uniform(1.0, 10.0) for field in team_fields}
+    rows = [random_rows(rng, player_fields, player_rates, SAMPLE_SIZE)]
+    rows += [random_rows(rng, team_fields, team_rates, SAMPLE_SIZE) for _ in range(3)]
+    return ColumnarGameStats(*rows)
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = np.random.default_rng(seed)
+
+    configs = {
+        stat: config
+        for stat, config in get_baseball_prop_configs().items()
+        if config.model_type == ModelType.POISSON
+    }
+    player_fields = sorted(
+        {config.stat_name for config in configs.values()}
+        | {f.field for config in configs.values() for f in config.features if f.scope == DataScope.PLAYER}
+    )
+    team_fields = sorted(
+        {f.field for config in configs.values() for f in config.features if f.scope != DataScope.PLAYER}
+    )
+
+    # Per game: (game data, eligible stats) for every player generated
+    slate = []
+    for _ in range(games):
+        players = [
+            (random_player(rng, player_fields, team_fields), BATTING_STATS)
+            for _ in range(2 * BATTERS_PER_TEAM)
+        ]
+        players += [(random_player(rng, player_fields, team_fields), PITCHING_STATS) for _ in range(2)]
+        slate.append(players)
+
+    generator = BasePropGenerator()
+    sklearn_configs = {stat: sklearn_config(config) for stat, config in configs.items()}
+
+    sklearn_lines = []
+    start = perf_counter()
+    for players in slate:
+        for stat, config in sklearn_configs.items():
+            random.seed(seed)
+            for game_data, eligible_stats in players:
+                if stat in eligible_stats:
+                    sklearn_lines.append(generator.generate_prop(config, game_data))
+    sklearn_seconds = perf_counter() - start
+
+    batched_lines = []
+    start = perf_counter()
+    for players in slate:
+        for stat, config in configs.items():
+            random.seed(seed)
+            stat_players = [game_data for game_data, eligible_stats in players if stat in eligible_stats]
+            if stat_players:
+                batched_lines.extend(generator.generate_props(config, stat_players))
+    batched_seconds = perf_counter() - start
+
+    props = len(sklearn_lines)
+    mismatches = sum(a != b for a, b in zip(sklearn_lines, batched_lines))
+    print(f"{games} games, {len(configs)} Poisson stats, {props} props")
+    print(f"sklearn per player {sklearn_seconds:7.2f}s ({sklearn_seconds / props * 1e3:.2f}ms/prop)")
+    print(f"batched per stat   {batched_seconds:7.2f}s ({batched_seconds / props * 1e3:.2f}ms/prop, {sklearn_seconds / batched_seconds:.1f}x)")
+    print(f"lines differing: {mismatches}/{props}")
+
+
+if __name__ == "__main__":
+    main()
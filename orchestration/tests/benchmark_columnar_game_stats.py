@@ -0,0 +1,122 @@
+"""
+Benchmark ColumnarGameStats against list-backed GameStats in BasePropGenerator.
+
+Builds synthetic stat rows covering every field used by the registered configs
+of each league, then generates every config's prop for a number of players,
+once from GameStats and once from ColumnarGameStats (building the columnar
+container once per player, like the services do). The random bias is seeded
+identically for both paths so the generated lines can be compared.
+
+Usage: python benchmark_columnar_game_stats.py [players] [seed]
+  players: Synthetic players per league (defaults to 50)
+  seed: Random seed (defaults to 0)
+"""
+
+import random
+import sys
+from time import perf_counter
+
+from prop_generation.configs.baseball import SAMPLE_SIZE as BASEBALL_SAMPLE_SIZE
+from prop_generation.configs.baseball import get_baseball_prop_configs
+from prop_generation.configs.basketball import SAMPLE_SIZE as BASKETBALL_SAMPLE_SIZE
+from prop_generation.configs.basketball import get_basketball_prop_configs
+from prop_generation.configs.football import SAMPLE_SIZE as FOOTBALL_SAMPLE_SIZE
+from prop_generation.configs.football import get_football_prop_configs
+from prop_generation.generator.base import DataScope, GameStats
+from prop_generation.generator.columnar import ColumnarGameStats
+from prop_generation.generator.main import BasePropGenerator
+
+LEAGUE_CONFIGS = {
+    "baseball": (get_baseball_prop_configs(), BASEBALL_SAMPLE_SIZE),
+    "basketball": (get_basketball_prop_configs(), BASKETBALL_SAMPLE_SIZE),
+    "football": (get_football_prop_configs(), FOOTBALL_SAMPLE_SIZE),
+}
+
+
+def config_fields(configs):
+    """Player and team fields read by a league's configs"""
+    player_fields = set()
+    team_fields = set()
+    for config in configs.values():
+        player_fields.add(config.stat_name)
+        for feature in config.features:
+            if feature.scope == DataScope.PLAYER:
+                player_fields.add(feature.field)
+            else:
+                team_fields.add(feature.field)
+    return sorted(player_fields), sorted(team_fields)
+
+
+def random_rows(rng, fields, count):
+    return [
+        {"game_id": f"g{i}", "status": "ACT", **{field: rng.randint(0, 30) + rng.random() * (i % 3) for field in fields}}
+        for i in range(count)
+    ]
+
+
+def generate_all(generator, configs, game_data, seed):
+    lines = []
+    for stat_name, config in configs.items():
+        random.seed(seed)
+        lines.append(generator.generate_prop(config, game_data))
+    return lines
+
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = random.Random(seed)
+    generator = BasePropGenerator()
+
+    for sport, (configs, sample_size) in LEAGUE_CONFIGS.items():
+        player_fields, team_fields = config_fields(configs)
+        player_data = [
+            (
+                random_rows(rng, player_fields, sample_size),
+                random_rows(rng, team_fields, sample_size),
+                random_rows(rng, team_fields, sample_size),
+                random_rows(rng, team_fields, sample_size),
+            )
+            for _ in range(players)
+        ]
+
+        list_lines = []
+        start = perf_counter()
+        for rows in player_data:
+            list_lines.extend(generate_all(generator, configs, GameStats(*rows), seed))
+        list_seconds = perf_counter() - start
+
+        columnar_lines = []
+        start = perf_counter()
+        for rows in player_data:
+            columnar_lines.extend(generate_all(generator, configs, ColumnarGameStats(*rows), seed))
+        columnar_seconds = perf_counter() - start
+
+        # Feature extraction alone, without model fitting
+        start = perf_counter()
+        for rows in player_data:
+            game_data = GameStats(*rows)
+            for config in configs.values():
+                feature_df = generator.extract_features(config, game_data)
+                generator.extract_prediction_features(config, game_data, feature_df)
+        list_features_seconds = perf_counter() - start
+
+        start = perf_counter()
+        for rows in player_data:
+            game_data = ColumnarGameStats(*rows)
+            for config in configs.values():
+                x_values = game_data.feature_matrix(config.features)
+                game_data.target_column(config.stat_name)
+                generator.feature_extractor.build_prediction_vector(config.features, game_data, x_values)
+        columnar_features_seconds = perf_counter() - start
+
+        mismatches = sum(a != b for a, b in zip(list_lines, columnar_lines))
+        props = len(list_lines)
+        print(f"{sport}: {len(configs)} configs x {players} players, {sample_size} games each")
+        print(f"  features   list {list_features_seconds / props * 1e6:8.1f}us/prop  columnar {columnar_features_seconds / props * 1e6:8.1f}us/prop ({list_features_seconds / columnar_features_seconds:.1f}x)")
+        print(f"  end to end list {list_seconds / props * 1e6:8.1f}us/prop  columnar {columnar_seconds / props * 1e6:8.1f}us/prop ({list_seconds / columnar_seconds:.1f}x)")
+        print(f"  lines differing: {mismatches}/{props}\n")
+
+
+if __name__ == "__main__":
+    main()
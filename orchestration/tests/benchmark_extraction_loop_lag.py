@@ -0,0 +1,121 @@
+"""
+Benchmark event-loop lag while props_worker-style extraction runs.
+
+Compares extracting every game inline on the event loop (the old behaviour)
+against the process pool of ExtractionStage.
+
+Usage: python benchmark_extraction_loop_lag.py <feed_file> <league> [repeats]
+  feed_file: Saved /live/{date}/{league} response body
+  league: League key inside the feed (MLB, NBA, NCAABB, NFL, NCAAFB)
+  repeats: How many times to replay the slate (defaults to 5)
+"""
+
+import asyncio
+import json
+import sys
+from time import perf_counter
+
+from data_pipeline.props_worker import MAX_CONCURRENT_GAMES
+from extract_stats.executor import ExtractionStage, extract_stat_tuples
+from prop_generation.configs.baseball import get_baseball_stats_list
+from prop_generation.configs.basketball import get_basketball_stats_list
+from prop_generation.configs.football import get_football_stats_list
+
+LEAGUE_STATS = {
+    "MLB": get_baseball_stats_list(),
+    "NBA": get_basketball_stats_list(),
+    "NCAABB": get_basketball_stats_list(),
+    "NFL": get_football_stats_list(),
+    "NCAAFB": get_football_stats_list(),
+}
+
+PROBE_INTERVAL = 0.001
+
+
+async def probe_loop_lag(samples: list[float], stop: asyncio.Event):
+    """Record how late each short sleep resumes until stopped"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected_wake = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(max(0.0, loop.time() - expected_wake))
+
+
+async def run_inline(games, league, stat_names):
+    for game in games:
+        extract_stat_tuples(game, league, stat_names)
+        # Yield like the real handler does between games
+        await asyncio.sleep(0)
+
+
+async def run_stage(games, league, stat_names, stage):
+    # Same in-flight bound as props_worker
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_GAMES)
+
+    async def extract_bounded(game):
+        async with semaphore:
+            return await stage.extract(game, league, stat_names)
+
+    await asyncio.gather(*[extract_bounded(game) for game in games])
+
+
+async def measure(label, coro_factory):
+    samples: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop_lag(samples, stop))
+    await asyncio.sleep(0.05)
+
+    start = perf_counter()
+    await coro_factory()
+    elapsed = perf_counter() - start
+
+    stop.set()
+    await probe
+
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0
+    max_lag = samples[-1] if samples else 0.0
+    print(
+        f"{label:<14} total {elapsed * 1000:8.1f}ms | "
+        f"loop lag p99 {p99 * 1000:7.2f}ms max {max_lag * 1000:7.2f}ms"
+    )
+
+
+async def run_benchmark(games, league, repeats):
+    stat_names = LEAGUE_STATS[league]
+    slate = games * repeats
+    print(f"Extracting {len(slate)} {league} games ({len(games)} x {repeats})\n")
+
+    await measure("inline", lambda: run_inline(slate, league, stat_names))
+
+    process_stage = ExtractionStage()
+    # Warm the spawned workers so pool start-up is not counted
+    await run_stage(games[:1], league, stat_names, process_stage)
+    await measure(
+        "process pool",
+        lambda: run_stage(slate, league, stat_names, process_stage),
+    )
+    process_stage.shutdown()
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python benchmark_extraction_loop_lag.py <feed_file> <league> [repeats]")
+        sys.exit(1)
+
+    feed_file = sys.argv[1]
+    league = sys.argv[2]
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with open(feed_file) as f:
+        games = json.load(f)["data"][league]
+
+    if not games:
+        print(f"No {league} games in {feed_file}")
+        sys.exit(1)
+
+    asyncio.run(run_benchmark(games, league, repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark match resolution transactions with and without pipeline mode.
+
+Resolves real two-player matches from DATABASE_URL with _resolve_match, the
+notification insert and a final ROLLBACK in place of the COMMIT, once
+statement by statement and once in libpq pipeline mode. Connections go
+through a local proxy that holds every chunk for delay_ms in each direction,
+standing in for the network between the workers and the database, so point
+DATABASE_URL at a local Postgres loaded with a copy of production data.
+
+Usage: python benchmark_pipeline.py [delay_ms] [matches]
+  delay_ms: One-way delay added by the proxy (defaults to 2)
+  matches: Matches resolved per mode (defaults to 200)
+"""
+
+import asyncio
+import sys
+from contextlib import nullcontext
+from time import perf_counter
+
+import numpy as np
+import psycopg
+from psycopg.conninfo import conninfo_to_dict, make_conninfo
+
+from data_pipeline.matches_worker import _match_resolved_notifications, _resolve_match
+from db.outbox import enqueue_notifications
+from db.statements import MATCH_USER_PARLAYS, MATCH_USERS, execute
+from utils import getenv_required
+
+MATCHES_QUERY = """
+    SELECT m.id, m.type
+    FROM match m
+    JOIN match_user mu ON mu.match_id = m.id
+    GROUP BY m.id, m.type
+    HAVING COUNT(*) = 2
+    ORDER BY m.type = 'competitive' DESC, m.id DESC
+    LIMIT %s
+"""
+
+
+class DelayProxy:
+    """TCP proxy delaying each chunk by a fixed time without serializing chunks behind each other"""
+
+    def __init__(self, target_host: str, target_port: int, delay: float):
+        self.target_host = target_host
+        self.target_port = target_port
+        self.delay = delay
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection(self.target_host, self.target_port)
+        await asyncio.gather(
+            self._forward(client_reader, server_writer),
+            self._forward(server_reader, client_writer),
+            return_exceptions=True,
+        )
+
+    async def _forward(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+
+        async def send():
+            while True:
+                due, data = await chunks.get()
+                await asyncio.sleep(max(0.0, due - loop.time()))
+                if not data:
+                    writer.close()
+                    return
+                writer.write(data)
+                await writer.drain()
+
+        sender = asyncio.create_task(send())
+        while data := await reader.read(65536):
+            chunks.put_nowait((loop.time() + self.delay, data))
+        chunks.put_nowait((loop.time() + self.delay, b""))
+        await sender
+
+
+async def load_match_users(cur, match_id) -> list[dict]:
+    """Match users with their parlays, shaped as the match handlers build them"""
+    await execute(cur, MATCH_USERS, (match_id,))
+    match_users_data = []
+    for mu_row in await cur.fetchall():
+        await execute(cur, MATCH_USER_PARLAYS, (mu_row[0],))
+        parlays = [
+            {"id": p[0], "stake": float(p[1]), "resolved": p[2], "payout": float(p[3]) if p[3] is not None else None}
+            for p in await cur.fetchall()
+        ]
+        match_users_data.append(
+            {
+                "id": mu_row[0],
+                "user_id": mu_row[1],
+                "balance": float(mu_row[2]),
+                "starting_balance": float(mu_row[3]),
+                "points_snapshot": float(mu_row[4]),
+                "points_delta": float(mu_row[5]),
+                "status": mu_row[6],
+                "parlays": parlays,
+            }
+        )
+    return match_users_data
+
+
+async def time_resolutions(conninfo: str, matches: list, pipelined: bool) -> list[float]:
+    """Seconds per resolution transaction, from BEGIN to its ROLLBACK returning"""
+    timings = []
+    async with await psycopg.AsyncConnection.connect(conninfo) as conn:
+        async with conn.cursor() as cur:
+            for match_id, match_type, match_users_data in matches:
+                start = perf_counter()
+                await cur.execute("BEGIN")
+                async with conn.pipeline() if pipelined else nullcontext():
+                    await _resolve_match(cur, match_id, match_type, match_users_data)
+                    await enqueue_notifications(cur, _match_resolved_notifications(match_id, match_users_data))
+                    await cur.execute("ROLLBACK")
+                timings.append(perf_counter() - start)
+    return timings
+
+
+async def main():
+    delay_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    database_url = getenv_required("DATABASE_URL")
+
+    matches = []
+    async with await psycopg.AsyncConnection.connect(database_url) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(MATCHES_QUERY, (count,))
+            for match_id, match_type in await cur.fetchall():
+                matches.append((match_id, match_type, await load_match_users(cur, match_id)))
+        await conn.rollback()
+    if not matches:
+        print("No two-player matches to resolve")
+        return
+
+    params = conninfo_to_dict(database_url)
+    proxy = DelayProxy(params.get("host") or "localhost", int(params.get("port") or 5432), delay_ms / 1000)
+    conninfo = make_conninfo(database_url, host="127.0.0.1", hostaddr="127.0.0.1", port=await proxy.start())
+
+    competitive = sum(1 for match in matches if match[1] == "competitive")
+    print(f"{len(matches)} matches ({competitive} competitive), {delay_ms}ms added each way")
+    print(f"{'mode':<12}{'mean (ms)':>11}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    results = {}
+    for mode, pipelined in (("sequential", False), ("pipelined", True)):
+        results[mode] = np.array(await time_resolutions(conninfo, matches, pipelined)) * 1000
+        p50, p99 = np.percentile(results[mode], [50, 99])
+        print(f"{mode:<12}{results[mode].mean():>11.2f}{p50:>10.2f}{p99:>10.2f}")
+    print(f"Pipelining saves {1 - results['pipelined'].mean() / results['sequential'].mean():.1%} per transaction")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+"""
+Benchmark per-message database time with and without prepared statements.
+
+Replays the statements each pipeline worker runs for one message (see
+db/statements.py) against DATABASE_URL, for ids sampled from the database,
+once with every statement prepared and once with none prepared. Each message
+runs in a transaction that is rolled back, so row locks are taken but nothing
+is written. Point it at a local Postgres loaded with a copy of production
+data; round trips to a remote database swamp the parse and plan time saved.
+
+Usage: python benchmark_prepared_statements.py [messages]
+  messages: Messages replayed per worker and mode (defaults to 2000)
+"""
+
+import asyncio
+import sys
+from time import perf_counter
+
+import numpy as np
+import psycopg
+
+from db.statements import (
+    LOCK_PARLAY,
+    LOCK_UNRESOLVED_MATCH,
+    MATCH_FOR_PARLAY,
+    MATCH_USER_PARLAYS,
+    MATCH_USERS,
+    PARLAY_EXISTS,
+    PARLAY_FOR_PICK,
+    PARLAY_PICKS,
+    PICK_EXISTS,
+    PICKS_FOR_PROP,
+    PROP_BY_ID,
+    execute,
+)
+from utils import getenv_required
+
+WARMUP = 50
+
+
+async def picks_message(cur, prepare: bool, prop_id) -> None:
+    await execute(cur, PROP_BY_ID, (prop_id,), prepare=prepare)
+    await cur.fetchone()
+    await execute(cur, PICKS_FOR_PROP, (prop_id,), prepare=prepare)
+    await cur.fetchall()
+
+
+async def parlays_message(cur, prepare: bool, pick_id) -> None:
+    await execute(cur, PICK_EXISTS, (pick_id,), prepare=prepare)
+    await cur.fetchone()
+    await execute(cur, PARLAY_FOR_PICK, (pick_id,), prepare=prepare)
+    parlay = await cur.fetchone()
+    if parlay:
+        await execute(cur, LOCK_PARLAY, (parlay[0],), prepare=prepare)
+        await cur.fetchone()
+        await execute(cur, PARLAY_PICKS, (parlay[0],), prepare=prepare)
+        await cur.fetchall()
+
+
+async def matches_message(cur, prepare: bool, parlay_id) -> None:
+    await execute(cur, PARLAY_EXISTS, (parlay_id,), prepare=prepare)
+    await cur.fetchone()
+    await execute(cur, MATCH_FOR_PARLAY, (parlay_id,), prepare=prepare)
+    match = await cur.fetchone()
+    if match:
+        await execute(cur, LOCK_UNRESOLVED_MATCH, (match[0],), prepare=prepare)
+        await cur.fetchone()
+        await execute(cur, MATCH_USERS, (match[0],), prepare=prepare)
+        for match_user in await cur.fetchall():
+            await execute(cur, MATCH_USER_PARLAYS, (match_user[0],), prepare=prepare)
+            await cur.fetchall()
+
+
+WORKERS = {
+    "picks_worker": (picks_message, "SELECT id FROM prop ORDER BY random() LIMIT %s"),
+    "parlays_worker": (parlays_message, "SELECT id FROM pick ORDER BY random() LIMIT %s"),
+    "matches_worker": (
+        matches_message,
+        "SELECT id FROM parlay WHERE match_user_id IS NOT NULL ORDER BY random() LIMIT %s",
+    ),
+}
+
+
+async def time_messages(conn, message, ids, prepare: bool) -> list[float]:
+    """Seconds per message, after a warmup that leaves the statements prepared when prepare is set"""
+    timings = []
+    async with conn.cursor() as cur:
+        for i, message_id in enumerate(ids):
+            start = perf_counter()
+            await message(cur, prepare, message_id)
+            await conn.rollback()
+            if i >= WARMUP:
+                timings.append(perf_counter() - start)
+    return timings
+
+
+async def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    database_url = getenv_required("DATABASE_URL")
+
+    print(f"{'worker':<16}{'mode':<12}{'messages':>9}{'mean (ms)':>11}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for worker, (message, sample_query) in WORKERS.items():
+        async with await psycopg.AsyncConnection.connect(database_url) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sample_query, (messages,))
+                ids = [row[0] for row in await cur.fetchall()]
+            await conn.rollback()
+        if not ids:
+            print(f"{worker:<16}no rows to sample, skipped")
+            continue
+        ids = (ids * (messages // len(ids) + 1))[: messages + WARMUP]
+
+        results = {}
+        for mode, prepare in (("unprepared", False), ("prepared", True)):
+            # A fresh connection per mode, so neither inherits the other's statements
+            async with await psycopg.AsyncConnection.connect(database_url) as conn:
+                results[mode] = await time_messages(conn, message, ids, prepare)
+
+        for mode, timings in results.items():
+            ms = np.array(timings) * 1000
+            p50, p99 = np.percentile(ms, [50, 99])
+            print(f"{worker:<16}{mode:<12}{len(ms):>9}{ms.mean():>11.3f}{p50:>10.3f}{p99:>10.3f}")
+        saved = 1 - np.mean(results["prepared"]) / np.mean(results["unprepared"])
+        print(f"{worker:<16}prepared statements save {saved:.1%} of per-message database time")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Benchmark selective stat extraction against full extraction.
+
+Settlement only needs the stats that have props, so extract_player_stats can be
+asked for just those stats and the fields they depend on. This replays a saved
+feed both ways, checks the requested values match, and reports time per tick.
+
+Usage: python benchmark_selective_extraction.py <feed_file> <league> [repeats] [stat,...]
+  feed_file: Saved /live/{date}/{league} response body
+  league: League key inside the feed (MLB, NBA, NCAABB, NFL, NCAAFB)
+  repeats: How many times to replay the slate (defaults to 20)
+  stats: Comma separated stat names (defaults to every prop stat for the league)
+"""
+
+import json
+import sys
+from time import perf_counter
+
+from extract_stats.main import extract_player_stats
+from prop_generation.configs.baseball import get_baseball_stats_list
+from prop_generation.configs.basketball import get_basketball_stats_list
+from prop_generation.configs.football import get_football_stats_list
+
+LEAGUE_STATS = {
+    "MLB": get_baseball_stats_list(),
+    "NBA": get_basketball_stats_list(),
+    "NCAABB": get_basketball_stats_list(),
+    "NFL": get_football_stats_list(),
+    "NCAAFB": get_football_stats_list(),
+}
+
+
+def time_ticks(games, league, repeats, stats):
+    start = perf_counter()
+    for _ in range(repeats):
+        for game in games:
+            extract_player_stats(game, league, stats)
+    return (perf_counter() - start) / repeats
+
+
+def check_matches(games, league, stats):
+    """Make sure selective extraction returns the same values as the full path"""
+    for game in games:
+        full_list, full_count = extract_player_stats(game, league)
+        selective_list, selective_count = extract_player_stats(game, league, stats)
+        assert full_count == selective_count
+
+        for full, selective in zip(full_list, selective_list):
+            for stat_name in stats:
+                if stat_name in full:
+                    assert selective[stat_name] == full[stat_name], (
+                        f"{stat_name} mismatch for player {full['player_id']}: "
+                        f"{selective[stat_name]} != {full[stat_name]}"
+                    )
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python benchmark_selective_extraction.py <feed_file> <league> [repeats] [stat,...]")
+        sys.exit(1)
+
+    feed_file = sys.argv[1]
+    league = sys.argv[2]
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    stats = sys.argv[4].split(",") if len(sys.argv) > 4 else LEAGUE_STATS[league]
+
+    with open(feed_file) as f:
+        games = json.load(f)["data"][league]
+
+    if not games:
+        print(f"No {league} games in {feed_file}")
+        sys.exit(1)
+
+    check_matches(games, league, stats)
+    print(f"Selective values match full extraction for {len(stats)} stats\n")
+
+    full_tick = time_ticks(games, league, repeats, None)
+    selective_tick = time_ticks(games, league, repeats, stats)
+
+    print(f"{len(games)} {league} games, {repeats} ticks")
+    print(f"full        {full_tick * 1000:8.2f}ms per tick")
+    print(f"selective   {selective_tick * 1000:8.2f}ms per tick ({full_tick / selective_tick:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
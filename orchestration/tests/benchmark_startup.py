@@ -0,0 +1,80 @@
+"""
+Benchmark import time and memory of each worker entry point.
+
+Every entry point is imported in a fresh interpreter, so module caches from
+one run don't leak into the next. Reports median import time, peak RSS, and
+whether pandas / scikit-learn were loaded.
+
+Needs the same environment variables as the workers (REDIS_*, DATABASE_URL),
+since some modules read them at import time. Nothing connects during import.
+
+Usage: python benchmark_startup.py [runs] [module ...]
+  runs: Fresh interpreters per entry point (defaults to 5)
+  module: Entry point modules to check (defaults to all workers and services)
+"""
+
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+ENTRY_POINTS = [
+    "data_pipeline.props_worker",
+    "data_pipeline.picks_worker",
+    "data_pipeline.parlays_worker",
+    "data_pipeline.matches_worker",
+    "data_pipeline.webhook_server",
+    "prop_generation.services.basketball",
+    "prop_generation.services.baseball",
+    "prop_generation.services.football",
+    "prop_generation.coordinator",
+    "prop_generation.worker",
+]
+
+MEASURE_IMPORT = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "ml_modules": [name for name in ("pandas", "sklearn") if name in sys.modules],
+}))
+"""
+
+
+def measure_entry_point(module, runs, cwd):
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", MEASURE_IMPORT, module],
+            capture_output=True,
+            text=True,
+            cwd=cwd,
+            env={**os.environ, "PYTHONPATH": cwd},
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+        # Modules may log at import time, the measurement is the last line
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    modules = sys.argv[2:] or ENTRY_POINTS
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    print(f"{'entry point':<40} {'import':>10} {'peak rss':>10}  ml stack")
+    for module in modules:
+        results = measure_entry_point(module, runs, cwd)
+        seconds = median(result["seconds"] for result in results)
+        max_rss_mb = median(result["max_rss_kb"] for result in results) / 1024
+        ml_modules = ", ".join(results[0]["ml_modules"]) or "-"
+        print(f"{module:<40} {seconds * 1000:8.0f}ms {max_rss_mb:8.1f}MB  {ml_modules}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark reads from a memory-mapped stat snapshot.
+
+Writes a synthetic league history (players on a handful of teams, one row per
+player per game, with ints, None values and the odd missing team row) with
+write_snapshot, then checks that StatsSnapshot returns the rows and the
+eligibility averages the stat queries would for every player and times
+opening the snapshot and reading each player's four stat lists.
+
+Usage: python benchmark_stats_snapshot.py [players] [games]
+  players: Synthetic players (defaults to 500)
+  games: Games per team (defaults to 80)
+"""
+
+import math
+import sys
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+from prop_generation.snapshot import StatsSnapshot, write_snapshot
+
+LEAGUE = "NBA"
+SAMPLE_SIZE = 25
+TEAMS = 30
+PLAYER_FIELDS = ["points", "rebounds", "assists", "minutes"]
+TEAM_FIELDS = ["points", "pace", "field_goals_attempted"]
+
+
+def synthetic_rows(players: int, games: int, rng: np.random.Generator):
+    """Player and team rows in the order the export queries return them"""
+    team_rows = []
+    schedule = []
+    for game in range(games * TEAMS // 2):
+        home, away = rng.choice(TEAMS, size=2, replace=False)
+        schedule.append((f"g{game:06d}", int(home), int(away)))
+        for team_id in (home, away):
+            # A few team rows missing, as when a feed has no team box
+            if rng.random() < 0.01:
+                continue
+            row = {"game_id": f"g{game:06d}", "team_id": int(team_id), "league": LEAGUE, "order": game}
+            for field in TEAM_FIELDS:
+                row[field] = None if rng.random() < 0.02 else float(rng.normal(100, 10))
+            team_rows.append(row)
+
+    player_rows = []
+    for player_id in range(players):
+        team_id = player_id % TEAMS
+        for game_id, home, away in schedule:
+            if team_id not in (home, away) or rng.random() < 0.1:
+                continue
+            row = {
+                "game_id": game_id,
+                "player_id": player_id,
+                "team_id": team_id,
+                "league": LEAGUE,
+                "status": "ACT",
+                "opponent_team_id": away if team_id == home else home,
+            }
+            for field in PLAYER_FIELDS:
+                row[field] = int(rng.poisson(10))
+            player_rows.append(row)
+
+    # Most recent game first within each id
+    player_rows.sort(key=lambda row: (row["player_id"], -int(row["game_id"][1:])))
+    team_rows.sort(key=lambda row: (row["team_id"], -row["order"]))
+    for row in team_rows:
+        del row["order"]
+    return player_rows, team_rows
+
+
+def expected_lists(player_rows, team_rows, player_id, opponent_id):
+    """What the stat queries return, computed from the rows"""
+    player_games = [row for row in player_rows if row["player_id"] == player_id][:SAMPLE_SIZE]
+    team_by_key = {(row["game_id"], row["team_id"]): row for row in team_rows}
+    team = [team_by_key[key] for key in ((row["game_id"], row["team_id"]) for row in player_games) if key in team_by_key]
+    opponent = [
+        team_by_key[key]
+        for key in ((row["game_id"], row["opponent_team_id"]) for row in player_games)
+        if key in team_by_key
+    ]
+    curr_opponent = [row for row in team_rows if row["team_id"] == opponent_id][:SAMPLE_SIZE]
+    return player_games, team, opponent, curr_opponent
+
+
+def same_rows(expected, actual, fields) -> bool:
+    if len(expected) != len(actual):
+        return False
+    for expected_row, actual_row in zip(expected, actual):
+        if expected_row["game_id"] != actual_row["game_id"]:
+            return False
+        for field in fields:
+            a, b = expected_row[field], actual_row[field]
+            if (a is None) != (b is None) or (a is not None and not math.isclose(a, b)):
+                return False
+    return True
+
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+
+    rng = np.random.default_rng(0)
+    player_rows, team_rows = synthetic_rows(players, games, rng)
+    print(f"{len(player_rows)} player rows, {len(team_rows)} team rows")
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = perf_counter()
+        write_snapshot(directory, LEAGUE, "basketball", player_rows, team_rows)
+        print(f"write: {perf_counter() - start:.3f}s")
+
+        start = perf_counter()
+        snapshot = StatsSnapshot(directory, LEAGUE)
+        print(f"open: {(perf_counter() - start) * 1000:.2f}ms")
+
+        start = perf_counter()
+        for player_id in range(players):
+            snapshot.stats_lists(player_id, (player_id + 1) % TEAMS, SAMPLE_SIZE)
+        elapsed = perf_counter() - start
+        print(f"read: {elapsed * 1e6 / players:.0f}us per player ({players} players)")
+
+        mismatches = 0
+        for player_id in range(players):
+            opponent_id = (player_id + 1) % TEAMS
+            expected = expected_lists(player_rows, team_rows, player_id, opponent_id)
+            actual = snapshot.stats_lists(player_id, opponent_id, SAMPLE_SIZE)
+            fields = [PLAYER_FIELDS, TEAM_FIELDS, TEAM_FIELDS, TEAM_FIELDS]
+            if not all(same_rows(e, a, f) for e, a, f in zip(expected, actual, fields)):
+                mismatches += 1
+        print(f"{players - mismatches}/{players} players read back identically")
+
+        # Eligibility averages, as the services took them of the player rows
+        averages = snapshot.recent_averages(list(range(players)), SAMPLE_SIZE, PLAYER_FIELDS)
+        for player_id in range(players):
+            player_games = expected_lists(player_rows, team_rows, player_id, 0)[0]
+            for field in PLAYER_FIELDS:
+                expected = float(np.mean([row[field] for row in player_games]))
+                if not math.isclose(averages[player_id][field], expected):
+                    print(f"player {player_id} {field} average {averages[player_id][field]} != {expected}")
+                    mismatches += 1
+
+        if snapshot.stats_lists(players + 1, 0, SAMPLE_SIZE)[0]:
+            print("unknown player returned rows")
+            mismatches += 1
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark decay-weighted means: per-feature pure Python vs cached weight kernels.
+
+Compares the old calculate_weighted_arithmetic_mean loop (weights rebuilt and
+summed in Python for every feature) against the weighting module, one feature
+matrix per player and a whole batch of players in one product. Also checks the
+results agree.
+
+Usage: python benchmark_weighted_means.py [players] [games] [features]
+  players: Players in the batch (defaults to 500)
+  games: Sample size per player (defaults to 25)
+  features: Features per player (defaults to 8)
+"""
+
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from prop_generation.generator.weighting import (
+    weighted_column_means,
+    weighted_means_batch,
+)
+
+
+def python_weighted_mean(values, decay_factor=0.825):
+    """calculate_weighted_arithmetic_mean before the weighting module"""
+    if not values:
+        return 0.0
+
+    n = len(values)
+    if n == 1:
+        return values[0]
+
+    weights = [decay_factor ** (n - i - 1) for i in range(n)]
+    weighted_sum = sum(v * w for v, w in zip(values, weights))
+    total_weight = sum(weights)
+
+    return weighted_sum / total_weight if total_weight > 0 else 0.0
+
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    features = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    rng = np.random.default_rng(0)
+    stack = rng.poisson(8, size=(players, games, features)).astype(np.float64)
+    columns = [[stack[p, :, f].tolist() for f in range(features)] for p in range(players)]
+
+    start = perf_counter()
+    python_means = np.array([[python_weighted_mean(column) for column in player] for player in columns])
+    python_seconds = perf_counter() - start
+
+    start = perf_counter()
+    matrix_means = np.array([weighted_column_means(stack[p]) for p in range(players)])
+    matrix_seconds = perf_counter() - start
+
+    start = perf_counter()
+    batch_means = weighted_means_batch(stack)
+    batch_seconds = perf_counter() - start
+
+    max_error = max(
+        np.max(np.abs(matrix_means - python_means)),
+        np.max(np.abs(batch_means - python_means)),
+    )
+
+    print(f"{players} players x {games} games x {features} features")
+    print(f"python per feature  {python_seconds * 1000:8.2f}ms")
+    print(f"matrix per player   {matrix_seconds * 1000:8.2f}ms ({python_seconds / matrix_seconds:.1f}x)")
+    print(f"batched             {batch_seconds * 1000:8.2f}ms ({python_seconds / batch_seconds:.1f}x)")
+    print(f"max abs difference  {max_error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Compare online ridge states with the batch Ridge refits they replace.
+
+Replays player histories game by game. Before each game, the batch model is
+fitted on the previous SAMPLE_SIZE games the way BasePropGenerator does, and
+the online state (folded through the previous game) predicts from its stored
+coefficients. Both are scored against the stat actually recorded. Every RIDGE
+config of the league is replayed with the online solver.
+
+The upcoming opponent is represented by the opponent's row from the game being
+predicted, for both models, since the replay has no opponent history.
+
+Usage: python compare_online_model.py [league] [player_id ...]
+  league: NBA, NCAABB, NFL, NCAAFB or MLB (defaults to NBA)
+  player_id: Players whose history is read from the database; without any, a
+      synthetic history with drifting player form is generated
+"""
+
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from db.stats.baseball import (
+    get_baseball_opponent_stats_for_player,
+    get_baseball_player_stats,
+    get_baseball_team_stats_for_player,
+)
+from db.stats.basketball import (
+    get_basketball_opponent_stats_for_player,
+    get_basketball_player_stats,
+    get_basketball_team_stats_for_player,
+)
+from db.stats.football import (
+    get_football_opponent_stats_for_player,
+    get_football_player_stats,
+    get_football_team_stats_for_player,
+)
+from prop_generation.configs.baseball import SAMPLE_SIZE as BASEBALL_SAMPLE_SIZE
+from prop_generation.configs.baseball import get_baseball_prop_configs
+from prop_generation.configs.basketball import SAMPLE_SIZE as BASKETBALL_SAMPLE_SIZE
+from prop_generation.configs.basketball import get_basketball_prop_configs
+from prop_generation.configs.football import SAMPLE_SIZE as FOOTBALL_SAMPLE_SIZE
+from prop_generation.configs.football import get_football_prop_configs
+from prop_generation.generator.base import DataScope, ModelType, PropConfig
+from prop_generation.generator.catalog import ONLINE_RLS_SOLVER
+from prop_generation.generator.columnar import ColumnarGameStats
+from prop_generation.generator.main import BasePropGenerator
+from prop_generation.generator.online import MIN_ONLINE_GAMES, OnlineRidgeState, fold_game
+
+LEAGUE_SPORTS = {"NBA": "basketball", "NCAABB": "basketball", "NFL": "football", "NCAAFB": "football", "MLB": "baseball"}
+
+SPORTS = {
+    "basketball": (
+        get_basketball_prop_configs,
+        BASKETBALL_SAMPLE_SIZE,
+        (get_basketball_player_stats, get_basketball_team_stats_for_player, get_basketball_opponent_stats_for_player),
+    ),
+    "football": (
+        get_football_prop_configs,
+        FOOTBALL_SAMPLE_SIZE,
+        (get_football_player_stats, get_football_team_stats_for_player, get_football_opponent_stats_for_player),
+    ),
+    "baseball": (
+        get_baseball_prop_configs,
+        BASEBALL_SAMPLE_SIZE,
+        (get_baseball_player_stats, get_baseball_team_stats_for_player, get_baseball_opponent_stats_for_player),
+    ),
+}
+
+HISTORY_LIMIT = 1000
+SYNTHETIC_PLAYERS = 20
+SYNTHETIC_GAMES = 120
+
+
+def online_config(config: PropConfig) -> PropConfig:
+    return PropConfig(
+        stat_name=config.stat_name,
+        features=config.features,
+        model_type=config.model_type,
+        display_name=config.display_name,
+        model_params={**config.model_params, "solver": ONLINE_RLS_SOLVER},
+    )
+
+
+def database_history(fetchers, league, player_id):
+    """(player rows, team rows, opponent rows), oldest game first"""
+    lists = [fetch(player_id=player_id, league=league, limit=HISTORY_LIMIT) for fetch in fetchers]
+    length = min(len(rows) for rows in lists)
+    return tuple(list(reversed(rows[:length])) for rows in lists)
+
+
+def synthetic_history(rng, configs):
+    """A season for one player whose form and usage drift over time"""
+    player_fields = sorted(
+        {config.stat_name for config in configs}
+        | {f.field for config in configs for f in config.features if f.scope == DataScope.PLAYER}
+    )
+    team_fields = sorted({f.field for config in configs for f in config.features if f.scope != DataScope.PLAYER})
+
+    base = {field: rng.uniform(2, 30) for field in player_fields}
+    drift = np.cumsum(rng.normal(0, 0.03, size=SYNTHETIC_GAMES))
+    player_rows, team_rows, opponent_rows = [], [], []
+    for game in range(SYNTHETIC_GAMES):
+        team_row = {field: rng.normal(100, 5) for field in team_fields}
+        opponent_row = {field: rng.normal(100, 5) for field in team_fields}
+        form = 1 + drift[game] + 0.002 * (opponent_row[team_fields[0]] - 100)
+        player_row = {
+            field: max(0.0, rng.normal(mean * form, mean * 0.2)) for field, mean in base.items()
+        }
+        for config in configs:
+            # Targets follow their features, so there is something to learn
+            inputs = [player_row.get(f.field, 0.0) for f in config.features if f.scope == DataScope.PLAYER]
+            player_row[config.stat_name] = max(0.0, 0.5 * float(np.mean(inputs or [0.0])) * form + rng.normal(0, 2))
+        player_row["game_id"] = f"g{game}"
+        player_rows.append(player_row)
+        team_rows.append(team_row)
+        opponent_rows.append(opponent_row)
+    return player_rows, team_rows, opponent_rows
+
+
+def batch_prediction(generator, config, game_data):
+    x_values = game_data.feature_matrix(config.features)
+    y_values = game_data.target_column(config.stat_name)
+    prediction_features = generator.feature_extractor.build_prediction_vector(config.features, game_data, x_values)
+    model = generator.create_model(ModelType.RIDGE, {"alpha": config.model_params.get("alpha", 1)})
+    model.fit(x_values, y_values)
+    return float(model.predict(prediction_features)[0])
+
+
+def replay(generator, config, history, sample_size, results):
+    player_rows, team_rows, opponent_rows = history
+    state = OnlineRidgeState.empty([feature.name for feature in config.features])
+
+    for game in range(len(player_rows)):
+        window = slice(max(0, game - sample_size), game)
+        if game - window.start >= max(MIN_ONLINE_GAMES, 3):
+            game_data = ColumnarGameStats(
+                list(reversed(player_rows[window])),
+                list(reversed(team_rows[window])),
+                list(reversed(opponent_rows[window])),
+                [opponent_rows[game]],
+            )
+            actual = float(player_rows[game][config.stat_name] or 0.0)
+
+            start = perf_counter()
+            batch = batch_prediction(generator, config, game_data)
+            results["batch_seconds"] += perf_counter() - start
+
+            start = perf_counter()
+            online = generator.predict_from_state(config, state, game_data)
+            results["online_seconds"] += perf_counter() - start
+
+            results["batch_errors"].append(batch - actual)
+            results["online_errors"].append(online - actual)
+
+        start = perf_counter()
+        fold_game(state, config, player_rows[game], team_rows[game], opponent_rows[game])
+        results["fold_seconds"] += perf_counter() - start
+
+
+def main():
+    league = sys.argv[1] if len(sys.argv) > 1 else "NBA"
+    player_ids = [int(player_id) for player_id in sys.argv[2:]]
+    sport = LEAGUE_SPORTS[league]
+    get_configs, sample_size, fetchers = SPORTS[sport]
+
+    configs = [
+        online_config(config)
+        for config in get_configs().values()
+        if config.model_type == ModelType.RIDGE
+    ]
+    if not configs:
+        print(f"No RIDGE configs for {league}")
+        return
+
+    if player_ids:
+        histories = [database_history(fetchers, league, player_id) for player_id in player_ids]
+    else:
+        rng = np.random.default_rng(0)
+        histories = [synthetic_history(rng, configs) for _ in range(SYNTHETIC_PLAYERS)]
+    print(f"{league}: {len(histories)} players ({'database' if player_ids else 'synthetic'}), {len(configs)} RIDGE configs")
+
+    generator = BasePropGenerator()
+    for config in configs:
+        results = {"batch_errors": [], "online_errors": [], "batch_seconds": 0.0, "online_seconds": 0.0, "fold_seconds": 0.0}
+        for history in histories:
+            replay(generator, config, history, sample_size, results)
+
+        if not results["batch_errors"]:
+            continue
+        batch_errors = np.array(results["batch_errors"])
+        online_errors = np.array(results["online_errors"])
+        predictions = len(batch_errors)
+        print(
+            f"  {config.stat_name:<24} MAE batch {np.mean(np.abs(batch_errors)):7.3f} online {np.mean(np.abs(online_errors)):7.3f}"
+            f"  RMSE batch {np.sqrt(np.mean(batch_errors**2)):7.3f} online {np.sqrt(np.mean(online_errors**2)):7.3f}"
+            f"  per line: fit {results['batch_seconds'] / predictions * 1e3:.2f}ms,"
+            f" state {results['online_seconds'] / predictions * 1e6:.0f}us (+{results['fold_seconds'] / predictions * 1e6:.0f}us fold)"
+        )
+
+
+if __name__ == "__main__":
+    main()
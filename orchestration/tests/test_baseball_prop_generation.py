@@ -208,7 +208,7 @@ def main() -> None:
                                 ),
                             }
 
-                            # Instead of insert_prop(prop_data), save to output
+                            # Instead of writer.add_prop(prop_data), save to output
                             props_output.append(prop_data)
 
                             total_props_generated += 1
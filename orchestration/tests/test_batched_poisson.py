@@ -0,0 +1,113 @@
+"""
+Validate the batched Poisson solver against scikit-learn.
+
+Fits random count problems, shaped like the prop generator's (a season of games
+by a handful of standardized features), with BatchedPoissonRegressor and with
+make_pipeline(StandardScaler(), PoissonRegressor()) at a tight tolerance, and
+checks the predictions agree. Includes constant features, all-zero targets and
+several alphas. Also reports how far sklearn's default tolerance, which the
+generator used before, is from the exact optimum.
+
+Usage: python test_batched_poisson.py [problems] [seed]
+  problems: Random problems per alpha (defaults to 200)
+  seed: Random seed (defaults to a random one, printed so failures can be replayed)
+"""
+
+import random
+import sys
+import warnings
+
+import numpy as np
+from sklearn.linear_model import PoissonRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from prop_generation.generator.poisson import BatchedPoissonRegressor
+
+ALPHAS = [0.1, 1.0, 10.0]
+RELATIVE_TOLERANCE = 1e-5
+
+
+def relative_error(actual, expected):
+    """Relative difference, or absolute for near-zero rates (all-zero targets)"""
+    return abs(actual - expected) / max(abs(expected), 1e-3)
+
+
+def random_problem(rng: np.random.Generator):
+    n_games = int(rng.integers(5, 60))
+    n_features = int(rng.integers(1, 9))
+    x_values = rng.gamma(2.0, 3.0, size=(n_games, n_features)) * rng.choice([1, 10, 100], size=n_features)
+    if rng.random() < 0.2:
+        x_values[:, rng.integers(n_features)] = rng.integers(0, 5)
+    rate = np.exp(0.3 * (x_values - x_values.mean(axis=0)) / (x_values.std(axis=0) + 1) @ rng.normal(size=n_features))
+    y_values = rng.poisson(rate * rng.choice([0.05, 0.5, 3.0])).astype(np.float64)
+    if rng.random() < 0.05:
+        y_values[:] = 0.0
+    x_next = x_values.mean(axis=0) + rng.normal(size=n_features) * x_values.std(axis=0)
+    return x_values, y_values, x_next[None, :]
+
+
+def sklearn_prediction(x_values, y_values, x_next, alpha, tol):
+    model = make_pipeline(StandardScaler(), PoissonRegressor(alpha=alpha, tol=tol, max_iter=10000))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model.fit(x_values, y_values)
+    return float(model.predict(x_next)[0])
+
+
+def main():
+    problems = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else random.randrange(2**32)
+    print(f"Checking {problems} random problems per alpha (seed {seed})")
+
+    rng = np.random.default_rng(seed)
+    failures = 0
+
+    for alpha in ALPHAS:
+        worst_exact = 0.0
+        worst_default = 0.0
+        batch = []
+
+        for problem in range(problems):
+            x_values, y_values, x_next = random_problem(rng)
+            batch.append((x_values, y_values, x_next))
+
+            predicted = float(BatchedPoissonRegressor(alpha=alpha).fit(x_values, y_values).predict(x_next)[0])
+            exact = sklearn_prediction(x_values, y_values, x_next, alpha, tol=1e-12)
+            default = sklearn_prediction(x_values, y_values, x_next, alpha, tol=1e-4)
+
+            error = relative_error(predicted, exact)
+            worst_exact = max(worst_exact, error)
+            worst_default = max(worst_default, relative_error(default, exact))
+            if error > RELATIVE_TOLERANCE:
+                failures += 1
+                print(f"alpha {alpha} problem {problem}: batched {predicted!r}, sklearn {exact!r}")
+
+        # A stack of same-shaped problems must give what fitting each alone does
+        shape = batch[0][0].shape
+        same_shape = [item for item in batch if item[0].shape == shape] or batch[:1]
+        stacked = BatchedPoissonRegressor(alpha=alpha).fit(
+            np.stack([x for x, _, _ in same_shape]), np.stack([y for _, y, _ in same_shape])
+        ).predict(np.stack([x_next for _, _, x_next in same_shape]))[:, 0]
+        alone = [
+            float(BatchedPoissonRegressor(alpha=alpha).fit(x, y).predict(x_next)[0])
+            for x, y, x_next in same_shape
+        ]
+        if not np.allclose(stacked, alone, rtol=1e-9, atol=1e-12):
+            failures += 1
+            print(f"alpha {alpha}: stacked fit differs from fitting alone")
+
+        print(
+            f"alpha {alpha}: max relative error vs exact sklearn {worst_exact:.1e}, "
+            f"sklearn default tol vs exact {worst_default:.1e}"
+        )
+
+    if failures:
+        print(f"\n{failures} mismatches (seed {seed})")
+        sys.exit(1)
+
+    print("\nBatched Poisson solver matches scikit-learn")
+
+
+if __name__ == "__main__":
+    main()
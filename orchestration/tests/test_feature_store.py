@@ -0,0 +1,112 @@
+"""
+Check that prop lines generated from the materialized feature windows match
+lines generated from the stat rows the services used to query.
+
+A synthetic history is ingested game by game: player and team windows are
+grown with prepend_player_game / prepend_team_game as process_game does, and
+compared with windows built in one go from the last SAMPLE_SIZE rows, as
+rebuild_feature_store does. Every config of the sport is then run on the
+window-backed stat lists and on the row lists. A game older than a window's
+most recent one, as a backfill ingests, must not be prepended.
+
+Usage: python test_feature_store.py [sport] [games]
+  sport: basketball, football or baseball (defaults to basketball)
+  games: Length of the synthetic history (defaults to 60)
+"""
+
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from prop_generation.feature_store import (
+    SPORT_FEATURE_STORES,
+    build_player_window,
+    build_team_window,
+    prepend_player_game,
+    prepend_team_game,
+    window_fields,
+    window_stats_lists,
+)
+from prop_generation.generator.columnar import ColumnarGameStats
+from prop_generation.generator.main import BasePropGenerator
+
+
+def synthetic_history(sport: str, games: int, rng: np.random.Generator):
+    """Player, team and opponent rows plus the upcoming opponent's rows, oldest game first"""
+    player_fields, team_fields = window_fields(sport)
+    player_rows, team_rows, opponent_rows, curr_opponent_rows = [], [], [], []
+    for game in range(games):
+        game_id = f"game-{game}"
+        player_row = {"game_id": game_id, "player_id": 1, "league": "TEST", "team_id": 10}
+        for field in player_fields:
+            player_row[field] = float(rng.poisson(4))
+        player_rows.append(player_row)
+
+        for rows, team_id in ((team_rows, 10), (opponent_rows, 20), (curr_opponent_rows, 30)):
+            row = {"game_id": game_id if team_id != 30 else f"other-{game}", "team_id": team_id}
+            for field in team_fields:
+                # Some missing values in past games, as the feeds leave them
+                missing = team_id != 30 and rng.random() < 0.02
+                row[field] = None if missing else float(rng.normal(50, 10))
+            rows.append(row)
+    return player_rows, team_rows, opponent_rows, curr_opponent_rows
+
+
+def generate_lines(sport: str, stats_lists) -> dict[str, float]:
+    configs = SPORT_FEATURE_STORES[sport]["get_configs"]()
+    game_data = ColumnarGameStats(*stats_lists)
+    generator = BasePropGenerator()
+    # Same random line bias for both runs
+    random.seed(0)
+    return {stat: generator.generate_prop(config, game_data) for stat, config in configs.items()}
+
+
+def main():
+    sport = sys.argv[1] if len(sys.argv) > 1 else "basketball"
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    sample_size = SPORT_FEATURE_STORES[sport]["sample_size"]
+
+    rng = np.random.default_rng(0)
+    player_rows, team_rows, opponent_rows, curr_opponent_rows = synthetic_history(sport, games, rng)
+
+    # Ingest game by game, seeding from the first game
+    start_times = [datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(days=game) for game in range(games)]
+    player_window = build_player_window(sport, "TEST", [player_rows[0]], [team_rows[0]], [opponent_rows[0]])
+    team_window = build_team_window(sport, "TEST", 30, [curr_opponent_rows[0]])
+    player_window["head_start_time"] = team_window["head_start_time"] = start_times[0]
+    for game in range(1, games):
+        prepend_player_game(sport, player_window, start_times[game], player_rows[game], team_rows[game], opponent_rows[game])
+        prepend_team_game(sport, team_window, start_times[game], curr_opponent_rows[game])
+    # Ingesting the same game twice, or an older game, changes nothing
+    for game in (games - 1, games // 2):
+        assert not prepend_player_game(
+            sport, player_window, start_times[game], player_rows[game], team_rows[game], opponent_rows[game]
+        )
+        assert not prepend_team_game(sport, team_window, start_times[game], curr_opponent_rows[game])
+    assert player_window["head_start_time"] == team_window["head_start_time"] == start_times[-1]
+
+    # Most recent first, as the stat queries return them
+    recent = [list(reversed(rows))[:sample_size] for rows in (player_rows, team_rows, opponent_rows, curr_opponent_rows)]
+    rebuilt_window = build_player_window(sport, "TEST", recent[0], recent[1], recent[2])
+    rebuilt_team_window = build_team_window(sport, "TEST", 30, recent[3])
+    assert np.array_equal(player_window["player_values"], rebuilt_window["player_values"], equal_nan=True)
+    assert player_window["game_ids"] == rebuilt_window["game_ids"]
+    assert np.array_equal(team_window["stat_values"], rebuilt_team_window["stat_values"], equal_nan=True)
+
+    window_lines = generate_lines(sport, window_stats_lists(sport, player_window, team_window))
+    row_lines = generate_lines(sport, recent)
+
+    mismatches = [stat for stat in row_lines if window_lines[stat] != row_lines[stat]]
+    for stat in row_lines:
+        marker = "" if stat not in mismatches else "  <-- mismatch"
+        print(f"{stat:>28}: rows {row_lines[stat]:>6}  window {window_lines[stat]:>6}{marker}")
+    print(f"{len(row_lines) - len(mismatches)}/{len(row_lines)} {sport} lines identical")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -234,7 +234,7 @@ def main():
                                     ),
                                 }
 
-                                # Instead of insert_prop(prop_data), save to output
+                                # Instead of writer.add_prop(prop_data), save to output
                                 props_output.append(prop_data)
 
                                 league_props_generated += 1
@@ -0,0 +1,105 @@
+"""
+Test that a failing pubsub handler is counted and marked on its span.
+
+Feeds listen_for_messages_async a stub pubsub carrying one traced message and
+one untraced message for a handler that raises, and one message for a
+handler that succeeds. Checks that handler_failures_total goes up once per
+failed message only, that the failed traced message's span is recorded with
+error set, and that the listener keeps going after a handler fails.
+
+Needs nothing running: the Redis client is a stub and spans are captured in
+memory instead of being exported.
+
+Usage: python test_handler_failures.py
+"""
+
+import asyncio
+import sys
+import uuid
+from time import time
+
+import tracing
+from metrics import HANDLER_FAILURES
+from redis_utils import listen_for_messages_async
+from tracing import TRACE_KEY
+
+
+class StubPubSub:
+    def __init__(self, messages: list):
+        self.messages = messages
+
+    async def subscribe(self, channel: str) -> None:
+        pass
+
+    async def listen(self):
+        for message in self.messages:
+            yield {"type": "message", "data": message}
+        # Give the handler tasks a chance to finish before the listener returns
+        await asyncio.sleep(0.05)
+
+
+class StubRedis:
+    def __init__(self, messages: list):
+        self.messages = messages
+
+    def pubsub(self) -> StubPubSub:
+        return StubPubSub(self.messages)
+
+
+def traced(data: dict, channel: str) -> dict:
+    now = time()
+    data[TRACE_KEY] = {"trace_id": uuid.uuid4().hex, "league": "NBA", "origin_at": now, "hops": [[channel, now]]}
+    return data
+
+
+def failures(channel: str) -> float:
+    return HANDLER_FAILURES.labels(handler=channel)._value.get()
+
+
+async def main():
+    spans = []
+    tracing._record = spans.append
+
+    handled = []
+
+    async def failing_handler(data):
+        handled.append(data["id"])
+        raise RuntimeError(f"handler failed for {data['id']}")
+
+    async def passing_handler(data):
+        handled.append(data["id"])
+
+    failing, passing = "test_failing", "test_passing"
+    before = failures(failing), failures(passing)
+
+    await listen_for_messages_async(
+        StubRedis([traced({"id": 1}, failing), {"id": 2}]), failing, failing_handler
+    )
+    await listen_for_messages_async(StubRedis([traced({"id": 3}, passing)]), passing, passing_handler)
+
+    failed = failures(failing) - before[0]
+    passed = failures(passing) - before[1]
+    print(f"handled {handled}, failures: {failing}={failed:g} {passing}={passed:g}, spans: {spans}")
+
+    errors = 0
+    if sorted(handled) != [1, 2, 3]:
+        print("not every message reached its handler")
+        errors += 1
+    if failed != 2:
+        print(f"expected 2 failures on {failing}, counted {failed:g}")
+        errors += 1
+    if passed != 0:
+        print(f"expected no failures on {passing}, counted {passed:g}")
+        errors += 1
+    span_errors = {span["name"]: span["error"] for span in spans}
+    if span_errors != {failing: True, passing: False}:
+        print(f"expected the failed handler's span to be marked as an error, got {span_errors}")
+        errors += 1
+
+    if errors:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,194 @@
+"""
+Test the notification outbox's claim, lease, backoff and dead-letter handling,
+and how the dispatcher merges a batch into requests.
+
+Drives db/outbox.py through a notification's life: claimed rows are leased
+away from the next claim, failures back off exponentially from the attempt the
+claim counted, a notification out of attempts is reported as a dead letter and
+never claimed again, and the retention purge deletes old sent notifications
+and old dead letters only. Then checks that merge_notifications sends each
+receiver one push and lets receivers of identical pushes share a request.
+
+Needs DATABASE_URL pointing at a Postgres the test can create a temporary
+table in. The temporary notification_outbox shadows the real one for the
+test's connection, so no stored notification is read or written.
+
+Usage: python test_notification_outbox.py
+"""
+
+import asyncio
+import sys
+
+import psycopg
+from psycopg.rows import dict_row
+
+from data_pipeline.notification_dispatcher import merge_notifications
+from db.outbox import (
+    claim_notifications,
+    delete_finished_notifications,
+    enqueue_notifications,
+    mark_notifications_failed,
+    mark_notifications_sent,
+)
+from utils import getenv_required
+
+MAX_ATTEMPTS = 3
+LEASE_SECONDS = 60
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 600
+RETENTION_DAYS = 7
+
+OUTBOX_TABLE = """
+    CREATE TEMPORARY TABLE notification_outbox (
+        id serial PRIMARY KEY,
+        receiver_id text NOT NULL,
+        title text NOT NULL,
+        body text NOT NULL,
+        url text,
+        attempts integer DEFAULT 0 NOT NULL,
+        next_attempt_at timestamp with time zone DEFAULT now() NOT NULL,
+        sent_at timestamp with time zone,
+        last_error text,
+        created_at timestamp with time zone DEFAULT now() NOT NULL
+    )
+"""
+
+
+def notification(receiver_id: str, title: str, body: str, url: str) -> dict:
+    return {"receiver_id": receiver_id, "title": title, "body": body, "url": url}
+
+
+async def due_in(cur, ids: list[int]) -> dict[int, float]:
+    """Seconds until each notification is due, from the transaction's NOW()"""
+    await cur.execute(
+        "SELECT id, EXTRACT(EPOCH FROM next_attempt_at - NOW())::float AS due_in FROM notification_outbox WHERE id = ANY(%s)",
+        (ids,),
+    )
+    return {row["id"]: round(row["due_in"], 3) for row in await cur.fetchall()}
+
+
+async def make_due(cur, ids: list[int]) -> None:
+    await cur.execute("UPDATE notification_outbox SET next_attempt_at = NOW() WHERE id = ANY(%s)", (ids,))
+
+
+async def claim(conn, cur) -> list[dict]:
+    rows = await claim_notifications(cur, 10, MAX_ATTEMPTS, LEASE_SECONDS)
+    await conn.commit()
+    return rows
+
+
+async def check_outbox(conn, cur) -> list[str]:
+    errors = []
+    await enqueue_notifications(
+        cur,
+        [
+            notification("user-a", "Parlay Resolved", "Your match parlay has been resolved!", "/match/1"),
+            notification("user-b", "Parlay Resolved", "Your match parlay has been resolved!", "/match/2"),
+            notification("user-c", "Match Ended", "Your match has ended. Check your results!", "/match/3"),
+            notification("", "Match Ended", "Never stored without a receiver", "/match/4"),
+        ],
+    )
+    await conn.commit()
+
+    # A claim leases the rows and counts the attempt; the next claim skips them
+    rows = await claim_notifications(cur, 2, MAX_ATTEMPTS, LEASE_SECONDS)
+    leases = await due_in(cur, [row["id"] for row in rows])
+    await conn.commit()
+    if [(row["id"], row["attempts"]) for row in rows] != [(1, 1), (2, 1)]:
+        errors.append(f"expected the two oldest rows on their first attempt, claimed {rows}")
+    if set(leases.values()) != {LEASE_SECONDS}:
+        errors.append(f"expected claimed rows leased for {LEASE_SECONDS}s, due in {leases}")
+    rows = await claim(conn, cur)
+    if [row["id"] for row in rows] != [3]:
+        errors.append(f"expected only the unleased row to be claimed, got {[row['id'] for row in rows]}")
+
+    # Failures back off 5s, 10s, ... from the attempt the claim counted, until out of attempts
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if attempt > 1:
+            await make_due(cur, [1])
+            await conn.commit()
+            rows = await claim(conn, cur)
+            if [(row["id"], row["attempts"]) for row in rows] != [(1, attempt)]:
+                errors.append(f"attempt {attempt}: expected row 1 claimed again, got {rows}")
+        dead_letters = await mark_notifications_failed(
+            cur, [1], f"failure {attempt}", BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS, MAX_ATTEMPTS
+        )
+        backoff = (await due_in(cur, [1]))[1]
+        await conn.commit()
+        if backoff != BACKOFF_BASE_SECONDS * 2 ** (attempt - 1):
+            errors.append(f"attempt {attempt}: expected a {BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)}s backoff, got {backoff}s")
+        if dead_letters != ([1] if attempt == MAX_ATTEMPTS else []):
+            errors.append(f"attempt {attempt}: dead letters {dead_letters}")
+
+    await make_due(cur, [1])
+    await conn.commit()
+    if await claim(conn, cur):
+        errors.append("a dead letter was claimed again")
+
+    await mark_notifications_sent(cur, [2, 3])
+    await conn.commit()
+    await make_due(cur, [2, 3])
+    if await claim(conn, cur):
+        errors.append("a sent notification was claimed again")
+
+    # Only old sent notifications and old dead letters are purged
+    await cur.execute(
+        "UPDATE notification_outbox SET created_at = NOW() - INTERVAL '8 days' WHERE id IN (1, 2)"
+    )
+    await cur.execute("UPDATE notification_outbox SET sent_at = NOW() - INTERVAL '8 days' WHERE id = 2")
+    deleted = await delete_finished_notifications(cur, RETENTION_DAYS, MAX_ATTEMPTS)
+    await cur.execute("SELECT id FROM notification_outbox ORDER BY id")
+    remaining = [row["id"] for row in await cur.fetchall()]
+    await conn.commit()
+    if deleted != 2 or remaining != [3]:
+        errors.append(f"expected rows 1 and 2 purged, deleted {deleted} leaving {remaining}")
+    return errors
+
+
+def check_merging() -> list[str]:
+    errors = []
+    rows = [
+        {"id": 1, "attempts": 1, **notification("user-a", "Parlay Resolved", "Your match parlay has been resolved!", "/match/1?p=1")},
+        {"id": 2, "attempts": 1, **notification("user-a", "Parlay Resolved", "Your match parlay has been resolved!", "/match/1?p=2")},
+        {"id": 3, "attempts": 1, **notification("user-b", "Parlay Resolved", "Your match parlay has been resolved!", "/match/2")},
+        {"id": 4, "attempts": 1, **notification("user-b", "Match Ended", "Your match has ended. Check your results!", "/match/2")},
+        {"id": 5, "attempts": 1, **notification("user-c", "Match Ended", "Your match has ended. Check your results!", "/match/3")},
+        {"id": 6, "attempts": 1, **notification("user-d", "Match Ended", "Your match has ended. Check your results!", "/match/3")},
+    ]
+    requests = merge_notifications(rows)
+    receivers = sorted(receiver for _, receiver_ids, _ in requests for receiver in receiver_ids)
+    if receivers != ["user-a", "user-b", "user-c", "user-d"]:
+        errors.append(f"expected one push per receiver, got receivers {receivers}")
+    if sorted(outbox_id for _, _, ids in requests for outbox_id in ids) != [1, 2, 3, 4, 5, 6]:
+        errors.append("not every outbox row is covered by exactly one request")
+    by_receiver = {receiver: push for push, receiver_ids, _ in requests for receiver in receiver_ids}
+    if by_receiver["user-a"] != {
+        "title": "Parlay Resolved",
+        "body": "Your match parlay has been resolved! (2 updates)",
+        "data": {"url": "/match/1?p=2"},
+    }:
+        errors.append(f"unexpected summary of repeated notifications: {by_receiver['user-a']}")
+    if by_receiver["user-b"]["title"] != "2 new notifications" or by_receiver["user-b"]["body"].count("\n") != 1:
+        errors.append(f"unexpected summary of different notifications: {by_receiver['user-b']}")
+    if len(requests) != 3:
+        errors.append(f"expected user-c and user-d to share a request, got {len(requests)} requests")
+    return errors
+
+
+async def main():
+    async with await psycopg.AsyncConnection.connect(getenv_required("DATABASE_URL")) as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(OUTBOX_TABLE)
+            await conn.commit()
+            errors = await check_outbox(conn, cur)
+    errors += check_merging()
+
+    for error in errors:
+        print(error)
+    if errors:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+Test the distributed prop generation work queue against a local Redis.
+
+Enqueues a run of synthetic work units and drains it with several worker
+processes that sleep instead of generating. One unit in seven fails on its
+first attempt and one worker dies holding a lease, so the run has to retry
+failed units and reclaim the expired lease. Checks that every unit ends up
+done, that exactly one call reports the run as finished, and that every key
+the run left in Redis expires.
+
+Needs REDIS_HOST, REDIS_PORT and REDIS_PW pointing at a Redis server the test
+can write to; it only touches keys of its own run.
+
+Usage: python test_prop_work_queue.py [units] [workers]
+  units: Synthetic work units (defaults to 200)
+  workers: Worker processes (defaults to 4)
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from prop_generation.work_queue import PropWorkQueue, make_unit
+from redis_utils import create_redis_client
+
+LEASE_SECONDS = 1
+
+
+def run_worker(run_id: str, crash: bool, results: multiprocessing.Queue) -> None:
+    queue = PropWorkQueue(create_redis_client(), run_id)
+    worker_id = f"test-worker-{os.getpid()}"
+    completed = []
+    finished_calls = 0
+
+    while True:
+        unit, attempt, run_finished = queue.claim(worker_id, LEASE_SECONDS)
+        finished_calls += run_finished
+        if unit is None:
+            if queue.settled():
+                break
+            time.sleep(0.05)
+            continue
+
+        if crash:
+            # Die holding the lease; another worker has to reclaim the unit
+            results.put((worker_id, completed, finished_calls, unit["unit_id"]))
+            results.close()
+            results.join_thread()
+            os._exit(0)
+
+        time.sleep(random.uniform(0, 0.01))
+        if unit["team_id"] % 7 == 0 and attempt == 1:
+            finished_calls += queue.fail(unit["unit_id"], worker_id)
+            continue
+
+        queue.heartbeat(unit["unit_id"], worker_id, LEASE_SECONDS)
+        finished_calls += queue.complete(unit["unit_id"])
+        completed.append(unit["unit_id"])
+
+    results.put((worker_id, completed, finished_calls, None))
+
+
+def main():
+    units_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    client = create_redis_client()
+    run_id = f"test-{os.getpid()}-{int(time.time())}"
+    units = [
+        make_unit("basketball", "NBA", "2025-01-01", False, {"game_ID": f"g{index // 2}"}, index)
+        for index in range(units_count)
+    ]
+    queue = PropWorkQueue.create(client, run_id, units)
+
+    start = time.perf_counter()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(run_id, index == 0, results))
+        for index in range(workers + 1)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    completed = [unit_id for _, unit_completed, _, _ in reports for unit_id in unit_completed]
+    finished_calls = sum(calls for _, _, calls, _ in reports)
+    crashed_units = [unit_id for _, _, _, unit_id in reports if unit_id is not None]
+    progress = queue.progress()
+    print(f"{units_count} units with {workers} workers in {elapsed:.2f}s: {progress}")
+
+    failures = 0
+    expected = {unit["unit_id"] for unit in units}
+    if set(completed) != expected:
+        print(f"missing units: {sorted(expected - set(completed))[:10]}")
+        failures += 1
+    if progress["done"] != units_count or progress["failed"]:
+        print("run did not settle with every unit done")
+        failures += 1
+    if finished_calls != 1:
+        print(f"run reported finished {finished_calls} times")
+        failures += 1
+    if not crashed_units or crashed_units[0] not in completed:
+        print("crashed worker's unit was not reclaimed")
+        failures += 1
+    # -1 is a key without an expiry, -2 one that does not exist
+    ttls = {key: client.ttl(key) for key in queue.keys}
+    without_ttl = [key for key, ttl in ttls.items() if ttl == -1]
+    if without_ttl:
+        print(f"keys without an expiry: {without_ttl}")
+        failures += 1
+    # Leases, owners and pending are empty, and so removed, once the run settles, as is failed when no unit failed
+    missing = [key for key in queue.keys if ttls[key] == -2 and not key.endswith((":leases", ":owners", ":pending", ":failed"))]
+    if missing:
+        print(f"run keys missing after the run: {missing}")
+        failures += 1
+
+    client.delete(*queue.keys)
+    if failures:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
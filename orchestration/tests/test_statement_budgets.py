@@ -0,0 +1,242 @@
+"""
+Test the pipeline handlers' statement budgets with strict budgets on.
+
+Runs each @statement_budget handler once down its settling path against a
+scripted cursor, which answers the registry statements with canned rows and
+counts every statement the way InstrumentedAsyncCursor does. Checks that each
+handler stays within its declared budget (handle_stats_updated has none; its
+count is checked against BEGIN, the two prop reads, one update per prop and
+COMMIT), and that the same handler body under a budget one below what it ran
+raises StatementBudgetExceeded.
+
+Needs nothing running: the pool, Redis client, feed and stat extraction are
+replaced with in-memory fakes.
+
+Usage: python test_statement_budgets.py
+"""
+
+import os
+
+# Read when db.instrumentation is imported
+os.environ["DB_STATEMENT_BUDGET_STRICT"] = "1"
+os.environ.setdefault("DATA_FEEDS_API_TOKEN", "test")
+os.environ.setdefault("DATA_FEEDS_BASE_URL", "http://feeds.test")
+
+import asyncio
+import json
+import sys
+import types
+from contextlib import asynccontextmanager
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from data_pipeline import matches_worker, parlays_worker, picks_worker, props_worker
+from db import statements
+from db.instrumentation import StatementBudgetExceeded, _record_statement, statement_budget, unit_of_work
+
+MATCH_USERS = [
+    (100, "user-a", 120.0, 100.0, 1200.0, 0.0, "not_resolved"),
+    (101, "user-b", 90.0, 100.0, 1180.0, 0.0, "not_resolved"),
+]
+
+ROWS = {
+    # picks_worker
+    statements.PROP_BY_ID.sql: lambda params: [(params[0], 25.0, 20.5, "resolved")],
+    statements.PICKS_OVER_HIT.sql: lambda params: [(1, 10), (2, 11)],
+    # parlays_worker
+    statements.PICK_EXISTS.sql: lambda params: [(params[0],)],
+    statements.PARLAY_FOR_PICK.sql: lambda params: [
+        (10, 5.0, "perfect", False, 100, None, 50.0, 1000, "user-a", None, None, None)
+    ],
+    statements.LOCK_PARLAY.sql: lambda params: [(params[0], False)],
+    statements.PARLAY_PICKS.sql: lambda params: [(1, "hit"), (2, "hit")],
+    # matches_worker
+    statements.PARLAY_EXISTS.sql: lambda params: [(params[0],)],
+    statements.MATCH_FOR_PARLAY.sql: lambda params: [(1000, "competitive", "NBA", False)],
+    statements.MATCH_BY_ID.sql: lambda params: [(params[0], "competitive", "NBA", False)],
+    statements.LOCK_UNRESOLVED_MATCH.sql: lambda params: [(params[0],)],
+    statements.MATCH_USERS.sql: lambda params: MATCH_USERS,
+    statements.MATCH_USER_PARLAYS.sql: lambda params: [(params[0] * 10, 30.0, True, 60.0), (params[0] * 10 + 1, 30.0, True, 0.0)],
+    statements.AVAILABLE_PROPS_IN_LEAGUE.sql: lambda params: [(0,)],
+    "SELECT id, points FROM public.user WHERE id = %s FOR UPDATE": lambda params: [(params[0], 1200.0)],
+    # props_worker
+    statements.PROPS_FOR_GAME_STATS.sql: lambda params: [
+        (200, 20.5, "not_resolved", 1, "points", "NBA", params[0]),
+        (201, 8.5, "not_resolved", 2, "rebounds", "NBA", params[0]),
+    ],
+    statements.OPEN_PROPS_FOR_GAME.sql: lambda params: [(200, 1, params[0]), (201, 2, params[0]), (202, 3, params[0])],
+    statements.UPDATE_PROP_VALUE.sql: lambda params: [(params[2],)],
+}
+
+
+class FakeCursor:
+    """Answers registry statements from ROWS; anything else returns no rows"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._rows = []
+        self.rowcount = -1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params=None, *, prepare=None, binary=None):
+        rows = ROWS.get(query)
+        self._rows = list(rows(params)) if rows else []
+        self.rowcount = len(self._rows) if rows else 1
+        _record_statement(self, query, 0.0)
+        return self
+
+    async def executemany(self, query, params_seq, *, returning=False):
+        self._rows = []
+        self.rowcount = len(params_seq)
+        _record_statement(self, query, 0.0)
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self):
+        return self._rows
+
+
+class FakeConnection:
+    def cursor(self):
+        return FakeCursor(self)
+
+    @asynccontextmanager
+    async def pipeline(self):
+        yield
+
+
+class FakePool:
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        yield FakeConnection()
+
+
+async def get_fake_pool():
+    return FakePool()
+
+
+class FakeRedis:
+    async def publish(self, channel, message):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+async def create_fake_redis_client():
+    return FakeRedis()
+
+
+class FakeFeedContent:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def read(self, n=-1):
+        chunk, self.body = (self.body, b"") if n < 0 else (self.body[:n], self.body[n:])
+        return chunk
+
+
+class FakeFeedResponse:
+    status = 200
+
+    def __init__(self, games: list):
+        self.content = FakeFeedContent(json.dumps({"data": {"NBA": games}}).encode())
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeFeedSession:
+    """Serves one completed game for today's feed and none for yesterday's"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @asynccontextmanager
+    async def get(self, url, timeout=None):
+        today = datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d")
+        games = [{"game_ID": "g1", "status": "completed"}] if f"/live/{today}/" in url else []
+        yield FakeFeedResponse(games)
+
+
+class FakeExtractionStage:
+    async def extract(self, game, league, stat_names):
+        return [(1, "points", 25.0), (2, "rebounds", 7.0)]
+
+
+# BEGIN, props for the stats, open props, one update per prop (two with stats, one did_not_play), COMMIT
+STATS_UPDATED_STATEMENTS = 7
+
+HANDLERS = [
+    (picks_worker.handle_prop_updated, {"id": 7}, 10),
+    (parlays_worker.handle_pick_resolved, {"id": 1}, 12),
+    (matches_worker.handle_parlay_resolved, {"id": 10}, 30),
+    (matches_worker.handle_match_check, {"matchId": 1000}, 30),
+    (props_worker.handle_stats_updated, {"league": "NBA"}, None),
+]
+
+
+def install_fakes() -> None:
+    for module in (picks_worker, parlays_worker, matches_worker, props_worker):
+        module.get_async_pool = get_fake_pool
+        module.create_async_redis_client = create_fake_redis_client
+    props_worker.aiohttp = types.SimpleNamespace(ClientSession=FakeFeedSession)
+    props_worker.extraction_stage = FakeExtractionStage()
+
+
+async def count_statements(handler, data) -> int:
+    with unit_of_work("test") as unit:
+        await handler(data)
+    return unit.statements
+
+
+async def main():
+    install_fakes()
+
+    failures = 0
+    for handler, data, budget in HANDLERS:
+        name = handler.__name__
+        try:
+            count = await count_statements(handler, data)
+        except StatementBudgetExceeded as e:
+            print(f"{name} went over its budget: {e}")
+            failures += 1
+            continue
+
+        expected = f"budget {budget}" if budget is not None else f"expected {STATS_UPDATED_STATEMENTS}"
+        print(f"{name}: {count} statements, {expected}")
+        if budget is not None and count > budget:
+            failures += 1
+        if budget is None and count != STATS_UPDATED_STATEMENTS:
+            failures += 1
+        if count == 0:
+            print(f"{name} ran no statements, so its settling path was not reached")
+            failures += 1
+            continue
+
+        # The undecorated handler body (under @profiled and @statement_budget), one statement short
+        body = handler.__wrapped__.__wrapped__
+        try:
+            await statement_budget(count - 1)(body)(data)
+        except StatementBudgetExceeded:
+            pass
+        else:
+            print(f"{name} under a budget of {count - 1} did not raise StatementBudgetExceeded")
+            failures += 1
+
+    if failures:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
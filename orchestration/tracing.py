@@ -0,0 +1,182 @@
+"""
+Trace context for the settlement chain.
+
+A stat update travels webhook_server -> stats_updated_* -> props_worker ->
+prop_updated -> picks_worker -> pick_resolved -> parlays_worker ->
+parlay_resolved -> matches_worker. publish_message_async stores the current
+trace in each message under TRACE_KEY: its id, league, origin time and one
+[channel, published_at] hop per message it has passed through.
+listen_for_messages_async runs each handler inside the trace its message
+carries, so everything the handler publishes continues that trace, and
+records a span of the handler.
+
+Spans are exported as one JSON object per line to TRACE_FILE and/or one per
+UDP datagram to TRACE_COLLECTOR (host:port), from a background thread. With
+neither set, context is still propagated but nothing is recorded.
+batch/settlement_lag_report.py summarizes exported spans.
+"""
+
+import atexit
+import json
+import os
+import queue
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import time
+from typing import Optional, TypedDict
+
+TRACE_KEY = "_trace"
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_COLLECTOR = os.getenv("TRACE_COLLECTOR")
+
+
+class TraceContext(TypedDict):
+    trace_id: str
+    league: Optional[str]
+    origin_at: float
+    hops: list  # [channel, published_at] per message, oldest first
+
+
+_current: ContextVar[Optional[TraceContext]] = ContextVar("trace_context", default=None)
+
+
+def new_trace(league: Optional[str] = None) -> TraceContext:
+    return {"trace_id": uuid.uuid4().hex, "league": league, "origin_at": time(), "hops": []}
+
+
+@contextmanager
+def start_trace(league: Optional[str] = None):
+    """Start a trace that messages published inside the block carry"""
+    token = _current.set(new_trace(league))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def inject(channel: str, message_data: dict) -> dict:
+    """Copy of a message carrying the current trace, with this publish as its latest hop.
+
+    Outside any trace the message starts a new one.
+    """
+    context = _current.get() or new_trace(message_data.get("league"))
+    hops = context["hops"] + [[channel, time()]]
+    return {**message_data, TRACE_KEY: {**context, "hops": hops}}
+
+
+@contextmanager
+def handling(channel: str, data):
+    """Run a message's handler inside the trace the message carries and record its span"""
+    context = data.get(TRACE_KEY) if isinstance(data, dict) else None
+    if not context:
+        yield
+        return
+
+    token = _current.set(context)
+    started_at = time()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        _current.reset(token)
+        _record(
+            {
+                "kind": "handler",
+                "name": channel,
+                "trace_id": context["trace_id"],
+                "league": context["league"],
+                "origin_at": context["origin_at"],
+                "published_at": context["hops"][-1][1],
+                "started_at": started_at,
+                "ended_at": time(),
+                "hops": context["hops"],
+                "error": error,
+            }
+        )
+
+
+def mark(name: str, **attributes) -> None:
+    """Record that something happened in the current trace, such as a match resolving"""
+    context = _current.get()
+    if context is None:
+        return
+    _record(
+        {
+            "kind": "mark",
+            "name": name,
+            "trace_id": context["trace_id"],
+            "league": context["league"],
+            "origin_at": context["origin_at"],
+            "at": time(),
+            "hops": context["hops"],
+            **attributes,
+        }
+    )
+
+
+class _SpanExporter:
+    """Writes spans from a daemon thread, so recording one never blocks the event loop"""
+
+    def __init__(self, path: Optional[str], collector: Optional[str]):
+        self._spans: queue.SimpleQueue = queue.SimpleQueue()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._socket = None
+        if collector:
+            host, port = collector.rsplit(":", 1)
+            self._address = (host, int(port))
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, span: dict) -> None:
+        self._spans.put(span)
+
+    def close(self) -> None:
+        self._spans.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._spans.get()]
+            while not self._spans.empty() and batch[-1] is not None:
+                batch.append(self._spans.get())
+            for span in batch:
+                if span is None:
+                    break
+                self._export(json.dumps(span))
+            if self._file:
+                self._file.flush()
+            if batch[-1] is None:
+                return
+
+    def _export(self, line: str) -> None:
+        if self._file:
+            self._file.write(line + "\n")
+        if self._socket:
+            try:
+                self._socket.sendto(line.encode(), self._address)
+            except OSError:
+                # A collector that is down must not take the worker with it
+                pass
+
+
+_exporter: Optional[_SpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _record(span: dict) -> None:
+    global _exporter
+    if not (TRACE_FILE or TRACE_COLLECTOR):
+        return
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = _SpanExporter(TRACE_FILE, TRACE_COLLECTOR)
+    _exporter.put(span)
@@ -1,10 +1,18 @@
 import os
+import atexit
+import copy
 import logging
-import json
+import logging.handlers
+import queue
+import random
+import threading
+import weakref
+import orjson
 from pythonjsonlogger.json import JsonFormatter
 from dotenv import load_dotenv
 from typing import Literal, Optional
 from datetime import datetime, timezone
+from time import monotonic
 
 load_dotenv()
 
@@ -18,39 +26,267 @@ def getenv_required(key: str) -> str:
 
 
 class CustomRailwayLogFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__()
+        self._second: Optional[int] = None
+        self._second_text = ""
+
+    def formatTime(self, record, datefmt=None):
+        # Records come in bursts within the same second, so format each second once
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._second_text = super().formatTime(record, datefmt)[:-4]
+        return f"{self._second_text},{int(record.msecs):03d}"
+
     def format(self, record):
         log_record = {
             "time": self.formatTime(record),
             "level": record.levelname,
             "message": record.getMessage(),
         }
-        return json.dumps(log_record)
+        return orjson.dumps(log_record).decode()
+
+
+class _LogQueueHandler(logging.handlers.QueueHandler):
+    """Queues records for the listener thread, which formats and writes them"""
+
+    def prepare(self, record):
+        # Only merge the message args here; JSON encoding and the write happen off the caller's thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+
+_log_queue_handler: Optional[_LogQueueHandler] = None
+_log_listener: Optional[logging.handlers.QueueListener] = None
+_log_setup_lock = threading.Lock()
+_sampling_filters: "weakref.WeakSet[SamplingFilter]" = weakref.WeakSet()
+
+
+def _start_log_listener():
+    global _log_queue_handler, _log_listener
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(CustomRailwayLogFormatter())
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _log_listener.start()
+
+    # Loggers created before a fork keep their handler, so point it at the child's own listener
+    if _log_queue_handler is None:
+        _log_queue_handler = _LogQueueHandler(log_queue)
+    else:
+        _log_queue_handler.queue = log_queue
+
+
+def _stop_log_listener():
+    if _log_listener is not None:
+        _log_listener.stop()
+
+
+def _flush_sampling_filters():
+    for log_filter in list(_sampling_filters):
+        log_filter.flush()
+
+
+def _reset_sampling_filters_after_fork():
+    for log_filter in list(_sampling_filters):
+        log_filter._reset_after_fork()
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through a sample of a logger's records below WARNING, at most
+    max_per_second of them, and logs a summary of what it saw every
+    summary_interval seconds."""
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        sample_rate: float = 1.0,
+        max_per_second: Optional[float] = None,
+        summary_interval: float = 60.0,
+    ):
+        super().__init__()
+        self._logger = logger
+        self._sample_rate = sample_rate
+        self._max_per_second = max_per_second
+        self._summary_interval = summary_interval
+        self._lock = threading.Lock()
+        self._window_start = monotonic()
+        self._tokens = max_per_second or 0.0
+        self._last_refill = self._window_start
+        self._seen = 0
+        self._logged = 0
+        # setup_logger flushes every live filter at exit and resets them in forked children
+        _sampling_filters.add(self)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or getattr(record, "log_summary", False):
+            return True
+
+        now = monotonic()
+        with self._lock:
+            summary = self._take_summary(now) if now - self._window_start >= self._summary_interval else None
+
+            self._seen += 1
+            keep = self._sample_rate >= 1 or random.random() < self._sample_rate
+            if keep and self._max_per_second:
+                self._tokens = min(
+                    self._max_per_second, self._tokens + (now - self._last_refill) * self._max_per_second
+                )
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                else:
+                    keep = False
+            if keep:
+                self._logged += 1
+
+        if summary:
+            self._log_summary(summary)
+        return keep
+
+    def flush(self):
+        """Log the summary of the current window now"""
+        with self._lock:
+            summary = self._take_summary(monotonic())
+        if summary:
+            self._log_summary(summary)
+
+    def _reset_after_fork(self):
+        # A forked child counts afresh rather than summarizing its parent's records again
+        self._lock = threading.Lock()
+        self._take_summary(monotonic())
+
+    def _take_summary(self, now: float):
+        summary = (self._seen, self._logged, now - self._window_start) if self._seen else None
+        self._window_start = now
+        self._seen = 0
+        self._logged = 0
+        return summary
+
+    def _log_summary(self, summary):
+        seen, logged, elapsed = summary
+        self._logger.info(
+            f"{self._logger.name}: {seen} messages in the last {elapsed:.0f}s, {logged} of them logged",
+            extra={"log_summary": True},
+        )
 
 
-def setup_logger(name: str, level: int = logging.INFO):
+def setup_logger(
+    name: str,
+    level: int = logging.INFO,
+    sample_rate: float = 1.0,
+    max_per_second: Optional[float] = None,
+    summary_interval: float = 60.0,
+):
     """Creates a new logger with proper JSON configuration.
 
+    Records are queued and written as JSON by one background thread per
+    process, so logging never blocks on stdout. For per-item logging on hot
+    paths, pass sample_rate and/or max_per_second: the logger then keeps only
+    that share of records below WARNING and logs a count of the rest every
+    summary_interval seconds.
+
     Args:
         name: Logger name (defaults to calling module name)
         level: Logging level (defaults to INFO)
+        sample_rate: Share of records below WARNING to log (defaults to all)
+        max_per_second: Most records below WARNING to log per second (optional)
+        summary_interval: Seconds between summaries of sampled records (defaults to 60)
 
     Returns:
         Configured logger instance
     """
+    with _log_setup_lock:
+        if _log_listener is None:
+            _start_log_listener()
+            os.register_at_fork(after_in_child=_start_log_listener)
+            atexit.register(_stop_log_listener)
+            # Registered after the listener's hooks so summaries are flushed before it stops
+            os.register_at_fork(after_in_child=_reset_sampling_filters_after_fork)
+            atexit.register(_flush_sampling_filters)
+
     logger = logging.getLogger(name)
     logger.setLevel(level)
-
-    handler = logging.StreamHandler()
+    # Each logger has its own handler; propagating would write records twice
+    logger.propagate = False
 
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
-    formatter = CustomRailwayLogFormatter()
-    handler.setFormatter(formatter)
-
-    logger.addHandler(handler)
+    logger.addHandler(_log_queue_handler)
+
+    for log_filter in logger.filters[:]:
+        if isinstance(log_filter, SamplingFilter):
+            log_filter.flush()
+            logger.removeFilter(log_filter)
+            _sampling_filters.discard(log_filter)
+    if sample_rate < 1 or max_per_second is not None:
+        logger.addFilter(SamplingFilter(logger, sample_rate, max_per_second, summary_interval))
     return logger
 
 
+async def monitor_event_loop_lag(
+    logger: logging.Logger, interval: float = 0.25, report_interval: float = 60.0
+):
+    """Measure how late the event loop wakes up and log a summary periodically.
+
+    Lag is the difference between when a sleep should have ended and when the
+    loop actually resumed it, i.e. how long something blocked the loop.
+
+    Args:
+        logger: Logger to report to
+        interval: Seconds between samples (defaults to 0.25)
+        report_interval: Seconds between summary log lines (defaults to 60)
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    samples: list[float] = []
+    last_report = loop.time()
+
+    while True:
+        expected_wake = loop.time() + interval
+        await asyncio.sleep(interval)
+        now = loop.time()
+        samples.append(max(0.0, now - expected_wake))
+
+        if now - last_report >= report_interval:
+            samples.sort()
+            p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+            logger.info(
+                f"Event loop lag: avg {1000 * sum(samples) / len(samples):.1f}ms, "
+                f"p99 {1000 * p99:.1f}ms, max {1000 * samples[-1]:.1f}ms over {len(samples)} samples"
+            )
+            samples = []
+            last_report = now
+
+
+class AsyncRateLimiter:
+    """Spaces out async calls to at most `rate` per second across tasks"""
+
+    def __init__(self, rate: float):
+        import asyncio
+
+        self.interval = 1 / rate
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        """Wait for the next free slot"""
+        import asyncio
+
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
 def server_req(
     route: str,
     method: Literal["GET", "POST", "PUT", "DELETE", "PATCH"],
@@ -113,12 +349,13 @@ def server_req(
     return response
 
 
-def data_feeds_req(route: str, params: Optional[dict] = None):
+def data_feeds_req(route: str, params: Optional[dict] = None, stream: bool = False):
     """Make authenticated GET requests to the data feeds API.
 
     Args:
         route: API route (e.g., '/team-info/MLB')
         params: Dictionary of query parameters (optional)
+        stream: Leave the response body unread so it can be consumed incrementally (optional)
 
     Returns:
         Response object from requests
@@ -140,7 +377,7 @@ def data_feeds_req(route: str, params: Optional[dict] = None):
 
     url = f"{DATA_FEEDS_BASE_URL}{route}"
 
-    response = requests.get(url, params=api_params, timeout=30)
+    response = requests.get(url, params=api_params, timeout=30, stream=stream)
 
     if response.status_code not in [200, 304]:
         raise requests.HTTPError(
@@ -227,6 +464,22 @@ async def async_server_req(
     Raises:
         Exception: If response status is not 200
     """
+    from metrics import SERVER_REQUEST_FAILURES, SERVER_REQUEST_SECONDS
+
+    try:
+        with SERVER_REQUEST_SECONDS.labels(route=route).time():
+            return await _async_server_req(route, method, body, params)
+    except Exception:
+        SERVER_REQUEST_FAILURES.labels(route=route).inc()
+        raise
+
+
+async def _async_server_req(
+    route: str,
+    method: Literal["GET", "POST", "PUT", "DELETE", "PATCH"],
+    body: Optional[dict],
+    params: Optional[dict],
+):
     import aiohttp
     import ssl
     import certifi
@@ -0,0 +1,18 @@
+CREATE TABLE "prop_model_state" (
+	"player_id" integer NOT NULL,
+	"league" "league_type" NOT NULL,
+	"stat_name" text NOT NULL,
+	"feature_names" text[] NOT NULL,
+	"information" double precision[] NOT NULL,
+	"moments" double precision[] NOT NULL,
+	"coefficients" double precision[] NOT NULL,
+	"feature_means" double precision[] NOT NULL,
+	"mean_weight" double precision DEFAULT 0 NOT NULL,
+	"target_sum_squares" double precision DEFAULT 0 NOT NULL,
+	"games" integer DEFAULT 0 NOT NULL,
+	"last_game_id" text,
+	"updated_at" timestamp with time zone DEFAULT now() NOT NULL,
+	CONSTRAINT "prop_model_state_player_id_league_stat_name_pk" PRIMARY KEY("player_id","league","stat_name")
+);
+--> statement-breakpoint
+ALTER TABLE "prop_model_state" ADD CONSTRAINT "fk_player_prop_model_state" FOREIGN KEY ("player_id","league") REFERENCES "public"."player"("player_id","league") ON DELETE cascade ON UPDATE no action;
\ No newline at end of file
@@ -0,0 +1,26 @@
+CREATE TABLE "player_feature_window" (
+	"player_id" integer NOT NULL,
+	"league" "league_type" NOT NULL,
+	"team_id" integer NOT NULL,
+	"game_ids" text[] NOT NULL,
+	"player_fields" text[] NOT NULL,
+	"team_fields" text[] NOT NULL,
+	"player_values" double precision[] NOT NULL,
+	"team_values" double precision[] NOT NULL,
+	"opponent_values" double precision[] NOT NULL,
+	"updated_at" timestamp with time zone DEFAULT now() NOT NULL,
+	CONSTRAINT "player_feature_window_player_id_league_pk" PRIMARY KEY("player_id","league")
+);
+--> statement-breakpoint
+CREATE TABLE "team_feature_window" (
+	"team_id" integer NOT NULL,
+	"league" "league_type" NOT NULL,
+	"game_ids" text[] NOT NULL,
+	"fields" text[] NOT NULL,
+	"stat_values" double precision[] NOT NULL,
+	"updated_at" timestamp with time zone DEFAULT now() NOT NULL,
+	CONSTRAINT "team_feature_window_team_id_league_pk" PRIMARY KEY("team_id","league")
+);
+--> statement-breakpoint
+ALTER TABLE "player_feature_window" ADD CONSTRAINT "fk_player_feature_window" FOREIGN KEY ("player_id","league") REFERENCES "public"."player"("player_id","league") ON DELETE cascade ON UPDATE no action;--> statement-breakpoint
+ALTER TABLE "team_feature_window" ADD CONSTRAINT "fk_team_feature_window" FOREIGN KEY ("team_id","league") REFERENCES "public"."team"("team_id","league") ON DELETE cascade ON UPDATE no action;
\ No newline at end of file
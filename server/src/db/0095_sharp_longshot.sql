@@ -0,0 +1,29 @@
+DO $$
+BEGIN
+	IF EXISTS (
+		SELECT 1
+		FROM "prop"
+		WHERE EXISTS (SELECT 1 FROM "pick" WHERE "pick"."prop_id" = "prop"."id")
+		GROUP BY "league", "game_id", "player_id", "stat_name"
+		HAVING COUNT(DISTINCT "line") > 1
+	) THEN
+		RAISE EXCEPTION 'Duplicate props with picks on different lines; settle or move those picks before adding uq_prop_league_game_player_stat';
+	END IF;
+END $$;--> statement-breakpoint
+WITH "ranked" AS (
+	SELECT "id", FIRST_VALUE("id") OVER (
+		PARTITION BY "league", "game_id", "player_id", "stat_name"
+		ORDER BY EXISTS (SELECT 1 FROM "pick" WHERE "pick"."prop_id" = "prop"."id") DESC, "id"
+	) AS "keep_id"
+	FROM "prop"
+)
+UPDATE "pick" SET "prop_id" = "ranked"."keep_id" FROM "ranked" WHERE "pick"."prop_id" = "ranked"."id" AND "ranked"."id" <> "ranked"."keep_id";--> statement-breakpoint
+WITH "ranked" AS (
+	SELECT "id", FIRST_VALUE("id") OVER (
+		PARTITION BY "league", "game_id", "player_id", "stat_name"
+		ORDER BY EXISTS (SELECT 1 FROM "pick" WHERE "pick"."prop_id" = "prop"."id") DESC, "id"
+	) AS "keep_id"
+	FROM "prop"
+)
+DELETE FROM "prop" USING "ranked" WHERE "prop"."id" = "ranked"."id" AND "ranked"."id" <> "ranked"."keep_id" AND NOT EXISTS (SELECT 1 FROM "pick" WHERE "pick"."prop_id" = "prop"."id");--> statement-breakpoint
+CREATE UNIQUE INDEX "uq_prop_league_game_player_stat" ON "prop" USING btree ("league","game_id","player_id","stat_name");
@@ -0,0 +1,11 @@
+CREATE TABLE "prop_input_fingerprint" (
+	"league" "league_type" NOT NULL,
+	"game_id" text NOT NULL,
+	"player_id" integer NOT NULL,
+	"fingerprint" text NOT NULL,
+	"updated_at" timestamp with time zone DEFAULT now() NOT NULL,
+	CONSTRAINT "prop_input_fingerprint_league_game_id_player_id_pk" PRIMARY KEY("league","game_id","player_id")
+);
+--> statement-breakpoint
+ALTER TABLE "prop_input_fingerprint" ADD CONSTRAINT "fk_game_prop_input_fingerprint" FOREIGN KEY ("game_id","league") REFERENCES "public"."game"("game_id","league") ON DELETE cascade ON UPDATE no action;--> statement-breakpoint
+ALTER TABLE "prop_input_fingerprint" ADD CONSTRAINT "fk_player_prop_input_fingerprint" FOREIGN KEY ("player_id","league") REFERENCES "public"."player"("player_id","league") ON DELETE cascade ON UPDATE no action;
\ No newline at end of file
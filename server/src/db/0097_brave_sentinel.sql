@@ -0,0 +1,2 @@
+DELETE FROM "prop_input_fingerprint";--> statement-breakpoint
+ALTER TABLE "prop_input_fingerprint" ADD COLUMN "team_id" integer NOT NULL;
\ No newline at end of file
@@ -0,0 +1,15 @@
+CREATE TABLE "notification_outbox" (
+	"id" serial PRIMARY KEY NOT NULL,
+	"receiver_id" text NOT NULL,
+	"title" text NOT NULL,
+	"body" text NOT NULL,
+	"url" text,
+	"attempts" integer DEFAULT 0 NOT NULL,
+	"next_attempt_at" timestamp with time zone DEFAULT now() NOT NULL,
+	"sent_at" timestamp with time zone,
+	"last_error" text,
+	"created_at" timestamp with time zone DEFAULT now() NOT NULL
+);
+--> statement-breakpoint
+ALTER TABLE "notification_outbox" ADD CONSTRAINT "notification_outbox_receiver_id_user_id_fk" FOREIGN KEY ("receiver_id") REFERENCES "public"."user"("id") ON DELETE cascade ON UPDATE no action;--> statement-breakpoint
+CREATE INDEX "idx_notification_outbox_pending" ON "notification_outbox" USING btree ("id") WHERE "notification_outbox"."sent_at" is null;
\ No newline at end of file
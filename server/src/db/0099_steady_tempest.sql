@@ -0,0 +1,7 @@
+CREATE TABLE "broadcast_checkpoint" (
+	"broadcast_id" text PRIMARY KEY NOT NULL,
+	"last_user_id" text,
+	"recipients" integer DEFAULT 0 NOT NULL,
+	"completed_at" timestamp with time zone,
+	"updated_at" timestamp with time zone DEFAULT now() NOT NULL
+);
@@ -0,0 +1,2 @@
+ALTER TABLE "player_feature_window" ADD COLUMN "head_start_time" timestamp with time zone;--> statement-breakpoint
+ALTER TABLE "team_feature_window" ADD COLUMN "head_start_time" timestamp with time zone;
@@ -10,7 +10,9 @@ import {
   serial,
   text,
   timestamp,
+  uniqueIndex,
 } from "drizzle-orm/pg-core";
+import { sql } from "drizzle-orm";
 import { v4 as uuidv4 } from "uuid";
 
 export const matchStatus = pgEnum("match_status", [
@@ -312,9 +314,179 @@ export const prop = pgTable(
     index("idx_prop_game_league").on(table.gameId, table.league),
     index("idx_prop_player_league").on(table.playerId, table.league),
     index("idx_prop_league_status").on(table.league, table.status),
+    uniqueIndex("uq_prop_league_game_player_stat").on(
+      table.league,
+      table.gameId,
+      table.playerId,
+      table.statName
+    ),
+  ]
+);
+
+export const propModelState = pgTable(
+  "prop_model_state",
+  {
+    playerId: integer("player_id").notNull(),
+    league: leagueType().notNull(),
+    statName: text("stat_name").notNull(),
+    featureNames: text("feature_names").array().notNull(),
+    information: doublePrecision().array().notNull(),
+    moments: doublePrecision().array().notNull(),
+    coefficients: doublePrecision().array().notNull(),
+    featureMeans: doublePrecision("feature_means").array().notNull(),
+    meanWeight: doublePrecision("mean_weight").default(0).notNull(),
+    targetSumSquares: doublePrecision("target_sum_squares").default(0).notNull(),
+    games: integer().default(0).notNull(),
+    lastGameId: text("last_game_id"),
+    updatedAt: timestamp("updated_at", {
+      withTimezone: true,
+      mode: "string",
+    })
+      .defaultNow()
+      .notNull(),
+  },
+  (table) => [
+    primaryKey({ columns: [table.playerId, table.league, table.statName] }),
+    foreignKey({
+      columns: [table.playerId, table.league],
+      foreignColumns: [player.playerId, player.league],
+      name: "fk_player_prop_model_state",
+    }).onDelete("cascade"),
+  ]
+);
+
+export const playerFeatureWindow = pgTable(
+  "player_feature_window",
+  {
+    playerId: integer("player_id").notNull(),
+    league: leagueType().notNull(),
+    teamId: integer("team_id").notNull(),
+    gameIds: text("game_ids").array().notNull(),
+    playerFields: text("player_fields").array().notNull(),
+    teamFields: text("team_fields").array().notNull(),
+    playerValues: doublePrecision("player_values").array().notNull(),
+    teamValues: doublePrecision("team_values").array().notNull(),
+    opponentValues: doublePrecision("opponent_values").array().notNull(),
+    headStartTime: timestamp("head_start_time", {
+      withTimezone: true,
+      mode: "string",
+    }),
+    updatedAt: timestamp("updated_at", {
+      withTimezone: true,
+      mode: "string",
+    })
+      .defaultNow()
+      .notNull(),
+  },
+  (table) => [
+    primaryKey({ columns: [table.playerId, table.league] }),
+    foreignKey({
+      columns: [table.playerId, table.league],
+      foreignColumns: [player.playerId, player.league],
+      name: "fk_player_feature_window",
+    }).onDelete("cascade"),
   ]
 );
 
+export const teamFeatureWindow = pgTable(
+  "team_feature_window",
+  {
+    teamId: integer("team_id").notNull(),
+    league: leagueType().notNull(),
+    gameIds: text("game_ids").array().notNull(),
+    fields: text().array().notNull(),
+    statValues: doublePrecision("stat_values").array().notNull(),
+    headStartTime: timestamp("head_start_time", {
+      withTimezone: true,
+      mode: "string",
+    }),
+    updatedAt: timestamp("updated_at", {
+      withTimezone: true,
+      mode: "string",
+    })
+      .defaultNow()
+      .notNull(),
+  },
+  (table) => [
+    primaryKey({ columns: [table.teamId, table.league] }),
+    foreignKey({
+      columns: [table.teamId, table.league],
+      foreignColumns: [team.teamId, team.league],
+      name: "fk_team_feature_window",
+    }).onDelete("cascade"),
+  ]
+);
+
+export const propInputFingerprint = pgTable(
+  "prop_input_fingerprint",
+  {
+    league: leagueType().notNull(),
+    gameId: text("game_id").notNull(),
+    playerId: integer("player_id").notNull(),
+    teamId: integer("team_id").notNull(),
+    fingerprint: text().notNull(),
+    updatedAt: timestamp("updated_at", {
+      withTimezone: true,
+      mode: "string",
+    })
+      .defaultNow()
+      .notNull(),
+  },
+  (table) => [
+    primaryKey({ columns: [table.league, table.gameId, table.playerId] }),
+    foreignKey({
+      columns: [table.gameId, table.league],
+      foreignColumns: [game.gameId, game.league],
+      name: "fk_game_prop_input_fingerprint",
+    }).onDelete("cascade"),
+    foreignKey({
+      columns: [table.playerId, table.league],
+      foreignColumns: [player.playerId, player.league],
+      name: "fk_player_prop_input_fingerprint",
+    }).onDelete("cascade"),
+  ]
+);
+
+export const notificationOutbox = pgTable(
+  "notification_outbox",
+  {
+    id: serial().primaryKey().notNull(),
+    receiverId: text("receiver_id")
+      .references(() => user.id, { onDelete: "cascade" })
+      .notNull(),
+    title: text().notNull(),
+    body: text().notNull(),
+    url: text(),
+    attempts: integer().default(0).notNull(),
+    nextAttemptAt: timestamp("next_attempt_at", {
+      withTimezone: true,
+      mode: "string",
+    })
+      .defaultNow()
+      .notNull(),
+    sentAt: timestamp("sent_at", { withTimezone: true, mode: "string" }),
+    lastError: text("last_error"),
+    createdAt: timestamp("created_at", { withTimezone: true, mode: "string" })
+      .defaultNow()
+      .notNull(),
+  },
+  (table) => [
+    index("idx_notification_outbox_pending")
+      .on(table.id)
+      .where(sql`${table.sentAt} is null`),
+  ]
+);
+
+export const broadcastCheckpoint = pgTable("broadcast_checkpoint", {
+  broadcastId: text("broadcast_id").primaryKey().notNull(),
+  lastUserId: text("last_user_id"),
+  recipients: integer().default(0).notNull(),
+  completedAt: timestamp("completed_at", { withTimezone: true, mode: "string" }),
+  updatedAt: timestamp("updated_at", { withTimezone: true, mode: "string" })
+    .defaultNow()
+    .notNull(),
+});
+
 export const parlay = pgTable(
   "parlay",
   {